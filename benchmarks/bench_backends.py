@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Compare embedding backends on latency, peak RSS and package size.
+
+Each backend runs in a fresh interpreter so peak RSS reflects only that
+backend's runtime. Package size is the on-disk size of the Python packages the
+backend imports plus its model files.
+
+Usage: python3 benchmarks/bench_backends.py [--backends torch onnx] [--repeats N]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Top-level packages each backend pulls in at runtime
+RUNTIME_PACKAGES: Dict[str, List[str]] = {
+    "torch": ["torch", "sentence_transformers", "transformers", "tokenizers", "huggingface_hub", "safetensors"],
+    "onnx": ["onnxruntime", "tokenizers"],
+}
+
+_CHILD = """
+import json, resource, sys, time
+from pathlib import Path
+from project import embeddings
+from project.preprocessing import normalize_text
+
+repeats = int(sys.argv[1])
+with Path("data/input_example.json").open("r") as fh:
+    texts = [normalize_text(i["sentence"]) for i in json.load(fh)["baseline"]]
+
+start = time.perf_counter()
+model = embeddings.get_model()
+loaded = time.perf_counter()
+latencies = []
+for _ in range(repeats):
+    t0 = time.perf_counter()
+    model.encode(texts)
+    latencies.append(time.perf_counter() - t0)
+
+print(json.dumps({
+    "load_s": loaded - start,
+    "encode_s": sorted(latencies)[len(latencies) // 2],
+    "sentences": len(texts),
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def directory_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def package_size_mb(backend: str) -> float:
+    from project.embedding_backends import EMBEDDING_ONNX_MODEL_DIR
+
+    total = 0
+    for name in RUNTIME_PACKAGES[backend]:
+        spec = importlib.util.find_spec(name)
+        if spec is not None and spec.origin:
+            total += directory_size(Path(spec.origin).parent)
+    if backend == "onnx":
+        model_dir = Path(EMBEDDING_ONNX_MODEL_DIR)
+        if model_dir.exists():
+            total += directory_size(model_dir)
+    return total / (1024 * 1024)
+
+
+def run_backend(backend: str, repeats: int) -> Dict[str, float]:
+    env = dict(os.environ)
+    env["EMBEDDING_BACKEND"] = backend
+    env["EMBEDDING_CACHE_ENABLED"] = "false"
+    env["PYTHONPATH"] = str(ROOT)
+    env.setdefault("LOG_LEVEL", "WARNING")
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, str(repeats)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        result = run_backend(backend, args.repeats)
+        print(
+            f"{backend:6s} load {result['load_s']:.3f}s  "
+            f"encode {result['sentences']} sentences {result['encode_s'] * 1000:.1f}ms (median)  "
+            f"peak RSS {result['peak_rss_mb']:.0f}MB  "
+            f"package {package_size_mb(backend):.0f}MB"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare fixed-size encode batches with length-bucketed, token-budgeted batches.
+
+For each file in data/ this reports padding efficiency (real tokens / computed
+tokens) for both strategies, and with --encode the measured throughput of the
+configured embedding backend.
+
+Usage: python3 benchmarks/bench_batching.py [--encode] [--budget TOKENS] [--repeats N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from project import embeddings  # noqa: E402
+from project.batching import get_token_budget, padding_efficiency, plan_batches  # noqa: E402
+from project.embedding_backends import estimate_token_lengths  # noqa: E402
+from project.loader import load_sentences  # noqa: E402
+from project.parser import parse_payload  # noqa: E402
+from project.preprocessing import preprocess_sentences  # noqa: E402
+
+FIXED_BATCH_SIZE = 32
+
+
+def load_texts(path: Path) -> List[str]:
+    with path.open("r") as fh:
+        raw = json.load(fh)
+    if not raw.get("comparison"):
+        raw.pop("comparison", None)
+    return [p.normalized_text for p in preprocess_sentences(load_sentences(parse_payload(raw)))]
+
+
+def best_of(repeats: int, fn) -> float: # type: ignore
+    timings: List[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--encode", action="store_true", help="also time real encodes (loads the model)")
+    parser.add_argument("--budget", type=int, default=None, help="token budget, default from memory tier")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.budget:
+        os.environ["ENCODE_TOKEN_BUDGET"] = str(args.budget)
+    budget = get_token_budget()
+    model = embeddings.get_model() if args.encode else None
+
+    for path in sorted((ROOT / "data").glob("*.json")):
+        texts = load_texts(path)
+        lengths = getattr(model, "token_lengths", estimate_token_lengths)(texts)
+
+        fixed = [list(range(i, min(i + FIXED_BATCH_SIZE, len(texts)))) for i in range(0, len(texts), FIXED_BATCH_SIZE)]
+        planned = plan_batches(lengths, budget)
+
+        line = (
+            f"{path.name:32s} {len(texts):4d} sentences  "
+            f"padding efficiency fixed[{FIXED_BATCH_SIZE}] {padding_efficiency(lengths, fixed):.2f}  "
+            f"bucketed[{budget} tok, {len(planned)} batches] {padding_efficiency(lengths, planned):.2f}"
+        )
+
+        if model is not None:
+            fixed_s = best_of(args.repeats, lambda: model.encode(texts, batch_size=FIXED_BATCH_SIZE)) # type: ignore
+            planned_s = best_of(args.repeats, lambda: embeddings._encode(texts)) # type: ignore
+            line += (
+                f"  throughput fixed {len(texts) / fixed_s:.0f}/s"
+                f"  bucketed {len(texts) / planned_s:.0f}/s ({fixed_s / planned_s:.2f}x)"
+            )
+
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
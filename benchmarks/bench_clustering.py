@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Scaling benchmark for the clustering engines.
+
+Clusters synthetic L2-normalized 384-dim vectors (Gaussian blobs around random
+centres plus uniform noise) from 500 up to 50k points and reports wall time
+and peak traced memory per engine. The sklearn engine builds full pairwise
+neighbourhoods, so it is skipped above --dbscan-limit points.
+
+Usage: python3 benchmarks/bench_clustering.py [--sizes 500 5000 ...] [--dbscan-limit N]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Tuple
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from project.clustering import ENGINES  # noqa: E402
+from project.constants import MIN_CLUSTER_SIZE, SIMILARITY_THRESHOLD  # noqa: E402
+
+DIM = 384
+
+
+def synthetic_vectors(n: int, seed: int = 0) -> np.ndarray:
+    """Roughly one topic per 50 sentences, with 20% unclustered noise."""
+    rng = np.random.default_rng(seed)
+    n_noise = n // 5
+    n_topics = max(1, n // 50)
+    centres = rng.normal(size=(n_topics, DIM))
+    assignment = rng.integers(0, n_topics, size=n - n_noise)
+    clustered = centres[assignment] + rng.normal(scale=0.02, size=(n - n_noise, DIM))
+    vectors = np.vstack([clustered, rng.normal(size=(n_noise, DIM))])
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def measure(engine: str, vectors: np.ndarray) -> Tuple[float, float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    labels = ENGINES[engine](vectors, SIMILARITY_THRESHOLD, MIN_CLUSTER_SIZE)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024), int(labels.max()) + 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 5000, 10000, 20000, 50000])
+    parser.add_argument("--engines", nargs="+", default=sorted(ENGINES))
+    parser.add_argument("--dbscan-limit", type=int, default=20000)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        vectors = synthetic_vectors(n)
+        for engine in args.engines:
+            if engine == "dbscan" and n > args.dbscan_limit:
+                print(f"{n:6d} {engine:8s} skipped (above --dbscan-limit)")
+                continue
+            elapsed, peak_mb, n_clusters = measure(engine, vectors)
+            print(f"{n:6d} {engine:8s} {elapsed:8.3f}s  peak {peak_mb:8.1f}MB  {n_clusters} clusters")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Peak memory of the object-per-sentence pipeline vs the columnar SentenceBatch.
+
+Runs preprocessing, embedding, clustering and summarization over synthetic
+sentences both ways and reports time and peak traced memory. Embeddings come
+from a deterministic in-process stand-in model (one topic direction per
+sentence prefix plus noise), so no weights are downloaded and only the data
+structures differ between runs.
+
+Usage: python3 benchmarks/bench_columnar.py [--sizes 5000 20000 50000]
+"""
+import argparse
+import gc
+import hashlib
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+import numpy as np  # noqa: E402
+
+from project import embeddings  # noqa: E402
+from project.clustering import cluster_batch, cluster_sentences  # noqa: E402
+from project.models import AnalysisMode, Sentence  # noqa: E402
+from project.preprocessing import build_sentence_batch, preprocess_sentences  # noqa: E402
+from project.summarization import summarize_cluster, summarize_rows  # noqa: E402
+
+DIM = 384
+TOPICS = 200
+
+
+class TopicModel:
+    """Sentences sharing their first word get nearby vectors."""
+
+    def __init__(self) -> None:
+        rng = np.random.default_rng(0)
+        self.centres = rng.normal(size=(TOPICS, DIM)).astype(np.float32)
+
+    def encode(self, texts: List[str], batch_size: int | None = None) -> np.ndarray:
+        vectors = np.empty((len(texts), DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+            topic = int(text.split()[0][1:]) % TOPICS
+            noise = np.random.default_rng(seed).normal(scale=0.05, size=DIM)
+            vectors[row] = self.centres[topic] + noise
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def synthetic_sentences(n: int) -> List[Sentence]:
+    rng = np.random.default_rng(1)
+    topics = rng.integers(0, TOPICS, size=n)
+    return [
+        Sentence(id=f"id-{i // 3}", text=f"t{topics[i]} comment number {i} about the service", source=AnalysisMode.STANDALONE)
+        for i in range(n)
+    ]
+
+
+def object_pipeline(sentences: List[Sentence]) -> int:
+    processed = preprocess_sentences(sentences)
+    embedded = embeddings.embed_sentence_list(processed).baseline
+    clusters = cluster_sentences(embedded, engine="blocked")
+    return len([summarize_cluster(c) for c in clusters])
+
+
+def columnar_pipeline(sentences: List[Sentence]) -> int:
+    batch = build_sentence_batch(sentences)
+    embeddings.embed_batch(batch)
+    clusters = cluster_batch(batch, engine="blocked")
+    return len([summarize_rows(batch, rows) for rows in clusters])
+
+
+def measure(fn: Callable[[List[Sentence]], Any], sentences: List[Sentence]) -> Tuple[float, float, Any]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(sentences)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024), result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 50000])
+    args = parser.parse_args()
+
+    embeddings._model = TopicModel() # type: ignore
+
+    for n in args.sizes:
+        sentences = synthetic_sentences(n)
+        for name, fn in (("objects", object_pipeline), ("columnar", columnar_pipeline)):
+            elapsed, peak_mb, n_clusters = measure(fn, sentences)
+            print(f"{n:6d} {name:8s} {elapsed:7.2f}s  peak {peak_mb:7.1f}MB  {n_clusters} clusters")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
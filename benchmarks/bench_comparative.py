@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Encode work for comparative analysis: per-set passes vs one shared pass.
+
+The "separate" strategy preprocesses, encodes and clusters baseline and
+comparison independently, which is what supporting comparison on top of the
+standalone pipeline would cost. The "shared" strategy is what lambda_handler
+does: deduplicate both sets together, encode each unique text once and cluster
+the combined matrix once.
+
+Usage: python3 benchmarks/bench_comparative.py [--repeats N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Measure model work, not cache hits
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from project import embeddings  # noqa: E402
+from project.clustering import cluster_sentences  # noqa: E402
+from project.loader import load_sentences  # noqa: E402
+from project.models import Sentence  # noqa: E402
+from project.parser import parse_payload  # noqa: E402
+from project.preprocessing import preprocess_sentences  # noqa: E402
+
+
+class CountingModel:
+    """Wraps the configured backend and counts the texts it is asked to encode."""
+
+    def __init__(self, inner: Any):
+        self.inner = inner
+        self.texts = 0
+        self.seconds = 0.0
+
+    def encode(self, texts: List[str], batch_size: int | None = None) -> Any:
+        start = time.perf_counter()
+        result = self.inner.encode(texts, batch_size=batch_size)
+        self.seconds += time.perf_counter() - start
+        self.texts += len(texts)
+        return result
+
+
+def run_separate(sentences: List[Sentence]) -> int:
+    clusters = 0
+    for source in {s.source for s in sentences}:
+        processed = preprocess_sentences([s for s in sentences if s.source == source])
+        clusters += len(cluster_sentences(embeddings.embed_sentence_list(processed).baseline))
+    return clusters
+
+
+def run_shared(sentences: List[Sentence]) -> int:
+    processed = preprocess_sentences(sentences)
+    return len(cluster_sentences(embeddings.embed_sentence_list(processed).baseline))
+
+
+def measure(strategy: Any, sentences: List[Sentence], repeats: int) -> Dict[str, float]:
+    inner = embeddings.get_model()
+    best: Dict[str, float] = {}
+    for _ in range(repeats):
+        counter = CountingModel(inner)
+        embeddings._model = counter # type: ignore
+        start = time.perf_counter()
+        strategy(sentences)
+        total = time.perf_counter() - start
+        if not best or total < best["total_s"]:
+            best = {"texts": counter.texts, "encode_s": counter.seconds, "total_s": total}
+    embeddings._model = inner
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with (ROOT / "data" / "input_comparison_example.json").open("r") as fh:
+        sentences = load_sentences(parse_payload(json.load(fh)))
+
+    for name, strategy in (("separate", run_separate), ("shared", run_shared)):
+        result = measure(strategy, sentences, args.repeats)
+        print(
+            f"{name:8s} {len(sentences)} input sentences  encoded {result['texts']:.0f} texts  "
+            f"encode {result['encode_s']:.3f}s  end-to-end {result['total_s']:.3f}s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Memory, clustering time and agreement of compact vector forms vs full precision.
+
+For each input size it clusters 384-dim float32 vectors as they are, then
+each --configs compact form (project.compression): PCA or random projection
+to fewer dimensions, int8 codes, or both. Per form it prints the bytes the
+clustering input takes, the compression and clustering seconds, the peak
+traced memory while clustering, and the adjusted Rand index of the labels
+against the full-precision ones.
+
+Inputs:
+  blobs-<n>      Gaussian blobs with 20% noise (benchmarks/bench_clustering.py)
+  sentences-<n>  a synthetic standalone request (benchmarks/suite.py), deduplicated
+                 and embedded offline with the stub backend
+
+Configs are <reduction>-<dim>[-int8] or int8, e.g. pca-128, random-64-int8.
+
+Usage: python3 benchmarks/bench_compression.py [--sizes 2000 5000 10000 20000] [--configs pca-128 int8 ...] [--engine blocked]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+from sklearn.metrics import adjusted_rand_score  # noqa: E402
+
+from benchmarks.bench_clustering import synthetic_vectors  # noqa: E402
+from benchmarks.suite import synthetic_payload  # noqa: E402
+from project.clustering import cluster_labels  # noqa: E402
+from project.compression import compress_vectors  # noqa: E402
+from project.embedding_backends import StubBackend  # noqa: E402
+from project.near_duplicates import collapse_near_duplicates  # noqa: E402
+from project.preprocessing import SentenceBatchBuilder  # noqa: E402
+
+DEFAULT_CONFIGS = ["pca-128", "pca-64", "random-128", "int8", "pca-128-int8", "pca-64-int8"]
+
+
+def sentence_vectors(size: int) -> np.ndarray:
+    builder = SentenceBatchBuilder()
+    for item in synthetic_payload(size, comparative=False)["baseline"]:
+        builder.add(item["id"], item["sentence"])
+    return StubBackend().encode(collapse_near_duplicates(builder.build()).normalized_texts)
+
+
+def inputs(size: int) -> List[Tuple[str, np.ndarray]]:
+    return [(f"blobs-{size}", synthetic_vectors(size)), (f"sentences-{size}", sentence_vectors(size))]
+
+
+def parse_config(config: str) -> Tuple[str, int | None, bool]:
+    parts = config.split("-")
+    int8 = parts[-1] == "int8"
+    if int8:
+        parts = parts[:-1]
+    if not parts:
+        return "none", None, int8
+    return parts[0], int(parts[1]), int8
+
+
+def measure(fn: Callable[[], Any]) -> Tuple[float, float, Any]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024), result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 5000, 10000, 20000])
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS)
+    parser.add_argument("--engine", default="blocked")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        for name, vectors in inputs(size):
+            seconds, peak, reference = measure(lambda: cluster_labels(vectors, engine=args.engine))
+            print(f"{name} ({vectors.shape[0]} rows, {args.engine} engine)")
+            print(f"  {'form':<14} {'input MB':>8} {'compress':>9} {'cluster':>8} {'peak MB':>8} {'clusters':>8} {'ARI':>6}")
+            print(f"  {'float32-384':<14} {vectors.nbytes / 2 ** 20:>8.2f} {'':>9} {seconds:>7.3f}s "
+                  f"{peak:>8.1f} {int(reference.max()) + 1:>8} {1:>6.3f}")
+
+            for config in args.configs:
+                method, dim, int8 = parse_config(config)
+                start = time.perf_counter()
+                compact = compress_vectors(vectors, method, dim, int8)
+                compress_seconds = time.perf_counter() - start
+                seconds, peak, labels = measure(lambda: cluster_labels(compact, engine=args.engine))
+                print(f"  {config:<14} {compact.nbytes / 2 ** 20:>8.2f} {compress_seconds:>8.3f}s {seconds:>7.3f}s "
+                      f"{peak:>8.1f} {int(labels.max()) + 1:>8} {adjusted_rand_score(reference, labels):>6.3f}")
+            print()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Encoder calls saved, and preprocessing throughput, by richer normalization and near-duplicate collapsing.
+
+Builds --size sentences like free-text survey answers: half are fresh
+combinations of words, half restate one of the data/*.json sentences, either
+verbatim or with a change of case or spacing, different punctuation, an
+emoji, a one-letter typo or an extra word. The distinct rows each step
+leaves are the texts the encoder would see:
+
+  exact       lowercase + whitespace folding (the key used before)
+  normalized  NFKC, punctuation, emoji and apostrophes stripped (dedup_key)
+  + minhash   normalized rows, then MinHash/LSH near-duplicate collapsing
+
+Throughput compares the previous preprocess_sentences, which scanned each
+group's id list for every repeat, against the current one.
+
+Usage: python3 benchmarks/bench_dedup.py [--size 50000] [--repeat 3] [--threshold 0.8]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, List
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from project.models import AnalysisMode, Sentence  # noqa: E402
+from project.near_duplicates import collapse_near_duplicates  # noqa: E402
+from project.preprocessing import SentenceBatchBuilder, normalize_text, preprocess_sentences  # noqa: E402
+from project.sentiment import score_sentiment  # noqa: E402
+
+EMOJI = ["👍", "😡", "🙂", "🔥", "👎🏽", "❤️"]
+PUNCTUATION = ["!", "!!", ".", "...", "?", " :(", " :)"]
+
+
+def data_sentences() -> List[str]:
+    sentences: List[str] = []
+    for path in sorted((ROOT / "data").glob("*.json")):
+        payload = json.loads(path.read_text())
+        for field in ("baseline", "comparison"):
+            sentences.extend(item["sentence"] for item in payload.get(field) or [])
+    return list(dict.fromkeys(sentences))
+
+
+def variant(rng: random.Random, text: str, vocabulary: List[str]) -> str:
+    kind = rng.randrange(6)
+    if kind == 0:
+        return text
+    if kind == 1:
+        return "  ".join(text.upper().split()) if rng.random() < 0.5 else text.lower()
+    if kind == 2:
+        return text.rstrip(".!?") + rng.choice(PUNCTUATION)
+    if kind == 3:
+        return f"{text} {rng.choice(EMOJI)}"
+    if kind == 4:
+        position = rng.randrange(len(text))
+        return text[:position] + text[position + 1:]
+    words = text.split()
+    words.insert(rng.randrange(len(words) + 1), rng.choice(vocabulary))
+    return " ".join(words)
+
+
+def synthetic_sentences(size: int, seed: int = 0) -> List[Sentence]:
+    rng = random.Random(seed)
+    sources = data_sentences()
+    vocabulary = sorted({w.strip(".,!?").lower() for s in sources for w in s.split()})
+    sentences = []
+    for i in range(size):
+        if rng.random() < 0.5:
+            text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(5, 14)))
+        else:
+            text = variant(rng, rng.choice(sources), vocabulary)
+        sentences.append(Sentence(id=f"c{i // 2}", text=text, source=AnalysisMode.STANDALONE))
+    return sentences
+
+
+def legacy_preprocess(sentences: List[Sentence]) -> int:
+    # preprocess_sentences before this change, minus building the ProcessedSentence objects
+    grouped: dict = {}
+    for sentence in sentences:
+        normalized = " ".join(sentence.text.lower().split())
+        if not normalized:
+            continue
+        if normalized not in grouped:
+            grouped[normalized] = ([], [], [], [])
+        ids, original_texts, baseline_ids, comparison_ids = grouped[normalized]
+        if sentence.id not in ids:
+            ids.append(sentence.id)
+        original_texts.append(sentence.text)
+        if sentence.id not in baseline_ids:
+            baseline_ids.append(sentence.id)
+    score_sentiment([group[1][0] for group in grouped.values()])
+    return len(grouped)
+
+
+def build_batch(sentences: List[Sentence]) -> Any:
+    builder = SentenceBatchBuilder()
+    for s in sentences:
+        builder.add(s.id, s.text)
+    return builder.build()
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    sentences = synthetic_sentences(args.size)
+    n = len(sentences)
+
+    exact_seconds, exact_rows = best_of(lambda: len({normalize_text(s.text) for s in sentences}), args.repeat)
+    batch_seconds, batch = best_of(lambda: build_batch(sentences), args.repeat)
+    collapse_seconds, collapsed = best_of(lambda: collapse_near_duplicates(batch, args.threshold), args.repeat)
+
+    print(f"{n} sentences")
+    print(f"{'step':<12} {'rows encoded':>12} {'calls saved':>12} {'vs exact':>9} {'seconds':>8}")
+    for name, rows, seconds in (
+        ("exact", exact_rows, exact_seconds),
+        ("normalized", len(batch), batch_seconds),
+        ("+ minhash", len(collapsed), batch_seconds + collapse_seconds),
+    ):
+        print(f"{name:<12} {rows:>12} {1 - rows / n:>11.1%} {1 - rows / exact_rows:>8.1%} {seconds:>8.3f}")
+
+    legacy_seconds, _ = best_of(lambda: legacy_preprocess(sentences), args.repeat)
+    current_seconds, _ = best_of(lambda: preprocess_sentences(sentences), args.repeat)
+    print()
+    print(f"{'throughput':<32} {'sentences/s':>12}")
+    print(f"{'preprocess_sentences (before)':<32} {n / legacy_seconds:>12,.0f}")
+    print(f"{'preprocess_sentences (now)':<32} {n / current_seconds:>12,.0f}")
+    print(f"{'SentenceBatchBuilder':<32} {n / batch_seconds:>12,.0f}")
+    print(f"{'collapse_near_duplicates':<32} {len(batch) / collapse_seconds:>12,.0f} rows/s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
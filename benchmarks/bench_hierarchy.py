@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Density hierarchy vs a naive eps sweep.
+
+Tuning eps by re-running DBSCAN costs a full similarity pass per value. The
+hierarchy engine builds the nearest-neighbour spanning forest once; after
+that every eps is a cheap cut (threshold_labels) and the most stable
+clusters come from one condensed-tree pass (stable_labels).
+
+Inputs, all embedded offline with the stub backend except the blobs:
+  data/*.json      the example requests
+  sentences-<n>    a synthetic standalone request of --size sentences (benchmarks/suite.py)
+  blobs-<n>        --size Gaussian blobs with 20% noise (benchmarks/bench_clustering.py)
+
+For each input it prints the sweep's and the hierarchy's wall time, each
+eps's clusters, noise and largest-cluster share, whether the cuts match the
+sweep (adjusted Rand index), and what the stability selection picked.
+
+Usage: python3 benchmarks/bench_hierarchy.py [--size 20000] [--eps 0.1 0.15 ...] [--engine blocked]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+from sklearn.metrics import adjusted_rand_score  # noqa: E402
+
+from benchmarks.bench_clustering import synthetic_vectors  # noqa: E402
+from benchmarks.suite import synthetic_payload  # noqa: E402
+from project.clustering import cluster_labels  # noqa: E402
+from project.constants import MIN_CLUSTER_SIZE  # noqa: E402
+from project.embedding_backends import StubBackend  # noqa: E402
+from project.hierarchy import (  # noqa: E402
+    HIERARCHY_MAX_DISTANCE, HIERARCHY_MIN_CLUSTER_SIZE, build_hierarchy, stable_labels, threshold_labels,
+)
+from project.preprocessing import normalize_text  # noqa: E402
+
+
+def embed_payload(payload: Dict[str, Any]) -> np.ndarray:
+    texts = [item["sentence"] for field in ("baseline", "comparison") for item in payload.get(field) or []]
+    unique = list({normalize_text(text): text for text in texts}.values())
+    return StubBackend().encode(unique)
+
+
+def inputs(size: int) -> List[Tuple[str, np.ndarray]]:
+    cases = [(path.name, embed_payload(json.loads(path.read_text()))) for path in sorted((ROOT / "data").glob("*.json"))]
+    cases.append((f"sentences-{size}", embed_payload(synthetic_payload(size, comparative=False))))
+    cases.append((f"blobs-{size}", synthetic_vectors(size)))
+    return cases
+
+
+def timed(fn: Callable[[], Any]) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def shape(labels: np.ndarray) -> str:
+    n = labels.shape[0]
+    sizes = np.bincount(labels[labels >= 0]) if (labels >= 0).any() else np.zeros(1, dtype=np.int64)
+    return f"{int(labels.max()) + 1:>6} {(labels < 0).mean():>6.1%} {sizes.max() / n:>8.1%}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--eps", type=float, nargs="+", default=[round(0.1 + 0.05 * i, 2) for i in range(9)])
+    parser.add_argument("--engine", default="blocked")
+    parser.add_argument("--min-samples", type=int, default=MIN_CLUSTER_SIZE)
+    args = parser.parse_args()
+    min_cluster_size = max(args.min_samples, HIERARCHY_MIN_CLUSTER_SIZE)
+
+    for name, vectors in inputs(args.size):
+        sweep_seconds, sweep = timed(lambda: [cluster_labels(vectors, eps, args.min_samples, args.engine) for eps in args.eps])
+        build_seconds, hierarchy = timed(lambda: build_hierarchy(vectors, args.min_samples))
+        cut_seconds, cuts = timed(lambda: [threshold_labels(hierarchy, eps) for eps in args.eps])
+        select_seconds, selected = timed(lambda: stable_labels(hierarchy, min_cluster_size))
+        hierarchy_seconds = build_seconds + cut_seconds + select_seconds
+
+        print(f"{name} ({vectors.shape[0]} rows)")
+        print(f"  {args.engine} sweep over {len(args.eps)} eps  {sweep_seconds:8.3f}s")
+        print(f"  hierarchy                  {hierarchy_seconds:8.3f}s  (build {build_seconds:.3f}s, "
+              f"cuts {cut_seconds:.3f}s, selection {select_seconds:.3f}s)  {sweep_seconds / hierarchy_seconds:.1f}x")
+        print(f"  {'eps':>6} {'clusters':>8} {'noise':>6} {'largest':>8}   ARI cut vs sweep")
+        for eps, cut, swept in zip(args.eps, cuts, sweep):
+            print(f"  {eps:>6.2f}   {shape(cut)}   {adjusted_rand_score(swept, cut):.3f}")
+        print(f"  {'stable':>6}   {shape(selected)}   "
+              f"(min cluster size {min_cluster_size}, max distance {HIERARCHY_MAX_DISTANCE})")
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
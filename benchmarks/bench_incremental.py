@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Re-run cost of an analysis when 1% of its sentences are new.
+
+For each size, a synthetic survey is analysed once through the handler with
+INCREMENTAL_ANALYSIS on, to store its state. The same survey plus --new-share
+new sentences is then analysed twice: incrementally against the stored
+state, and from scratch. Reported per run: wall time, texts sent to the
+model, and clusters summarized afresh.
+
+Embeddings come from the offline stub backend, slowed by --encode-ms per
+text to stand in for the real model's CPU cost. MAX_SENTENCES is lifted in
+process so dashboard-sized surveys fit in one request.
+
+Usage: python3 benchmarks/bench_incremental.py [--sizes 500 2000 10000] [--new-share 0.01] [--encode-ms 2]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("ANALYSIS_STORE_DIR", tempfile.mkdtemp(prefix="bench-analysis-store-"))
+
+import numpy as np  # noqa: E402
+
+from project import app, embeddings, incremental, ingestion, validation  # noqa: E402
+from project.embedding_backends import StubBackend  # noqa: E402
+
+TOPICS = 60
+VOCABULARY = 400
+
+
+class SlowStubModel:
+    """The stub backend, plus a fixed cost per encoded text."""
+
+    def __init__(self, encode_ms: float):
+        self.encode_ms = encode_ms
+        self.encoded = 0
+
+    def encode(self, texts: List[str], batch_size: int | None = None) -> np.ndarray:
+        self.encoded += len(texts)
+        time.sleep(len(texts) * self.encode_ms / 1000)
+        return StubBackend().encode(texts)
+
+
+def synthetic_sentences(n: int, start: int, seed: int) -> List[Dict[str, str]]:
+    # sentences on the same topic share five words, so the stub embeds them close together
+    rng = np.random.default_rng(seed)
+    topic_words = np.random.default_rng(0).integers(0, VOCABULARY, size=(TOPICS, 5))
+    topics = rng.integers(0, TOPICS, size=n)
+    extras = rng.integers(0, VOCABULARY, size=n)
+    return [
+        {
+            "id": f"c{(start + i) // 2}",
+            "sentence": " ".join(f"w{w}" for w in topic_words[t]) + f" w{e} note{start + i}",
+        }
+        for i, (t, e) in enumerate(zip(topics, extras))
+    ]
+
+
+def run(payload: Dict[str, Any], model: SlowStubModel, incremental_on: bool) -> tuple[float, int, int]:
+    model.encoded = 0
+    with mock.patch.object(app, "INCREMENTAL_ANALYSIS", incremental_on):
+        start = time.perf_counter()
+        clusters = json.loads(app.lambda_handler(payload, None)["body"])["clusters"]
+        elapsed = time.perf_counter() - start
+    return elapsed, model.encoded, len(clusters)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 10000])
+    parser.add_argument("--new-share", type=float, default=0.01)
+    parser.add_argument("--encode-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    model = SlowStubModel(args.encode_ms)
+    embeddings._model = model
+    limit = max(args.sizes) * 2
+    summarized: List[int] = []
+    original_summarize = app.summarize_rows
+
+    def counting_summarize(batch: Any, rows: Any) -> Any:
+        summarized.append(1)
+        return original_summarize(batch, rows)
+
+    print(f"encode cost {args.encode_ms} ms/text, {args.new_share:.0%} new sentences, store {incremental.ANALYSIS_STORE}")
+    print(f"{'sentences':>9}  {'run':<11}  {'seconds':>8}  {'encoded':>7}  {'summarized':>10}")
+    with mock.patch.object(ingestion, "MAX_SENTENCES", limit), mock.patch.object(validation, "MAX_SENTENCES", limit), \
+            mock.patch.object(app, "summarize_rows", counting_summarize):
+        for size in args.sizes:
+            base = synthetic_sentences(size, 0, seed=size)
+            payload = {"surveyTitle": f"Survey {size}", "theme": "service", "baseline": base}
+            rerun = dict(payload, baseline=base + synthetic_sentences(max(1, int(size * args.new_share)), size, seed=size + 1))
+
+            results = []
+            for label, body, incremental_on in (
+                ("first", payload, True), ("incremental", rerun, True), ("full", rerun, False),
+            ):
+                summarized.clear()
+                seconds, encoded, clusters = run(body, model, incremental_on)
+                results.append((label, seconds, encoded, len(summarized), clusters))
+
+            for label, seconds, encoded, fresh, clusters in results:
+                print(f"{size:>9}  {label:<11}  {seconds:>8.3f}  {encoded:>7}  {fresh:>4} of {clusters:<4}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
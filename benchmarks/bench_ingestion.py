@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Single-pass ingestion vs the staged parse -> validate -> parse -> load path.
+
+Scales data/input_comparison_example.json up by repeating its sentences with
+fresh ids and a copy number, then ingests the same API Gateway style body
+both ways into a SentenceBatch and reports time and peak traced memory.
+MAX_SENTENCES is lifted for the run so the scaled payload validates.
+
+Usage: python3 benchmarks/bench_ingestion.py [--scale 100] [--repeat 5]
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from project import ingestion, validation  # noqa: E402
+from project.models import IngestedRequest  # noqa: E402
+
+SAMPLE = ROOT / "data" / "input_comparison_example.json"
+
+
+def scaled_body(scale: int) -> str:
+    payload = json.loads(SAMPLE.read_text())
+    for field in ("baseline", "comparison"):
+        items = payload[field]
+        payload[field] = [
+            {"sentence": f"{item['sentence']} ({copy})", "id": f"{item['id']}-{copy}"}
+            for copy in range(scale) for item in items
+        ]
+    return json.dumps(payload, indent=4)
+
+
+def staged(event: Dict[str, Any]) -> IngestedRequest:
+    return ingestion._ingest_staged(ingestion.parse_json(event))
+
+
+def measure(fn: Callable[[Dict[str, Any]], IngestedRequest], event: Dict[str, Any], repeat: int) -> Tuple[float, int, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        request = fn(event)
+        best = min(best, time.perf_counter() - start)
+        del request
+
+    gc.collect()
+    tracemalloc.start()
+    request = fn(event)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(request.batch)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    event = {"body": scaled_body(args.scale)}
+    validation.MAX_SENTENCES = ingestion.MAX_SENTENCES = sys.maxsize
+
+    print(f"body: {len(event['body']) / 1e6:.1f} MB, scale {args.scale}x")
+    print(f"{'path':<12}{'best s':>10}{'peak MB':>10}{'rows':>8}")
+    for name, fn in (("staged", staged), ("single-pass", ingestion.ingest_event)):
+        seconds, peak, rows = measure(fn, event, args.repeat)
+        print(f"{name:<12}{seconds:>10.3f}{peak / 1e6:>10.1f}{rows:>8}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Per-request encodes vs the cross-request micro-batcher (project.microbatch).
+
+Each client thread sends --requests requests of --texts distinct sentences
+through project.embeddings, like concurrent handler threads in one warm
+process. The run is repeated with micro-batching off and on, at each
+concurrency level, and reports throughput and latency percentiles.
+
+The default model is an in-process numpy stand-in shaped like a small
+encoder: hashed token embeddings and a per-token feed-forward layer over the
+padded batch, mean-pooled. Its cost per call grows with the padded batch as
+a transformer's does, so batching effects are real matrix effects; use
+--real-model for the configured backend.
+
+Usage: python3 benchmarks/bench_microbatch.py [--clients 1 8 32] [--requests 20] [--texts 16]
+           [--window-ms 5] [--max-texts 256] [--real-model]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Measure model work, not cache hits
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import numpy as np  # noqa: E402
+
+from project import embeddings  # noqa: E402
+from project.microbatch import MicroBatcher  # noqa: E402
+
+DIM = 384
+HIDDEN = 1536
+VOCAB = 8192
+WORDS = [f"w{i}" for i in range(5000)]
+
+
+class FeedForwardModel:
+    """Token embeddings -> per-token ReLU feed-forward -> masked mean pool -> L2 norm."""
+
+    def __init__(self) -> None:
+        rng = np.random.default_rng(0)
+        self.table = rng.standard_normal((VOCAB, DIM), dtype=np.float32)
+        self.w1 = rng.standard_normal((DIM, HIDDEN), dtype=np.float32) / np.sqrt(DIM)
+        self.w2 = rng.standard_normal((HIDDEN, DIM), dtype=np.float32) / np.sqrt(HIDDEN)
+
+    def encode(self, texts: List[str], batch_size: int | None = None) -> np.ndarray:
+        tokens = [[hash(w) % VOCAB for w in t.split()] or [0] for t in texts]
+        longest = max(len(t) for t in tokens)
+        ids = np.zeros((len(texts), longest), dtype=np.int64)
+        mask = np.zeros((len(texts), longest), dtype=np.float32)
+        for row, t in enumerate(tokens):
+            ids[row, :len(t)] = t
+            mask[row, :len(t)] = 1.0
+
+        hidden = np.maximum(self.table[ids] @ self.w1, 0) @ self.w2
+        pooled = (hidden * mask[:, :, None]).sum(axis=1) / mask.sum(axis=1, keepdims=True)
+        return pooled / np.linalg.norm(pooled, axis=1, keepdims=True)
+
+
+def make_requests(clients: int, requests: int, texts: int) -> List[List[List[str]]]:
+    rng = np.random.default_rng(1)
+    return [
+        [[" ".join(rng.choice(WORDS, size=rng.integers(6, 20))) for _ in range(texts)] for _ in range(requests)]
+        for _ in range(clients)
+    ]
+
+
+def run(workload: List[List[List[str]]]) -> Dict[str, float]:
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def client(requests: List[List[str]]) -> None:
+        for texts in requests:
+            start = time.perf_counter()
+            embeddings._embed_texts(texts)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(requests,)) for requests in workload]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    texts = sum(len(texts) for requests in workload for texts in requests)
+    return {"req_s": len(latencies) / total, "texts_s": texts / total, "p50": p50, "p95": p95, "p99": p99}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--texts", type=int, default=16, help="sentences per request")
+    parser.add_argument("--window-ms", type=float, default=embeddings.EMBEDDING_MICROBATCH_WINDOW_MS)
+    parser.add_argument("--max-texts", type=int, default=embeddings.EMBEDDING_MICROBATCH_MAX_TEXTS)
+    parser.add_argument("--real-model", action="store_true", help="use the configured backend instead of the stand-in")
+    args = parser.parse_args()
+
+    if not args.real_model:
+        embeddings._model = FeedForwardModel() # type: ignore
+    embeddings.get_model()
+
+    print(f"{args.texts} texts/request, {args.requests} requests/client, window {args.window_ms}ms, max {args.max_texts} texts")
+    print(f"{'clients':>7} {'mode':<14}{'req/s':>8}{'texts/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'batches':>9}")
+    for clients in args.clients:
+        workload = make_requests(clients, args.requests, args.texts)
+        embeddings.EMBEDDING_MICROBATCH = False
+        run(workload[:1])  # warm BLAS and caches
+
+        for mode in ("per-request", "micro-batched"):
+            embeddings.EMBEDDING_MICROBATCH = mode == "micro-batched"
+            batcher = MicroBatcher(embeddings._encode, args.window_ms / 1000, args.max_texts)
+            embeddings._batcher = batcher
+            r = run(workload)
+            batcher.close()
+
+            batches = str(batcher.stats.batches) if embeddings.EMBEDDING_MICROBATCH else "-"
+            print(
+                f"{clients:>7} {mode:<14}{r['req_s']:>8.1f}{r['texts_s']:>9.0f}"
+                f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{batches:>9}"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Peak memory of inline requests vs object references as input grows.
+
+For each size, synthetic sentences are written as JSONL to a local blob
+store, then analysed in a fresh process two ways: inline, with the JSON
+body read into the event (MAX_SENTENCES lifted in process), and by
+reference, with only `baselineUri` in the event. A sampler thread reads the
+process's anonymous resident memory (RssAnon: heap and numpy buffers, not
+file-backed maps) every few milliseconds; the table shows its peak growth
+over the idle process, plus wall time and the result's size.
+
+Embeddings come from the offline stub backend; clustering of referenced
+input uses the blocked engine, whose similarity scratch is capped by
+SIMILARITY_MEMORY_BYTES, so expect a few minutes at 100k.
+
+Usage: python3 benchmarks/bench_offload.py [--sizes 1000 10000 100000] [--inline-max 10000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("EMBEDDING_BACKEND", "stub")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import numpy as np  # noqa: E402
+
+TOPIC_SIZE = 40
+VOCABULARY = 5000
+
+
+def anon_rss_kb() -> int:
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    return 0
+
+
+def write_sentences(path: Path, n: int) -> None:
+    # about TOPIC_SIZE sentences per topic, sharing five words so the stub embeds them together
+    rng = np.random.default_rng(n)
+    topics = max(1, n // TOPIC_SIZE)
+    topic_words = rng.integers(0, VOCABULARY, size=(topics, 5))
+    with path.open("w") as fh:
+        for i, (t, extra) in enumerate(zip(rng.integers(0, topics, size=n), rng.integers(0, VOCABULARY, size=n))):
+            words = " ".join(f"w{w}" for w in topic_words[t])
+            fh.write(json.dumps({"id": f"c{i // 2}", "sentence": f"{words} w{extra} note{i}"}) + "\n")
+
+
+def child(mode: str, root: str, key: str, n: int) -> None:
+    from unittest import mock
+    from project import app, blob_store, embeddings, ingestion, validation
+
+    store = blob_store.LocalBlobStore(root)
+    blob_store._blob_store = store
+    embeddings.get_model()
+
+    peak = [0]
+    done = threading.Event()
+
+    def sample() -> None:
+        while not done.is_set():
+            peak[0] = max(peak[0], anon_rss_kb())
+            time.sleep(0.002)
+
+    base = anon_rss_kb()
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+
+    if mode == "inline":
+        with mock.patch.object(ingestion, "MAX_SENTENCES", n), mock.patch.object(validation, "MAX_SENTENCES", n):
+            with store.open_read(f"s3://bench/{key}") as fh:
+                items = [json.loads(line) for line in fh]
+            body = json.dumps({"surveyTitle": "Bench", "theme": "all", "baseline": items})
+            del items
+            response = app.lambda_handler({"body": body}, None)
+        result_bytes = len(response["body"])
+    else:
+        event = {"surveyTitle": "Bench", "theme": "all", "baselineUri": f"s3://bench/{key}"}
+        response = app.lambda_handler(event, None)
+        result_bytes = store.path(json.loads(response["body"])["resultUri"]).stat().st_size
+
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    peak_mb = (max(peak[0], anon_rss_kb()) - base) / 1024
+    print(json.dumps({"peak_mb": peak_mb, "seconds": elapsed, "result_mb": result_bytes / 1e6}))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--inline-max", type=int, default=10000, help="largest size also run inline")
+    parser.add_argument("--child", nargs=4, metavar=("MODE", "ROOT", "KEY", "N"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, root, key, n = args.child
+        child(mode, root, key, int(n))
+        return 0
+
+    with tempfile.TemporaryDirectory() as root:
+        (Path(root) / "bench").mkdir()
+        print(f"{'sentences':>9}  {'input':<9}  {'peak anon MB':>12}  {'seconds':>8}  {'result MB':>9}")
+        for n in args.sizes:
+            key = f"survey-{n}.jsonl"
+            write_sentences(Path(root) / "bench" / key, n)
+            for mode in ("inline", "reference"):
+                if mode == "inline" and n > args.inline_max:
+                    continue
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", mode, root, key, str(n)],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                row = json.loads(output.strip().splitlines()[-1])
+                print(f"{n:>9}  {mode:<9}  {row['peak_mb']:>12.1f}  {row['seconds']:>8.2f}  {row['result_mb']:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Coverage gained, and time added, by recovering noise rows into their nearest cluster.
+
+For each data/*.json request, runs ingest, near-duplicate collapsing,
+embedding and clustering once. It then reports the share of input sentence
+ids that end up in some cluster, first from members alone and then with the
+ids recovered at each --floors similarity. It also reports how long
+recover_noise takes next to the clustering stage and the whole handler
+(median of --repeat runs, recovery on and off).
+
+Runs offline on the stub embedding backend unless --backend says otherwise.
+
+Usage: python3 benchmarks/bench_recovery.py [--floors 0.5 0.6 0.7] [--repeat 20] [--backend stub]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, List
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def covered_ids(batch: Any, clusters: List[Any], recovered: List[Any]) -> set:
+    ids = set()
+    for rows, extra in zip(clusters, recovered):
+        ids.update(batch.ids_for(rows))
+        ids.update(batch.ids_for(extra))
+    return ids
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--floors", type=float, nargs="+", default=[0.4, 0.5, 0.6, 0.7])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--backend", default="stub")
+    args = parser.parse_args()
+
+    # Read at import time by the project modules
+    os.environ["EMBEDDING_BACKEND"] = args.backend
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from project import app
+    from project.clustering import cluster_batch
+    from project.embeddings import embed_batch
+    from project.ingestion import ingest_event
+    from project.near_duplicates import collapse_near_duplicates
+    from project.noise_recovery import NOISE_RECOVERY_SIMILARITY, recover_noise, recovered_rows
+
+    for path in sorted((ROOT / "data").glob("*.json")):
+        payload = json.loads(path.read_text())
+        batch = collapse_near_duplicates(ingest_event(payload).batch)
+        embed_batch(batch)
+        clusters = cluster_batch(batch)
+        all_ids = set(batch.id_table)
+        none = [rows[:0] for rows in clusters]
+        noise_rows = int((batch.labels < 0).sum())
+
+        print(f"{path.name}: {len(all_ids)} ids, {len(batch)} rows, {len(clusters)} clusters, {noise_rows} noise rows")
+        print(f"  {'floor':>7} {'recovered rows':>15} {'ids covered':>12}")
+        print(f"  {'members':>7} {'':>15} {len(covered_ids(batch, clusters, none)) / len(all_ids):>12.1%}")
+        for floor in args.floors:
+            recover_noise(batch, floor)
+            recovered = recovered_rows(batch, clusters)
+            rows = sum(r.size for r in recovered)
+            print(f"  {floor:>7.2f} {rows:>15} {len(covered_ids(batch, clusters, recovered)) / len(all_ids):>12.1%}")
+
+        cluster_ms = median_ms(lambda: cluster_batch(batch), args.repeat)
+        recover_ms = median_ms(lambda: recover_noise(batch), args.repeat)
+        app.NOISE_RECOVERY = False
+        handler_off_ms = median_ms(lambda: app.lambda_handler(payload, None), args.repeat)
+        app.NOISE_RECOVERY = True
+        handler_on_ms = median_ms(lambda: app.lambda_handler(payload, None), args.repeat)
+        print(f"  recover_noise {recover_ms:.2f}ms at floor {NOISE_RECOVERY_SIMILARITY} "
+              f"(cluster_batch {cluster_ms:.2f}ms); handler {handler_off_ms:.1f}ms without, {handler_on_ms:.1f}ms with")
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Accuracy and throughput of the batch sentiment scorer against the old keyword classifier.
+
+Accuracy is measured on benchmarks/data/sentiment_labels.jsonl: 100 sentences
+sampled from data/*.json and labelled by hand. The label distribution and
+agreement between the two classifiers are reported over every sentence in the
+data files. Throughput is measured on the data-file sentences repeated up to
+--size.
+
+Usage: python3 benchmarks/bench_sentiment.py [--size 50000] [--repeat 3]
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from project.sentiment import label_scores, score_sentiment  # noqa: E402
+
+LABELS_PATH = ROOT / "benchmarks" / "data" / "sentiment_labels.jsonl"
+
+
+def keyword_sentiment(text: str) -> str:
+    # The classifier summarization used before the lexicon scorer
+    text_lower = text.lower()
+    if "good" in text_lower or "great" in text_lower or "excellent" in text_lower:
+        return "positive"
+    elif "bad" in text_lower or "terrible" in text_lower or "poor" in text_lower:
+        return "negative"
+    else:
+        return "neutral"
+
+
+def batch_sentiment(texts: List[str]) -> List[str]:
+    return label_scores(score_sentiment(texts))
+
+
+def data_sentences() -> List[str]:
+    sentences: List[str] = []
+    for path in sorted((ROOT / "data").glob("*.json")):
+        payload = json.loads(path.read_text())
+        for field in ("baseline", "comparison"):
+            sentences.extend(item["sentence"] for item in payload.get(field) or [])
+    return list(dict.fromkeys(sentences))
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    labelled = [json.loads(line) for line in LABELS_PATH.read_text().splitlines() if line]
+    texts = [row["sentence"] for row in labelled]
+    gold = [row["label"] for row in labelled]
+    print(f"hand-labelled accuracy ({len(gold)} sentences, {dict(Counter(gold))})")
+    for name, predicted in (("keyword", [keyword_sentiment(t) for t in texts]), ("lexicon", batch_sentiment(texts))):
+        correct = sum(p == g for p, g in zip(predicted, gold))
+        per_label = {label: sum(p == g == label for p, g in zip(predicted, gold)) for label in sorted(set(gold))}
+        print(f"  {name:<8} {correct / len(gold):.0%}  correct per label {per_label}")
+
+    sentences = data_sentences()
+    old = [keyword_sentiment(t) for t in sentences]
+    new = batch_sentiment(sentences)
+    print(f"\ndata files ({len(sentences)} unique sentences)")
+    print(f"  keyword  {dict(Counter(old))}")
+    print(f"  lexicon  {dict(Counter(new))}")
+    print(f"  agreement {sum(a == b for a, b in zip(old, new)) / len(sentences):.0%}")
+
+    workload = (sentences * (args.size // len(sentences) + 1))[:args.size]
+    keyword_s = best_of(lambda: [keyword_sentiment(t) for t in workload], args.repeat)
+    lexicon_s = best_of(lambda: score_sentiment(workload), args.repeat)
+    print(f"\nthroughput ({len(workload)} sentences, best of {args.repeat})")
+    print(f"  keyword  {keyword_s * 1000:8.1f}ms  {len(workload) / keyword_s:>10,.0f} sentences/s")
+    print(f"  lexicon  {lexicon_s * 1000:8.1f}ms  {len(workload) / lexicon_s:>10,.0f} sentences/s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Load test for the HTTP server (project.server).
+
+Opens --concurrency keep-alive connections that POST the same payload until
+--requests responses have come back, then reports throughput, latency
+percentiles and status counts. 503s from backpressure are counted and kept
+out of the latency figures.
+
+With no --url, a server is started in-process on a free port, on the
+offline stub embedding backend unless EMBEDDING_BACKEND says otherwise, so
+the run measures the server and pipeline overhead and needs no model weights.
+
+Usage: python3 benchmarks/bench_server.py [--url http://host:port/analyze]
+           [--concurrency 8] [--requests 400] [--payload data/input_example.json]
+           [--workers N] [--max-pending N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("EMBEDDING_BACKEND", "stub")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import numpy as np  # noqa: E402
+
+from project import server  # noqa: E402
+
+
+def start_local_server(workers: int, max_pending: int) -> Tuple[str, int]:
+    ready = threading.Event()
+    address: List[Tuple[str, int]] = []
+
+    async def run() -> None:
+        app = server.AnalysisServer(workers=workers, max_pending=max_pending)
+        address.append(await app.start("127.0.0.1", 0))
+        ready.set()
+        await app.serve_forever()
+
+    threading.Thread(target=lambda: asyncio.run(run()), daemon=True).start()
+    ready.wait()
+    return address[0]
+
+
+async def client(host: str, port: int, path: str, body: bytes, counter: List[int], total: int,
+                 latencies: List[float], statuses: Counter) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    request = (
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+
+    while counter[0] < total:
+        counter[0] += 1
+        start = time.perf_counter()
+        writer.write(request)
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+        await reader.readexactly(length)
+        elapsed = time.perf_counter() - start
+
+        status = int(head.split(b" ", 2)[1])
+        statuses[status] += 1
+        if status != 503:
+            latencies.append(elapsed)
+        if b"connection: close" in head.lower():
+            writer.close()
+            reader, writer = await asyncio.open_connection(host, port)
+
+    writer.close()
+
+
+async def load_test(host: str, port: int, path: str, body: bytes, concurrency: int, total: int) -> None:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = [0]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, path, body, counter, total, latencies, statuses) for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    print(f"requests: {sum(statuses.values())} in {elapsed:.2f}s ({sum(statuses.values()) / elapsed:.1f} req/s)")
+    print("statuses: " + ", ".join(f"{code} x{count}" for code, count in sorted(statuses.items())))
+    if latencies:
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        print(f"latency ms: p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}  max {max(latencies) * 1000:.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target server; default starts one in-process")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--payload", type=Path, default=ROOT / "data" / "input_example.json")
+    parser.add_argument("--workers", type=int, default=server.SERVER_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=server.SERVER_MAX_PENDING)
+    args = parser.parse_args()
+
+    if args.url:
+        target = urlsplit(args.url)
+        host, port, path = target.hostname or "127.0.0.1", target.port or 80, target.path or "/"
+    else:
+        host, port = start_local_server(args.workers, args.max_pending)
+        path = "/analyze"
+
+    print(f"target: http://{host}:{port}{path}, concurrency {args.concurrency}, payload {args.payload.name}")
+    asyncio.run(load_test(host, port, path, args.payload.read_bytes(), args.concurrency, args.requests))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Scaling of the sharded embed and cluster stages across worker processes.
+
+For each --sizes synthetic standalone request (benchmarks/suite.py), collapsed
+into rows as the handler would, it times embed_batch plus cluster_batch in
+this process, then embed_shards plus cluster_shards on a pool of each
+--workers count. Worker start-up and model loading are paid before timing,
+as in a warm host.
+
+Per pool it prints the embed and cluster seconds, the speed-up over the
+single process, the largest shard, the noise share and how far the merged
+clusters are from the single-process ones: adjusted Rand index over all
+rows, and over the rows outside the largest single-process cluster, which
+DBSCAN's chaining grows across what the shards keep as separate topics.
+
+Speed-ups are bounded by the cores of the host, printed first. Each shard
+is also a smaller O(rows²) clustering problem, so sharding pays off even
+with fewer cores than workers.
+
+Runs offline on the stub embedding backend unless --backend says otherwise.
+
+Usage: python3 benchmarks/bench_sharding.py [--sizes 20000 100000] [--workers 1 2 4 8] [--engine blocked]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Tuple
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def timed(fn: Callable[[], Any]) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--engine", default="blocked")
+    parser.add_argument("--backend", default="stub")
+    args = parser.parse_args()
+
+    # Read at import time by the project modules, here and in the workers
+    os.environ["EMBEDDING_BACKEND"] = args.backend
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    import numpy as np
+    from sklearn.metrics import adjusted_rand_score
+
+    from benchmarks.suite import synthetic_payload
+    from project.clustering import cluster_batch
+    from project.embeddings import embed_batch, warm_up
+    from project.near_duplicates import collapse_near_duplicates
+    from project.preprocessing import SentenceBatchBuilder
+    from project.sharding import SHARD_START_METHOD, cluster_shards, embed_shards, partition_rows
+
+    print(f"{os.cpu_count()} cores, {SHARD_START_METHOD} workers, {args.backend} backend, {args.engine} engine")
+    warm_up()
+    pools = {}
+    for workers in args.workers:
+        pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(SHARD_START_METHOD))
+        warm = SentenceBatchBuilder()
+        for i in range(workers):
+            warm.add(str(i), f"warm up sentence {i}")
+        embed_shards(warm.build(), workers, executor=pools[workers])
+
+    for size in args.sizes:
+        builder = SentenceBatchBuilder()
+        for item in synthetic_payload(size, comparative=False)["baseline"]:
+            builder.add(item["id"], item["sentence"])
+        batch = collapse_near_duplicates(builder.build())
+
+        embed_seconds, _ = timed(lambda: embed_batch(batch))
+        cluster_seconds, _ = timed(lambda: cluster_batch(batch, engine=args.engine))
+        single_seconds = embed_seconds + cluster_seconds
+        reference = batch.labels.copy()
+        rest = reference != np.bincount(reference[reference >= 0]).argmax()
+        print(f"sentences-{size} ({len(batch)} rows after deduplication)")
+        print(f"  {'workers':>7} {'embed':>8} {'cluster':>8} {'total':>8} {'speed-up':>8} "
+              f"{'shard':>7} {'clusters':>8} {'noise':>6} {'ARI':>6} {'rest':>6}")
+        print(f"  {'-':>7} {embed_seconds:>7.2f}s {cluster_seconds:>7.2f}s {single_seconds:>7.2f}s {1:>7.2f}x "
+              f"{len(batch):>7} {int(reference.max()) + 1:>8} {(reference < 0).mean():>6.1%} {1:>6.3f} {1:>6.3f}")
+
+        for workers, pool in pools.items():
+            shard_embed_seconds, _ = timed(lambda: embed_shards(batch, workers, executor=pool))
+            shard_cluster_seconds, clusters = timed(
+                lambda: cluster_shards(batch, workers, engine=args.engine, executor=pool)
+            )
+            total = shard_embed_seconds + shard_cluster_seconds
+            largest = max(rows.size for rows in partition_rows(batch.vectors, workers))
+            print(f"  {workers:>7} {shard_embed_seconds:>7.2f}s {shard_cluster_seconds:>7.2f}s {total:>7.2f}s "
+                  f"{single_seconds / total:>7.2f}x {largest:>7} {len(clusters):>8} "
+                  f"{(batch.labels < 0).mean():>6.1%} {adjusted_rand_score(reference, batch.labels):>6.3f} "
+                  f"{adjusted_rand_score(reference[rest], batch.labels[rest]):>6.3f}")
+        print()
+
+    for pool in pools.values():
+        pool.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the blocked similarity kernel in project.similarity.
+
+For corpora of 1k, 10k and 100k random 384-dim unit vectors, times top-k and
+thresholded neighbour search for a batch of query rows, and reports peak
+traced memory next to what a full n x n float32 matrix would need.
+
+Usage: python3 benchmarks/bench_similarity.py [--sizes 1000 10000 100000] [--queries N] [--memory-mb MB]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Tuple
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from project.similarity import threshold_neighbours, top_k_neighbours  # noqa: E402
+
+DIM = 384
+
+
+def unit_vectors(n: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def measure(fn: Callable[[], Any]) -> Tuple[float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=1000, help="query rows per run (all rows if fewer)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--memory-mb", type=int, default=64)
+    args = parser.parse_args()
+    memory_bytes = args.memory_mb * 1024 * 1024
+
+    for n in args.sizes:
+        corpus = unit_vectors(n)
+        queries = corpus[:min(args.queries, n)]
+        full_mb = n * n * 4 / (1024 * 1024)
+
+        runs = {
+            f"top-{args.k}": lambda: top_k_neighbours(queries, corpus, args.k, exclude_self=True, memory_bytes=memory_bytes),
+            f"sim>={args.threshold}": lambda: threshold_neighbours(queries, corpus, args.threshold, memory_bytes=memory_bytes),
+        }
+        for name, fn in runs.items():
+            elapsed, peak_mb = measure(fn)
+            print(
+                f"n={n:6d} {name:9s} {len(queries)} queries {elapsed * 1000:8.1f}ms "
+                f"({len(queries) / elapsed:8.0f} q/s)  peak {peak_mb:6.1f}MB  (full n x n would be {full_mb:,.0f}MB)"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Measure cold-start import-to-first-response time for lambda_handler.
+
+Each sample runs in a fresh interpreter so module imports and model loading
+are paid exactly as they would be on a Lambda cold start. Both the lazy
+(default) and eager (EAGER_MODEL_LOAD=true) paths are measured, for a request
+that fails validation and for a valid request that needs embeddings.
+
+Usage: python3 benchmarks/bench_startup.py [--repeats N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Runs inside the child interpreter; prints a single JSON line of timings
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import project.app as app
+imported = time.perf_counter()
+from project.validation import BadRequestError
+event = json.loads(sys.argv[1])
+try:
+    app.lambda_handler(event, None)
+except BadRequestError:
+    pass
+done = time.perf_counter()
+from project.embeddings import get_load_stats
+stats = get_load_stats()
+print(json.dumps({
+    "import_s": imported - start,
+    "first_response_s": done - start,
+    "model_import_s": stats.import_seconds if stats else None,
+    "model_load_s": stats.load_seconds if stats else None,
+}))
+"""
+
+
+def run_once(event: Dict[str, object], eager: bool) -> Dict[str, float]:
+    env = dict(os.environ)
+    env["EAGER_MODEL_LOAD"] = "true" if eager else "false"
+    env["PYTHONPATH"] = str(ROOT)
+    env.setdefault("LOG_LEVEL", "WARNING")
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, json.dumps(event)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with (ROOT / "data" / "input_example.json").open("r") as fh:
+        valid_event = json.load(fh)
+    invalid_event = {"surveyTitle": "T", "theme": "t", "baseline": []}
+
+    for label, event in (("invalid request", invalid_event), ("valid request", valid_event)):
+        for eager in (False, True):
+            samples: List[Dict[str, float]] = [run_once(event, eager) for _ in range(args.repeats)]
+            imports = [s["import_s"] for s in samples]
+            firsts = [s["first_response_s"] for s in samples]
+            print(
+                f"{label:16s} {'eager' if eager else 'lazy':5s} "
+                f"import median {statistics.median(imports):.3f}s  "
+                f"first response median {statistics.median(firsts):.3f}s  "
+                f"(model import {samples[-1]['model_import_s']}, load {samples[-1]['model_load_s']})"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
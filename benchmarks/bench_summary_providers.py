@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Wall time of the summary provider stage against cluster count and concurrency.
+
+Uses the stub provider with a simulated per-call latency (--latency-ms,
+default 1500ms, roughly a short LLM completion), so the run needs no
+network. Each configuration runs on a cold cache, then again on the warm
+cache to show what a re-run of unchanged clusters costs. Runs where the
+stage deadline (--deadline-ms) cut calls off report how many clusters kept
+their extractive summary; their warm run only calls for those clusters.
+
+Usage: python3 benchmarks/bench_summary_providers.py [--clusters 12 48 96]
+           [--concurrency 1 8 16] [--latency-ms 1500] [--deadline-ms 6000]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from project.models import AnalysisMode, SummaryRequest, SummaryRunStats  # noqa: E402
+from project.summary_providers import SummaryCache, StubSummaryProvider, generate_summaries  # noqa: E402
+
+
+def cluster_requests(count: int) -> List[SummaryRequest]:
+    payload = json.loads((ROOT / "data" / "input_example.json").read_text())
+    sentences = [item["sentence"] for item in payload["baseline"]]
+    return [
+        SummaryRequest(
+            mode=AnalysisMode.STANDALONE,
+            survey_title=payload["surveyTitle"],
+            theme=payload["theme"],
+            sentiment="neutral",
+            baseline_texts=[sentences[(i * 7 + j) % len(sentences)] for j in range(8)],
+            comparison_texts=[],
+            baseline_count=8,
+            comparison_count=0,
+        )
+        for i in range(count)
+    ]
+
+
+def timed_run(requests: List[SummaryRequest], provider: StubSummaryProvider, cache: SummaryCache,
+              concurrency: int, deadline_ms: float) -> tuple[float, SummaryRunStats]:
+    stats = SummaryRunStats()
+    start = time.perf_counter()
+    asyncio.run(generate_summaries(
+        requests, provider, cache, concurrency=concurrency, deadline_ms=deadline_ms,
+        timeout_ms=provider.latency_seconds * 1000 * 2 + 1000, stats=stats,
+    ))
+    return time.perf_counter() - start, stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clusters", type=int, nargs="+", default=[12, 48, 96])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 16])
+    parser.add_argument("--latency-ms", type=float, default=1500)
+    parser.add_argument("--deadline-ms", type=float, default=6000)
+    args = parser.parse_args()
+
+    provider = StubSummaryProvider(args.latency_ms / 1000)
+    print(f"simulated latency {args.latency_ms:.0f}ms per call, stage deadline {args.deadline_ms:.0f}ms")
+    print(f"{'clusters':>8}{'workers':>9}{'cold s':>9}{'generated':>11}{'cut off':>9}{'warm ms':>9}")
+    for count in args.clusters:
+        requests = cluster_requests(count)
+        for concurrency in args.concurrency:
+            cache = SummaryCache(len(requests))
+            cold, stats = timed_run(requests, provider, cache, concurrency, args.deadline_ms)
+            warm, _ = timed_run(requests, provider, cache, concurrency, args.deadline_ms)
+            print(f"{count:>8}{concurrency:>9}{cold:>9.2f}{stats.generated:>11}{stats.timed_out:>9}{warm * 1000:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Pipeline benchmark suite and regression check.
+
+`run` builds synthetic payloads shaped like data/*.json at each size, both
+standalone and comparative. Sentences are word-level variations of the
+example sentences, with 1-3 sentences per comment id. It then times each
+stage:
+  preprocess_sentences, _embed, cluster_sentences, summarize_cluster
+  (summarize_comparative_cluster for comparative payloads)
+It also times the end-to-end lambda_handler, along with the handler's own
+traced stages (handler.ingest, handler.embed, ...). Results are written as
+a JSON baseline.
+
+`compare` exits 1 when any stage's median is slower than the baseline by
+more than --tolerance (relative) and --min-ms (absolute, to ignore noise on
+sub-millisecond stages).
+
+Runs offline by default on the stub embedding backend (feature hashing, no
+weights), so parsing, clustering and summarization can be tracked without
+downloading a model. MAX_SENTENCES is lifted so the large sizes validate.
+Sizes above 20k need the blocked clustering engine; sklearn's DBSCAN builds
+the full n x n distance matrix.
+
+Usage: python3 benchmarks/suite.py run [--sizes 100 500 5000 50000] [--repeat 3]
+           [--backend stub] [--engine blocked] [--out benchmarks/baselines/local.json]
+       python3 benchmarks/suite.py compare BASELINE CURRENT [--tolerance 0.25] [--min-ms 2]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+DEFAULT_SIZES = [100, 500, 5000, 50000]
+BASELINE_DIR = ROOT / "benchmarks" / "baselines"
+
+Timings = Dict[str, Dict[str, float]]
+
+
+# ---- synthetic payloads ----
+
+def _example_sentences() -> List[str]:
+    sentences: List[str] = []
+    for path in sorted((ROOT / "data").glob("*.json")):
+        payload = json.loads(path.read_text())
+        for field in ("baseline", "comparison"):
+            sentences.extend(item["sentence"] for item in payload.get(field) or [])
+    return list(dict.fromkeys(sentences))
+
+
+def _sentence_items(rng: Any, sources: List[str], vocabulary: List[str], count: int, id_prefix: str) -> List[Dict[str, str]]:
+    items: List[Dict[str, str]] = []
+    while len(items) < count:
+        comment_id = f"{id_prefix}{rng.getrandbits(128):032x}"
+        for _ in range(min(rng.choice((1, 1, 1, 2, 2, 3)), count - len(items))):
+            words = rng.choice(sources).split()
+            # small word-level edits keep each variant near its source sentence
+            for _ in range(rng.randint(0, 2)):
+                position = rng.randrange(len(words) + 1)
+                if rng.random() < 0.5 and len(words) > 3:
+                    del words[min(position, len(words) - 1)]
+                else:
+                    words.insert(position, rng.choice(vocabulary))
+            items.append({"sentence": " ".join(words), "id": comment_id})
+    return items
+
+
+def synthetic_payload(size: int, comparative: bool, seed: int = 0) -> Dict[str, Any]:
+    """
+    A request with `size` sentences in total; comparative payloads split them evenly.
+    """
+    import random
+
+    rng = random.Random(seed * 1_000_003 + size * 2 + comparative)
+    sources = _example_sentences()
+    vocabulary = sorted({w for s in sources for w in s.split()})
+
+    baseline_count = size // 2 if comparative else size
+    payload: Dict[str, Any] = {
+        "baseline": _sentence_items(rng, sources, vocabulary, baseline_count, ""),
+        "comparison": _sentence_items(rng, sources, vocabulary, size - baseline_count, "c") if comparative else [],
+        "surveyTitle": "Synthetic Customer Feedback",
+        "theme": "benchmark",
+    }
+    if not comparative:
+        payload["query"] = "overview"
+    return payload
+
+
+# ---- timing ----
+
+def _measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3), "min_ms": round(min(samples), 3)}
+
+
+def run_case(size: int, comparative: bool, repeat: int) -> Timings:
+    from project import app, embeddings
+    from project.clustering import cluster_sentences
+    from project.loader import load_sentences
+    from project.parser import parse_payload
+    from project.preprocessing import preprocess_sentences
+    from project.summarization import summarize_comparative_cluster, summarize_cluster
+
+    payload = synthetic_payload(size, comparative)
+    event = {"body": json.dumps(payload)}
+    sentences = load_sentences(parse_payload(payload))
+    summarize = summarize_comparative_cluster if comparative else summarize_cluster
+
+    processed = preprocess_sentences(sentences)
+    embedded = embeddings._embed(processed)
+    clusters = cluster_sentences(embedded)
+
+    timings: Timings = {
+        "preprocess_sentences": _measure(lambda: preprocess_sentences(sentences), repeat),
+        "_embed": _measure(lambda: embeddings._embed(processed), repeat),
+        "cluster_sentences": _measure(lambda: cluster_sentences(embedded), repeat),
+        "summarize_cluster": _measure(lambda: [summarize(c) for c in clusters], repeat),
+    }
+
+    handler_stages: Dict[str, List[float]] = {}
+
+    def handler() -> None:
+        response = app.lambda_handler(event, None)
+        for stage, timing in json.loads(response["body"])["timings"].items():
+            handler_stages.setdefault(f"handler.{stage}", []).append(timing["wall_ms"])
+
+    timings["lambda_handler"] = _measure(handler, repeat)
+    for stage, samples in handler_stages.items():
+        timings[stage] = {"median_ms": round(statistics.median(samples), 3), "min_ms": round(min(samples), 3)}
+
+    return timings
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args: argparse.Namespace) -> int:
+    # Read at import time by the project modules
+    os.environ["EMBEDDING_BACKEND"] = args.backend
+    os.environ["CLUSTERING_ENGINE"] = args.engine
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ["TRACE_TIMINGS_IN_RESPONSE"] = "true"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from project import embeddings, ingestion, validation
+
+    validation.MAX_SENTENCES = ingestion.MAX_SENTENCES = sys.maxsize
+    embeddings.warm_up()
+
+    results: Dict[str, Timings] = {}
+    for size in args.sizes:
+        for comparative in (False, True):
+            case = f"{'comparative' if comparative else 'standalone'}-{size}"
+            results[case] = run_case(size, comparative, args.repeat)
+            stages = results[case]
+            print(f"{case:<20} " + "  ".join(f"{name} {t['median_ms']:.1f}" for name, t in stages.items()), flush=True)
+
+    document = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "backend": args.backend,
+            "engine": args.engine,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(document, indent=2) + "\n")
+    print(f"wrote {args.out}")
+    return 0
+
+
+# ---- regression check ----
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float, min_ms: float) -> List[str]:
+    """
+    Print a stage-by-stage comparison and return the stages that regressed.
+    """
+    regressions: List[str] = []
+    print(f"{'case':<20}{'stage':<24}{'baseline':>11}{'current':>11}{'change':>9}")
+    for case, stages in current["results"].items():
+        for stage, timing in stages.items():
+            before = baseline["results"].get(case, {}).get(stage)
+            if before is None:
+                continue
+            old, new = before["median_ms"], timing["median_ms"]
+            change = (new - old) / old if old else 0.0
+            regressed = new > old * (1 + tolerance) and new - old > min_ms
+            if regressed:
+                regressions.append(f"{case} {stage}")
+            print(f"{case:<20}{stage:<24}{old:>9.1f}ms{new:>9.1f}ms{change:>+8.0%}{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+
+def compare(args: argparse.Namespace) -> int:
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    for key in ("backend", "engine", "cpu_count"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: {key} differs ({baseline['meta'].get(key)} vs {current['meta'].get(key)})")
+
+    regressions = compare_results(baseline, current, args.tolerance, args.min_ms)
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed beyond {args.tolerance:.0%} and {args.min_ms}ms")
+        return 1
+    print("\nno regressions")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite and write a JSON baseline")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--backend", default="stub", help="embedding backend (stub needs no weights)")
+    run_parser.add_argument("--engine", default="blocked", help="clustering engine")
+    run_parser.add_argument("--out", type=Path, default=BASELINE_DIR / "local.json")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="fail if CURRENT regressed against BASELINE")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    compare_parser.add_argument("--min-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
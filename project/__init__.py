@@ -4,4 +4,10 @@ This file makes the `project` folder an importable Python package for tests
 and runtime usage. Keep this minimal to avoid side effects at import time.
 """
 
-__all__ = ["models", "validation", "parser", "constants", "app", "loader", "logging", "embeddings", "preprocessing"]
+__all__ = [
+    "models", "validation", "parser", "constants", "app", "loader", "logging",
+    "embeddings", "embedding_cache", "embedding_backends", "batching", "similarity", "preprocessing",
+    "ingestion", "server", "microbatch", "tracing", "sentiment", "summary_providers", "incremental",
+    "blob_store", "offload", "jobs", "near_duplicates", "response_cache", "hierarchy",
+    "noise_recovery", "sharding", "compression",
+]
@@ -1,81 +1,195 @@
 from dataclasses import asdict
 import json
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 from pathlib import Path
 
-from project.clustering import cluster_sentences
-from project.embeddings import embed_sentence_list
-from project.models import AnalysisMode, ClusterSummary
-from project.parser import parse_payload
-from project.preprocessing import preprocess_sentences
-from project.summarization import summarize_cluster
-from project.validation import validate_payload, BadRequestError
-from project.loader import load_sentences
+from project.clustering import cluster_batch
+from project.compression import compress_vectors, compression_enabled
+from project.embeddings import embed_batch, embed_batch_to_disk
+from project.incremental import INCREMENTAL_ANALYSIS, start_incremental
+from project.ingestion import determine_mode, ingest_event, parse_json # noqa: F401 - re-exported
+from project.near_duplicates import NEAR_DUPLICATE_COLLAPSE, collapse_near_duplicates
+from project.noise_recovery import NOISE_RECOVERY, recover_noise, recovered_rows
+from project.models import AnalysisMode, ClusterSummary, ComparativeClusterSummary, SummaryRunStats
+from project.response_cache import cached_response, get_response_cache
+from project.offload import OFFLOAD_CHUNK_SENTENCES, OFFLOAD_CLUSTERING_ENGINE, OFFLOAD_SCRATCH_DIR, write_result
+from project.sentiment import score_sentiment
+from project.sharding import cluster_shards, embed_shards, use_shards
+from project.summarization import (
+    apply_generated_summary, summarize_comparative_rows, summarize_rows, summary_request_rows, with_recovered_rows,
+)
+from project.summary_providers import SUMMARY_PROVIDER, summarize_clusters
+from project.validation import BadRequestError
 from project.logging import setup_logger
+from project.tracing import TRACE_TIMINGS_IN_RESPONSE, Trace, profiled, start_trace
 
 
 logger = setup_logger(__name__)
 
 
 def lambda_handler(event: Dict[str, Any], context):
-    raw_payload = parse_json(event)
-    mode = determine_mode(raw_payload)
-    logger.info(f"Processing mode: {mode}")
-
-    validate_payload(raw_payload, mode)
-
-    payload = parse_payload(raw_payload)
-
-    sentences = load_sentences(payload)
-    logger.info(f"Loaded {len(sentences)} sentences successfully")
-
-    processed_sentences = preprocess_sentences(sentences)
-    logger.info(f"Processed {len(processed_sentences)} sentences successfully")
-
-    embeddings = embed_sentence_list(processed_sentences)
-    logger.info(f"Generated embeddings for {len(embeddings.baseline)} sentences")
-
-    clusters = cluster_sentences(embeddings.baseline)
-    logger.info(f"Formed {len(clusters)} clusters from sentences")
-
-    summary_results = list[ClusterSummary]()
-    for cluster in clusters:
-        summary = summarize_cluster(cluster)
-        summary_results.append(summary)
-
-    logger.info(f"Summarized {len(summary_results)} clusters successfully")
-
-    return success_response({
-        "clusters": [asdict(s) for s in summary_results],
-    })
+    with profiled():
+        return run_analysis(event)
 
 
-def parse_json(event: Dict[str, Any]) -> Dict[str, Any]:
-    """Parse the incoming Lambda event into a JSON payload dict.
-
-    Supports API Gateway proxy events (with `body` string) or a direct dict payload.
-    Raises BadRequestError on invalid JSON or missing payload.
+def run_analysis(event: Dict[str, Any], trace: Trace | None = None) -> Dict[str, Any]:
     """
-    if not event:
-        raise BadRequestError("Empty event payload")
-
-    # API Gateway proxy integration: body is a JSON string
-    if "body" in event and isinstance(event["body"], str):
-        try:
-            return json.loads(event["body"]) if event["body"] else {}
-        except json.JSONDecodeError as exc:
-            raise BadRequestError(f"Invalid JSON in body: {exc}")
-
-    return event
-
+    Run the pipeline for one event and log its stages. A caller that follows
+    the stages as they run (see project.jobs) passes its own `trace`.
+    """
+    trace = trace if trace is not None else start_trace()
+    try:
+        # Identical payloads within the TTL get the stored response; timings would be stale, so never cached
+        cache = get_response_cache()
+        if cache is None or TRACE_TIMINGS_IN_RESPONSE:
+            return _run_pipeline(event, trace)[0]
+        return cached_response(event, cache, lambda payload: _run_pipeline(payload, trace))
+    finally:
+        trace.log(logger)
 
-def determine_mode(payload: Dict[str, Any]) -> AnalysisMode:
-    """Determine processing mode from payload shape.
 
-    Returns "comparative" if `comparison` list has values in it, otherwise "standalone".
+def _run_pipeline(event: Dict[str, Any], trace: Trace) -> Tuple[Dict[str, Any], bool]:
+    """
+    The response for one event, and whether it is complete: False when the
+    summary provider timed out or failed for a cluster, which then keeps
+    its extractive summary.
     """
+    # Validation, parsing and loading happen in one pass over the body,
+    # straight into the columnar batch the rest of the pipeline works on
+    with trace.stage("ingest"):
+        request = ingest_event(event)
+    mode = request.mode
+    logger.info(f"Processing mode: {mode}")
+    logger.info(f"Loaded {request.sentence_count} sentences successfully")
+
+    # Rows that differ only by a typo or two are folded together, so the encoder sees each once
+    if NEAR_DUPLICATE_COLLAPSE:
+        with trace.stage("dedupe"):
+            request.batch = collapse_near_duplicates(request.batch)
+
+    # Columnar from here on: one contiguous vector matrix, clusters as row index arrays
+    batch = request.batch
+    logger.info(f"Processed {len(batch)} sentences successfully")
+
+    # Baseline and comparison were deduplicated together, so one pass encodes
+    # and clusters both sets; ids are split back out per cluster when summarizing
+    # Inputs streamed from stored objects are encoded in chunks onto a disk-backed matrix
+    offloaded = request.result_uri is not None
+    engine = OFFLOAD_CLUSTERING_ENGINE if offloaded else None
+    # Large requests can instead be embedded, then clustered, in shards on worker processes
+    sharded = use_shards(batch)
+
+    # Re-runs of the same survey title, theme and mode reuse the previous
+    # run's rows: only new sentences are encoded and scored, and only
+    # clusters whose membership changed are summarized again. Offloaded and
+    # sharded requests always run in full, on their own engine and memory layout
+    incremental = start_incremental(request) if INCREMENTAL_ANALYSIS and not (offloaded or sharded) else None
+
+    with trace.stage("embed"):
+        if incremental is not None:
+            incremental.embed(batch)
+        elif sharded:
+            embed_shards(batch, directory=OFFLOAD_SCRATCH_DIR if offloaded else None)
+        elif offloaded:
+            embed_batch_to_disk(batch, OFFLOAD_CHUNK_SENTENCES, OFFLOAD_SCRATCH_DIR)
+        else:
+            embed_batch(batch)
+    logger.info(f"Generated embeddings for {len(batch)} sentences")
+
+    # Every sentence is scored in one pass; clusters only aggregate these scores
+    with trace.stage("sentiment"):
+        batch.sentiment_scores = incremental.score(batch) if incremental is not None else score_sentiment(batch.first_texts)
+
+    # Clustering can run on a smaller copy of the vectors; summaries and noise recovery keep the full ones
+    if compression_enabled():
+        with trace.stage("compress"):
+            batch.compact_vectors = compress_vectors(batch.vectors)
+
+    with trace.stage("cluster"):
+        if incremental is not None:
+            clusters = incremental.cluster(batch)
+        elif sharded:
+            clusters = cluster_shards(batch, engine=engine, directory=OFFLOAD_SCRATCH_DIR if offloaded else None)
+        else:
+            clusters = cluster_batch(batch, engine=engine)
+    batch.compact_vectors = None
+    logger.info(f"Formed {len(clusters)} clusters from sentences")
 
-    return AnalysisMode.COMPARATIVE if "comparison" in payload and payload["comparison"] else AnalysisMode.STANDALONE
+    # Noise rows close to a cluster's centroid are reported with it, apart from its members
+    if NOISE_RECOVERY:
+        with trace.stage("recover"):
+            recover_noise(batch)
+
+    summarize = summarize_comparative_rows if mode == AnalysisMode.COMPARATIVE else summarize_rows
+    summaries: List[ClusterSummary | ComparativeClusterSummary]
+    with trace.stage("summarize"):
+        reused = [incremental.previous_summary(batch, rows) if incremental is not None else None for rows in clusters]
+        summaries = [r if r is not None else summarize(batch, rows) for rows, r in zip(clusters, reused)]
+        logger.info(f"Summarized {reused.count(None)} of {len(summaries)} clusters, reusing the rest")
+
+    # Optional provider pass over the extractive summaries: titles and markdown
+    # bullets, concurrently and cached; any cluster it misses keeps its own
+    fresh = [i for i, r in enumerate(reused) if r is None]
+    generation = SummaryRunStats()
+    if SUMMARY_PROVIDER and fresh:
+        with trace.stage("generate"):
+            summary_requests = [
+                summary_request_rows(batch, clusters[i], summaries[i], request.survey_title, request.theme)
+                for i in fresh
+            ]
+            for i, generated in zip(fresh, summarize_clusters(summary_requests, generation)):
+                summaries[i] = apply_generated_summary(summaries[i], generated)
+
+    # Set for every cluster, reused summaries included: the noise around them may have changed
+    if batch.recovered_labels is not None:
+        summaries = [with_recovered_rows(s, batch, rows) for s, rows in zip(summaries, recovered_rows(batch, clusters))]
+
+    if incremental is not None:
+        with trace.stage("persist"):
+            incremental.save(batch, clusters, summaries)
+
+    # Without noise recovery the output keeps its original fields
+    recovered = batch.recovered_labels is not None
+    body: Dict[str, Any]
+    if mode == AnalysisMode.COMPARATIVE:
+        body = {"clusters": [comparative_cluster_body(s, recovered) for s in summaries]} # type: ignore
+    else:
+        body = {"clusters": [cluster_body(s, recovered) for s in summaries]} # type: ignore
+
+    # Large results go back to storage; the response only points to them
+    if request.result_uri is not None:
+        with trace.stage("write_result"):
+            write_result(request.result_uri, body)
+        body = {"resultUri": request.result_uri, "clusterCount": len(summaries), "sentenceCount": request.sentence_count}
+
+    if TRACE_TIMINGS_IN_RESPONSE:
+        body["timings"] = trace.as_dict()
+
+    return success_response(body), not (generation.timed_out or generation.failed)
+
+
+def cluster_body(summary: ClusterSummary, recovered: bool = True) -> Dict[str, Any]:
+    """Shape a standalone summary; the recovered ids are left out unless `recovered`."""
+    body = asdict(summary)
+    if not recovered:
+        del body["recovered_sentence_ids"]
+    return body
+
+
+def comparative_cluster_body(summary: ComparativeClusterSummary, recovered: bool = True) -> Dict[str, Any]:
+    """Shape a comparative summary with the field names from the comparative output spec."""
+    body = {
+        "title": summary.title,
+        "sentiment": summary.sentiment,
+        "baselineSentences": summary.baseline_sentence_ids,
+        "comparisonSentences": summary.comparison_sentence_ids,
+        "keySimilarities": summary.key_similarities,
+        "keyDifferences": summary.key_differences,
+    }
+    if recovered:
+        body["recoveredBaselineSentences"] = summary.recovered_baseline_sentence_ids
+        body["recoveredComparisonSentences"] = summary.recovered_comparison_sentence_ids
+    return body
 
 
 def success_response(body: Dict[str, Any]) -> Dict[str, Any]:
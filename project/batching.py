@@ -0,0 +1,61 @@
+import os
+from typing import Dict, List
+
+from project.constants import ENCODE_TOKEN_BUDGETS
+
+
+def token_budget_for_memory(memory_mb: int, budgets: Dict[int, int] = ENCODE_TOKEN_BUDGETS) -> int:
+    """
+    Pick the token budget of the largest memory tier that fits in `memory_mb`.
+    """
+    eligible = [tier for tier in budgets if tier <= memory_mb]
+    return budgets[max(eligible)] if eligible else budgets[min(budgets)]
+
+
+def get_token_budget() -> int:
+    """
+    ENCODE_TOKEN_BUDGET overrides; otherwise derived from the Lambda memory size.
+    """
+    override = os.getenv("ENCODE_TOKEN_BUDGET")
+    if override:
+        return int(override)
+
+    memory_mb = int(os.getenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "0"))
+    return token_budget_for_memory(memory_mb)
+
+
+def plan_batches(token_lengths: List[int], token_budget: int) -> List[List[int]]:
+    """
+    Group item indices into batches whose padded size stays under `token_budget`.
+
+    Items are sorted longest first (stable) so each batch pads to a similar
+    length. A batch costs `len(batch) * longest_item` padded tokens; an item
+    longer than the whole budget is placed in a batch on its own.
+    """
+    order = sorted(range(len(token_lengths)), key=lambda i: token_lengths[i], reverse=True)
+
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_max = 0
+
+    for index in order:
+        length = token_lengths[index]
+        padded_max = max(current_max, length)
+        if current and padded_max * (len(current) + 1) > token_budget:
+            batches.append(current)
+            current, padded_max = [], length
+        current.append(index)
+        current_max = padded_max
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def padding_efficiency(token_lengths: List[int], batches: List[List[int]]) -> float:
+    """
+    Fraction of computed tokens that are real (not padding).
+    """
+    padded = sum(len(b) * max(token_lengths[i] for i in b) for b in batches)
+    return sum(token_lengths) / padded if padded else 1.0
@@ -0,0 +1,175 @@
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Protocol, Tuple, Type
+from urllib.parse import urlsplit
+
+# "local" (a directory tree standing in for buckets) or "s3" (boto3, bundled with the Lambda Python runtime)
+BLOB_STORE = os.getenv("BLOB_STORE", "local")
+
+# Root of the local store: `<scheme>://<bucket>/<key>` lives at `<root>/<bucket>/<key>`
+BLOB_STORE_ROOT = os.getenv("BLOB_STORE_ROOT", "/tmp/blob-store")
+
+
+class BlobNotFoundError(Exception):
+    """Raised when a referenced object does not exist."""
+    pass
+
+
+def split_uri(uri: str) -> Tuple[str, str]:
+    """
+    Bucket and key of an S3-style `scheme://bucket/key` URI.
+    """
+    parts = urlsplit(uri)
+    key = parts.path.lstrip("/")
+    if not parts.scheme or not parts.netloc or not key:
+        raise ValueError(f"Expected an object URI like s3://bucket/key, got {uri!r}")
+    return parts.netloc, key
+
+
+class BlobStore(Protocol):
+    """
+    Anything that can stream objects in and out by URI.
+    """
+
+    def open_read(self, uri: str) -> BinaryIO:
+        ...
+
+    def open_write(self, uri: str) -> BinaryIO:
+        """
+        A writable binary file; the object appears, complete, when it is closed.
+        """
+        ...
+
+
+class LocalBlobStore:
+    """
+    Buckets as directories under `root`, for tests and local runs.
+    """
+
+    def __init__(self, root: str | Path = BLOB_STORE_ROOT):
+        self.root = Path(root)
+
+    def path(self, uri: str) -> Path:
+        bucket, key = split_uri(uri)
+        path = (self.root / bucket / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Object key escapes the store: {uri!r}")
+        return path
+
+    def open_read(self, uri: str) -> BinaryIO:
+        try:
+            return self.path(uri).open("rb")
+        except FileNotFoundError:
+            raise BlobNotFoundError(f"Object not found: {uri}")
+
+    def open_write(self, uri: str) -> BinaryIO:
+        path = self.path(uri)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return _RenameOnClose(path)
+
+
+class _RenameOnClose:
+    """
+    Writes to a temporary file beside `path` and renames it into place on a clean close.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._temporary = path.with_suffix(f"{path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self._file = self._temporary.open("wb")
+
+    def write(self, data: bytes) -> int:
+        return self._file.write(data)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+            self._temporary.replace(self.path)
+
+    def __enter__(self) -> "_RenameOnClose":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            self._temporary.unlink(missing_ok=True)
+
+
+class S3BlobStore:
+    """
+    Objects in S3 through boto3. Reads stream the response body; writes are
+    spooled to local disk and uploaded on close, since S3 has no appends.
+    """
+
+    def __init__(self) -> None:
+        import boto3 # type: ignore
+        self._client = boto3.client("s3") # type: ignore
+
+    def open_read(self, uri: str) -> BinaryIO:
+        bucket, key = split_uri(uri)
+        try:
+            return self._client.get_object(Bucket=bucket, Key=key)["Body"] # type: ignore
+        except self._client.exceptions.NoSuchKey: # type: ignore
+            raise BlobNotFoundError(f"Object not found: {uri}")
+
+    def open_write(self, uri: str) -> BinaryIO:
+        return _UploadOnClose(self._client, *split_uri(uri))
+
+
+class _UploadOnClose:
+    def __init__(self, client: Any, bucket: str, key: str):
+        self._client = client
+        self._bucket = bucket
+        self._key = key
+        self._file = tempfile.TemporaryFile()
+
+    def write(self, data: bytes) -> int:
+        return self._file.write(data)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.seek(0)
+            self._client.upload_fileobj(self._file, self._bucket, self._key) # type: ignore
+            self._file.close()
+
+    def __enter__(self) -> "_UploadOnClose":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+
+BLOB_STORES: Dict[str, Type[Any]] = {
+    "local": LocalBlobStore,
+    "s3": S3BlobStore,
+}
+
+
+def get_blob_store_class(name: str) -> Type[Any]:
+    try:
+        return BLOB_STORES[name]
+    except KeyError:
+        raise ValueError(f"Unsupported blob store: {name}. Expected one of {sorted(BLOB_STORES)}")
+
+
+_blob_store: Any = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store() -> Any:
+    """
+    The BLOB_STORE client, created on first call.
+    """
+    global _blob_store
+    if _blob_store is None:
+        with _blob_store_lock:
+            if _blob_store is None:
+                _blob_store = get_blob_store_class(BLOB_STORE)()
+    return _blob_store
@@ -1,15 +1,240 @@
-from typing import List
+import os
+from typing import Callable, Dict, List, Tuple
 import numpy as np # type: ignore
+from scipy.sparse import coo_matrix, csr_matrix # type: ignore
+from scipy.sparse.csgraph import connected_components # type: ignore
 from sklearn.cluster import DBSCAN # type: ignore
 
-from project.constants import MIN_CLUSTER_SIZE, SIMILARITY_THRESHOLD
-from project.models import EmbeddedSentence, SentenceCluster
+from project.constants import MIN_CLUSTER_SIZE, SIMILARITY_MEMORY_BYTES, SIMILARITY_THRESHOLD
+from project.hierarchy import hierarchy_labels
+from project.models import EmbeddedSentence, QuantizedVectors, SentenceBatch, SentenceCluster
+from project.similarity import similarity_blocks
+
+# "dbscan" (sklearn, brute-force pairwise distances), "blocked" (bounded-memory dot-product search)
+# or "hierarchy" (most stable clusters of a density hierarchy, no fixed eps)
+CLUSTERING_ENGINE = os.getenv("CLUSTERING_ENGINE", "dbscan")
+
+# Worst case bytes per similarity cell in the blocked engine: float32 score,
+# bool mask and two int64 edge indices
+_BYTES_PER_CELL = 4 + 1 + 16
+
+# A stored neighbour edge: int32 row, int32 column, float32 similarity
+_BYTES_PER_EDGE = 4 + 4 + 4
+
+
+def _dbscan_labels(vectors: np.ndarray, eps: float, min_samples: int) -> np.ndarray: # type: ignore
+    clustering = DBSCAN(
+        eps=eps,
+        min_samples=min_samples,
+        metric="cosine",
+    ).fit(vectors) # type: ignore
+
+    return clustering.labels_ # type: ignore
+
+
+def _link_from_graph(
+    graph: csr_matrix, # type: ignore
+    is_core: np.ndarray, # type: ignore
+    core_index: np.ndarray, # type: ignore
+) -> Tuple[np.ndarray, np.ndarray]: # type: ignore
+    n = graph.shape[0] # type: ignore
+    representative = np.arange(n) # type: ignore
+    nearest_core = np.full(n, -1, dtype=np.int64) # type: ignore
+
+    _, component = connected_components(graph[core_index][:, core_index], directed=False) # type: ignore
+    lowest = np.full(component.max() + 1, n, dtype=np.int64) # type: ignore
+    np.minimum.at(lowest, component, core_index) # type: ignore
+    representative[core_index] = lowest[component] # type: ignore
+
+    border_index = np.flatnonzero(~is_core) # type: ignore
+    to_core = graph[border_index][:, core_index] # type: ignore
+    reachable = to_core.getnnz(axis=1) > 0 # type: ignore
+    if reachable.any(): # type: ignore
+        # stored similarities are all positive, so the sparse argmax ignores non-neighbours
+        best = np.asarray(to_core[reachable].argmax(axis=1)).ravel() # type: ignore
+        nearest_core[border_index[reachable]] = core_index[best] # type: ignore
+
+    return representative, nearest_core # type: ignore
+
+
+def _link_blockwise(
+    vectors: np.ndarray, # type: ignore
+    is_core: np.ndarray, # type: ignore
+    core_index: np.ndarray, # type: ignore
+    threshold: float,
+    memory_bytes: int,
+) -> Tuple[np.ndarray, np.ndarray]: # type: ignore
+    n = vectors.shape[0] # type: ignore
+    representative = np.arange(n) # type: ignore
+    nearest_core = np.full(n, -1, dtype=np.int64) # type: ignore
+    core_vectors = vectors[core_index] # type: ignore
+
+    for block, sims in similarity_blocks(vectors, core_vectors, memory_bytes, _BYTES_PER_CELL):
+        linked = sims >= threshold # type: ignore
+        block_rows = np.arange(block.start, block.stop) # type: ignore
+
+        core_rows = is_core[block] # type: ignore
+        rows, cols = np.nonzero(linked[core_rows]) # type: ignore
+        edge_src = np.concatenate([block_rows[core_rows][rows], np.arange(n)]) # type: ignore
+        edge_dst = np.concatenate([core_index[cols], representative]) # type: ignore
+        graph = coo_matrix((np.ones(edge_src.size, dtype=np.int8), (edge_src, edge_dst)), shape=(n, n)) # type: ignore
+        _, component = connected_components(graph, directed=False) # type: ignore
+
+        # collapse each component back to a star around its lowest index
+        lowest = np.full(component.max() + 1, n, dtype=np.int64) # type: ignore
+        np.minimum.at(lowest, component, np.arange(n)) # type: ignore
+        representative = lowest[component] # type: ignore
+
+        border_rows = ~core_rows & linked.any(axis=1) # type: ignore
+        if border_rows.any(): # type: ignore
+            best = sims[border_rows].argmax(axis=1) # type: ignore
+            nearest_core[block_rows[border_rows]] = core_index[best] # type: ignore
+
+    return representative, nearest_core # type: ignore
+
+
+def _blocked_dbscan_labels(
+    vectors: np.ndarray, # type: ignore
+    eps: float,
+    min_samples: int,
+    memory_bytes: int = SIMILARITY_MEMORY_BYTES,
+) -> np.ndarray: # type: ignore
+    """
+    DBSCAN over L2-normalized vectors without materializing the n x n distance matrix.
+
+    Cosine distance <= eps is the same as dot product >= 1 - eps, so
+    neighbourhoods come from row blocks of `vectors @ vectors.T`
+    (project.similarity) sized to fit `memory_bytes`. The first pass counts neighbours to find core points and
+    keeps the sparse neighbour graph while it fits in the same budget. Core
+    points are then linked into connected components and each border point
+    joins its most similar core neighbour. If the graph did not fit, a second
+    blockwise pass does the linking instead, keeping only a spanning star per
+    component between blocks.
+
+    Labels are numbered in order of each cluster's first core point, like
+    sklearn; a border point within reach of two clusters may land in a
+    different one than sklearn picks.
+    """
+    n = vectors.shape[0] # type: ignore
+    threshold = 1.0 - eps
+
+    # ---- pass one: core points, plus the neighbour graph while it fits ----
+    neighbour_counts = np.empty(n, dtype=np.int64) # type: ignore
+    keep_graph = threshold > 0
+    edge_budget = memory_bytes // _BYTES_PER_EDGE
+    stored_edges = 0
+    edge_rows: List[np.ndarray] = [] # type: ignore
+    edge_cols: List[np.ndarray] = [] # type: ignore
+    edge_sims: List[np.ndarray] = [] # type: ignore
+
+    for block, sims in similarity_blocks(vectors, vectors, memory_bytes, _BYTES_PER_CELL):
+        linked = sims >= threshold # type: ignore
+        neighbour_counts[block] = linked.sum(axis=1) # type: ignore
+
+        if keep_graph:
+            rows, cols = np.nonzero(linked) # type: ignore
+            stored_edges += rows.size # type: ignore
+            if stored_edges > edge_budget:
+                keep_graph = False
+                edge_rows, edge_cols, edge_sims = [], [], []
+            else:
+                edge_rows.append((rows + block.start).astype(np.int32)) # type: ignore
+                edge_cols.append(cols.astype(np.int32)) # type: ignore
+                edge_sims.append(sims[rows, cols]) # type: ignore
+
+    is_core = neighbour_counts >= min_samples # type: ignore
+    core_index = np.flatnonzero(is_core) # type: ignore
+    if core_index.size == 0: # type: ignore
+        return np.full(n, -1, dtype=np.int64) # type: ignore
+
+    # ---- link core points, find nearest core for border points ----
+    if keep_graph:
+        graph = csr_matrix( # type: ignore
+            (np.concatenate(edge_sims), (np.concatenate(edge_rows), np.concatenate(edge_cols))), shape=(n, n) # type: ignore
+        )
+        representative, nearest_core = _link_from_graph(graph, is_core, core_index) # type: ignore
+    else:
+        representative, nearest_core = _link_blockwise(vectors, is_core, core_index, threshold, memory_bytes) # type: ignore
+
+    # ---- number clusters by first core point ----
+    labels = np.full(n, -1, dtype=np.int64) # type: ignore
+    core_roots = representative[core_index] # type: ignore
+    _, first_seen = np.unique(core_roots, return_index=True) # type: ignore
+    label_of_root = {int(core_roots[i]): label for label, i in enumerate(sorted(first_seen))} # type: ignore
+
+    labels[core_index] = [label_of_root[int(r)] for r in core_roots] # type: ignore
+    border = np.flatnonzero(nearest_core >= 0) # type: ignore
+    labels[border] = [label_of_root[int(representative[c])] for c in nearest_core[border]] # type: ignore
+
+    return labels # type: ignore
+
+
+ENGINES: Dict[str, Callable[..., np.ndarray]] = { # type: ignore
+    "dbscan": _dbscan_labels,
+    "blocked": _blocked_dbscan_labels,
+    "hierarchy": hierarchy_labels,
+}
+
+
+def cluster_labels(
+    vectors: np.ndarray, # type: ignore
+    eps: float = SIMILARITY_THRESHOLD,
+    min_samples: int = MIN_CLUSTER_SIZE,
+    engine: str | None = None,
+) -> np.ndarray: # type: ignore
+    """
+    Cluster label per row of an L2-normalized matrix (or its
+    QuantizedVectors form), -1 for noise.
+
+    `engine` picks the implementation (see ENGINES), defaulting to CLUSTERING_ENGINE.
+    """
+    engine_name = engine or CLUSTERING_ENGINE
+    if engine_name not in ENGINES:
+        raise ValueError(f"Unsupported clustering engine: {engine_name}. Expected one of {sorted(ENGINES)}")
+
+    if not isinstance(vectors, QuantizedVectors):
+        vectors = vectors.astype(np.float32, copy=False) # type: ignore
+    return ENGINES[engine_name](vectors, eps, min_samples) # type: ignore
+
+
+def group_labels(labels: np.ndarray) -> List[np.ndarray]: # type: ignore
+    """
+    Row indices of each cluster, in order of first appearance; noise is dropped.
+    """
+    clustered = np.flatnonzero(labels >= 0) # type: ignore
+    if clustered.size == 0: # type: ignore
+        return []
+
+    # stable sort keeps rows in input order within each cluster
+    order = clustered[np.argsort(labels[clustered], kind="stable")] # type: ignore
+    _, starts = np.unique(labels[order], return_index=True) # type: ignore
+    groups = np.split(order, starts[1:]) # type: ignore
+    return sorted(groups, key=lambda g: int(g[0])) # type: ignore
+
+
+def cluster_batch(
+    batch: SentenceBatch,
+    eps: float = SIMILARITY_THRESHOLD,
+    min_samples: int = MIN_CLUSTER_SIZE,
+    engine: str | None = None,
+) -> List[np.ndarray]: # type: ignore
+    """
+    Cluster an embedded SentenceBatch, setting `batch.labels` and returning
+    the row indices of each cluster. Runs on `batch.compact_vectors` when set.
+    """
+    if not len(batch) or batch.vectors is None:
+        return []
+
+    vectors = batch.compact_vectors if batch.compact_vectors is not None else batch.vectors
+    batch.labels = cluster_labels(vectors, eps, min_samples, engine) # type: ignore
+    return group_labels(batch.labels) # type: ignore
 
 
 def cluster_sentences(
     embedded_sentences: List[EmbeddedSentence],
     eps: float = SIMILARITY_THRESHOLD,
     min_samples: int = MIN_CLUSTER_SIZE,
+    engine: str | None = None,
 ) -> List[SentenceCluster]:
     """
     Cluster embedded sentences using cosine similarity.
@@ -18,25 +243,9 @@ def cluster_sentences(
         return []
 
     vectors = np.vstack([e.vector for e in embedded_sentences]) # type: ignore
-
-    clustering = DBSCAN(
-        eps=eps,
-        min_samples=min_samples,
-        metric="cosine",
-    ).fit(vectors) # type: ignore
-
-    labels = clustering.labels_ # type: ignore
-
-    clusters: dict[int, list[EmbeddedSentence]] = {}
-
-    for label, embedded in zip(labels, embedded_sentences): # type: ignore
-        if label == -1:
-            # Noise / outlier — ignore for now
-            continue
-
-        clusters.setdefault(label, []).append(embedded) # type: ignore
+    labels = cluster_labels(vectors, eps, min_samples, engine) # type: ignore
 
     return [
-        SentenceCluster(sentences=members)
-        for members in clusters.values()
+        SentenceCluster(sentences=[embedded_sentences[i] for i in rows])
+        for rows in group_labels(labels) # type: ignore
     ]
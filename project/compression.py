@@ -0,0 +1,115 @@
+import os
+import time
+from dataclasses import asdict
+from typing import Callable, Dict
+import numpy as np # type: ignore
+
+from project.constants import SIMILARITY_MEMORY_BYTES
+from project.logging import setup_logger
+from project.models import CompressionStats, QuantizedVectors
+from project.similarity import row_blocks
+
+logger = setup_logger(__name__)
+
+# "none", "pca" (leading singular directions of the request's own vectors) or
+# "random" (seeded Gaussian projection); clustering then runs on VECTOR_REDUCTION_DIM dimensions
+VECTOR_REDUCTION = os.getenv("VECTOR_REDUCTION", "none")
+VECTOR_REDUCTION_DIM = int(os.getenv("VECTOR_REDUCTION_DIM", "128"))
+
+# Evenly spaced rows the PCA directions are fitted on
+VECTOR_REDUCTION_SAMPLE = int(os.getenv("VECTOR_REDUCTION_SAMPLE", "10000"))
+
+# Set to "true" to also hold the clustering vectors as int8 codes with a float32 scale per row
+VECTOR_INT8 = os.getenv("VECTOR_INT8", "false").lower() == "true"
+
+_RANDOM_PROJECTION_SEED = 0
+
+
+def _pca_directions(vectors: np.ndarray, dim: int) -> np.ndarray: # type: ignore
+    # uncentered, like a truncated SVD: the directions that keep dot products best, not variance
+    sample = np.linspace(0, vectors.shape[0] - 1, min(vectors.shape[0], VECTOR_REDUCTION_SAMPLE)).astype(np.int64) # type: ignore
+    _, _, directions = np.linalg.svd(np.asarray(vectors[sample], dtype=np.float32), full_matrices=False) # type: ignore
+    return directions[:dim] # type: ignore
+
+
+def _random_directions(vectors: np.ndarray, dim: int) -> np.ndarray: # type: ignore
+    rng = np.random.default_rng(_RANDOM_PROJECTION_SEED) # type: ignore
+    return rng.standard_normal((dim, vectors.shape[1]), dtype=np.float32) # type: ignore
+
+
+REDUCTIONS: Dict[str, Callable[[np.ndarray, int], np.ndarray]] = { # type: ignore
+    "pca": _pca_directions,
+    "random": _random_directions,
+}
+
+
+def reduce_dimensions(vectors: np.ndarray, dim: int, method: str = "pca") -> np.ndarray: # type: ignore
+    """
+    Project the rows onto `dim` directions picked by `method` (see
+    REDUCTIONS) and L2-normalize them again, a row block at a time so
+    disk-backed inputs are streamed once.
+    """
+    if method not in REDUCTIONS:
+        raise ValueError(f"Unsupported vector reduction: {method}. Expected one of {sorted(REDUCTIONS)}")
+
+    directions = np.ascontiguousarray(REDUCTIONS[method](vectors, dim), dtype=np.float32) # type: ignore
+    reduced = np.empty((vectors.shape[0], directions.shape[0]), dtype=np.float32) # type: ignore
+    for block in row_blocks(vectors.shape[0], vectors.shape[1], SIMILARITY_MEMORY_BYTES, 4): # type: ignore
+        reduced[block] = vectors[block] @ directions.T # type: ignore
+    reduced /= np.maximum(np.linalg.norm(reduced, axis=1, keepdims=True), np.float32(1e-12)) # type: ignore
+    return reduced # type: ignore
+
+
+def quantize(vectors: np.ndarray) -> QuantizedVectors: # type: ignore
+    """
+    Int8 codes of each row scaled by its own largest magnitude.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32) # type: ignore
+    scales = np.maximum(np.abs(vectors).max(axis=1, initial=0.0), np.float32(1e-12)) / np.float32(127) # type: ignore
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8) # type: ignore
+    return QuantizedVectors(codes=codes, scales=scales.astype(np.float32)) # type: ignore
+
+
+def compression_enabled() -> bool:
+    return VECTOR_REDUCTION != "none" or VECTOR_INT8
+
+
+def compress_vectors(
+    vectors: np.ndarray, # type: ignore
+    method: str | None = None,
+    dim: int | None = None,
+    int8: bool | None = None,
+) -> np.ndarray | QuantizedVectors: # type: ignore
+    """
+    The compact form clustering runs on: reduced to `dim` dimensions
+    unless `method` is "none" or the vectors are no wider, then int8 when
+    `int8` is set. Returns `vectors` itself when neither applies.
+
+    Unset arguments come from VECTOR_REDUCTION, VECTOR_REDUCTION_DIM and VECTOR_INT8.
+    """
+    method = method or VECTOR_REDUCTION
+    dim = dim or VECTOR_REDUCTION_DIM
+    int8 = VECTOR_INT8 if int8 is None else int8
+    if method != "none" and method not in REDUCTIONS:
+        raise ValueError(f"Unsupported vector reduction: {method}. Expected one of {sorted(REDUCTIONS)}")
+
+    start = time.perf_counter()
+    compact = vectors
+    if method != "none" and dim < vectors.shape[1]: # type: ignore
+        compact = reduce_dimensions(vectors, dim, method)
+    if int8:
+        compact = quantize(compact)
+
+    stats = CompressionStats(
+        rows=int(vectors.shape[0]), # type: ignore
+        dim=int(compact.shape[1]), # type: ignore
+        full_bytes=int(vectors.nbytes), # type: ignore
+        compact_bytes=int(compact.nbytes), # type: ignore
+        seconds=round(time.perf_counter() - start, 4),
+    )
+    logger.info(
+        f"Compressed {stats.rows} vectors to {stats.dim} dimensions{' (int8)' if int8 else ''}: "
+        f"{stats.full_bytes} -> {stats.compact_bytes} bytes",
+        extra={"fields": asdict(stats)},
+    )
+    return compact
@@ -2,3 +2,21 @@ MAX_SENTENCES = 500
 MAX_SENTENCE_LENGTH = 1000
 MIN_CLUSTER_SIZE = 2
 SIMILARITY_THRESHOLD = 0.3
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Padded tokens per encode batch, keyed by the minimum Lambda memory size (MB) it is safe for
+ENCODE_TOKEN_BUDGETS = {
+    0: 4096,
+    1024: 8192,
+    2048: 16384,
+    4096: 32768,
+}
+# Upper bound on scratch memory for one block of pairwise similarities
+SIMILARITY_MEMORY_BYTES = 128 * 1024 * 1024
+# Key insights per cluster, how strongly their selection favours diversity over centrality (0-1),
+# and the similarity above which a member only counts as a restatement of one already picked
+KEY_INSIGHT_COUNT = 3
+INSIGHT_DIVERSITY = 0.3
+NEAR_DUPLICATE_SIMILARITY = 0.9
+# Representative sentences shown to a summary provider per cluster
+SUMMARY_PROMPT_SENTENCES = 12
@@ -0,0 +1,182 @@
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Protocol, Type
+import numpy as np # type: ignore
+
+from project.constants import EMBEDDING_MODEL_NAME
+
+# Directory holding `model.onnx` and `tokenizer.json`, produced by scripts/export_onnx_model.py
+EMBEDDING_ONNX_MODEL_DIR = os.getenv(
+    "EMBEDDING_ONNX_MODEL_DIR",
+    str(Path(__file__).resolve().parents[1] / "models" / f"{EMBEDDING_MODEL_NAME}-int8"),
+)
+
+# all-MiniLM-L6-v2 truncates to 256 word pieces
+ONNX_MAX_TOKENS = 256
+
+# Matches all-MiniLM-L6-v2 so matrices have the real model's shape
+STUB_DIM = 384
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class EmbeddingBackend(Protocol):
+    """
+    Anything that turns texts into L2-normalized float32 vectors, one row per text.
+    """
+
+    def encode(self, texts: List[str], batch_size: int | None = None) -> np.ndarray: # type: ignore
+        ...
+
+
+def estimate_token_lengths(texts: List[str]) -> List[int]:
+    """
+    Rough word-piece count for backends without a tokenizer: ~1.3 pieces per
+    word plus the [CLS]/[SEP] specials.
+    """
+    return [int(len(t.split()) * 1.3) + 3 for t in texts]
+
+
+class TorchBackend:
+    """
+    sentence-transformers on torch, float32 on CPU. The reference implementation.
+    """
+
+    model_id = EMBEDDING_MODEL_NAME
+
+    @staticmethod
+    def import_runtime() -> None:
+        import sentence_transformers # type: ignore # noqa: F401
+
+    def __init__(self) -> None:
+        from sentence_transformers import SentenceTransformer # type: ignore
+        self._model = SentenceTransformer(EMBEDDING_MODEL_NAME) # type: ignore
+
+    def encode(self, texts: List[str], batch_size: int | None = None) -> np.ndarray: # type: ignore
+        return self._model.encode( # type: ignore
+            texts,
+            batch_size=batch_size or 32,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        encoded = self._model.tokenizer(texts, truncation=True, max_length=self._model.max_seq_length) # type: ignore
+        return [len(ids) for ids in encoded["input_ids"]] # type: ignore
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray: # type: ignore
+    """
+    Attention-masked mean over tokens followed by L2 normalization, matching
+    the sentence-transformers pooling for all-MiniLM-L6-v2.
+    """
+    mask = attention_mask[..., None].astype(np.float32) # type: ignore
+    summed = (token_embeddings * mask).sum(axis=1) # type: ignore
+    counts = np.clip(mask.sum(axis=1), 1e-9, None) # type: ignore
+    pooled = summed / counts # type: ignore
+    norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None) # type: ignore
+    return (pooled / norms).astype(np.float32) # type: ignore
+
+
+class OnnxBackend:
+    """
+    int8 dynamically quantized export of the same model on ONNX Runtime.
+
+    Needs only `onnxruntime` and `tokenizers` at runtime, so the deployment
+    package does not have to ship torch.
+    """
+
+    model_id = f"{EMBEDDING_MODEL_NAME}:onnx-int8"
+
+    @staticmethod
+    def import_runtime() -> None:
+        import onnxruntime # type: ignore # noqa: F401
+        import tokenizers # type: ignore # noqa: F401
+
+    def __init__(self, model_dir: str | Path = EMBEDDING_ONNX_MODEL_DIR) -> None:
+        import onnxruntime # type: ignore
+        from tokenizers import Tokenizer # type: ignore
+
+        model_dir = Path(model_dir)
+        self._tokenizer: Any = Tokenizer.from_file(str(model_dir / "tokenizer.json")) # type: ignore
+        self._tokenizer.enable_truncation(max_length=ONNX_MAX_TOKENS)
+        self._tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions() # type: ignore
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL # type: ignore
+        self._session: Any = onnxruntime.InferenceSession( # type: ignore
+            str(model_dir / "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+    def encode(self, texts: List[str], batch_size: int | None = None) -> np.ndarray: # type: ignore
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32) # type: ignore
+
+        if batch_size and len(texts) > batch_size:
+            return np.vstack([ # type: ignore
+                self.encode(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)
+            ])
+
+        encodings = self._tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64), # type: ignore
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64), # type: ignore
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64), # type: ignore
+        }
+        feeds = {k: v for k, v in feeds.items() if k in self._input_names} # type: ignore
+
+        token_embeddings = self._session.run(None, feeds)[0]
+        return mean_pool(token_embeddings, feeds["attention_mask"]) # type: ignore
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        return [sum(e.attention_mask) for e in self._tokenizer.encode_batch(texts)]
+
+
+class StubBackend:
+    """
+    Offline, deterministic stand-in with no weights and no downloads: signed
+    feature hashing of each text's words into STUB_DIM dimensions, L2-normalized.
+    Texts that share words get similar vectors, so clustering and
+    summarization behave plausibly. For benchmarks and local runs, not for
+    production results.
+    """
+
+    model_id = "stub-feature-hashing"
+
+    @staticmethod
+    def import_runtime() -> None:
+        pass
+
+    def encode(self, texts: List[str], batch_size: int | None = None) -> np.ndarray: # type: ignore
+        rows: List[int] = []
+        hashes: List[int] = []
+        for row, text in enumerate(texts):
+            for word in _WORD_RE.findall(text.lower()):
+                rows.append(row)
+                hashes.append(zlib.crc32(word.encode("utf-8")))
+
+        codes = np.asarray(hashes, dtype=np.int64) # type: ignore
+        signs = np.where(codes & (1 << 31), -1.0, 1.0).astype(np.float32) # type: ignore
+        vectors = np.zeros((len(texts), STUB_DIM), dtype=np.float32) # type: ignore
+        np.add.at(vectors, (np.asarray(rows, dtype=np.int64), codes % STUB_DIM), signs) # type: ignore
+
+        norms = np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None) # type: ignore
+        return vectors / norms # type: ignore
+
+
+BACKENDS: Dict[str, Type[Any]] = {
+    "torch": TorchBackend,
+    "onnx": OnnxBackend,
+    "stub": StubBackend,
+}
+
+
+def get_backend_class(name: str) -> Type[Any]:
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unsupported embedding backend: {name}. Expected one of {sorted(BACKENDS)}")
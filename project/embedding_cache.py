@@ -0,0 +1,207 @@
+import fcntl
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List
+import numpy as np # type: ignore
+
+from project.models import EmbeddingCacheStats
+
+
+def cache_key(model_name: str, normalized_text: str) -> str:
+    """
+    Content address for an embedding: hash of the model name and normalized text.
+    """
+    return hashlib.sha256(f"{model_name}\0{normalized_text}".encode("utf-8")).hexdigest()
+
+
+class LRUEmbeddingCache:
+    """
+    In-process LRU tier bounded by the total bytes of the stored vectors.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict() # type: ignore
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> np.ndarray | None: # type: ignore
+        vector = self._entries.get(key) # type: ignore
+        if vector is not None:
+            self._entries.move_to_end(key)
+        return vector # type: ignore
+
+    def put(self, key: str, vector: np.ndarray) -> None: # type: ignore
+        size = int(vector.nbytes) # type: ignore
+        if size > self.max_bytes:
+            return
+
+        existing = self._entries.pop(key, None) # type: ignore
+        if existing is not None:
+            self.current_bytes -= int(existing.nbytes) # type: ignore
+
+        self._entries[key] = vector
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False) # type: ignore
+            self.current_bytes -= int(evicted.nbytes) # type: ignore
+
+
+class DiskEmbeddingStore:
+    """
+    Append-only float32 store on local disk, read back through a memory map.
+
+    Layout in `directory`:
+    - meta.json: the vector dimension
+    - index.txt: one cache key per line, line number == row number
+    - vectors.f32: raw float32 rows
+
+    Rows are written before their keys so a partially written append is never
+    referenced by the index. Several processes can share a directory (shard
+    workers, hosts running more than one worker): appends hold an exclusive
+    flock on `lock` and first re-read what the others appended.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._meta_path = self.directory / "meta.json"
+        self._index_path = self.directory / "index.txt"
+        self._data_path = self.directory / "vectors.f32"
+        self._lock_path = self.directory / "lock"
+
+        self._dim: int | None = None
+        self._rows: Dict[str, int] = {}
+        # rows both written and indexed; a key stored twice counts twice
+        self._row_count = 0
+        self._mmap: np.ndarray | None = None # type: ignore
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _load(self) -> List[str]:
+        """
+        Re-read the index from disk and return every key in it, indexed or not.
+        """
+        if not self._meta_path.exists():
+            return []
+
+        self._dim = int(json.loads(self._meta_path.read_text())["dim"])
+        if not self._index_path.exists() or not self._data_path.exists():
+            return []
+
+        keys = self._index_path.read_text().split()
+        complete_rows = self._data_path.stat().st_size // (self._dim * 4)
+        self._row_count = min(len(keys), complete_rows)
+        self._rows = {key: row for row, key in enumerate(keys[:self._row_count])}
+        return keys
+
+    def _vectors(self) -> np.ndarray: # type: ignore
+        if self._mmap is None or self._mmap.shape[0] < self._row_count: # type: ignore
+            self._mmap = np.memmap( # type: ignore
+                self._data_path, dtype=np.float32, mode="r", shape=(self._row_count, self._dim)
+            )
+        return self._mmap # type: ignore
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]: # type: ignore
+        wanted = [(k, self._rows[k]) for k in keys if k in self._rows]
+        if not wanted:
+            return {}
+
+        vectors = self._vectors()
+        return {k: np.array(vectors[row]) for k, row in wanted} # type: ignore
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None: # type: ignore
+        if all(k in self._rows for k in items):
+            return
+
+        # released when the file closes
+        with self._lock_path.open("a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._append(items)
+
+    def _append(self, items: Dict[str, np.ndarray]) -> None: # type: ignore
+        # another process may have appended since this one last looked
+        keys = self._load()
+        new_items = [(k, v) for k, v in items.items() if k not in self._rows]
+        if not new_items:
+            return
+
+        if self._dim is None:
+            self._dim = int(new_items[0][1].shape[0]) # type: ignore
+            self._meta_path.write_text(json.dumps({"dim": self._dim}))
+
+        matrix = np.vstack([v for _, v in new_items]).astype(np.float32, copy=False) # type: ignore
+        if matrix.shape[1] != self._dim: # type: ignore
+            raise ValueError(f"Vector dimension {matrix.shape[1]} does not match store dimension {self._dim}") # type: ignore
+
+        # an append cut short leaves rows without keys or keys without rows; drop them
+        # so the new rows land on the line numbers of their keys
+        start = self._row_count
+        with self._data_path.open("ab") as fh:
+            if fh.tell() != start * self._dim * 4:
+                fh.truncate(start * self._dim * 4)
+            fh.write(matrix.tobytes()) # type: ignore
+        if len(keys) != start:
+            self._index_path.write_text("".join(f"{k}\n" for k in keys[:start]))
+        with self._index_path.open("a") as fh:
+            fh.write("".join(f"{k}\n" for k, _ in new_items))
+
+        for offset, (key, _) in enumerate(new_items):
+            self._rows[key] = start + offset
+        self._row_count = start + len(new_items)
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: an in-process LRU in front of an optional disk store.
+    """
+
+    def __init__(self, memory: LRUEmbeddingCache, disk: DiskEmbeddingStore | None = None):
+        self.memory = memory
+        self.disk = disk
+        self.stats = EmbeddingCacheStats()
+        self._lock = threading.Lock()
+
+    def lookup(self, keys: List[str]) -> Dict[str, np.ndarray]: # type: ignore
+        """
+        Return cached vectors for the given keys, promoting disk hits into memory.
+        """
+        found: Dict[str, np.ndarray] = {} # type: ignore
+
+        with self._lock:
+            remaining: List[str] = []
+            for key in keys:
+                vector = self.memory.get(key) # type: ignore
+                if vector is not None:
+                    found[key] = vector
+                else:
+                    remaining.append(key)
+            self.stats.memory_hits += len(found)
+
+            if remaining and self.disk is not None:
+                from_disk = self.disk.get_many(remaining) # type: ignore
+                for key, vector in from_disk.items(): # type: ignore
+                    self.memory.put(key, vector) # type: ignore
+                found.update(from_disk) # type: ignore
+                self.stats.disk_hits += len(from_disk) # type: ignore
+
+            self.stats.misses += len(keys) - len(found)
+
+        return found
+
+    def store(self, items: Dict[str, np.ndarray]) -> None: # type: ignore
+        items = {k: np.asarray(v, dtype=np.float32) for k, v in items.items()} # type: ignore
+
+        with self._lock:
+            for key, vector in items.items(): # type: ignore
+                self.memory.put(key, vector) # type: ignore
+            if self.disk is not None:
+                self.disk.put_many(items) # type: ignore
@@ -1,23 +1,206 @@
-from typing import List
-from sentence_transformers import SentenceTransformer # type: ignore
-from project.models import EmbeddedSentence, EmbeddedDataset, AnalysisMode, ProcessedSentence
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List
+import numpy as np # type: ignore
+from project.batching import get_token_budget, plan_batches
+from project.constants import EMBEDDING_CACHE_MAX_BYTES
+from project.embedding_backends import EmbeddingBackend, estimate_token_lengths, get_backend_class
+from project.embedding_cache import DiskEmbeddingStore, EmbeddingCache, LRUEmbeddingCache, cache_key
+from project.logging import setup_logger
+from project.microbatch import MicroBatcher
+from project.models import EmbeddedSentence, EmbeddedDataset, AnalysisMode, ModelLoadStats, ProcessedSentence, SentenceBatch
 
-#  Load once per cold start
-_model = SentenceTransformer("all-MiniLM-L6-v2") # type: ignore
+logger = setup_logger(__name__)
+
+# Set to "true" to load the model during the Lambda init phase (e.g. with provisioned concurrency)
+EAGER_MODEL_LOAD = os.getenv("EAGER_MODEL_LOAD", "false").lower() == "true"
+
+# "torch" (sentence-transformers), "onnx" (int8 ONNX Runtime export) or "stub" (offline, no weights),
+# see project.embedding_backends
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# /tmp survives between warm invocations of the same Lambda container. Empty disables the disk tier
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "/tmp/embedding-cache")
+
+# Set to "true" in long-lived multi-threaded hosts to coalesce concurrent requests' encodes (project.microbatch)
+EMBEDDING_MICROBATCH = os.getenv("EMBEDDING_MICROBATCH", "false").lower() == "true"
+EMBEDDING_MICROBATCH_WINDOW_MS = float(os.getenv("EMBEDDING_MICROBATCH_WINDOW_MS", "5"))
+EMBEDDING_MICROBATCH_MAX_TEXTS = int(os.getenv("EMBEDDING_MICROBATCH_MAX_TEXTS", "256"))
+
+# Deadline for a request's encode when the caller gives none
+EMBEDDING_ENCODE_TIMEOUT_MS = float(os.getenv("EMBEDDING_ENCODE_TIMEOUT_MS", "10000"))
+
+# Loaded lazily on first use so requests that fail validation never pay for torch
+_model: EmbeddingBackend | None = None
+_load_stats: ModelLoadStats | None = None
+_cache: EmbeddingCache | None = None
+# Long-lived hosts run requests on worker threads; load the model once between them
+_model_lock = threading.Lock()
+_batcher: MicroBatcher | None = None
+
+
+def model_id() -> str:
+    """
+    Identifier of the configured backend's model, used to key cached vectors.
+    """
+    return get_backend_class(EMBEDDING_BACKEND).model_id
+
+
+def _load_model() -> EmbeddingBackend:
+    global _load_stats
+
+    backend_class = get_backend_class(EMBEDDING_BACKEND)
+
+    start = time.perf_counter()
+    backend_class.import_runtime()
+    imported = time.perf_counter()
+
+    model = backend_class()
+    loaded = time.perf_counter()
+
+    _load_stats = ModelLoadStats(
+        model_name=backend_class.model_id,
+        import_seconds=imported - start,
+        load_seconds=loaded - imported,
+    )
+    logger.info(
+        f"Loaded embedding model {backend_class.model_id} "
+        f"(import {_load_stats.import_seconds:.3f}s, load {_load_stats.load_seconds:.3f}s)"
+    )
+    return model
+
+
+def get_model() -> EmbeddingBackend:
+    """
+    Return the configured embedding backend, loading it on first call.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_model()
+    return _model
+
+
+def warm_up() -> ModelLoadStats | None:
+    """
+    Load the embedding model ahead of the first request.
+
+    Returns the import/load timings, or None if the model was already
+    provided without going through the loader.
+    """
+    get_model()
+    return _load_stats
+
+
+def get_load_stats() -> ModelLoadStats | None:
+    return _load_stats
+
+
+def get_cache() -> EmbeddingCache | None:
+    """
+    Return the embedding cache, creating it on first call. None when disabled.
+    """
+    global _cache
+    if _cache is None and EMBEDDING_CACHE_ENABLED:
+        disk = DiskEmbeddingStore(EMBEDDING_CACHE_DIR) if EMBEDDING_CACHE_DIR else None
+        _cache = EmbeddingCache(LRUEmbeddingCache(EMBEDDING_CACHE_MAX_BYTES), disk)
+    return _cache
+
+
+def _encode(texts: List[str]) -> np.ndarray: # type: ignore
+    """
+    Encode texts in length-sorted, token-budgeted batches, returned in input order.
+    """
+    model = get_model()
+    token_lengths = getattr(model, "token_lengths", estimate_token_lengths)(texts)
+    batches = plan_batches(token_lengths, get_token_budget())
+
+    vectors: np.ndarray | None = None # type: ignore
+    for batch in batches:
+        encoded = np.asarray(model.encode([texts[i] for i in batch], batch_size=len(batch)), dtype=np.float32) # type: ignore
+        if vectors is None:
+            vectors = np.empty((len(texts), encoded.shape[1]), dtype=np.float32) # type: ignore
+        vectors[batch] = encoded # type: ignore
+
+    return vectors # type: ignore
+
+
+def get_batcher() -> MicroBatcher:
+    """
+    Return the shared micro-batcher, starting it on first call.
+    """
+    global _batcher
+    if _batcher is None:
+        with _model_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(_encode, EMBEDDING_MICROBATCH_WINDOW_MS / 1000, EMBEDDING_MICROBATCH_MAX_TEXTS)
+    return _batcher
+
+
+def _encode_request(texts: List[str], deadline: float | None = None) -> np.ndarray: # type: ignore
+    """
+    Encode one request's texts, through the shared micro-batcher when enabled.
+    """
+    if not EMBEDDING_MICROBATCH:
+        return _encode(texts)
+
+    if deadline is None:
+        deadline = time.monotonic() + EMBEDDING_ENCODE_TIMEOUT_MS / 1000
+    return get_batcher().encode(texts, deadline)
+
+
+def _embed_texts(texts: List[str], deadline: float | None = None) -> np.ndarray: # type: ignore
+    """
+    One contiguous float32 matrix with a row per text, going to the model only for cache misses.
+    """
+    cache = get_cache()
+    if cache is None:
+        return _encode_request(texts, deadline)
+
+    current_model = model_id()
+    keys = [cache_key(current_model, t) for t in texts]
+    found = cache.lookup(list(dict.fromkeys(keys)))
+
+    # Only cache misses go to the model, each unique text once
+    missing: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+
+    if missing:
+        encoded = _encode_request(list(missing.values()), deadline)
+        new_vectors = dict(zip(missing.keys(), encoded)) # type: ignore
+        cache.store(new_vectors) # type: ignore
+        found.update(new_vectors) # type: ignore
+
+    logger.info(
+        f"Embedding cache: {len(keys) - len(missing)} hits, {len(missing)} misses "
+        f"(totals: {cache.stats.memory_hits} memory hits, {cache.stats.disk_hits} disk hits, {cache.stats.misses} misses)"
+    )
+
+    dim = len(next(iter(found.values()))) # type: ignore
+    vectors = np.empty((len(texts), dim), dtype=np.float32) # type: ignore
+    for row, key in enumerate(keys):
+        vectors[row] = found[key] # type: ignore
+    return vectors # type: ignore
+
+
+def embed_texts(texts: List[str], deadline: float | None = None) -> np.ndarray: # type: ignore
+    """
+    One embedding row per text, through the cache and the micro-batcher like `embed_batch`.
+    """
+    return _embed_texts(texts, deadline)
 
 
 def _embed(sentences: List[ProcessedSentence]) -> List[EmbeddedSentence]:
     if not sentences:
         return []
 
-    texts = [s.normalized_text for s in sentences]
-
-    vectors = _model.encode( # type: ignore
-        texts,
-        show_progress_bar=False,
-        convert_to_numpy=True,
-        normalize_embeddings=True,
-    )
+    vectors = _embed_texts([s.normalized_text for s in sentences])
 
     return [
         EmbeddedSentence(sentence=s, vector=v) # type: ignore
@@ -25,6 +208,41 @@ def _embed(sentences: List[ProcessedSentence]) -> List[EmbeddedSentence]:
     ]
 
 
+def embed_batch(batch: SentenceBatch, deadline: float | None = None) -> SentenceBatch:
+    """
+    Fill `batch.vectors` with one embedding row per sentence.
+
+    `deadline` (a `time.monotonic()` value) bounds the wait when encodes are micro-batched.
+    """
+    if len(batch):
+        batch.vectors = _embed_texts(batch.normalized_texts, deadline)
+    return batch
+
+
+def embed_batch_to_disk(batch: SentenceBatch, chunk_rows: int, directory: str) -> SentenceBatch:
+    """
+    `embed_batch` for inputs too large to hold their vectors in memory.
+
+    Rows are encoded `chunk_rows` at a time and appended to an unlinked
+    scratch file in `directory`, which `batch.vectors` then maps read-only.
+    Only one chunk of vectors is ever on the heap; the mapped pages are
+    file-backed, so the kernel can drop them under pressure.
+    """
+    if not len(batch):
+        return batch
+
+    dim = 0
+    with tempfile.TemporaryFile(dir=directory) as scratch:
+        for start in range(0, len(batch), chunk_rows):
+            vectors = _embed_texts(batch.normalized_texts[start:start + chunk_rows])
+            dim = vectors.shape[1] # type: ignore
+            scratch.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes()) # type: ignore
+        scratch.flush()
+        # the mapping outlives the file handle
+        batch.vectors = np.memmap(scratch, dtype=np.float32, mode="r", shape=(len(batch), dim)) # type: ignore
+    return batch
+
+
 def embed_sentences(
     *,
     mode: AnalysisMode,
@@ -44,9 +262,15 @@ def embed_sentences(
         if comparison is None:
             raise ValueError("comparison sentences required for comparative mode")
 
+        # One encode pass over both sets; a text present in both is encoded once
+        unique: Dict[str, ProcessedSentence] = {}
+        for sentence in baseline + comparison:
+            unique.setdefault(sentence.normalized_text, sentence)
+        vectors = {e.sentence.normalized_text: e.vector for e in _embed(list(unique.values()))} # type: ignore
+
         return EmbeddedDataset(
-            baseline=_embed(baseline),
-            comparison=_embed(comparison),
+            baseline=[EmbeddedSentence(sentence=s, vector=vectors[s.normalized_text]) for s in baseline], # type: ignore
+            comparison=[EmbeddedSentence(sentence=s, vector=vectors[s.normalized_text]) for s in comparison], # type: ignore
         )
 
     raise ValueError(f"Unsupported analysis mode: {mode}")
@@ -60,3 +284,7 @@ def embed_sentence_list(sentences: List[ProcessedSentence]) -> EmbeddedDataset:
         baseline=_embed(sentences),
         comparison=None,
     )
+
+
+if EAGER_MODEL_LOAD:
+    warm_up()
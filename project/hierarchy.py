@@ -0,0 +1,308 @@
+import os
+from typing import Dict, List, Tuple
+import numpy as np # type: ignore
+from scipy.sparse import coo_matrix # type: ignore
+from scipy.sparse.csgraph import connected_components, minimum_spanning_tree # type: ignore
+
+from project.constants import SIMILARITY_MEMORY_BYTES
+from project.models import DensityHierarchy
+from project.similarity import top_k_neighbours
+
+# Nearest neighbours kept per point. The spanning tree only links points through these, so a
+# cluster is found as long as its members reach each other in steps of this many neighbours
+HIERARCHY_NEIGHBOURS = int(os.getenv("HIERARCHY_NEIGHBOURS", "15"))
+
+# Smallest group the hierarchy engine reports as a cluster; it never goes below min_samples
+HIERARCHY_MIN_CLUSTER_SIZE = int(os.getenv("HIERARCHY_MIN_CLUSTER_SIZE", "2"))
+
+# Cosine distance past which points never join a cluster. Beyond it sentences share little but
+# their language, and in high dimensions even unrelated points would form small clusters
+HIERARCHY_MAX_DISTANCE = float(os.getenv("HIERARCHY_MAX_DISTANCE", "0.5"))
+if HIERARCHY_MAX_DISTANCE <= 0:
+    raise ValueError(f"HIERARCHY_MAX_DISTANCE must be positive, got {HIERARCHY_MAX_DISTANCE}")
+
+# Distances are floored here so identical vectors still get a (finite, positive) spanning tree edge
+# and a finite density
+_MIN_DISTANCE = 1e-6
+
+
+def build_hierarchy(
+    vectors: np.ndarray, # type: ignore
+    min_samples: int,
+    neighbours: int = HIERARCHY_NEIGHBOURS,
+    memory_bytes: int = SIMILARITY_MEMORY_BYTES,
+) -> DensityHierarchy:
+    """
+    Nearest neighbours, core distances and the mutual reachability spanning
+    forest of an L2-normalized matrix, from one blocked similarity pass.
+
+    The mutual reachability distance of two points is the largest of their
+    cosine distance and their two core distances, so a point in a sparse
+    region is only reached at the distance DBSCAN would need to make it a
+    core point. Only each point's `neighbours` nearest points are linked,
+    which makes the forest approximate where clusters are much larger than
+    that.
+    """
+    n = vectors.shape[0] # type: ignore
+    k = max(neighbours, min_samples - 1)
+    indices, scores = top_k_neighbours(vectors, vectors, k, exclude_self=True, memory_bytes=memory_bytes)
+    k = indices.shape[1] # type: ignore
+    distances = np.clip(1.0 - scores.astype(np.float64), 0.0, 2.0) # type: ignore
+
+    if min_samples >= 2 and k:
+        core = distances[:, min(min_samples - 2, k - 1)] # type: ignore
+    else:
+        core = np.zeros(n) # type: ignore
+
+    rows = np.repeat(np.arange(n), k) # type: ignore
+    cols = indices.ravel() # type: ignore
+    weights = np.maximum(np.maximum(core[rows], core[cols]), distances.ravel()) # type: ignore
+    graph = coo_matrix((np.maximum(weights, _MIN_DISTANCE), (rows, cols)), shape=(n, n)).tocsr() # type: ignore
+    # a pair usually appears from both ends with the same weight; max keeps one copy of it
+    forest = minimum_spanning_tree(graph.maximum(graph.T)).tocoo() # type: ignore
+    order = np.argsort(forest.data, kind="stable") # type: ignore
+
+    return DensityHierarchy(
+        min_samples=min_samples,
+        core_distances=core,
+        neighbours=indices,
+        neighbour_distances=distances,
+        edge_sources=forest.row[order].astype(np.int64), # type: ignore
+        edge_targets=forest.col[order].astype(np.int64), # type: ignore
+        edge_distances=forest.data[order], # type: ignore
+    )
+
+
+def _number_by_first_row(labels: np.ndarray) -> np.ndarray: # type: ignore
+    # relabel 0, 1, ... in order of each cluster's first row, keeping -1 for noise
+    clustered = labels >= 0 # type: ignore
+    if not clustered.any(): # type: ignore
+        return np.full(labels.shape[0], -1, dtype=np.int64) # type: ignore
+    values, first = np.unique(labels[clustered], return_index=True) # type: ignore
+    rank = np.empty(values.size, dtype=np.int64) # type: ignore
+    rank[np.argsort(first)] = np.arange(values.size) # type: ignore
+    numbered = np.full(labels.shape[0], -1, dtype=np.int64) # type: ignore
+    numbered[clustered] = rank[np.searchsorted(values, labels[clustered])] # type: ignore
+    return numbered # type: ignore
+
+
+def threshold_labels(hierarchy: DensityHierarchy, eps: float) -> np.ndarray: # type: ignore
+    """
+    The flat clustering DBSCAN finds at `eps`, read off the hierarchy
+    without another similarity pass.
+
+    Core points are those with a core distance within `eps`, linked by the
+    spanning forest edges within `eps`; every other point joins the cluster
+    of its nearest core neighbour within `eps`, or is noise (-1).
+    """
+    n = len(hierarchy)
+    is_core = hierarchy.core_distances <= eps # type: ignore
+    labels = np.full(n, -1, dtype=np.int64) # type: ignore
+    if not is_core.any(): # type: ignore
+        return labels # type: ignore
+
+    linked = hierarchy.edge_distances <= eps # type: ignore
+    graph = coo_matrix( # type: ignore
+        (np.ones(int(linked.sum()), dtype=np.int8), (hierarchy.edge_sources[linked], hierarchy.edge_targets[linked])),
+        shape=(n, n),
+    )
+    _, component = connected_components(graph, directed=False) # type: ignore
+    labels[is_core] = component[is_core] # type: ignore
+
+    # neighbours are sorted closest first, so the first core one within eps is the nearest
+    border = np.flatnonzero(~is_core) # type: ignore
+    reachable = is_core[hierarchy.neighbours[border]] & (hierarchy.neighbour_distances[border] <= eps) # type: ignore
+    has_core = reachable.any(axis=1) # type: ignore
+    nearest = hierarchy.neighbours[border[has_core], reachable[has_core].argmax(axis=1)] # type: ignore
+    labels[border[has_core]] = component[nearest] # type: ignore
+
+    return _number_by_first_row(labels) # type: ignore
+
+
+def _single_linkage(
+    hierarchy: DensityHierarchy, max_distance: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]: # type: ignore
+    """
+    Children, merge distance and size of each single-linkage node n, n + 1, ...
+    (scipy linkage numbering). Separate trees of the forest are joined last,
+    so there is always one root, and no merge is further apart than
+    `max_distance`: everything that only joins beyond it joins at it.
+    """
+    n = len(hierarchy)
+    sources = hierarchy.edge_sources.tolist()
+    targets = hierarchy.edge_targets.tolist()
+    distances = hierarchy.edge_distances.tolist()
+
+    _, component = connected_components( # type: ignore
+        coo_matrix((np.ones(len(sources)), (sources, targets)), shape=(n, n)), directed=False # type: ignore
+    )
+    _, roots = np.unique(component, return_index=True) # type: ignore
+    sources += [int(roots[0])] * (roots.size - 1)
+    targets += roots[1:].tolist()
+    distances += [max_distance] * (roots.size - 1)
+
+    parent = list(range(2 * n - 1))
+    children = np.empty((n - 1, 2), dtype=np.int64) # type: ignore
+    sizes = np.ones(2 * n - 1, dtype=np.int64) # type: ignore
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for node, (a, b) in enumerate(zip(sources, targets), start=n):
+        left, right = find(a), find(b)
+        children[node - n] = left, right
+        sizes[node] = sizes[left] + sizes[right]
+        parent[left] = parent[right] = node
+
+    return children, np.minimum(np.asarray(distances, dtype=np.float64), max_distance), sizes # type: ignore
+
+
+def _leaves(children: np.ndarray, node: int, n: int) -> List[int]: # type: ignore
+    stack, leaves = [node], []
+    while stack:
+        node = stack.pop()
+        if node < n:
+            leaves.append(node)
+        else:
+            stack.extend(children[node - n].tolist())
+    return leaves
+
+
+def _condense(
+    children: np.ndarray, # type: ignore
+    distances: np.ndarray, # type: ignore
+    sizes: np.ndarray, # type: ignore
+    min_cluster_size: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: # type: ignore
+    """
+    HDBSCAN's condensed tree: walking down from the root, a split only
+    starts two new clusters when both sides have `min_cluster_size` points;
+    otherwise the small side's points fall out of the cluster at that
+    density. Returns (parent, child, lambda, size) rows; clusters are
+    numbered from n (the root) upwards, parents before children, and
+    children below n are points.
+    """
+    n = children.shape[0] + 1 # type: ignore
+    cluster_of = {2 * n - 2: n}
+    next_cluster = n + 1
+    rows: List[Tuple[int, int, float, int]] = []
+
+    stack = [2 * n - 2]
+    while stack:
+        node = stack.pop()
+        cluster = cluster_of[node]
+        left, right = children[node - n].tolist()
+        density = 1.0 / max(float(distances[node - n]), _MIN_DISTANCE)
+
+        if sizes[left] >= min_cluster_size and sizes[right] >= min_cluster_size:
+            for child in (left, right):
+                cluster_of[child] = next_cluster
+                rows.append((cluster, next_cluster, density, int(sizes[child])))
+                next_cluster += 1
+                stack.append(child)
+            continue
+
+        for child in (left, right):
+            if sizes[child] >= min_cluster_size:
+                cluster_of[child] = cluster
+                stack.append(child)
+            else:
+                rows.extend((cluster, leaf, density, 1) for leaf in _leaves(children, child, n))
+
+    table = np.array(rows, dtype=np.float64).reshape(-1, 4) # type: ignore
+    return table[:, 0].astype(np.int64), table[:, 1].astype(np.int64), table[:, 2], table[:, 3].astype(np.int64) # type: ignore
+
+
+def _select_clusters(
+    parents: np.ndarray, # type: ignore
+    nodes: np.ndarray, # type: ignore
+    densities: np.ndarray, # type: ignore
+    sizes: np.ndarray, # type: ignore
+    n: int,
+    min_density: float,
+) -> np.ndarray: # type: ignore
+    """
+    Label per point from the condensed tree, choosing clusters by excess of
+    mass: a cluster is kept when its stability, the density its points
+    stay in it past its birth summed over its points, is at least that of
+    the best selection among its descendants. The root (everything) is
+    never a candidate, and points that only fall out at `min_density` or
+    below are noise wherever they fall out.
+    """
+    n_clusters = int(parents.max()) - n + 1 # type: ignore
+    is_cluster = nodes >= n # type: ignore
+    birth = np.zeros(n_clusters) # type: ignore
+    birth[nodes[is_cluster] - n] = densities[is_cluster] # type: ignore
+    stability = np.bincount( # type: ignore
+        parents - n, weights=(densities - birth[parents - n]) * sizes, minlength=n_clusters # type: ignore
+    )
+
+    cluster_children: Dict[int, List[int]] = {}
+    for parent, child in zip((parents[is_cluster] - n).tolist(), (nodes[is_cluster] - n).tolist()):
+        cluster_children.setdefault(parent, []).append(child)
+
+    # children are numbered after their parents, so walking backwards sees them first
+    selected = np.zeros(n_clusters, dtype=bool) # type: ignore
+    best = stability.copy() # type: ignore
+    for cluster in range(n_clusters - 1, 0, -1):
+        below = cluster_children.get(cluster, [])
+        descendants_best = sum(best[child] for child in below)
+        if below and descendants_best > stability[cluster]:
+            best[cluster] = descendants_best
+        else:
+            selected[cluster] = True
+    # a selected cluster wins over everything it contains
+    parent_of = np.zeros(n_clusters, dtype=np.int64) # type: ignore
+    parent_of[nodes[is_cluster] - n] = parents[is_cluster] - n # type: ignore
+    owner = np.full(n_clusters, -1, dtype=np.int64) # type: ignore
+    for cluster in range(1, n_clusters):
+        parent_owner = owner[parent_of[cluster]]
+        owner[cluster] = parent_owner if parent_owner >= 0 else (cluster if selected[cluster] else -1)
+
+    labels = np.full(n, -1, dtype=np.int64) # type: ignore
+    points = ~is_cluster & (densities > min_density) # type: ignore
+    labels[nodes[points]] = owner[parents[points] - n] # type: ignore
+    return labels # type: ignore
+
+
+def stable_labels(
+    hierarchy: DensityHierarchy,
+    min_cluster_size: int,
+    max_distance: float = HIERARCHY_MAX_DISTANCE,
+) -> np.ndarray: # type: ignore
+    """
+    Label per point (-1 for noise) from the most stable clusters of the
+    hierarchy, HDBSCAN-style: no eps, and clusters of different densities
+    can be picked at different thresholds up to `max_distance`.
+    """
+    if max_distance <= 0:
+        raise ValueError(f"max_distance must be positive, got {max_distance}")
+    n = len(hierarchy)
+    min_cluster_size = max(min_cluster_size, 2)
+    if n < min_cluster_size:
+        return np.full(n, -1, dtype=np.int64) # type: ignore
+
+    children, distances, sizes = _single_linkage(hierarchy, max_distance)
+    parents, nodes, densities, counts = _condense(children, distances, sizes, min_cluster_size)
+    labels = _select_clusters(parents, nodes, densities, counts, n, 1.0 / max_distance)
+    return _number_by_first_row(labels) # type: ignore
+
+
+def hierarchy_labels(
+    vectors: np.ndarray, # type: ignore
+    eps: float,
+    min_samples: int,
+    memory_bytes: int = SIMILARITY_MEMORY_BYTES,
+) -> np.ndarray: # type: ignore
+    """
+    Clustering engine over the density hierarchy: the most stable clusters
+    of at least max(min_samples, HIERARCHY_MIN_CLUSTER_SIZE) points.
+
+    `eps` is not used; the threshold each cluster is cut at comes from the
+    data. Labels are numbered in order of each cluster's first row.
+    """
+    hierarchy = build_hierarchy(vectors, min_samples, memory_bytes=memory_bytes)
+    return stable_labels(hierarchy, max(min_samples, HIERARCHY_MIN_CLUSTER_SIZE)) # type: ignore
@@ -0,0 +1,436 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Protocol, Set, Type
+import numpy as np # type: ignore
+
+from project.clustering import cluster_batch, cluster_labels, group_labels
+from project.constants import MIN_CLUSTER_SIZE, SIMILARITY_THRESHOLD
+from project.embeddings import embed_batch, embed_texts, model_id
+from project.logging import setup_logger
+from project.models import (
+    AnalysisMode, AnalysisState, ClusterSummary, ComparativeClusterSummary, IncrementalStats, IngestedRequest, SentenceBatch,
+)
+from project.sentiment import score_sentiment
+from project.settings import pipeline_settings
+from project.similarity import similarity_blocks
+
+
+logger = setup_logger(__name__)
+
+# Set to "true" to keep each analysis's state and re-run the same survey title, theme and mode incrementally
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "false").lower() == "true"
+
+# "file" (one .npz per analysis under ANALYSIS_STORE_DIR) or "memory" (process lifetime only)
+ANALYSIS_STORE = os.getenv("ANALYSIS_STORE", "file")
+ANALYSIS_STORE_DIR = os.getenv("ANALYSIS_STORE_DIR", "/tmp/analysis-store")
+
+# Above this share of new, changed or removed rows a re-run clusters everything from scratch,
+# so assignments cannot drift far from what a full run would give
+INCREMENTAL_MAX_CHANGED_FRACTION = float(os.getenv("INCREMENTAL_MAX_CHANGED_FRACTION", "0.2"))
+
+
+# ---- stores ----
+
+class AnalysisStore(Protocol):
+    """
+    Anything that keeps one AnalysisState per analysis key.
+    """
+
+    def load(self, key: str) -> AnalysisState | None:
+        ...
+
+    def save(self, key: str, state: AnalysisState) -> None:
+        ...
+
+
+class MemoryAnalysisStore:
+    """
+    States held in a dict, for tests and single-process hosts.
+    """
+
+    def __init__(self) -> None:
+        self._states: Dict[str, AnalysisState] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def load(self, key: str) -> AnalysisState | None:
+        with self._lock:
+            return self._states.get(key)
+
+    def save(self, key: str, state: AnalysisState) -> None:
+        with self._lock:
+            self._states[key] = state
+
+
+class FileAnalysisStore:
+    """
+    One uncompressed .npz per analysis in `directory`: the vectors, labels
+    and sentiment scores as arrays, everything else as a JSON `meta` member.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def load(self, key: str) -> AnalysisState | None:
+        try:
+            with np.load(self._path(key), allow_pickle=False) as stored: # type: ignore
+                meta = json.loads(stored["meta"].tobytes().decode("utf-8")) # type: ignore
+                vectors, labels, scores = stored["vectors"], stored["labels"], stored["sentiment_scores"] # type: ignore
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning(f"Ignoring unreadable analysis state {key}: {exc!r}")
+            return None
+
+        mode = AnalysisMode(meta["mode"])
+        summary_class = ComparativeClusterSummary if mode == AnalysisMode.COMPARATIVE else ClusterSummary
+        return AnalysisState(
+            model_id=meta["model_id"],
+            mode=mode,
+            eps=meta["eps"],
+            min_samples=meta["min_samples"],
+            normalized_texts=meta["normalized_texts"],
+            first_texts=meta["first_texts"],
+            row_signatures=meta["row_signatures"],
+            vectors=vectors,
+            labels=labels,
+            sentiment_scores=scores,
+            summaries={int(label): summary_class(**s) for label, s in meta["summaries"].items()},
+            settings=meta.get("settings", []),
+        )
+
+    def save(self, key: str, state: AnalysisState) -> None:
+        meta = {
+            "model_id": state.model_id,
+            "mode": state.mode.value,
+            "eps": state.eps,
+            "min_samples": state.min_samples,
+            "normalized_texts": state.normalized_texts,
+            "first_texts": state.first_texts,
+            "row_signatures": state.row_signatures,
+            "summaries": {str(label): asdict(s) for label, s in state.summaries.items()},
+            "settings": state.settings,
+        }
+        buffer = io.BytesIO()
+        np.savez( # type: ignore
+            buffer,
+            meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8), # type: ignore
+            vectors=state.vectors,
+            labels=state.labels,
+            sentiment_scores=state.sentiment_scores,
+        )
+
+        # write-then-rename so a concurrent run never loads a partial file
+        path = self._path(key)
+        temporary = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary.write_bytes(buffer.getbuffer())
+        temporary.replace(path)
+
+
+STORES: Dict[str, Type[Any]] = {
+    "file": FileAnalysisStore,
+    "memory": MemoryAnalysisStore,
+}
+
+
+def get_store_class(name: str) -> Type[Any]:
+    try:
+        return STORES[name]
+    except KeyError:
+        raise ValueError(f"Unsupported analysis store: {name}. Expected one of {sorted(STORES)}")
+
+
+_store: Any = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Any:
+    """
+    The ANALYSIS_STORE instance, created on first call.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store_class = get_store_class(ANALYSIS_STORE)
+                _store = store_class(ANALYSIS_STORE_DIR) if store_class is FileAnalysisStore else store_class()
+    return _store
+
+
+# ---- incremental runs ----
+
+def analysis_key(mode: AnalysisMode, survey_title: str, theme: str) -> str:
+    """
+    Identity of an analysis across runs: hash of its mode, survey title and theme.
+    """
+    return hashlib.sha256(json.dumps([mode.value, survey_title, theme]).encode("utf-8")).hexdigest()
+
+
+def row_signatures(batch: SentenceBatch) -> List[str]:
+    """
+    Fingerprint of each row's first text and its input ids with their
+    sources. A row whose signature is unchanged summarizes the same way.
+    """
+    ids = [batch.id_table[i] for i in batch.entry_ids.tolist()] # type: ignore
+    tagged = [f"{source}:{i}" for source, i in zip(batch.entry_sources.tolist(), ids)] # type: ignore
+    offsets = batch.entry_offsets.tolist() # type: ignore
+
+    return [
+        hashlib.blake2b(
+            "\0".join([batch.first_texts[row], *sorted(tagged[offsets[row]:offsets[row + 1]])]).encode("utf-8"),
+            digest_size=12,
+        ).hexdigest()
+        for row in range(len(batch))
+    ]
+
+
+class IncrementalAnalysis:
+    """
+    One run of an analysis that reuses the state its previous run saved.
+
+    Rows are matched to the previous run by normalized text. Only rows that
+    are new get encoded, and only new or changed rows get sentiment scores.
+    Kept rows keep their cluster label. A new row joins the cluster of its
+    most similar clustered row when that is within `eps` cosine distance;
+    the rest are clustered together with the previous run's noise, so
+    they can start new clusters. A cluster keeps its stored summary unless
+    it gained, lost or changed a row.
+
+    With no usable previous state, or once the share of new, changed or
+    removed rows passes INCREMENTAL_MAX_CHANGED_FRACTION, the run is a full
+    one and every cluster is summarized afresh.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        store: Any,
+        mode: AnalysisMode,
+        previous: AnalysisState | None,
+        eps: float = SIMILARITY_THRESHOLD,
+        min_samples: int = MIN_CLUSTER_SIZE,
+    ):
+        self.key = key
+        self.store = store
+        self.mode = mode
+        self.previous = previous
+        self.eps = eps
+        self.min_samples = min_samples
+        self.stats = IncrementalStats()
+
+        self._signatures: List[str] = []
+        # previous row of each current row (-1 if new), and rows whose signature is new or changed
+        self._source: np.ndarray = np.zeros(0, dtype=np.int64) # type: ignore
+        self._dirty: np.ndarray = np.zeros(0, dtype=bool) # type: ignore
+        self._changed_labels: Set[int] = set()
+
+    def _match_rows(self, batch: SentenceBatch) -> None:
+        self._signatures = row_signatures(batch)
+        n = len(batch)
+        self._source = np.full(n, -1, dtype=np.int64) # type: ignore
+        self._dirty = np.ones(n, dtype=bool) # type: ignore
+        if self.previous is None:
+            return
+
+        previous_rows = {text: row for row, text in enumerate(self.previous.normalized_texts)}
+        self._source = np.fromiter( # type: ignore
+            (previous_rows.get(text, -1) for text in batch.normalized_texts), dtype=np.int64, count=n,
+        )
+        matched = np.flatnonzero(self._source >= 0) # type: ignore
+        previous_signatures = self.previous.row_signatures
+        self._dirty[matched] = [ # type: ignore
+            self._signatures[row] != previous_signatures[source]
+            for row, source in zip(matched.tolist(), self._source[matched].tolist()) # type: ignore
+        ]
+
+        removed = len(self.previous.normalized_texts) - matched.size # type: ignore
+        changed = int(self._dirty.sum()) + removed # type: ignore
+        if changed > INCREMENTAL_MAX_CHANGED_FRACTION * max(n, 1):
+            logger.info(f"{changed} of {n} rows changed, re-running analysis {self.key[:12]} in full")
+            self.previous = None
+            self._source[:] = -1
+            self._dirty[:] = True
+            return
+
+        self.stats.full_rebuild = False
+        self.stats.removed_rows = removed
+
+    def embed(self, batch: SentenceBatch) -> None:
+        """
+        Fill `batch.vectors`, encoding only rows the previous run did not have.
+        """
+        self._match_rows(batch)
+        self.stats.rows = len(batch)
+        if self.previous is None:
+            embed_batch(batch)
+            self.stats.embedded_rows = len(batch)
+            return
+
+        kept = np.flatnonzero(self._source >= 0) # type: ignore
+        new = np.flatnonzero(self._source < 0) # type: ignore
+        vectors = np.empty((len(batch), self.previous.vectors.shape[1]), dtype=np.float32) # type: ignore
+        vectors[kept] = self.previous.vectors[self._source[kept]] # type: ignore
+        if new.size: # type: ignore
+            vectors[new] = embed_texts([batch.normalized_texts[i] for i in new]) # type: ignore
+
+        batch.vectors = vectors
+        self.stats.reused_rows = int(kept.size) # type: ignore
+        self.stats.embedded_rows = int(new.size) # type: ignore
+
+    def score(self, batch: SentenceBatch) -> np.ndarray: # type: ignore
+        """
+        Sentiment score per row, scoring only new or changed rows.
+        """
+        if self.previous is None:
+            return score_sentiment(batch.first_texts)
+
+        scores = np.empty(len(batch), dtype=np.float32) # type: ignore
+        clean = np.flatnonzero(~self._dirty) # type: ignore
+        dirty = np.flatnonzero(self._dirty) # type: ignore
+        scores[clean] = self.previous.sentiment_scores[self._source[clean]] # type: ignore
+        scores[dirty] = score_sentiment([batch.first_texts[i] for i in dirty]) # type: ignore
+        return scores # type: ignore
+
+    def cluster(self, batch: SentenceBatch) -> List[np.ndarray]: # type: ignore
+        """
+        Set `batch.labels` and return the row indices of each cluster, like `cluster_batch`.
+        """
+        if self.previous is None:
+            clusters = cluster_batch(batch, self.eps, self.min_samples)
+            self._changed_labels = {int(batch.labels[rows[0]]) for rows in clusters} # type: ignore
+            self.stats.clusters = len(clusters)
+            return clusters
+
+        previous_labels = self.previous.labels
+        labels = np.full(len(batch), -1, dtype=np.int64) # type: ignore
+        kept = np.flatnonzero(self._source >= 0) # type: ignore
+        labels[kept] = previous_labels[self._source[kept]] # type: ignore
+
+        # clusters that lost a row
+        still_present = np.zeros(len(previous_labels), dtype=bool) # type: ignore
+        still_present[self._source[kept]] = True # type: ignore
+        changed = set(previous_labels[~still_present & (previous_labels >= 0)].tolist()) # type: ignore
+
+        # in the space the first run clustered in, as `cluster_batch` does
+        vectors = batch.compact_vectors if batch.compact_vectors is not None else batch.vectors
+        new = np.flatnonzero(self._source < 0) # type: ignore
+        if new.size: # type: ignore
+            self._assign_new_rows(vectors, labels, new, int(previous_labels.max(initial=-1)) + 1) # type: ignore
+
+        # clusters that gained or changed a row, and any started this run
+        changed.update(labels[self._dirty & (labels >= 0)].tolist()) # type: ignore
+        current = np.unique(labels[labels >= 0]).tolist() # type: ignore
+        changed.update(label for label in current if label not in self.previous.summaries)
+
+        # a cluster left smaller than min_samples by removals dissolves into noise
+        sizes = np.bincount(labels[labels >= 0], minlength=1) # type: ignore
+        labels[(labels >= 0) & (sizes[np.maximum(labels, 0)] < self.min_samples)] = -1 # type: ignore
+
+        batch.labels = labels
+        self._changed_labels = changed
+        clusters = group_labels(labels)
+        self.stats.clusters = len(clusters)
+        return clusters
+
+    def _assign_new_rows(
+        self,
+        vectors: np.ndarray, # type: ignore
+        labels: np.ndarray, # type: ignore
+        new: np.ndarray, # type: ignore
+        next_label: int,
+    ) -> None:
+        members = np.flatnonzero(labels >= 0) # type: ignore
+        if members.size: # type: ignore
+            best = np.empty(new.size, dtype=np.int64) # type: ignore
+            best_similarity = np.empty(new.size, dtype=np.float32) # type: ignore
+            for block, sims in similarity_blocks(vectors[new], vectors[members]): # type: ignore
+                best[block] = sims.argmax(axis=1) # type: ignore
+                best_similarity[block] = sims[np.arange(sims.shape[0]), best[block]] # type: ignore
+            joins = best_similarity >= 1.0 - self.eps # type: ignore
+            labels[new[joins]] = labels[members[best[joins]]] # type: ignore
+
+        # what is left of the new rows, with the previous noise, may form clusters of its own
+        if not (labels[new] < 0).any(): # type: ignore
+            return
+        pool = np.flatnonzero(labels < 0) # type: ignore
+        pool_labels = cluster_labels(vectors[pool], self.eps, self.min_samples) # type: ignore
+        formed = pool_labels >= 0 # type: ignore
+        labels[pool[formed]] = pool_labels[formed] + next_label # type: ignore
+
+    def previous_summary(
+        self, batch: SentenceBatch, rows: np.ndarray, # type: ignore
+    ) -> ClusterSummary | ComparativeClusterSummary | None:
+        """
+        The stored summary of the cluster these rows form, if its membership is unchanged.
+        """
+        if self.previous is None:
+            return None
+        label = int(batch.labels[rows[0]]) # type: ignore
+        if label in self._changed_labels:
+            return None
+        return self.previous.summaries.get(label)
+
+    def save(
+        self,
+        batch: SentenceBatch,
+        clusters: List[np.ndarray], # type: ignore
+        summaries: List[ClusterSummary | ComparativeClusterSummary],
+    ) -> None:
+        """
+        Persist this run's rows, vectors, labels and summaries for the next one.
+        """
+        if batch.vectors is None:
+            return
+
+        labels = [int(batch.labels[rows[0]]) for rows in clusters] # type: ignore
+        self.stats.reused_clusters = sum(label not in self._changed_labels for label in labels)
+
+        self.store.save(self.key, AnalysisState(
+            model_id=model_id(),
+            mode=self.mode,
+            eps=self.eps,
+            min_samples=self.min_samples,
+            normalized_texts=batch.normalized_texts,
+            first_texts=batch.first_texts,
+            row_signatures=self._signatures,
+            vectors=batch.vectors,
+            labels=batch.labels if batch.labels is not None else np.full(len(batch), -1, dtype=np.int64), # type: ignore
+            sentiment_scores=batch.sentiment_scores, # type: ignore
+            summaries=dict(zip(labels, summaries)),
+            settings=pipeline_settings(),
+        ))
+        logger.info(
+            f"Incremental analysis reused {self.stats.reused_rows} of {self.stats.rows} rows "
+            f"and {self.stats.reused_clusters} of {self.stats.clusters} cluster summaries",
+            extra={"fields": asdict(self.stats)},
+        )
+
+
+def start_incremental(request: IngestedRequest, store: Any = None) -> IncrementalAnalysis:
+    """
+    An IncrementalAnalysis for the request, with the state of the analysis's
+    previous run if it was made by the same model, clustering settings and
+    pipeline_settings().
+    """
+    store = store if store is not None else get_store()
+    key = analysis_key(request.mode, request.survey_title, request.theme)
+
+    previous = store.load(key)
+    settings = (model_id(), request.mode, SIMILARITY_THRESHOLD, MIN_CLUSTER_SIZE, pipeline_settings())
+    stored = (previous.model_id, previous.mode, previous.eps, previous.min_samples, previous.settings) if previous else None
+    if previous is not None and stored != settings:
+        logger.info(f"Stored state of analysis {key[:12]} was made with other settings, running in full")
+        previous = None
+
+    return IncrementalAnalysis(key, store, request.mode, previous)
@@ -0,0 +1,206 @@
+import json
+import re
+from typing import Any, Dict, Tuple
+
+from project.constants import MAX_SENTENCES
+from project.loader import load_sentences
+from project.models import AnalysisMode, BASELINE_SOURCE, COMPARISON_SOURCE, IngestedRequest
+from project.offload import ingest_reference, is_reference_payload
+from project.parser import parse_payload
+from project.preprocessing import SentenceBatchBuilder, build_sentence_batch
+from project.validation import BadRequestError, validate_payload, validate_sentence_item
+
+_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+_SENTENCE_FIELDS = {"baseline": BASELINE_SOURCE, "comparison": COMPARISON_SOURCE}
+
+
+class _Unhandled(Exception):
+    """The single pass met a payload it does not handle; the staged path decides."""
+    pass
+
+
+def parse_json(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse the incoming Lambda event into a JSON payload dict.
+
+    Supports API Gateway proxy events (with `body` string) or a direct dict payload.
+    Raises BadRequestError on invalid JSON or missing payload.
+    """
+    if not event:
+        raise BadRequestError("Empty event payload")
+
+    # API Gateway proxy integration: body is a JSON string
+    if "body" in event and isinstance(event["body"], str):
+        try:
+            return json.loads(event["body"]) if event["body"] else {}
+        except json.JSONDecodeError as exc:
+            raise BadRequestError(f"Invalid JSON in body: {exc}")
+
+    return event
+
+
+def determine_mode(payload: Dict[str, Any]) -> AnalysisMode:
+    """Determine processing mode from payload shape.
+
+    Returns "comparative" if `comparison` list has values in it, otherwise "standalone".
+    """
+
+    return AnalysisMode.COMPARATIVE if "comparison" in payload and payload["comparison"] else AnalysisMode.STANDALONE
+
+
+def ingest_event(event: Dict[str, Any]) -> IngestedRequest:
+    """
+    Validate, parse and load a Lambda event into a SentenceBatch in one pass.
+
+    Each sentence is validated and handed to the batch builder as soon as it
+    is decoded, so no intermediate payload, SentenceInput or Sentence lists
+    are built. Anything the single pass does not accept (a validation error,
+    malformed JSON, an unexpected shape) is re-run through the staged
+    `parse_json` -> `validate_payload` -> `parse_payload` -> `load_sentences`
+    path, so errors carry exactly the same messages and indices as before.
+    Payloads that reference stored objects (`baselineUri`) instead of
+    inlining sentences are streamed in by `project.offload.ingest_reference`.
+    """
+    if event and "body" in event and isinstance(event["body"], str):
+        body = event["body"]
+        try:
+            return _ingest_json(body)
+        except (_Unhandled, BadRequestError, ValueError):
+            return _ingest_staged(parse_json(event))
+
+    try:
+        return _ingest_dict(event)
+    except (_Unhandled, BadRequestError):
+        return _ingest_staged(parse_json(event))
+
+
+def _ingest_staged(raw_payload: Dict[str, Any]) -> IngestedRequest:
+    # Sentences in stored objects rather than inline; the single pass never accepts these
+    if is_reference_payload(raw_payload):
+        return ingest_reference(raw_payload)
+
+    mode = determine_mode(raw_payload)
+    validate_payload(raw_payload, mode)
+    payload = parse_payload(raw_payload)
+    sentences = load_sentences(payload)
+
+    return IngestedRequest(
+        mode=mode,
+        survey_title=payload.survey_title,
+        theme=payload.theme,
+        batch=build_sentence_batch(sentences),
+        sentence_count=len(sentences),
+    )
+
+
+def _finish(fields: Dict[str, Any], counts: Dict[str, int], builder: SentenceBatchBuilder) -> IngestedRequest:
+    # the staged checks run in a fixed order, so leave any failure to them
+    for name in ("surveyTitle", "theme"):
+        value = fields.get(name)
+        if not isinstance(value, str) or not value.strip():
+            raise _Unhandled(name)
+    if not counts.get("baseline"):
+        raise _Unhandled("baseline")
+
+    mode = AnalysisMode.COMPARATIVE if counts.get("comparison") else AnalysisMode.STANDALONE
+    return IngestedRequest(
+        mode=mode,
+        survey_title=fields["surveyTitle"],
+        theme=fields["theme"],
+        batch=builder.build(),
+        sentence_count=sum(counts.values()),
+    )
+
+
+def _add_sentence(builder: SentenceBatchBuilder, item: Any, field_name: str, index: int) -> None:
+    if index >= MAX_SENTENCES or not isinstance(item, dict):
+        raise _Unhandled(field_name)
+    validate_sentence_item(item, field_name, index)
+    builder.add(item["id"], item["sentence"], _SENTENCE_FIELDS[field_name])
+
+
+def _ingest_dict(payload: Dict[str, Any]) -> IngestedRequest:
+    builder = SentenceBatchBuilder()
+    counts: Dict[str, int] = {}
+
+    for field_name in _SENTENCE_FIELDS:
+        if field_name not in payload:
+            continue
+        items = payload[field_name]
+        if not isinstance(items, list):
+            raise _Unhandled(field_name)
+        for index, item in enumerate(items):
+            _add_sentence(builder, item, field_name, index)
+        counts[field_name] = len(items)
+
+    return _finish(payload, counts, builder)
+
+
+# ---- incremental JSON decoding ----
+
+def _skip(text: str, pos: int) -> int:
+    return _WHITESPACE_RE.match(text, pos).end() # type: ignore
+
+
+def _expect(text: str, pos: int, char: str) -> int:
+    if text[pos:pos + 1] != char:
+        raise _Unhandled(char)
+    return _skip(text, pos + 1)
+
+
+def _ingest_sentence_array(text: str, pos: int, field_name: str, builder: SentenceBatchBuilder) -> Tuple[int, int]:
+    pos = _expect(text, pos, "[")
+    if text[pos:pos + 1] == "]":
+        return pos + 1, 0
+
+    decode = _decoder.raw_decode
+    skip = _WHITESPACE_RE.match
+    index = 0
+    while True:
+        item, pos = decode(text, pos)
+        _add_sentence(builder, item, field_name, index)
+        index += 1
+
+        pos = skip(text, pos).end() # type: ignore
+        if text[pos:pos + 1] == "]":
+            return pos + 1, index
+        if text[pos:pos + 1] != ",":
+            raise _Unhandled(",")
+        pos = skip(text, pos + 1).end() # type: ignore
+
+
+def _ingest_json(text: str) -> IngestedRequest:
+    """
+    Decode the top-level object one member at a time, and the sentence
+    arrays one item at a time, with the stdlib decoder.
+    """
+    builder = SentenceBatchBuilder()
+    fields: Dict[str, Any] = {}
+    counts: Dict[str, int] = {}
+
+    pos = _expect(text, _skip(text, 0), "{")
+    while text[pos:pos + 1] != "}":
+        key, pos = _decoder.raw_decode(text, pos)
+        # json.loads keeps the last duplicate key; and rows must be added baseline first
+        if not isinstance(key, str) or key in fields or key in counts:
+            raise _Unhandled(key)
+        if key == "comparison" and "baseline" not in counts:
+            raise _Unhandled(key)
+        pos = _expect(text, _skip(text, pos), ":")
+
+        if key in _SENTENCE_FIELDS:
+            pos, counts[key] = _ingest_sentence_array(text, pos, key, builder)
+        else:
+            fields[key], pos = _decoder.raw_decode(text, pos)
+
+        pos = _skip(text, pos)
+        if text[pos:pos + 1] != "}":
+            pos = _expect(text, pos, ",")
+            if text[pos:pos + 1] == "}":
+                raise _Unhandled(",")
+
+    if _skip(text, pos + 1) != len(text):
+        raise _Unhandled("trailing data")
+
+    return _finish(fields, counts, builder)
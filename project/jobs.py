@@ -0,0 +1,483 @@
+import contextlib
+import dataclasses
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Protocol, Set, Type
+
+from project.app import run_analysis
+from project.ingestion import determine_mode, parse_json
+from project.logging import setup_logger
+from project.models import Job, JobStatus
+from project.offload import OFFLOAD_ALLOWED_PREFIXES, is_reference_payload
+from project.tracing import TRACE_TIMINGS_IN_RESPONSE, TRACING_ENABLED, Trace, profiled
+from project.validation import BadRequestError, validate_payload, validate_reference_payload
+
+logger = setup_logger(__name__)
+
+# "memory" (process lifetime only) or "sqlite" (a database file at JOB_STORE_PATH, shared by processes on the host)
+JOB_STORE = os.getenv("JOB_STORE", "memory")
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "/tmp/jobs.sqlite3")
+
+# Threads running submitted jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(os.cpu_count() or 1)))
+
+# Jobs admitted at once (running plus queued for a worker); beyond this submissions are refused
+JOB_MAX_ACTIVE = int(os.getenv("JOB_MAX_ACTIVE", "64"))
+
+# Finished jobs, with their results, are dropped from the store this long after they finish
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+# A manager refreshes the jobs it owns this often; an active job not refreshed for JOB_STALE_SECONDS
+# was left by a process that died, so it is failed instead of being attached to or counted
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300"))
+
+# Error recorded on an active job reaped as stale
+_ABANDONED = "Job abandoned by its worker"
+
+_ACTIVE = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+class JobQueueFullError(Exception):
+    """Raised when a submission would exceed the number of active jobs allowed."""
+    pass
+
+
+def payload_fingerprint(payload: Dict[str, Any]) -> str:
+    """
+    Content address of a payload: the same fields and values give the same
+    fingerprint whatever their key order or whitespace.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def validate_submission(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The payload of a job submission, checked the way the pipeline would check it,
+    so a bad request is refused before it is queued.
+    """
+    payload = parse_json(event)
+    if not isinstance(payload, dict):
+        raise BadRequestError("Request body must be a JSON object")
+    if is_reference_payload(payload):
+        validate_reference_payload(payload, OFFLOAD_ALLOWED_PREFIXES)
+    else:
+        validate_payload(payload, determine_mode(payload))
+    return payload
+
+
+# ---- stores ----
+
+class JobStore(Protocol):
+    """
+    Anything that keeps jobs by id. `get` returns a copy, so a reader never
+    sees a job change under it.
+    """
+
+    def save(self, job: Job) -> None:
+        ...
+
+    def get(self, job_id: str) -> Job | None:
+        ...
+
+    def find_active(self, fingerprint: str, live_after: float = 0.0) -> Job | None:
+        """
+        A queued or running job for the payload with this fingerprint, last
+        updated at or after `live_after`, if any.
+        """
+        ...
+
+    def admit(self, job: Job, live_after: float, max_active: int) -> Job:
+        """
+        Atomically: the live active job with `job`'s fingerprint if there is
+        one, else `job` saved. Raises JobQueueFullError when `max_active`
+        live jobs are already active.
+        """
+        ...
+
+    def touch(self, job_ids: List[str], at: float) -> None:
+        """
+        Set the update time of those of the jobs still active.
+        """
+        ...
+
+    def purge(self, finished_before: float, stale_before: float = 0.0) -> int:
+        """
+        Fail active jobs last updated before `stale_before`, then drop jobs
+        that finished before `finished_before`; returns how many were dropped.
+        """
+        ...
+
+
+def _copy(job: Job) -> Job:
+    return dataclasses.replace(job, completed_stages=list(job.completed_stages))
+
+
+class MemoryJobStore:
+    """
+    Jobs held in a dict, for tests and single-process hosts.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = _copy(job)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return _copy(job) if job is not None else None
+
+    def _live(self, live_after: float) -> List[Job]:
+        return [job for job in self._jobs.values() if job.status in _ACTIVE and job.updated_at >= live_after]
+
+    def find_active(self, fingerprint: str, live_after: float = 0.0) -> Job | None:
+        with self._lock:
+            for job in self._live(live_after):
+                if job.fingerprint == fingerprint:
+                    return _copy(job)
+        return None
+
+    def admit(self, job: Job, live_after: float, max_active: int) -> Job:
+        with self._lock:
+            live = self._live(live_after)
+            for existing in live:
+                if existing.fingerprint == job.fingerprint:
+                    return _copy(existing)
+            if len(live) >= max_active:
+                raise JobQueueFullError(f"{len(live)} jobs already active, retry later")
+            self._jobs[job.job_id] = _copy(job)
+        return job
+
+    def touch(self, job_ids: List[str], at: float) -> None:
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job is not None and job.status in _ACTIVE:
+                    job.updated_at = at
+
+    def purge(self, finished_before: float, stale_before: float = 0.0) -> int:
+        with self._lock:
+            now = time.time()
+            for job in self._jobs.values():
+                if job.status in _ACTIVE and job.updated_at < stale_before:
+                    job.status, job.stage, job.error, job.updated_at = JobStatus.FAILED, None, _ABANDONED, now
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.status not in _ACTIVE and job.updated_at < finished_before
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SqliteJobStore:
+    """
+    Jobs as rows of a SQLite database, with results stored as JSON text.
+    Admission runs in a write transaction, so processes sharing the file
+    see one set of active jobs.
+    """
+
+    _COLUMNS = ("job_id", "fingerprint", "status", "stage", "completed_stages", "created_at", "updated_at", "result", "error")
+
+    def __init__(self, path: str = JOB_STORE_PATH):
+        self.path = path
+        # one connection shared by the worker threads, serialized by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, status TEXT NOT NULL, stage TEXT, "
+                "completed_stages TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "result TEXT, error TEXT)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs (fingerprint, status)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _job(self, row: Any) -> Job | None:
+        if row is None:
+            return None
+        values = dict(zip(self._COLUMNS, row))
+        return Job(
+            job_id=values["job_id"],
+            fingerprint=values["fingerprint"],
+            status=JobStatus(values["status"]),
+            stage=values["stage"],
+            completed_stages=json.loads(values["completed_stages"]),
+            created_at=values["created_at"],
+            updated_at=values["updated_at"],
+            result=json.loads(values["result"]) if values["result"] is not None else None,
+            error=values["error"],
+        )
+
+    def _insert(self, job: Job) -> None:
+        row = (
+            job.job_id, job.fingerprint, job.status.value, job.stage, json.dumps(job.completed_stages),
+            job.created_at, job.updated_at, json.dumps(job.result) if job.result is not None else None, job.error,
+        )
+        self._connection.execute(
+            f"INSERT OR REPLACE INTO jobs ({', '.join(self._COLUMNS)}) VALUES ({', '.join('?' * len(row))})", row,
+        )
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._insert(job)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,),
+            ).fetchone()
+        return self._job(row)
+
+    def _find_active(self, fingerprint: str, live_after: float) -> Job | None:
+        row = self._connection.execute(
+            f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE fingerprint = ? AND status IN (?, ?) AND updated_at >= ? LIMIT 1",
+            (fingerprint, *(status.value for status in _ACTIVE), live_after),
+        ).fetchone()
+        return self._job(row)
+
+    def find_active(self, fingerprint: str, live_after: float = 0.0) -> Job | None:
+        with self._lock:
+            return self._find_active(fingerprint, live_after)
+
+    def admit(self, job: Job, live_after: float, max_active: int) -> Job:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so no other process admits between the checks and the insert
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._find_active(job.fingerprint, live_after)
+                if existing is not None:
+                    return existing
+                (count,) = self._connection.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?) AND updated_at >= ?",
+                    (*(status.value for status in _ACTIVE), live_after),
+                ).fetchone()
+                if count >= max_active:
+                    raise JobQueueFullError(f"{count} jobs already active, retry later")
+                self._insert(job)
+            finally:
+                self._connection.execute("COMMIT")
+        return job
+
+    def touch(self, job_ids: List[str], at: float) -> None:
+        with self._lock:
+            self._connection.executemany(
+                "UPDATE jobs SET updated_at = ? WHERE job_id = ? AND status IN (?, ?)",
+                [(at, job_id, *(status.value for status in _ACTIVE)) for job_id in job_ids],
+            )
+
+    def purge(self, finished_before: float, stale_before: float = 0.0) -> int:
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, stage = NULL, error = ?, updated_at = ? WHERE status IN (?, ?) AND updated_at < ?",
+                (JobStatus.FAILED.value, _ABANDONED, time.time(), *(status.value for status in _ACTIVE), stale_before),
+            )
+            cursor = self._connection.execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?) AND updated_at < ?",
+                (*(status.value for status in _ACTIVE), finished_before),
+            )
+        return cursor.rowcount
+
+
+JOB_STORES: Dict[str, Type[Any]] = {
+    "memory": MemoryJobStore,
+    "sqlite": SqliteJobStore,
+}
+
+
+def get_job_store_class(name: str) -> Type[Any]:
+    try:
+        return JOB_STORES[name]
+    except KeyError:
+        raise ValueError(f"Unsupported job store: {name}. Expected one of {sorted(JOB_STORES)}")
+
+
+_job_store: Any = None
+_job_store_lock = threading.Lock()
+
+
+def get_job_store() -> Any:
+    """
+    The JOB_STORE instance, created on first call.
+    """
+    global _job_store
+    if _job_store is None:
+        with _job_store_lock:
+            if _job_store is None:
+                _job_store = get_job_store_class(JOB_STORE)()
+    return _job_store
+
+
+# ---- runner ----
+
+class _JobTrace(Trace):
+    """
+    A job's trace: saves the job as each pipeline stage starts and finishes,
+    so a status call shows where it is.
+    """
+
+    def __init__(self, job: Job, store: Any) -> None:
+        super().__init__()
+        self._job = job
+        self._store = store
+
+    @contextlib.contextmanager
+    def _progress(self, name: str) -> Iterator[None]:
+        self._job.stage = name
+        self._job.updated_at = time.time()
+        self._store.save(self._job)
+        with self._measure(name):
+            yield
+        self._job.completed_stages.append(name)
+
+    def stage(self, name: str) -> contextlib.AbstractContextManager:
+        return self._progress(name)
+
+    def log(self, target: Any = logger) -> None:
+        # stage timings are always measured for progress, but only logged like any other request's
+        if TRACING_ENABLED or TRACE_TIMINGS_IN_RESPONSE:
+            super().log(target)
+
+
+def job_status_body(job: Job) -> Dict[str, Any]:
+    """
+    What a status call returns: progress while the job runs, then the
+    response body it produced (its `clusters`) or the error that ended it.
+    """
+    body: Dict[str, Any] = {
+        "jobId": job.job_id,
+        "status": job.status.value,
+        "stage": job.stage,
+        "completedStages": job.completed_stages,
+    }
+    if job.status == JobStatus.SUCCEEDED and job.result is not None:
+        body.update(job.result)
+    elif job.status == JobStatus.FAILED:
+        body["error"] = job.error
+    return body
+
+
+class JobManager:
+    """
+    Runs analyses in the background: `submit` validates a payload and
+    returns its job at once, a pool of `workers` threads runs the pipeline,
+    and each job's progress is saved to `store` after every stage.
+
+    A payload identical to one still queued or running attaches to that
+    job instead of being run again. At most `max_active` jobs are admitted
+    at once; finished jobs are purged from the store `retention_seconds`
+    after they finish.
+
+    The jobs a manager owns are refreshed every `heartbeat_seconds`. An
+    active job not refreshed for `stale_seconds`, left by a process that
+    died, is neither attached to nor counted, and is failed at the next
+    purge.
+    """
+
+    def __init__(
+        self,
+        store: Any = None,
+        workers: int = JOB_WORKERS,
+        max_active: int = JOB_MAX_ACTIVE,
+        retention_seconds: float = JOB_RETENTION_SECONDS,
+        heartbeat_seconds: float = JOB_HEARTBEAT_SECONDS,
+        stale_seconds: float = JOB_STALE_SECONDS,
+    ) -> None:
+        self.store = store if store is not None else get_job_store()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._max_active = max_active
+        self._retention_seconds = retention_seconds
+        self._stale_seconds = stale_seconds
+        self._active = 0
+        self._owned: Set[str] = set()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._heartbeat = threading.Thread(target=self._beat, args=(heartbeat_seconds,), name="job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def submit(self, event: Dict[str, Any]) -> Job:
+        """
+        Validate a payload and queue its analysis, or return the in-flight job
+        for an identical payload. Raises BadRequestError for an invalid
+        payload and JobQueueFullError when too many jobs are active.
+        """
+        payload = validate_submission(event)
+        fingerprint = payload_fingerprint(payload)
+
+        now = time.time()
+        self.store.purge(now - self._retention_seconds, now - self._stale_seconds)
+        job = Job(job_id=uuid.uuid4().hex, fingerprint=fingerprint, created_at=now, updated_at=now)
+        admitted = self.store.admit(job, now - self._stale_seconds, self._max_active)
+        if admitted.job_id != job.job_id:
+            logger.info(f"Attached submission to in-flight job {admitted.job_id}")
+            return admitted
+        with self._lock:
+            self._active += 1
+            self._owned.add(job.job_id)
+
+        queued = _copy(job)
+        self._executor.submit(self._run, job, payload)
+        logger.info(f"Queued job {job.job_id}")
+        return queued
+
+    def get(self, job_id: str) -> Job | None:
+        return self.store.get(job_id)
+
+    def close(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+        self._closed.set()
+
+    def _beat(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            with self._lock:
+                owned = list(self._owned)
+            if owned:
+                try:
+                    self.store.touch(owned, time.time())
+                except Exception:
+                    logger.exception("Could not refresh active jobs")
+
+    def _run(self, job: Job, payload: Dict[str, Any]) -> None:
+        job.status = JobStatus.RUNNING
+        try:
+            with profiled("job"):
+                response = run_analysis(payload, _JobTrace(job, self.store))
+            job.status = JobStatus.SUCCEEDED
+            job.result = json.loads(response["body"])
+        except BadRequestError as exc:
+            job.status = JobStatus.FAILED
+            job.error = str(exc)
+        except Exception:
+            logger.exception(f"Unhandled error while running job {job.job_id}")
+            job.status = JobStatus.FAILED
+            job.error = "Internal server error"
+        finally:
+            job.stage = None
+            job.updated_at = time.time()
+            self.store.save(job)
+            with self._lock:
+                self._active -= 1
+                self._owned.discard(job.job_id)
+        logger.info(f"Job {job.job_id} {job.status.value} after {job.updated_at - job.created_at:.2f}s")
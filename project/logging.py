@@ -5,6 +5,25 @@ import json
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record. Structured fields passed as
+    `extra={"fields": {...}}` are added alongside the standard keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "timestamp": self.formatTime(record),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
 def setup_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
 
@@ -14,17 +33,7 @@ def setup_logger(name: str) -> logging.Logger:
     logger.setLevel(LOG_LEVEL)
 
     handler = logging.StreamHandler()
-
-    formatter = logging.Formatter(
-        json.dumps({
-            "level": "%(levelname)s",
-            "logger": "%(name)s",
-            "message": "%(message)s",
-            "timestamp": "%(asctime)s"
-        })
-    )
-
-    handler.setFormatter(formatter)
+    handler.setFormatter(JsonFormatter())
     logger.addHandler(handler)
 
     return logger
@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, List
+import numpy as np # type: ignore
+
+from project.models import MicroBatchStats
+
+EncodeFn = Callable[[List[str]], np.ndarray] # type: ignore
+
+
+class EncodeDeadlineExceeded(TimeoutError):
+    """Raised when an encode job's deadline passes before its vectors are ready."""
+    pass
+
+
+@dataclass
+class _EncodeJob:
+    texts: List[str]
+    deadline: float
+    future: Future
+
+
+class MicroBatcher:
+    """
+    Coalesces encode calls from concurrent requests into shared model batches.
+
+    Callers block in `encode` while a single background thread collects jobs:
+    a batch closes `window_seconds` after its first job arrives, once it holds
+    `max_texts` texts, or early enough before the earliest deadline among its
+    jobs to encode it, whichever comes first. The lead left before a deadline
+    is the recent encode time plus `margin_seconds`. Texts repeated across
+    jobs are encoded once, and each caller gets back exactly the rows for its
+    own texts, in order.
+
+    Deadlines are `time.monotonic()` values. A job still queued when its
+    deadline passes is dropped from the batch; its caller gets
+    EncodeDeadlineExceeded rather than waiting for work it cannot use.
+    """
+
+    def __init__(self, encode_fn: EncodeFn, window_seconds: float, max_texts: int, margin_seconds: float = 0.01) -> None:
+        self._encode_fn = encode_fn
+        self._window_seconds = window_seconds
+        self._max_texts = max_texts
+        self._margin_seconds = margin_seconds
+        # moving average of how long a batch takes to encode
+        self._encode_seconds = 0.0
+        self._queue: "queue.Queue[_EncodeJob | None]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = MicroBatchStats()
+        self._thread = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str], deadline: float) -> "Future[np.ndarray]": # type: ignore
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            job = _EncodeJob(texts=texts, deadline=deadline, future=Future())
+            self._queue.put(job)
+        return job.future
+
+    def encode(self, texts: List[str], deadline: float) -> np.ndarray: # type: ignore
+        """
+        Vectors for `texts`, batched with whatever other requests are encoding now.
+        """
+        future = self.submit(texts, deadline)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            future.cancel()
+            raise EncodeDeadlineExceeded(f"Encoding {len(texts)} texts missed its deadline")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    # ---- batcher thread ----
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+
+            jobs = [job]
+            text_count = len(job.texts)
+            closes_at = min(time.monotonic() + self._window_seconds, self._closes_before(job))
+            stopping = False
+
+            while text_count < self._max_texts:
+                remaining = closes_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    next_job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if next_job is None:
+                    stopping = True
+                    break
+                jobs.append(next_job)
+                text_count += len(next_job.texts)
+                closes_at = min(closes_at, self._closes_before(next_job))
+
+            self._run_batch(jobs)
+            if stopping:
+                return
+
+    def _closes_before(self, job: _EncodeJob) -> float:
+        return job.deadline - self._encode_seconds - self._margin_seconds
+
+    def _run_batch(self, jobs: List[_EncodeJob]) -> None:
+        now = time.monotonic()
+        live: List[_EncodeJob] = []
+        for job in jobs:
+            # False means the caller already gave up and cancelled
+            if not job.future.set_running_or_notify_cancel():
+                self.stats.expired += 1
+            elif job.deadline <= now:
+                self.stats.expired += 1
+                job.future.set_exception(EncodeDeadlineExceeded("Deadline passed while queued for encoding"))
+            else:
+                live.append(job)
+
+        if not live:
+            return
+
+        unique = dict.fromkeys(text for job in live for text in job.texts)
+        try:
+            vectors = np.asarray(self._encode_fn(list(unique)), dtype=np.float32) # type: ignore
+        except Exception as exc:
+            for job in live:
+                job.future.set_exception(exc)
+            return
+        elapsed = time.monotonic() - now
+        self._encode_seconds = elapsed if not self.stats.batches else 0.8 * self._encode_seconds + 0.2 * elapsed
+
+        rows = {text: i for i, text in enumerate(unique)}
+        for job in live:
+            job.future.set_result(vectors[[rows[text] for text in job.texts]]) # type: ignore
+
+        self.stats.batches += 1
+        self.stats.jobs += len(live)
+        self.stats.texts += len(unique)
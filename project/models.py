@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
 from enum import Enum
 import numpy as np # type: ignore
 
@@ -21,6 +21,11 @@ class ProcessedSentence:
     original_texts: List[str]
     # not sure if we need to keep original as well
     normalized_text: str
+    # ids split by input set, so comparative clusters can be split back out
+    baseline_ids: List[str] = field(default_factory=list)
+    comparison_ids: List[str] = field(default_factory=list)
+    # lexicon score of original_texts[0], filled in by preprocess_sentences
+    sentiment_score: float | None = None
 
 
 @dataclass
@@ -69,3 +74,305 @@ class ClusterSummary:
     sentiment: str
     sentence_ids: list[str]
     key_insights: list[str]
+    # ids of noise sentences close enough to the cluster to report with it, not members
+    recovered_sentence_ids: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ComparativeClusterSummary:
+    title: str
+    sentiment: str
+    baseline_sentence_ids: list[str]
+    comparison_sentence_ids: list[str]
+    key_similarities: list[str]
+    key_differences: list[str]
+    recovered_baseline_sentence_ids: list[str] = field(default_factory=list)
+    recovered_comparison_sentence_ids: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class ModelLoadStats:
+    model_name: str
+    import_seconds: float
+    load_seconds: float
+
+
+@dataclass
+class EmbeddingCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+
+# Values of SentenceBatch.entry_sources
+BASELINE_SOURCE = 0
+COMPARISON_SOURCE = 1
+
+
+@dataclass
+class QuantizedVectors:
+    """
+    Int8 form of an L2-normalized float32 matrix, a quarter of its size:
+    row i is approximately `codes[i] * scales[i]`. Indexing rows keeps the
+    form; `np.asarray` gives the float32 matrix back.
+    """
+    codes: np.ndarray # type: ignore
+    scales: np.ndarray # type: ignore
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.codes.shape # type: ignore
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + self.scales.nbytes) # type: ignore
+
+    def __len__(self) -> int:
+        return self.codes.shape[0] # type: ignore
+
+    def __getitem__(self, rows: Any) -> "QuantizedVectors":
+        return QuantizedVectors(self.codes[rows], self.scales[rows]) # type: ignore
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray: # type: ignore
+        vectors = self.codes.astype(np.float32) * self.scales[:, None] # type: ignore
+        return vectors if dtype is None else vectors.astype(dtype, copy=False) # type: ignore
+
+
+@dataclass
+class SentenceBatch:
+    """
+    Columnar form of a request's deduplicated sentences.
+
+    Row i is the i-th unique normalized text. Its input ids are
+    `entry_ids[entry_offsets[i]:entry_offsets[i + 1]]`, indices into the
+    interned `id_table`, with `entry_sources` marking each entry as
+    BASELINE_SOURCE or COMPARISON_SOURCE. `vectors` is one contiguous float32
+    matrix with a row per sentence, `labels` the cluster label per row (-1
+    for noise) and `sentiment_scores` the lexicon score per row, filled in by
+    the embedding, clustering and sentiment stages. `recovered_labels` is
+    the cluster each noise row was recovered into (-1 for the rest and for
+    members), when noise recovery ran. `compact_vectors`, when set, is the
+    smaller copy of `vectors` clustering runs on (see project.compression).
+    """
+    normalized_texts: List[str]
+    first_texts: List[str]
+    id_table: List[str]
+    entry_ids: np.ndarray # type: ignore
+    entry_sources: np.ndarray # type: ignore
+    entry_offsets: np.ndarray # type: ignore
+    vectors: np.ndarray | None = None # type: ignore
+    labels: np.ndarray | None = None # type: ignore
+    sentiment_scores: np.ndarray | None = None # type: ignore
+    recovered_labels: np.ndarray | None = None # type: ignore
+    compact_vectors: np.ndarray | QuantizedVectors | None = None # type: ignore
+
+    def __len__(self) -> int:
+        return len(self.normalized_texts)
+
+    def ids_for(self, rows: np.ndarray, source: int | None = None) -> List[str]: # type: ignore
+        """
+        Sorted unique input ids of the given rows, optionally from one source only.
+        """
+        rows = np.asarray(rows, dtype=np.int64) # type: ignore
+        starts = self.entry_offsets[rows] # type: ignore
+        lengths = self.entry_offsets[rows + 1] - starts # type: ignore
+
+        # every entry index in [start, stop) of each row, without a Python loop
+        entries = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths) # type: ignore
+        if source is not None:
+            entries = entries[self.entry_sources[entries] == source] # type: ignore
+
+        return sorted(self.id_table[i] for i in np.unique(self.entry_ids[entries])) # type: ignore
+
+
+@dataclass
+class IngestedRequest:
+    """
+    A validated request, loaded straight into a SentenceBatch.
+    `sentence_count` counts input sentences before deduplication.
+    `result_uri` is set when the input came from object references: the
+    result is written there and the response only points to it.
+    """
+    mode: AnalysisMode
+    survey_title: str
+    theme: str
+    batch: SentenceBatch
+    sentence_count: int
+    result_uri: str | None = None
+
+
+@dataclass
+class MicroBatchStats:
+    batches: int = 0
+    jobs: int = 0
+    texts: int = 0
+    expired: int = 0
+
+
+@dataclass(frozen=True)
+class StageTiming:
+    stage: str
+    wall_ms: float
+    cpu_ms: float
+    # growth of the process's peak resident set during the stage
+    peak_rss_delta_kb: int
+
+
+@dataclass(frozen=True)
+class SummaryRequest:
+    """
+    What a summary provider sees of one cluster: its most representative
+    sentences per input set, most central first, plus context.
+    """
+    mode: AnalysisMode
+    survey_title: str
+    theme: str
+    sentiment: str
+    baseline_texts: List[str]
+    comparison_texts: List[str]
+    baseline_count: int
+    comparison_count: int
+
+
+@dataclass
+class GeneratedSummary:
+    title: str
+    key_insights: List[str] = field(default_factory=list)
+    key_similarities: List[str] = field(default_factory=list)
+    key_differences: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SummaryRunStats:
+    clusters: int = 0
+    cache_hits: int = 0
+    generated: int = 0
+    failed: int = 0
+    timed_out: int = 0
+
+
+@dataclass
+class NearDuplicateStats:
+    rows: int = 0
+    collapsed: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class DensityHierarchy:
+    """
+    Mutual-reachability structure of a set of L2-normalized vectors, built
+    once and then cut at any threshold.
+
+    `core_distances` is each point's cosine distance to its
+    (min_samples - 1)-th nearest other point, `neighbours` and
+    `neighbour_distances` its nearest points, closest first. The edges are
+    the minimum spanning forest of the mutual reachability graph over those
+    neighbours, sorted by distance: every single-linkage merge, in order.
+    """
+    min_samples: int
+    core_distances: np.ndarray # type: ignore
+    neighbours: np.ndarray # type: ignore
+    neighbour_distances: np.ndarray # type: ignore
+    edge_sources: np.ndarray # type: ignore
+    edge_targets: np.ndarray # type: ignore
+    edge_distances: np.ndarray # type: ignore
+
+    def __len__(self) -> int:
+        return int(self.core_distances.shape[0]) # type: ignore
+
+
+@dataclass
+class NoiseRecoveryStats:
+    noise: int = 0
+    recovered: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class CompressionStats:
+    rows: int = 0
+    dim: int = 0
+    full_bytes: int = 0
+    compact_bytes: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class ShardMergeStats:
+    shards: int = 0
+    local_clusters: int = 0
+    clusters: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class ResponseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    # waited for an identical request already being computed
+    coalesced: int = 0
+    # could not be fingerprinted, e.g. object references
+    bypassed: int = 0
+
+
+@dataclass
+class AnalysisState:
+    """
+    What an incremental analysis keeps between runs of the same survey title,
+    theme and mode: the deduplicated sentences with their embeddings,
+    sentiment scores and cluster labels (-1 for noise), and each cluster's
+    summary by label. `row_signatures` fingerprint each row's first text and
+    input ids, so a re-run can tell which rows changed. `settings` are the
+    other pipeline settings the state was made with.
+    """
+    model_id: str
+    mode: AnalysisMode
+    eps: float
+    min_samples: int
+    normalized_texts: List[str]
+    first_texts: List[str]
+    row_signatures: List[str]
+    vectors: np.ndarray # type: ignore
+    labels: np.ndarray # type: ignore
+    sentiment_scores: np.ndarray # type: ignore
+    summaries: Dict[int, ClusterSummary | ComparativeClusterSummary] = field(default_factory=dict)
+    settings: List[Any] = field(default_factory=list)
+
+
+@dataclass
+class IncrementalStats:
+    rows: int = 0
+    reused_rows: int = 0
+    embedded_rows: int = 0
+    removed_rows: int = 0
+    clusters: int = 0
+    reused_clusters: int = 0
+    full_rebuild: bool = True
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """
+    One asynchronous analysis. `stage` is the pipeline stage running now and
+    `completed_stages` those already finished; `result` is the response body
+    once the job has succeeded, `error` its message once it has failed.
+    `fingerprint` identifies the payload, so identical submissions can share
+    a job while it is in flight.
+    """
+    job_id: str
+    fingerprint: str
+    status: JobStatus = JobStatus.QUEUED
+    stage: str | None = None
+    completed_stages: List[str] = field(default_factory=list)
+    created_at: float = 0.0
+    updated_at: float = 0.0
+    result: Dict[str, Any] | None = None
+    error: str | None = None
@@ -0,0 +1,166 @@
+import os
+import time
+from dataclasses import asdict
+from typing import Dict, FrozenSet, List, Tuple
+import numpy as np # type: ignore
+
+from project.logging import setup_logger
+from project.models import NearDuplicateStats, SentenceBatch
+from project.preprocessing import dedup_key
+
+logger = setup_logger(__name__)
+
+# Set to "false" to encode every exact-deduplicated row, however close to another
+NEAR_DUPLICATE_COLLAPSE = os.getenv("NEAR_DUPLICATE_COLLAPSE", "true").lower() == "true"
+
+# Jaccard similarity of character trigram sets at which a row folds into an earlier one;
+# a one-letter typo in a 30-character sentence scores about 0.8
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+
+_SHINGLE = 3
+# 8 bands of 4 hashes: pairs at 0.8 become candidates 98% of the time, pairs at 0.5 about 40%
+_BANDS = 8
+_ROWS_PER_BAND = 4
+_PERMUTATIONS = _BANDS * _ROWS_PER_BAND
+# Rows hashed at a time, bounding the per-trigram scratch arrays
+_CHUNK_ROWS = 8192
+
+# Multiply-shift hash family over 24-bit trigram codes, fixed so runs are reproducible
+_rng = np.random.default_rng(0x5EED) # type: ignore
+_MULTIPLIERS = _rng.integers(1, 2 ** 63, size=_PERMUTATIONS, dtype=np.uint64) | np.uint64(1) # type: ignore
+_OFFSETS = _rng.integers(0, 2 ** 63, size=_PERMUTATIONS, dtype=np.uint64) # type: ignore
+_BAND_MIX = _rng.integers(1, 2 ** 63, size=_ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1) # type: ignore
+
+
+def _shingles(key: str) -> FrozenSet[int]:
+    # hashes of the character trigrams (the signatures hash byte trigrams, the same thing for
+    # ASCII text); ints keep the sets out of the garbage collector's way
+    return frozenset(map(hash, zip(key, key[1:], key[2:])))
+
+
+def minhash_signatures(keys: List[str]) -> Tuple[np.ndarray, np.ndarray]: # type: ignore
+    """
+    MinHash signature of each key's set of UTF-8 byte trigrams, one uint32
+    row of _PERMUTATIONS hashes per key, and a mask of the keys long enough
+    to have a trigram (the others' rows are meaningless).
+    """
+    n = len(keys)
+    signatures = np.zeros((n, _PERMUTATIONS), dtype=np.uint32) # type: ignore
+    hashed = np.zeros(n, dtype=bool) # type: ignore
+
+    for start in range(0, n, _CHUNK_ROWS):
+        encoded = [key.encode("utf-8") for key in keys[start:start + _CHUNK_ROWS]]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)) # type: ignore
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64) # type: ignore
+        if data.size < _SHINGLE:
+            continue
+
+        # a 24-bit code per trigram of the concatenated bytes, kept where it lies inside one key
+        codes = (data[:-2] << np.uint64(16)) | (data[1:-1] << np.uint64(8)) | data[2:] # type: ignore
+        owner = np.repeat(np.arange(len(encoded)), lengths)[:codes.size] # type: ignore
+        offset = np.arange(codes.size) - (np.cumsum(lengths) - lengths)[owner] # type: ignore
+        inside = offset + _SHINGLE <= lengths[owner] # type: ignore
+        codes, owner = codes[inside], owner[inside]
+        if not codes.size:
+            continue
+
+        # trigrams are grouped by key already, so each key's minimum is one reduceat segment
+        rows, first = np.unique(owner, return_index=True) # type: ignore
+        for k in range(_PERMUTATIONS):
+            hashes = (codes * _MULTIPLIERS[k] + _OFFSETS[k]) >> np.uint64(32) # type: ignore
+            signatures[start + rows, k] = np.minimum.reduceat(hashes, first) # type: ignore
+        hashed[start + rows] = True
+
+    return signatures, hashed
+
+
+def near_duplicate_representatives(keys: List[str], threshold: float = NEAR_DUPLICATE_THRESHOLD) -> np.ndarray: # type: ignore
+    """
+    For each key, the index of the earlier key it is a near duplicate of,
+    or its own index.
+
+    Candidates come from MinHash LSH: keys that agree on every hash of at
+    least one band. Each candidate is checked against the exact trigram
+    Jaccard similarity before it folds into the earliest key of its band,
+    and only ever into a key that is itself a representative, so every
+    merged key is within `threshold` of its representative directly.
+    """
+    n = len(keys)
+    representative = np.arange(n) # type: ignore
+    signatures, hashed = minhash_signatures(keys)
+    candidates = np.flatnonzero(hashed) # type: ignore
+    if candidates.size < 2:
+        return representative
+
+    has_members = np.zeros(n, dtype=bool) # type: ignore
+    shingles: Dict[int, FrozenSet[int]] = {}
+
+    def similar(a: int, b: int) -> bool:
+        if a not in shingles:
+            shingles[a] = _shingles(keys[a])
+        if b not in shingles:
+            shingles[b] = _shingles(keys[b])
+        first, second = shingles[a], shingles[b]
+        # the size ratio bounds the Jaccard similarity, so most mismatches stop here
+        if min(len(first), len(second)) < threshold * max(len(first), len(second)):
+            return False
+        shared = len(first & second)
+        return shared >= threshold * (len(first) + len(second) - shared)
+
+    for band in range(_BANDS):
+        columns = signatures[candidates, band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND].astype(np.uint64) # type: ignore
+        band_hash = (columns * _BAND_MIX).sum(axis=1) # type: ignore
+        order = np.argsort(band_hash, kind="stable") # type: ignore
+        sorted_hash = band_hash[order]
+        starts = np.flatnonzero(np.concatenate([[True], sorted_hash[1:] != sorted_hash[:-1]])) # type: ignore
+        ends = np.append(starts[1:], sorted_hash.size) # type: ignore
+        shared = ends - starts > 1
+        members = candidates[order].tolist()
+        for begin, end in zip(starts[shared].tolist(), ends[shared].tolist()):
+            target = representative[members[begin]]
+            for member in members[begin + 1:end]:
+                if representative[member] != member or has_members[member] or member == target:
+                    continue
+                if similar(member, target):
+                    representative[member] = target
+                    has_members[target] = True
+
+    return representative
+
+
+def collapse_near_duplicates(batch: SentenceBatch, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> SentenceBatch:
+    """
+    Fold rows whose texts are near duplicates (see `near_duplicate_representatives`)
+    into one row, before embedding, so the encoder sees each of them once.
+
+    The kept row is the earliest of each group, with its texts; the ids of
+    the folded rows move to it, so every input sentence still appears in
+    its cluster. Returns `batch` itself when nothing folds.
+    """
+    start = time.perf_counter()
+    n = len(batch)
+    representative = near_duplicate_representatives([dedup_key(text) for text in batch.normalized_texts], threshold)
+    kept = np.flatnonzero(representative == np.arange(n)) # type: ignore
+    stats = NearDuplicateStats(rows=n, collapsed=n - kept.size, seconds=round(time.perf_counter() - start, 4))
+    logger.info(f"Collapsed {stats.collapsed} near-duplicate rows of {n}", extra={"fields": asdict(stats)})
+    if kept.size == n:
+        return batch
+
+    new_row = np.full(n, -1, dtype=np.int64) # type: ignore
+    new_row[kept] = np.arange(kept.size)
+    entry_rows = new_row[representative][np.repeat(np.arange(n), np.diff(batch.entry_offsets))] # type: ignore
+
+    # an id can now reach the same row twice; keep its first entry, in row order then input order
+    entries = np.stack([entry_rows, batch.entry_ids, batch.entry_sources]) # type: ignore
+    _, first = np.unique(entries, axis=1, return_index=True) # type: ignore
+    first = first[np.lexsort((first, entry_rows[first]))] # type: ignore
+    counts = np.bincount(entry_rows[first], minlength=kept.size) # type: ignore
+
+    return SentenceBatch(
+        normalized_texts=[batch.normalized_texts[i] for i in kept.tolist()],
+        first_texts=[batch.first_texts[i] for i in kept.tolist()],
+        id_table=batch.id_table,
+        entry_ids=batch.entry_ids[first],
+        entry_sources=batch.entry_sources[first],
+        entry_offsets=np.concatenate([[0], np.cumsum(counts)]).astype(np.int64), # type: ignore
+    )
@@ -0,0 +1,87 @@
+import os
+import time
+from dataclasses import asdict
+from typing import List
+import numpy as np # type: ignore
+from scipy.sparse import csr_matrix # type: ignore
+
+from project.logging import setup_logger
+from project.models import NoiseRecoveryStats, SentenceBatch
+from project.similarity import similarity_blocks
+
+logger = setup_logger(__name__)
+
+# Set to "false" to leave rows the clustering engine called noise out of every cluster
+NOISE_RECOVERY = os.getenv("NOISE_RECOVERY", "true").lower() == "true"
+
+# Cosine similarity to a cluster's centroid a noise row needs to be reported with that cluster
+NOISE_RECOVERY_SIMILARITY = float(os.getenv("NOISE_RECOVERY_SIMILARITY", "0.5"))
+
+
+def cluster_centroids(vectors: np.ndarray, labels: np.ndarray) -> np.ndarray: # type: ignore
+    """
+    L2-normalized mean vector of each label 0..labels.max(), one row per
+    label, from a single sparse one-hot by dense product. Labels without
+    rows get a zero row.
+    """
+    clustered = np.flatnonzero(labels >= 0) # type: ignore
+    n_labels = int(labels.max(initial=-1)) + 1 # type: ignore
+    membership = csr_matrix( # type: ignore
+        (np.ones(clustered.size, dtype=np.float32), (labels[clustered], clustered)),
+        shape=(n_labels, labels.shape[0]), # type: ignore
+    )
+    centroids = np.asarray(membership @ vectors, dtype=np.float32) # type: ignore
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True) # type: ignore
+    return centroids / np.maximum(norms, np.float32(1e-12)) # type: ignore
+
+
+def recover_noise(batch: SentenceBatch, threshold: float = NOISE_RECOVERY_SIMILARITY) -> np.ndarray: # type: ignore
+    """
+    Set `batch.recovered_labels`: for each noise row, the cluster whose
+    centroid it is most similar to, if that similarity reaches `threshold`,
+    else -1 (as for every member row). Returns it.
+
+    Members keep their labels; recovered rows are reported separately
+    (see `recovered_rows`) and never change a centroid, so the result does
+    not depend on the order rows are visited in.
+    """
+    start = time.perf_counter()
+    labels = batch.labels
+    recovered = np.full(len(batch), -1, dtype=np.int64) # type: ignore
+    noise = np.flatnonzero(labels < 0) if labels is not None else np.empty(0, dtype=np.int64) # type: ignore
+
+    if noise.size and batch.vectors is not None and (labels >= 0).any(): # type: ignore
+        centroids = cluster_centroids(batch.vectors, labels)
+        for block, sims in similarity_blocks(batch.vectors[noise], centroids): # type: ignore
+            best = sims.argmax(axis=1) # type: ignore
+            close = sims[np.arange(best.size), best] >= threshold # type: ignore
+            recovered[noise[block][close]] = best[close] # type: ignore
+
+    batch.recovered_labels = recovered
+    stats = NoiseRecoveryStats(
+        noise=int(noise.size),
+        recovered=int((recovered >= 0).sum()), # type: ignore
+        seconds=round(time.perf_counter() - start, 4),
+    )
+    logger.info(f"Recovered {stats.recovered} of {stats.noise} noise rows", extra={"fields": asdict(stats)})
+    return recovered # type: ignore
+
+
+def recovered_rows(batch: SentenceBatch, clusters: List[np.ndarray]) -> List[np.ndarray]: # type: ignore
+    """
+    Row indices recovered into each of `clusters` (as returned by
+    `cluster_batch`), in row order; empty when recovery did not run.
+    """
+    if batch.recovered_labels is None or batch.labels is None:
+        return [np.empty(0, dtype=np.int64) for _ in clusters] # type: ignore
+
+    rows = np.flatnonzero(batch.recovered_labels >= 0) # type: ignore
+    # stable sort keeps rows in order within each label
+    rows = rows[np.argsort(batch.recovered_labels[rows], kind="stable")] # type: ignore
+    sorted_labels = batch.recovered_labels[rows] # type: ignore
+    result = []
+    for members in clusters:
+        label = batch.labels[members[0]] # type: ignore
+        start, stop = np.searchsorted(sorted_labels, [label, label + 1]) # type: ignore
+        result.append(rows[start:stop])
+    return result
@@ -0,0 +1,237 @@
+import codecs
+import contextlib
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Iterator
+from urllib.parse import urlsplit
+
+from project.blob_store import BlobNotFoundError, get_blob_store, split_uri
+from project.models import AnalysisMode, BASELINE_SOURCE, COMPARISON_SOURCE, IngestedRequest
+from project.preprocessing import SentenceBatchBuilder
+from project.validation import BadRequestError, validate_object_uri, validate_reference_payload, validate_sentence_item
+
+# Sentences per referenced field; inline requests stay capped at MAX_SENTENCES
+OFFLOAD_MAX_SENTENCES = int(os.getenv("OFFLOAD_MAX_SENTENCES", "200000"))
+
+# Rows encoded per chunk, so only this many vectors are on the heap at once
+OFFLOAD_CHUNK_SENTENCES = int(os.getenv("OFFLOAD_CHUNK_SENTENCES", "2048"))
+
+# Where chunked vectors are spooled; /tmp is the only writable path on Lambda
+OFFLOAD_SCRATCH_DIR = os.getenv("OFFLOAD_SCRATCH_DIR", "/tmp")
+
+# The bounded-memory engine; "dbscan" would build the full neighbour lists at once
+OFFLOAD_CLUSTERING_ENGINE = os.getenv("OFFLOAD_CLUSTERING_ENGINE", "blocked")
+
+# Results without an explicit resultUri go under this prefix in the baseline object's bucket
+OFFLOAD_RESULT_PREFIX = os.getenv("OFFLOAD_RESULT_PREFIX", "results")
+
+# Comma-separated URI prefixes (e.g. "s3://survey-inputs/,s3://survey-results/") that references
+# may read from and write to; objects anywhere else are refused, so with none set no reference is accepted
+OFFLOAD_ALLOWED_PREFIXES = [p.strip() for p in os.getenv("OFFLOAD_ALLOWED_PREFIXES", "").split(",") if p.strip()]
+
+# Bytes read at a time from a referenced object, and characters per write of a result
+_READ_SIZE = 64 * 1024
+
+# Longest JSON text of one item or line a referenced object may hold; a valid one is far shorter
+_MAX_ITEM_CHARS = 64 * 1024
+
+_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+_URI_FIELDS = {"baselineUri": ("baseline", BASELINE_SOURCE), "comparisonUri": ("comparison", COMPARISON_SOURCE)}
+
+
+def is_reference_payload(payload: Any) -> bool:
+    """
+    Whether the payload points at stored sentences instead of inlining them.
+    """
+    return isinstance(payload, dict) and "baselineUri" in payload and "baseline" not in payload
+
+
+def _iter_lines(text: Any, uri: str) -> Iterator[Any]:
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise BadRequestError(f"Invalid JSON on line {number} of {uri}: {exc}")
+
+
+def _iter_array(text: Any, uri: str) -> Iterator[Any]:
+    """
+    Items of a top-level JSON array, decoded one at a time from a window
+    of the text that only ever holds the current item plus one read.
+    """
+    buffer, pos = "", 0
+
+    def read_more() -> bool:
+        nonlocal buffer, pos
+        chunk = text.read(_READ_SIZE)
+        if not chunk:
+            return False
+        buffer, pos = buffer[pos:] + chunk, 0
+        return True
+
+    def peek() -> str:
+        # next non-whitespace character, or "" at the end of the object
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE_RE.match(buffer, pos).end() # type: ignore
+            if pos < len(buffer):
+                return buffer[pos]
+            if not read_more():
+                return ""
+
+    if peek() != "[":
+        raise BadRequestError(f"Expected a JSON array of sentences in {uri}")
+    pos += 1
+
+    index = 0
+    while peek() != "]":
+        while True:
+            try:
+                item, pos = _decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError as exc:
+                if len(buffer) - pos > _MAX_ITEM_CHARS:
+                    raise BadRequestError(f"Item {index} of {uri} is not valid JSON within {_MAX_ITEM_CHARS} characters")
+                if not read_more():
+                    raise BadRequestError(f"Invalid JSON at item {index} of {uri}: {exc}")
+        yield item
+        index += 1
+
+        separator = peek()
+        if separator == ",":
+            pos += 1
+        elif separator != "]":
+            raise BadRequestError(f"Invalid JSON after item {index - 1} of {uri}: expected ',' or ']'")
+
+    pos += 1
+    if peek():
+        raise BadRequestError(f"Unexpected data after the sentence array in {uri}")
+
+
+class _TextReader:
+    """
+    Incremental UTF-8 text over any binary stream with `read(n)`, such as an
+    S3 response body. Lines longer than _MAX_ITEM_CHARS are refused.
+    """
+
+    def __init__(self, stream: Any, uri: str):
+        self._stream = stream
+        self._uri = uri
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def read(self, size: int) -> str:
+        while True:
+            data = self._stream.read(size)
+            text = self._decoder.decode(data, final=not data)
+            # a read can end inside a multi-byte character and decode to nothing
+            if text or not data:
+                return text
+
+    def __iter__(self) -> Iterator[str]:
+        pending = ""
+        while True:
+            chunk = self.read(_READ_SIZE)
+            if not chunk:
+                break
+            lines = (pending + chunk).split("\n")
+            pending = lines.pop()
+            if len(pending) > _MAX_ITEM_CHARS:
+                raise BadRequestError(f"Line longer than {_MAX_ITEM_CHARS} characters in {self._uri}")
+            yield from (line + "\n" for line in lines)
+        if pending:
+            yield pending
+
+
+def iter_sentence_items(stream: Any, uri: str) -> Iterator[Any]:
+    """
+    Sentence items of a stored object, streamed: one JSON value per line for
+    `.jsonl`/`.ndjson` keys, otherwise a JSON array.
+    """
+    text = _TextReader(stream, uri)
+    if urlsplit(uri).path.endswith((".jsonl", ".ndjson")):
+        return _iter_lines(text, uri)
+    return _iter_array(text, uri)
+
+
+def default_result_uri(payload: Dict[str, Any]) -> str:
+    """
+    Where the result of a referenced analysis goes when the payload names no
+    `resultUri`: a key derived from the request, in the baseline's bucket.
+    """
+    bucket, _ = split_uri(payload["baselineUri"])
+    scheme = urlsplit(payload["baselineUri"]).scheme
+    identity = [payload["surveyTitle"], payload["theme"], payload["baselineUri"], payload.get("comparisonUri")]
+    digest = hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()[:32]
+    return f"{scheme}://{bucket}/{OFFLOAD_RESULT_PREFIX}/{digest}.json"
+
+
+def ingest_reference(payload: Dict[str, Any], store: Any = None) -> IngestedRequest:
+    """
+    Load a payload whose sentences live in stored objects into a SentenceBatch.
+
+    Each object is streamed and every item validated and added to the batch
+    as it is decoded, so memory grows with the deduplicated rows only, not
+    with the size of the objects.
+    """
+    validate_reference_payload(payload, OFFLOAD_ALLOWED_PREFIXES)
+    store = store if store is not None else get_blob_store()
+    result_uri = payload.get("resultUri") or default_result_uri(payload)
+    validate_object_uri(result_uri, "resultUri", OFFLOAD_ALLOWED_PREFIXES)
+
+    builder = SentenceBatchBuilder()
+    counts: Dict[str, int] = {}
+    for uri_field, (field_name, source) in _URI_FIELDS.items():
+        if uri_field not in payload:
+            continue
+        uri = payload[uri_field]
+        try:
+            stream = store.open_read(uri)
+        except BlobNotFoundError as exc:
+            raise BadRequestError(str(exc))
+
+        count = 0
+        with contextlib.closing(stream):
+            for index, item in enumerate(iter_sentence_items(stream, uri)):
+                if index >= OFFLOAD_MAX_SENTENCES:
+                    raise BadRequestError(f"{field_name} exceeds maximum allowed size of {OFFLOAD_MAX_SENTENCES}")
+                if not isinstance(item, dict):
+                    raise BadRequestError(f"{field_name}[{index}] must contain 'id' and 'sentence'")
+                validate_sentence_item(item, field_name, index)
+                builder.add(item["id"], item["sentence"], source)
+                count += 1
+
+        if not count:
+            raise BadRequestError(f"{field_name} must be a non-empty list")
+        counts[field_name] = count
+
+    return IngestedRequest(
+        mode=AnalysisMode.COMPARATIVE if counts.get("comparison") else AnalysisMode.STANDALONE,
+        survey_title=payload["surveyTitle"],
+        theme=payload["theme"],
+        batch=builder.build(),
+        sentence_count=sum(counts.values()),
+        result_uri=result_uri,
+    )
+
+
+def write_result(uri: str, body: Dict[str, Any], store: Any = None) -> None:
+    """
+    Stream a response body to `uri` as JSON, without building the whole string.
+    """
+    store = store if store is not None else get_blob_store()
+    with store.open_write(uri) as fh:
+        pending: list[str] = []
+        size = 0
+        for piece in json.JSONEncoder().iterencode(body):
+            pending.append(piece)
+            size += len(piece)
+            if size >= _READ_SIZE:
+                fh.write("".join(pending).encode("utf-8"))
+                pending, size = [], 0
+        fh.write("".join(pending).encode("utf-8"))
@@ -1,17 +1,51 @@
-import re
-from typing import List
-from project.models import Sentence, ProcessedSentence
-
-_WHITESPACE_RE = re.compile(r"\s+")
+import sys
+import unicodedata
+from array import array
+from typing import Dict, List
+import numpy as np # type: ignore
+from project.models import (
+    AnalysisMode, BASELINE_SOURCE, COMPARISON_SOURCE, Sentence, SentenceBatch, ProcessedSentence,
+)
+from project.sentiment import score_sentiment
 
 
 def normalize_text(text: str) -> str:
     """
     Normalize sentence text for clustering.
     """
-    text = text.strip().lower()
-    text = _WHITESPACE_RE.sub(" ", text)
-    return text
+    # NFKC folds full-width forms, ligatures and the like; plain ASCII is already in normal form
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text)
+    # str.split() splits on the same Unicode whitespace as \s, without the regex overhead
+    return " ".join(text.lower().split())
+
+
+class _SymbolTable(dict):
+    """
+    str.translate table that turns punctuation and symbols (emoji included)
+    into spaces and drops apostrophes, filled in per code point on first sight.
+    """
+
+    def __missing__(self, codepoint: int) -> int | None:
+        category = unicodedata.category(chr(codepoint))
+        # emoji sequences also carry joiners, variation selectors and keycap marks
+        strip = category[0] in "PS" or codepoint in _EMOJI_JOINERS
+        self[codepoint] = 32 if strip else codepoint
+        return self[codepoint]
+
+
+_EMOJI_JOINERS = {0x200D, 0x20E3, *range(0xFE00, 0xFE10), *range(0xE0020, 0xE0080)}
+_SYMBOLS = _SymbolTable({ord("'"): None, ord("\u2019"): None})
+
+
+def dedup_key(normalized: str) -> str:
+    """
+    What two normalized sentences must share to count as duplicates: the
+    text with punctuation, emoji and other symbols removed and case folded.
+    Text made only of symbols keys on itself, so it is not dropped.
+    """
+    key = " ".join(normalized.translate(_SYMBOLS).casefold().split())
+    return key or normalized
 
 # If we have the same sentence but with different ids, we keep them all
 # We do this so that we can trace back to original inputs after clustering,
@@ -23,26 +57,110 @@ def preprocess_sentences(sentences: List[Sentence],) -> List[ProcessedSentence]:
     Clean and normalize sentences for downstream processing.
 
     - Strips whitespace
-    - Lowercases
-    - Deduplicates by normalized text
+    - Lowercases and applies Unicode NFKC
+    - Deduplicates by `dedup_key` (ignoring punctuation and emoji), across
+      baseline and comparison; the first variant's normalized text is kept
     - Filters empty results
+    - Scores sentiment for every sentence in one pass
     """
-    grouped: dict[str, ProcessedSentence] = {}
+    # dedup key -> (normalized_text, ids, original_texts, baseline_ids, comparison_ids);
+    # ids are dicts used as ordered sets, so repeats are found without scanning
+    grouped: Dict[str, tuple[str, Dict[str, None], List[str], Dict[str, None], Dict[str, None]]] = {}
 
     for sentence in sentences:
         normalized = normalize_text(sentence.text)
         if not normalized:
             continue
 
-        if normalized not in grouped:
-            grouped[normalized] = ProcessedSentence(
-                normalized_text=normalized,
-                original_texts=[sentence.text],
-                ids=[sentence.id],
-            )
-        else:
-            if sentence.id not in grouped[normalized].ids:
-                grouped[normalized].ids.append(sentence.id)
-            grouped[normalized].original_texts.append(sentence.text)
-
-    return list(grouped.values())
+        key = dedup_key(normalized)
+        if key not in grouped:
+            grouped[key] = (normalized, {}, [], {}, {})
+
+        _, ids, original_texts, baseline_ids, comparison_ids = grouped[key]
+        ids[sentence.id] = None
+        original_texts.append(sentence.text)
+
+        # The loader tags comparison sentences as COMPARATIVE, baseline as STANDALONE
+        source_ids = comparison_ids if sentence.source == AnalysisMode.COMPARATIVE else baseline_ids
+        source_ids[sentence.id] = None
+
+    scores = score_sentiment([group[2][0] for group in grouped.values()]).tolist()
+    return [
+        ProcessedSentence(
+            normalized_text=normalized,
+            original_texts=original_texts,
+            ids=list(ids),
+            baseline_ids=list(baseline_ids),
+            comparison_ids=list(comparison_ids),
+            sentiment_score=score,
+        )
+        for (normalized, ids, original_texts, baseline_ids, comparison_ids), score in zip(grouped.values(), scores)
+    ]
+
+
+class SentenceBatchBuilder:
+    """
+    Builds a SentenceBatch one input sentence at a time, with the same
+    normalization and deduplication as `preprocess_sentences`.
+    """
+
+    def __init__(self) -> None:
+        self._rows: dict[str, int] = {}
+        self._normalized_texts: List[str] = []
+        self._first_texts: List[str] = []
+        self._id_index: dict[str, int] = {}
+        self._id_table: List[str] = []
+        self._seen_entries: set[tuple[int, int, int]] = set()
+        self._entry_rows = array("q")
+        self._entry_ids = array("q")
+        self._entry_sources = array("b")
+
+    def add(self, sentence_id: str, text: str, source: int = BASELINE_SOURCE) -> None:
+        normalized = normalize_text(text)
+        if not normalized:
+            return
+
+        key = dedup_key(normalized)
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = len(self._normalized_texts)
+            self._normalized_texts.append(normalized)
+            self._first_texts.append(text)
+
+        id_index = self._id_index.get(sentence_id)
+        if id_index is None:
+            id_index = self._id_index[sentence_id] = len(self._id_table)
+            self._id_table.append(sys.intern(sentence_id))
+
+        entry = (row, id_index, source)
+        if entry in self._seen_entries:
+            return
+        self._seen_entries.add(entry)
+        self._entry_rows.append(row)
+        self._entry_ids.append(id_index)
+        self._entry_sources.append(source)
+
+    def build(self) -> SentenceBatch:
+        entry_rows = np.asarray(self._entry_rows, dtype=np.int64) # type: ignore
+        order = np.argsort(entry_rows, kind="stable") # type: ignore
+        counts = np.bincount(entry_rows, minlength=len(self._normalized_texts)) # type: ignore
+
+        return SentenceBatch(
+            normalized_texts=self._normalized_texts,
+            first_texts=self._first_texts,
+            id_table=self._id_table,
+            entry_ids=np.asarray(self._entry_ids, dtype=np.int32)[order], # type: ignore
+            entry_sources=np.asarray(self._entry_sources, dtype=np.int8)[order], # type: ignore
+            entry_offsets=np.concatenate([[0], np.cumsum(counts)]).astype(np.int64), # type: ignore
+        )
+
+
+def build_sentence_batch(sentences: List[Sentence]) -> SentenceBatch:
+    """
+    Columnar equivalent of `preprocess_sentences`.
+    """
+    builder = SentenceBatchBuilder()
+    for sentence in sentences:
+        source = COMPARISON_SOURCE if sentence.source == AnalysisMode.COMPARATIVE else BASELINE_SOURCE
+        builder.add(sentence.id, sentence.text, source)
+    return builder.build()
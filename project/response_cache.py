@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Protocol, Tuple, Type
+
+from project import incremental, settings, sharding, summary_providers
+from project.ingestion import parse_json
+from project.logging import setup_logger
+from project.models import ResponseCacheStats
+from project.offload import is_reference_payload
+
+logger = setup_logger(__name__)
+
+# "memory" (per process), "file" (one file per response under RESPONSE_CACHE_DIR) or empty to disable
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "")
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", "/tmp/response-cache")
+
+# Responses older than this are recomputed; the cap bounds the bytes of response bodies kept
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "600"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Bump whenever a change to the pipeline changes what it returns for the same input
+RESPONSE_CACHE_VERSION = "1"
+
+# Computes the response for a payload, and whether it is complete enough to store
+Compute = Callable[[Dict[str, Any]], Tuple[Dict[str, Any], bool]]
+
+
+def _pipeline_settings() -> List[Any]:
+    # what the shared settings leave out but a whole response depends on: whether and how
+    # it was sharded, cut short by the summary deadline or built on a previous run
+    return [
+        *settings.pipeline_settings(),
+        sharding.SHARD_WORKERS,
+        sharding.SHARD_MIN_ROWS,
+        sharding.SHARD_MERGE_SIMILARITY,
+        sharding.SHARD_PARTITION_ITERATIONS,
+        summary_providers.SUMMARY_CONCURRENCY,
+        summary_providers.SUMMARY_TIMEOUT_MS,
+        summary_providers.SUMMARY_RETRIES,
+        summary_providers.SUMMARY_DEADLINE_MS,
+        incremental.INCREMENTAL_ANALYSIS,
+        incremental.INCREMENTAL_MAX_CHANGED_FRACTION,
+    ]
+
+
+def response_fingerprint(payload: Any) -> str | None:
+    """
+    Cache key of a payload: hash of its survey title, theme, baseline and
+    comparison items in sorted order, the pipeline settings and
+    RESPONSE_CACHE_VERSION.
+
+    None for payloads that must not be cached: references to stored objects,
+    whose contents can change under the same URI, and shapes validation will
+    reject anyway.
+    """
+    if not isinstance(payload, dict) or is_reference_payload(payload):
+        return None
+    try:
+        items = [
+            sorted((item["id"], item["sentence"]) for item in payload.get(field) or [])
+            for field in ("baseline", "comparison")
+        ]
+        identity = [RESPONSE_CACHE_VERSION, _pipeline_settings(), payload.get("surveyTitle"), payload.get("theme"), *items]
+        canonical = json.dumps(identity, separators=(",", ":"), ensure_ascii=False)
+    except (TypeError, KeyError):
+        return None
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ---- backends ----
+
+class ResponseCache(Protocol):
+    """
+    Anything that keeps response bodies by fingerprint for a limited time.
+    """
+
+    def get(self, key: str) -> str | None:
+        ...
+
+    def put(self, key: str, body: str) -> None:
+        ...
+
+
+class MemoryResponseCache:
+    """
+    In-process LRU of response bodies, bounded by their total length and by age.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, body = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self._bytes -= len(body)
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: str, body: str) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._entries[key] = (time.monotonic(), body)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+class FileResponseCache:
+    """
+    One JSON file per response in `directory`, so warm containers and
+    processes on the same host share them. Age is the file's mtime; past
+    `max_bytes` the oldest files go first.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path = RESPONSE_CACHE_DIR,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._bytes = sum(entry.stat().st_size for entry in self.directory.glob("*.json"))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def put(self, key: str, body: str) -> None:
+        data = body.encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        # write-then-rename so concurrent readers never see a partial file
+        path = self._path(key)
+        temporary = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary.write_bytes(data)
+        temporary.replace(path)
+
+        with self._lock:
+            self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # other processes write here too, so re-read the directory rather than trust the running total
+        files = []
+        for entry in self.directory.glob("*.json"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry))
+        files.sort()
+
+        self._bytes = sum(size for _, size, _ in files)
+        for _, size, entry in files:
+            if self._bytes <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            self._bytes -= size
+
+
+RESPONSE_CACHES: Dict[str, Type[Any]] = {
+    "memory": MemoryResponseCache,
+    "file": FileResponseCache,
+}
+
+
+def get_response_cache_class(name: str) -> Type[Any]:
+    try:
+        return RESPONSE_CACHES[name]
+    except KeyError:
+        raise ValueError(f"Unsupported response cache: {name}. Expected one of {sorted(RESPONSE_CACHES)}")
+
+
+_cache: Any = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Any:
+    """
+    The RESPONSE_CACHE backend, created on first call. None when disabled.
+    """
+    global _cache
+    if _cache is None and RESPONSE_CACHE:
+        with _cache_lock:
+            if _cache is None:
+                _cache = get_response_cache_class(RESPONSE_CACHE)()
+    return _cache
+
+
+# ---- lookups ----
+
+_stats = ResponseCacheStats()
+_in_flight: Dict[str, Future] = {}
+_in_flight_lock = threading.Lock()
+
+
+def get_stats() -> ResponseCacheStats:
+    return _stats
+
+
+_OUTCOME_FIELDS = {"hit": "hits", "miss": "misses", "coalesced": "coalesced", "bypassed": "bypassed"}
+
+
+def _record(outcome: str) -> None:
+    with _in_flight_lock:
+        field = _OUTCOME_FIELDS[outcome]
+        setattr(_stats, field, getattr(_stats, field) + 1)
+        fields: Dict[str, Any] = {"outcome": outcome, **asdict(_stats)}
+    lookups = fields["hits"] + fields["coalesced"] + fields["misses"]
+    fields["hit_rate"] = round((fields["hits"] + fields["coalesced"]) / lookups, 4) if lookups else 0.0
+    logger.info(f"Response cache {outcome}", extra={"fields": fields})
+
+
+def cached_response(event: Dict[str, Any], cache: Any, compute: Compute) -> Dict[str, Any]:
+    """
+    The response for `event` from `cache`, or from `compute` on a miss.
+
+    Concurrent misses for the same fingerprint are coalesced: one caller
+    computes and the others wait for its response (or its exception).
+    Only successful responses that `compute` reports complete are stored.
+    Events that cannot be fingerprinted go straight to `compute`.
+    """
+    payload = parse_json(event)
+    key = response_fingerprint(payload)
+    if key is None:
+        _record("bypassed")
+        return compute(event)[0]
+
+    body = cache.get(key)
+    if body is not None:
+        _record("hit")
+        return {"statusCode": 200, "body": body}
+
+    with _in_flight_lock:
+        flight = _in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _in_flight[key] = Future()
+    if not leader:
+        _record("coalesced")
+        return flight.result() # type: ignore
+
+    try:
+        # the previous leader may have stored it between our lookup and taking the lead
+        body = cache.get(key)
+        if body is not None:
+            response = {"statusCode": 200, "body": body}
+            _record("hit")
+        else:
+            _record("miss")
+            response, complete = compute(payload)
+            if complete and response.get("statusCode") == 200:
+                cache.put(key, response["body"])
+        flight.set_result(response) # type: ignore
+        return response
+    except BaseException as exc:
+        flight.set_exception(exc) # type: ignore
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
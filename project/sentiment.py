@@ -0,0 +1,200 @@
+from typing import Dict, List
+import numpy as np # type: ignore
+
+# ---- lexicon ----
+
+POSITIVE_WORDS = {
+    "good", "great", "nice", "friendly", "helpful", "easy", "fast", "quick", "comfortable", "clean",
+    "delicious", "tasty", "pleasant", "enjoy", "enjoyed", "enjoying", "enjoyable", "appreciate",
+    "appreciated", "recommend", "recommended", "happy", "glad", "love", "loved", "loves", "decent",
+    "plentiful", "efficient", "smooth", "polite", "attentive", "courteous", "generous", "free",
+    "complimentary", "included", "fine", "fresh", "better", "improved", "reliable", "convenient",
+    "simple", "intuitive", "thanks", "thank", "kind", "professional", "impressed", "impressive",
+    "excited", "refreshing", "neat", "worth", "reasonable",
+}
+STRONG_POSITIVE_WORDS = {
+    "excellent", "amazing", "awesome", "outstanding", "perfect", "best", "superb", "terrific",
+    "wonderful", "fantastic", "exceptional", "brilliant",
+}
+NEGATIVE_WORDS = {
+    "bad", "poor", "slow", "rude", "dirty", "late", "delay", "delayed", "delays", "cancelled", "canceled",
+    "cancellation", "cancellations", "lost", "broken", "damaged", "crash", "crashes", "crashed", "crashing",
+    "bug", "bugs", "buggy", "glitch", "glitches", "error", "errors", "issue", "issues", "problem",
+    "problems", "difficult", "hard", "annoying", "frustrating", "frustrated", "disappointing",
+    "disappointed", "disappointment", "expensive", "overpriced", "ridiculous", "uncomfortable", "tight",
+    "cramped", "stale", "bland", "mediocre", "lacking", "limited", "sparse", "unhelpful", "useless",
+    "stupid", "fail", "failed", "fails", "failure", "lose", "losing", "loss", "scam", "fraud", "stuck",
+    "locked", "unreasonable", "unimaginative", "worse", "bummer", "tricky", "risky", "inefficient",
+    "unfortunately", "sadly", "complaint", "stress", "inconvenience", "overcrowded", "waited", "waiting",
+    "rubbery", "burnt", "disinterested", "skipped", "below", "terse", "inadequate", "unable",
+}
+STRONG_NEGATIVE_WORDS = {
+    "terrible", "horrible", "awful", "worst", "disgusting", "inedible", "unacceptable", "pathetic",
+}
+
+# Flip the polarity of sentiment words shortly after these, within the same clause
+NEGATORS = {
+    "not", "no", "never", "nothing", "none", "nobody", "neither", "nor", "without", "hardly", "barely",
+    "cannot", "cant", "dont", "doesnt", "didnt", "isnt", "wasnt", "werent", "wont", "wouldnt", "aint",
+    "can't", "don't", "doesn't", "didn't", "isn't", "wasn't", "weren't", "won't", "wouldn't", "ain't",
+    "aren't", "couldn't", "shouldn't", "haven't", "hasn't", "hadn't",
+}
+NEGATION_WINDOW = 3
+
+LABELS = ("negative", "neutral", "positive")
+
+# Texts tokenized together; larger inputs are scored in slices so scratch arrays stay bounded
+_TEXTS_PER_PASS = 8192
+
+# ---- compiled form ----
+
+# Tokens are packed into a uint64 key, 5 bits per character: the first
+# _KEY_CHARS characters plus the token length (capped at 15) in the top bits.
+# Lexicon words are at most 14 characters, so two tokens only share a key if
+# both are longer than _KEY_CHARS, start with the same _KEY_CHARS characters
+# and are the same length.
+_KEY_CHARS = 12
+_APOSTROPHE = 27
+_DIGIT = 28
+_BREAK = 31
+
+# 5-bit symbol per code point below _SYMBOL_LIMIT: letters in either case,
+# digits and apostrophes (straight or curly) are word characters, and
+# _BREAK marks the characters that end a clause; "\n" also separates texts.
+_SYMBOL_LIMIT = 0x2020
+_SYMBOLS = np.zeros(_SYMBOL_LIMIT, dtype=np.uint8) # type: ignore
+for _i, _ch in enumerate("abcdefghijklmnopqrstuvwxyz", start=1):
+    _SYMBOLS[ord(_ch)] = _SYMBOLS[ord(_ch.upper())] = _i
+_SYMBOLS[[ord(c) for c in "0123456789"]] = _DIGIT
+_SYMBOLS[[ord(c) for c in "'‘’`"]] = _APOSTROPHE
+_SYMBOLS[[ord(c) for c in ",.;:!?\n"]] = _BREAK
+
+
+def _pack(word: str) -> int:
+    key = min(len(word), 15) << (5 * _KEY_CHARS)
+    for k, ch in enumerate(word[:_KEY_CHARS]):
+        key |= int(_SYMBOLS[ord(ch)]) << (5 * (_KEY_CHARS - 1 - k))
+    return key
+
+
+def _compile() -> tuple[np.ndarray, np.ndarray, np.ndarray]: # type: ignore
+    """
+    Sorted keys of every lexicon word and negator, with their weights and negator flags.
+    """
+    weights: Dict[str, float] = dict.fromkeys(NEGATORS, 0.0)
+    for words, weight in (
+        (POSITIVE_WORDS, 1.0), (STRONG_POSITIVE_WORDS, 2.0), (NEGATIVE_WORDS, -1.0), (STRONG_NEGATIVE_WORDS, -2.0),
+    ):
+        weights.update(dict.fromkeys(words, weight))
+
+    entries = sorted((_pack(word), weight, word in NEGATORS) for word, weight in weights.items())
+    keys, values, negators = zip(*entries)
+    return np.array(keys, dtype=np.uint64), np.array(values, dtype=np.float32), np.array(negators) # type: ignore
+
+
+_KEYS, _WEIGHTS, _IS_NEGATOR = _compile()
+_BUT_KEY = np.uint64(_pack("but"))
+
+
+def _tokenize(texts: List[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: # type: ignore
+    """
+    Text-ordered tokens: packed word keys with their token positions, plus
+    the positions and text index of clause breaks.
+    """
+    joined = "\n".join(texts)
+    if joined.count("\n") != len(texts) - 1:
+        joined = "\n".join(t.replace("\n", " ") for t in texts)
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32) # type: ignore
+    symbols = _SYMBOLS[np.minimum(codes, _SYMBOL_LIMIT - 1)] # type: ignore
+
+    # an apostrophe is part of a word only between two letters or digits ("didn't", not 'quoted')
+    alnum = (symbols > 0) & (symbols < _BREAK) & (symbols != _APOSTROPHE) # type: ignore
+    in_word = alnum.copy()
+    in_word[1:-1] |= (symbols[1:-1] == _APOSTROPHE) & alnum[:-2] & alnum[2:] # type: ignore
+
+    edges = np.diff(in_word.view(np.int8), prepend=np.int8(0), append=np.int8(0)) # type: ignore
+    starts = np.flatnonzero(edges == 1) # type: ignore
+    lengths = np.flatnonzero(edges == -1) - starts # type: ignore
+
+    keys = np.minimum(lengths, 15).astype(np.uint64) << np.uint64(5 * _KEY_CHARS) # type: ignore
+    last = len(symbols) - 1
+    for k in range(_KEY_CHARS):
+        chars = symbols[np.minimum(starts + k, last)] * (lengths > k) # type: ignore
+        keys |= chars.astype(np.uint64) << np.uint64(5 * (_KEY_CHARS - 1 - k)) # type: ignore
+
+    # token position = rank of the token's first character among word starts and breaks
+    is_break = symbols == _BREAK
+    rank = np.cumsum((edges[:-1] == 1) | is_break) - 1 # type: ignore
+    break_chars = np.flatnonzero(is_break) # type: ignore
+    word_positions, break_positions = rank[starts], rank[break_chars] # type: ignore
+    break_text_index = np.cumsum(codes[break_chars] == 10) # type: ignore
+
+    return keys, word_positions, break_positions, break_text_index
+
+
+def score_sentiment(texts: List[str]) -> np.ndarray: # type: ignore
+    """
+    Lexicon sentiment score per text in one pass: >0 positive, <0 negative.
+
+    All texts are tokenized together with array operations on their code
+    points, and tokens are matched against the compiled lexicon by binary
+    search. Negation is resolved with array scans rather than per-sentence
+    loops: a sentiment word within NEGATION_WINDOW tokens after a negator,
+    with no clause break in between, counts with its sign flipped. So
+    "not good" scores negative and "no issues" positive.
+    """
+    n = len(texts)
+    if n == 0:
+        return np.zeros(0, dtype=np.float32) # type: ignore
+    if n > _TEXTS_PER_PASS:
+        return np.concatenate([ # type: ignore
+            score_sentiment(texts[start:start + _TEXTS_PER_PASS]) for start in range(0, n, _TEXTS_PER_PASS)
+        ])
+
+    keys, word_positions, break_positions, break_text_index = _tokenize(texts)
+    token_count = len(word_positions) + len(break_positions)
+
+    index = np.minimum(np.searchsorted(_KEYS, keys), len(_KEYS) - 1) # type: ignore
+    known = _KEYS[index] == keys # type: ignore
+    weights = np.where(known, _WEIGHTS[index], np.float32(0)) # type: ignore
+
+    is_negator = np.zeros(token_count, dtype=bool) # type: ignore
+    is_negator[word_positions] = known & _IS_NEGATOR[index] # type: ignore
+    is_break = np.zeros(token_count, dtype=bool) # type: ignore
+    is_break[break_positions] = True
+    is_break[word_positions[keys == _BUT_KEY]] = True # type: ignore
+
+    # position of the latest negator and latest clause break at or before each word
+    positions = np.arange(token_count) # type: ignore
+    last_negator = np.maximum.accumulate(np.where(is_negator, positions, -1))[word_positions] # type: ignore
+    last_break = np.maximum.accumulate(np.where(is_break, positions, -1))[word_positions] # type: ignore
+    negated = (last_negator > last_break) & (word_positions - last_negator <= NEGATION_WINDOW) # type: ignore
+
+    # each word belongs to the text after as many "\n" breaks as precede it
+    preceding_breaks = word_positions - np.arange(len(word_positions)) # type: ignore
+    text_index = np.concatenate(([0], break_text_index))[preceding_breaks] # type: ignore
+
+    contributions = np.where(negated, -weights, weights) # type: ignore
+    return np.bincount(text_index, weights=contributions, minlength=n).astype(np.float32) # type: ignore
+
+
+def label_scores(scores: np.ndarray) -> List[str]: # type: ignore
+    """
+    "negative", "neutral" or "positive" per score.
+    """
+    return [LABELS[int(s) + 1] for s in np.sign(scores)] # type: ignore
+
+
+def aggregate_sentiment(scores: np.ndarray) -> str: # type: ignore
+    """
+    Cluster sentiment from its sentences' scores: the most common label, ties
+    broken by the sign of the summed score.
+    """
+    if len(scores) == 0:
+        return "neutral"
+
+    counts = np.bincount(np.sign(scores).astype(np.int64) + 1, minlength=3) # type: ignore
+    winners = np.flatnonzero(counts == counts.max()) # type: ignore
+    if len(winners) == 1:
+        return LABELS[int(winners[0])]
+    return LABELS[int(np.sign(scores.sum())) + 1] # type: ignore
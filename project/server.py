@@ -0,0 +1,298 @@
+import argparse
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Tuple
+
+from project.app import error_response, lambda_handler, success_response
+from project.embeddings import warm_up
+from project.jobs import JobManager, JobQueueFullError, job_status_body
+from project.logging import setup_logger
+from project.validation import BadRequestError
+
+logger = setup_logger(__name__)
+
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+
+# Threads running the pipeline; numpy and the model release the GIL for the heavy parts
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+
+# Requests admitted at once (running plus queued for a worker); beyond this the server answers 503
+SERVER_MAX_PENDING = int(os.getenv("SERVER_MAX_PENDING", "64"))
+
+SERVER_MAX_BODY_BYTES = int(os.getenv("SERVER_MAX_BODY_BYTES", str(16 * 1024 * 1024)))
+
+# Header fields accepted per request; each line is also bounded by the stream reader's limit (64 KiB)
+SERVER_MAX_HEADERS = int(os.getenv("SERVER_MAX_HEADERS", "100"))
+
+ANALYZE_PATHS = ("/", "/analyze")
+
+# POST submits an analysis as a background job; GET /jobs/<id> polls it
+JOBS_PATH = "/jobs"
+
+Handler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def handle_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the Lambda pipeline and shape failures like the Lambda entry point would.
+    """
+    try:
+        return lambda_handler(event, None)
+    except BadRequestError as exc:
+        return error_response(str(exc), 400)
+    except TimeoutError as exc:
+        logger.warning(f"Request timed out: {exc}")
+        return error_response("Request timed out", 504)
+    except Exception:
+        logger.exception("Unhandled error while processing request")
+        return error_response("Internal server error", 500)
+
+
+def _http_response(status: int, body: str, keep_alive: bool, headers: Dict[str, str] | None = None) -> bytes:
+    payload = body.encode("utf-8")
+    lines = [
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(payload)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload
+
+
+def _reject(writer: asyncio.StreamWriter, status: int, message: str) -> bool:
+    # answers a request that cannot be read, and closes the connection: the rest of the stream is unframed
+    writer.write(_http_response(status, error_response(message, status)["body"], False))
+    return False
+
+
+class AnalysisServer:
+    """
+    Asyncio HTTP/1.1 front end for the analysis pipeline.
+
+    The event loop only reads requests and writes responses; every pipeline
+    run happens on a bounded thread pool, so a slow request never stalls the
+    loop. At most `max_pending` requests are admitted at once, and anything
+    beyond that gets an immediate 503 with Retry-After instead of an
+    unbounded queue. The model is loaded once at start-up and stays warm for
+    the life of the process.
+
+    Analyses too large for one request/response cycle are submitted to
+    JOBS_PATH instead and run by a JobManager (project.jobs), created on
+    first use unless one is passed in.
+    """
+
+    def __init__(
+        self,
+        handler: Handler = handle_event,
+        workers: int = SERVER_WORKERS,
+        max_pending: int = SERVER_MAX_PENDING,
+        max_body_bytes: int = SERVER_MAX_BODY_BYTES,
+        max_headers: int = SERVER_MAX_HEADERS,
+        warm: bool = True,
+        jobs: JobManager | None = None,
+    ) -> None:
+        self._handler = handler
+        self._workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+        self._max_pending = max_pending
+        self._max_body_bytes = max_body_bytes
+        self._max_headers = max_headers
+        self._warm = warm
+        self._pending = 0
+        self._jobs = jobs
+        self._owns_jobs = jobs is None
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def jobs(self) -> JobManager:
+        if self._jobs is None:
+            self._jobs = JobManager()
+        return self._jobs
+
+    async def start(self, host: str = SERVER_HOST, port: int = SERVER_PORT) -> Tuple[str, int]:
+        """
+        Warm the model and start listening; returns the bound address.
+        """
+        if self._warm:
+            stats = await asyncio.get_running_loop().run_in_executor(self._executor, warm_up)
+            if stats is not None:
+                logger.info(f"Model warm ({stats.import_seconds + stats.load_seconds:.3f}s)")
+
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        address = self._server.sockets[0].getsockname()
+        logger.info(f"Listening on {address[0]}:{address[1]} with {self._workers} workers")
+        return address[0], address[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            raise RuntimeError("Server not started")
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+        if self._owns_jobs and self._jobs is not None:
+            self._jobs.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                keep_alive = await self._handle_request(reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        try:
+            request_line = await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            return _reject(writer, 400, "Request line too long")
+        if not request_line:
+            return False
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            return _reject(writer, 400, "Malformed request line")
+        method, path, version = parts
+
+        headers: Dict[str, str] = {}
+        while True:
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                return _reject(writer, 431, "Request header field too long")
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= self._max_headers:
+                return _reject(writer, 431, f"More than {self._max_headers} request header fields")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+        # bodies are only read by Content-Length; a framing we do not read must not leave bytes behind
+        encoding = headers.get("transfer-encoding", "").lower()
+        if encoding:
+            if "content-length" in headers:
+                return _reject(writer, 400, "Both Transfer-Encoding and Content-Length given")
+            if encoding.split(",")[-1].strip() == "chunked":
+                return _reject(writer, 411, "Chunked request bodies are not supported, send Content-Length")
+            return _reject(writer, 501, f"Unsupported Transfer-Encoding: {encoding}")
+
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            length = -1
+        if length < 0:
+            return _reject(writer, 400, "Invalid Content-Length")
+        if length > self._max_body_bytes:
+            return _reject(writer, 413, f"Request body exceeds {self._max_body_bytes} bytes")
+        body = await reader.readexactly(length)
+
+        status, response_body, extra_headers = await self._dispatch(method, path.split("?", 1)[0], body)
+        writer.write(_http_response(status, response_body, keep_alive, extra_headers))
+        return keep_alive
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, str, Dict[str, str]]:
+        if path == "/health":
+            if method != "GET":
+                return 405, error_response("Method not allowed", 405)["body"], {"Allow": "GET"}
+            return 200, success_response({"status": "ok", "pending": self._pending})["body"], {}
+
+        if path == JOBS_PATH or path.startswith(f"{JOBS_PATH}/"):
+            return await self._dispatch_jobs(method, path, body)
+
+        if path not in ANALYZE_PATHS:
+            return 404, error_response("Not found", 404)["body"], {}
+        if method != "POST":
+            return 405, error_response("Method not allowed", 405)["body"], {"Allow": "POST"}
+
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return 400, error_response("Request body must be UTF-8")["body"], {}
+
+        # ---- backpressure: shed load rather than queue without bound ----
+        if self._pending >= self._max_pending:
+            return 503, error_response("Server busy, retry later", 503)["body"], {"Retry-After": "1"}
+
+        self._pending += 1
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(self._executor, self._handler, {"body": text})
+        finally:
+            self._pending -= 1
+
+        return response["statusCode"], response["body"], {}
+
+    async def _dispatch_jobs(self, method: str, path: str, body: bytes) -> Tuple[int, str, Dict[str, str]]:
+        job_id = path[len(JOBS_PATH):].strip("/")
+        if job_id:
+            if method != "GET":
+                return 405, error_response("Method not allowed", 405)["body"], {"Allow": "GET"}
+            job = self.jobs.get(job_id)
+            if job is None:
+                return 404, error_response("Job not found", 404)["body"], {}
+            return 200, success_response(job_status_body(job))["body"], {}
+
+        if method != "POST":
+            return 405, error_response("Method not allowed", 405)["body"], {"Allow": "POST"}
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return 400, error_response("Request body must be UTF-8")["body"], {}
+
+        # validation walks the whole payload, so it stays off the event loop too
+        try:
+            job = await asyncio.to_thread(self.jobs.submit, {"body": text})
+        except BadRequestError as exc:
+            return 400, error_response(str(exc))["body"], {}
+        except JobQueueFullError:
+            return 503, error_response("Too many jobs in progress, retry later", 503)["body"], {"Retry-After": "5"}
+
+        response = success_response({"jobId": job.job_id, "status": job.status.value})
+        return 202, response["body"], {"Location": f"{JOBS_PATH}/{job.job_id}"}
+
+
+async def serve(host: str = SERVER_HOST, port: int = SERVER_PORT, **options: Any) -> None:
+    server = AnalysisServer(**options)
+    await server.start(host, port)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Serve the analysis pipeline over HTTP (POST JSON to / or /analyze, or to /jobs to run in the background).",
+    )
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=SERVER_MAX_PENDING)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, max_pending=args.max_pending))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,32 @@
+from typing import Any, List
+
+from project import (
+    clustering, compression, constants, embeddings, hierarchy, near_duplicates, noise_recovery, summary_providers,
+)
+
+
+def pipeline_settings() -> List[Any]:
+    """
+    The settings that decide which rows, clusters and summaries the pipeline
+    produces for an input. Anything that keeps results across requests keys
+    them on these, plus whatever else its own results depend on.
+    """
+    provider = summary_providers.get_provider()
+    return [
+        embeddings.model_id(),
+        constants.SIMILARITY_THRESHOLD,
+        constants.MIN_CLUSTER_SIZE,
+        clustering.CLUSTERING_ENGINE,
+        compression.VECTOR_REDUCTION,
+        compression.VECTOR_REDUCTION_DIM,
+        compression.VECTOR_REDUCTION_SAMPLE,
+        compression.VECTOR_INT8,
+        hierarchy.HIERARCHY_NEIGHBOURS,
+        hierarchy.HIERARCHY_MIN_CLUSTER_SIZE,
+        hierarchy.HIERARCHY_MAX_DISTANCE,
+        near_duplicates.NEAR_DUPLICATE_COLLAPSE,
+        near_duplicates.NEAR_DUPLICATE_THRESHOLD,
+        noise_recovery.NOISE_RECOVERY,
+        noise_recovery.NOISE_RECOVERY_SIMILARITY,
+        provider.model_id if provider is not None else None,
+    ]
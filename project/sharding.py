@@ -0,0 +1,287 @@
+import contextlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict
+from typing import Iterator, List, Tuple
+import numpy as np # type: ignore
+from scipy.sparse import coo_matrix # type: ignore
+from scipy.sparse.csgraph import connected_components # type: ignore
+
+from project.clustering import CLUSTERING_ENGINE, cluster_labels, group_labels
+from project.constants import MIN_CLUSTER_SIZE, SIMILARITY_THRESHOLD
+from project.embeddings import embed_texts
+from project.logging import setup_logger
+from project.models import QuantizedVectors, SentenceBatch, ShardMergeStats
+from project.noise_recovery import cluster_centroids
+from project.similarity import similarity_blocks
+
+logger = setup_logger(__name__)
+
+# Worker processes that embed and cluster one shard of a request each; 0 or 1 keeps every stage in-process
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "0"))
+
+# Requests with fewer rows after deduplication are not worth the process hop
+SHARD_MIN_ROWS = int(os.getenv("SHARD_MIN_ROWS", "5000"))
+
+# Cosine similarity two clusters from different shards need between their centroids to be merged
+SHARD_MERGE_SIMILARITY = float(os.getenv("SHARD_MERGE_SIMILARITY", "0.7"))
+
+# Spherical k-means rounds that move similar rows into the same shard before clustering
+SHARD_PARTITION_ITERATIONS = int(os.getenv("SHARD_PARTITION_ITERATIONS", "10"))
+
+# Vectors cross between processes as memory-mapped files here; under /dev/shm they never leave memory
+SHARD_SHARED_DIR = os.getenv("SHARD_SHARED_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+
+# "spawn" is safe next to the threads of long-lived hosts and torch; "fork" starts faster
+SHARD_START_METHOD = os.getenv("SHARD_START_METHOD", "spawn")
+
+# Started on first use and kept, so each worker loads the model once
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> Executor:
+    """
+    Return the shared worker pool, starting it on first call.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                context = multiprocessing.get_context(SHARD_START_METHOD)
+                _executor = ProcessPoolExecutor(max_workers=SHARD_WORKERS, mp_context=context)
+    return _executor
+
+
+def use_shards(batch: SentenceBatch) -> bool:
+    return SHARD_WORKERS > 1 and len(batch) >= SHARD_MIN_ROWS
+
+
+@contextlib.contextmanager
+def _shared_files(directory: str, count: int, futures: List[Future]) -> Iterator[List[str]]:
+    """
+    `count` fresh file paths in `directory`, removed on exit once every
+    future is done, so no worker writes to one after it is gone.
+    """
+    paths = []
+    try:
+        for _ in range(count):
+            fd, path = tempfile.mkstemp(prefix="shard-", suffix=".bin", dir=directory)
+            os.close(fd)
+            paths.append(path)
+        yield paths
+    finally:
+        wait(futures)
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+
+
+def _embed_shard(texts: List[str], path: str) -> Tuple[int, int]:
+    """
+    Worker side: embed one shard's texts into a memory-mapped matrix at `path`; returns its shape.
+    """
+    vectors = embed_texts(texts)
+    shared = np.memmap(path, dtype=np.float32, mode="w+", shape=vectors.shape) # type: ignore
+    shared[:] = vectors
+    shared.flush()
+    return vectors.shape # type: ignore
+
+
+def _cluster_shard(
+    layout: List[Tuple[str, str, Tuple[int, ...]]], rows: np.ndarray, eps: float, min_samples: int, engine: str, # type: ignore
+) -> np.ndarray: # type: ignore
+    """
+    Worker side: cluster `rows` of the memory-mapped vectors in `layout`,
+    the path, dtype and shape of a float32 matrix, or of int8 codes then their scales.
+    """
+    shared = [
+        np.asarray(np.memmap(path, dtype=dtype, mode="r", shape=shape)[rows]) for path, dtype, shape in layout # type: ignore
+    ]
+    vectors = QuantizedVectors(*shared) if len(shared) == 2 else shared[0]
+    return cluster_labels(vectors, eps, min_samples, engine) # type: ignore
+
+
+def _shard_count(rows: int, shards: int | None) -> int:
+    return max(1, min(shards or SHARD_WORKERS, rows))
+
+
+def embed_shards(
+    batch: SentenceBatch,
+    shards: int | None = None,
+    executor: Executor | None = None,
+    directory: str | None = None,
+) -> SentenceBatch:
+    """
+    `embed_batch` across worker processes: the rows are split into
+    `shards` contiguous ranges (SHARD_WORKERS by default), each embedded
+    by a worker straight into a memory-mapped file in SHARD_SHARED_DIR.
+    Only the texts are pickled.
+
+    With a `directory`, the vectors are then gathered onto an unlinked
+    scratch file there, as in `embed_batch_to_disk`; else onto the heap.
+    """
+    if not len(batch):
+        return batch
+
+    executor = executor or get_executor()
+    bounds = np.linspace(0, len(batch), _shard_count(len(batch), shards) + 1).astype(np.int64) # type: ignore
+    futures: List[Future] = []
+    with _shared_files(SHARD_SHARED_DIR, len(bounds) - 1, futures) as paths:
+        for start, stop, path in zip(bounds[:-1], bounds[1:], paths):
+            futures.append(executor.submit(_embed_shard, batch.normalized_texts[start:stop], path))
+        shapes = [future.result() for future in futures]
+
+        shape = (len(batch), shapes[0][1])
+        with tempfile.TemporaryFile(dir=directory) if directory else contextlib.nullcontext() as scratch:
+            if scratch is None:
+                vectors = np.empty(shape, dtype=np.float32) # type: ignore
+            else:
+                scratch.truncate(shape[0] * shape[1] * 4)
+                vectors = np.memmap(scratch, dtype=np.float32, mode="r+", shape=shape) # type: ignore
+            for start, stop, path, part in zip(bounds[:-1], bounds[1:], paths, shapes):
+                vectors[start:stop] = np.memmap(path, dtype=np.float32, mode="r", shape=part) # type: ignore
+            if scratch is not None:
+                # the mapping outlives the file handle
+                vectors.flush()
+                vectors = np.memmap(scratch, dtype=np.float32, mode="r", shape=shape) # type: ignore
+
+    batch.vectors = vectors
+    return batch
+
+
+def partition_rows(
+    vectors: np.ndarray, shards: int, iterations: int = SHARD_PARTITION_ITERATIONS, # type: ignore
+) -> List[np.ndarray]: # type: ignore
+    """
+    Row indices of up to `shards` groups of similar rows, from spherical
+    k-means seeded farthest-first from row 0; empty groups are dropped.
+
+    Rows within eps of each other nearly always share their nearest
+    centre, so few clusters end up split across shards.
+    """
+    seeds = [0]
+    closest = np.full(vectors.shape[0], -np.inf, dtype=np.float32) # type: ignore
+    for _ in range(shards - 1):
+        for block, sims in similarity_blocks(vectors, vectors[seeds[-1:]]): # type: ignore
+            np.maximum(closest[block], sims[:, 0], out=closest[block]) # type: ignore
+        seeds.append(int(closest.argmin())) # type: ignore
+
+    centres = np.asarray(vectors[seeds], dtype=np.float32) # type: ignore
+    assignment = np.zeros(vectors.shape[0], dtype=np.int64) # type: ignore
+    for _ in range(iterations + 1):
+        for block, sims in similarity_blocks(vectors, centres):
+            assignment[block] = sims.argmax(axis=1) # type: ignore
+        centres = cluster_centroids(vectors, assignment)
+
+    # stable sort keeps rows in order within each shard
+    order = np.argsort(assignment, kind="stable") # type: ignore
+    return [rows for rows in np.split(order, np.cumsum(np.bincount(assignment))[:-1]) if rows.size] # type: ignore
+
+
+def cluster_shards(
+    batch: SentenceBatch,
+    shards: int | None = None,
+    eps: float = SIMILARITY_THRESHOLD,
+    min_samples: int = MIN_CLUSTER_SIZE,
+    engine: str | None = None,
+    threshold: float = SHARD_MERGE_SIMILARITY,
+    executor: Executor | None = None,
+    directory: str | None = None,
+) -> List[np.ndarray]: # type: ignore
+    """
+    `cluster_batch` across worker processes: the embedded rows are
+    partitioned into `shards` groups of similar rows (`partition_rows`),
+    each clustered by a worker that reads its rows from one memory-mapped
+    copy of the vectors in `directory` (SHARD_SHARED_DIR by default), and
+    the shard-local clusters are combined by `merge_shards`.
+
+    Workers cluster `batch.compact_vectors` when set, as `cluster_batch`
+    does; partitioning and merging use the full vectors. Only row indices
+    and labels are pickled.
+    """
+    if not len(batch) or batch.vectors is None:
+        return []
+
+    vectors = batch.compact_vectors if batch.compact_vectors is not None else batch.vectors
+    arrays = [vectors.codes, vectors.scales] if isinstance(vectors, QuantizedVectors) else [vectors]
+    executor = executor or get_executor()
+    parts = partition_rows(batch.vectors, _shard_count(len(batch), shards))
+    futures: List[Future] = []
+    with _shared_files(directory or SHARD_SHARED_DIR, len(arrays), futures) as paths:
+        layout = []
+        for path, array in zip(paths, arrays):
+            shared = np.memmap(path, dtype=array.dtype, mode="w+", shape=array.shape) # type: ignore
+            shared[:] = array
+            shared.flush()
+            del shared
+            layout.append((path, array.dtype.str, array.shape)) # type: ignore
+        for rows in parts:
+            futures.append(executor.submit(_cluster_shard, layout, rows, eps, min_samples, engine or CLUSTERING_ENGINE))
+        local_labels = [future.result() for future in futures]
+
+    return merge_shards(batch, parts, local_labels, threshold)
+
+
+def merge_shards(
+    batch: SentenceBatch,
+    parts: List[np.ndarray], # type: ignore
+    local_labels: List[np.ndarray], # type: ignore
+    threshold: float = SHARD_MERGE_SIMILARITY,
+) -> List[np.ndarray]: # type: ignore
+    """
+    Combine the labels each shard gave its `parts` rows into
+    `batch.labels` and return the row indices of each cluster, like
+    `cluster_batch`.
+
+    Clusters from different shards whose centroids are at least
+    `threshold` similar are merged, transitively; clusters of the same
+    shard were already kept apart by the engine and are only joined
+    through another shard. Rows a shard called noise stay noise, even when
+    their neighbours landed in another shard (noise recovery can still
+    report them with the nearest cluster).
+    """
+    start = time.perf_counter()
+    labels = np.full(len(batch), -1, dtype=np.int64) # type: ignore
+    shard_of_cluster = []
+    next_label = 0
+    for shard, (rows, local) in enumerate(zip(parts, local_labels)):
+        clustered = local >= 0 # type: ignore
+        labels[rows[clustered]] = local[clustered] + next_label # type: ignore
+        count = int(local.max(initial=-1)) + 1 # type: ignore
+        shard_of_cluster.append(np.full(count, shard, dtype=np.int64)) # type: ignore
+        next_label += count
+
+    if next_label:
+        shard_of = np.concatenate(shard_of_cluster) # type: ignore
+        centroids = cluster_centroids(batch.vectors, labels) # type: ignore
+        sources, targets = [], []
+        for block, sims in similarity_blocks(centroids, centroids):
+            rows, cols = np.nonzero(sims >= threshold) # type: ignore
+            rows += block.start
+            across = shard_of[rows] != shard_of[cols] # type: ignore
+            sources.append(rows[across])
+            targets.append(cols[across])
+        source, target = np.concatenate(sources), np.concatenate(targets) # type: ignore
+        graph = coo_matrix((np.ones(source.size, dtype=np.int8), (source, target)), shape=(next_label, next_label)) # type: ignore
+        _, merged = connected_components(graph, directed=False) # type: ignore
+        clustered = labels >= 0 # type: ignore
+        labels[clustered] = merged[labels[clustered]] # type: ignore
+
+    batch.labels = labels
+    clusters = group_labels(labels)
+    stats = ShardMergeStats(
+        shards=len(parts),
+        local_clusters=next_label,
+        clusters=len(clusters),
+        seconds=round(time.perf_counter() - start, 4),
+    )
+    logger.info(
+        f"Merged {stats.local_clusters} clusters from {stats.shards} shards into {stats.clusters}",
+        extra={"fields": asdict(stats)},
+    )
+    return clusters
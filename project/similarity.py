@@ -0,0 +1,132 @@
+from typing import Iterator, List, Tuple
+import numpy as np # type: ignore
+from scipy.sparse import csr_matrix # type: ignore
+
+from project.constants import SIMILARITY_MEMORY_BYTES
+from project.models import QuantizedVectors
+
+# Scratch per similarity cell: float32 score plus a bool mask
+_BYTES_PER_CELL = 4 + 1
+
+# Top-k also holds the int64 argpartition indices for every cell
+_TOP_K_BYTES_PER_CELL = 4 + 8
+
+# Int8 corpus rows are widened to float32 this many bytes at a time
+_QUANTIZED_TILE_BYTES = 4 * 1024 * 1024
+
+
+def row_blocks(n_rows: int, n_cols: int, memory_bytes: int, bytes_per_cell: int = _BYTES_PER_CELL) -> List[slice]:
+    """
+    Split `n_rows` into consecutive blocks whose `rows x n_cols` scratch fits in `memory_bytes`.
+    """
+    rows = max(1, memory_bytes // max(1, n_cols * bytes_per_cell))
+    return [slice(start, min(start + rows, n_rows)) for start in range(0, n_rows, rows)]
+
+
+def similarity_blocks(
+    queries: np.ndarray, # type: ignore
+    corpus: np.ndarray, # type: ignore
+    memory_bytes: int = SIMILARITY_MEMORY_BYTES,
+    bytes_per_cell: int = _BYTES_PER_CELL,
+) -> Iterator[Tuple[slice, np.ndarray]]: # type: ignore
+    """
+    Yield `(rows, queries[rows] @ corpus.T)` one row block at a time.
+
+    Inputs are expected to be L2-normalized float32, so each block holds
+    cosine similarities. Only one block is alive at a time; the full
+    `len(queries) x len(corpus)` matrix is never built. Either side may
+    also be QuantizedVectors (see `quantized_dot`).
+    """
+    quantized = isinstance(queries, QuantizedVectors) or isinstance(corpus, QuantizedVectors)
+    for block in row_blocks(queries.shape[0], corpus.shape[0], memory_bytes, bytes_per_cell): # type: ignore
+        yield block, quantized_dot(queries[block], corpus) if quantized else queries[block] @ corpus.T # type: ignore
+
+
+def quantized_dot(
+    queries: np.ndarray | QuantizedVectors, # type: ignore
+    corpus: np.ndarray | QuantizedVectors, # type: ignore
+) -> np.ndarray: # type: ignore
+    """
+    `queries @ corpus.T` where either side holds int8 codes: the codes are
+    multiplied as float32 (exact for integer products of up to 1024
+    dimensions, and on the BLAS path numpy has no int8 kernel for), corpus
+    rows widened a tile at a time, and the row scales applied afterwards.
+    """
+    left = queries.codes.astype(np.float32) if isinstance(queries, QuantizedVectors) else queries # type: ignore
+    sims = np.empty((queries.shape[0], corpus.shape[0]), dtype=np.float32) # type: ignore
+    for tile in row_blocks(corpus.shape[0], corpus.shape[1], _QUANTIZED_TILE_BYTES, 4): # type: ignore
+        right = corpus.codes[tile].astype(np.float32) if isinstance(corpus, QuantizedVectors) else corpus[tile] # type: ignore
+        np.matmul(left, right.T, out=sims[:, tile]) # type: ignore
+
+    if isinstance(queries, QuantizedVectors):
+        sims *= queries.scales[:, None] # type: ignore
+    if isinstance(corpus, QuantizedVectors):
+        sims *= corpus.scales[None, :] # type: ignore
+    return sims # type: ignore
+
+
+def top_k_neighbours(
+    queries: np.ndarray, # type: ignore
+    corpus: np.ndarray, # type: ignore
+    k: int,
+    exclude_self: bool = False,
+    memory_bytes: int = SIMILARITY_MEMORY_BYTES,
+) -> Tuple[np.ndarray, np.ndarray]: # type: ignore
+    """
+    Indices and similarities of the `k` most similar corpus rows for each query, best first.
+
+    With `exclude_self`, queries are taken to be the leading rows of the
+    corpus and a row is never returned as its own neighbour.
+    """
+    n_queries = queries.shape[0] # type: ignore
+    k = min(k, corpus.shape[0] - (1 if exclude_self else 0)) # type: ignore
+    indices = np.empty((n_queries, max(k, 0)), dtype=np.int64) # type: ignore
+    scores = np.empty((n_queries, max(k, 0)), dtype=np.float32) # type: ignore
+    if k <= 0:
+        return indices, scores # type: ignore
+
+    for block, sims in similarity_blocks(queries, corpus, memory_bytes, _TOP_K_BYTES_PER_CELL):
+        local = np.arange(block.stop - block.start) # type: ignore
+        if exclude_self:
+            sims[local, local + block.start] = -np.inf # type: ignore
+
+        candidates = np.argpartition(sims, -k, axis=1)[:, -k:] # type: ignore
+        candidate_scores = np.take_along_axis(sims, candidates, axis=1) # type: ignore
+        order = np.argsort(-candidate_scores, axis=1, kind="stable") # type: ignore
+
+        indices[block] = np.take_along_axis(candidates, order, axis=1) # type: ignore
+        scores[block] = np.take_along_axis(candidate_scores, order, axis=1) # type: ignore
+
+    return indices, scores # type: ignore
+
+
+def threshold_neighbours(
+    queries: np.ndarray, # type: ignore
+    corpus: np.ndarray, # type: ignore
+    threshold: float,
+    memory_bytes: int = SIMILARITY_MEMORY_BYTES,
+) -> csr_matrix: # type: ignore
+    """
+    Sparse `len(queries) x len(corpus)` matrix of similarities >= `threshold`.
+
+    Row i lists the neighbours of query i (its indices) with their
+    similarities (its data). Scratch memory is bounded per block; the result
+    itself grows with the number of neighbour pairs found.
+    """
+    rows: List[np.ndarray] = [] # type: ignore
+    cols: List[np.ndarray] = [] # type: ignore
+    sims_kept: List[np.ndarray] = [] # type: ignore
+
+    for block, sims in similarity_blocks(queries, corpus, memory_bytes):
+        r, c = np.nonzero(sims >= threshold) # type: ignore
+        rows.append((r + block.start).astype(np.int32)) # type: ignore
+        cols.append(c.astype(np.int32)) # type: ignore
+        sims_kept.append(sims[r, c]) # type: ignore
+
+    shape = (queries.shape[0], corpus.shape[0]) # type: ignore
+    if not rows:
+        return csr_matrix(shape, dtype=np.float32) # type: ignore
+
+    return csr_matrix( # type: ignore
+        (np.concatenate(sims_kept), (np.concatenate(rows), np.concatenate(cols))), shape=shape # type: ignore
+    )
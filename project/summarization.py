@@ -1,57 +1,334 @@
-from collections import Counter
-from project.models import SentenceCluster, ClusterSummary
+from dataclasses import replace
+from typing import List
+import numpy as np # type: ignore
+from project.constants import INSIGHT_DIVERSITY, KEY_INSIGHT_COUNT, NEAR_DUPLICATE_SIMILARITY, SUMMARY_PROMPT_SENTENCES
+from project.models import (
+    AnalysisMode, BASELINE_SOURCE, COMPARISON_SOURCE, SentenceBatch, SentenceCluster, ClusterSummary,
+    ComparativeClusterSummary, GeneratedSummary, SummaryRequest,
+)
+from project.sentiment import aggregate_sentiment, label_scores, score_sentiment
 
 
 def classify_sentiment(text: str) -> str:
-    # Placeholder sentiment classification logic. Improve
-    text_lower = text.lower()
-    if "good" in text_lower or "great" in text_lower or "excellent" in text_lower:
-        return "positive"
-    elif "bad" in text_lower or "terrible" in text_lower or "poor" in text_lower:
-        return "negative"
-    else:
-        return "neutral"
+    """
+    Sentiment of a single sentence; batches should use `score_sentiment`.
+    """
+    return label_scores(score_sentiment([text]))[0]
 
 
-def summarize_cluster(cluster: SentenceCluster) -> ClusterSummary:
-    # ---- sentence IDs ----
-    sentence_ids = set[str]()
-    normalized_texts = list[str]()
+def _centroid_relevance(vectors: np.ndarray | None, size: int) -> np.ndarray: # type: ignore
+    """
+    Cosine similarity of each member to the cluster centroid, in one matrix-vector product.
 
-    for embedded in cluster.sentences:
-        sentence_ids.update(embedded.sentence.ids)
-        normalized_texts.append(embedded.sentence.normalized_text)
+    Member vectors are L2-normalized, so the normalized sum is the centroid
+    direction. Without vectors, with a zero centroid, or with two members
+    (always equally close to their mean), every member scores 0 and ranking
+    falls back to input order.
+    """
+    if vectors is None or size <= 2:
+        return np.zeros(size, dtype=np.float32) # type: ignore
+
+    centroid = vectors.sum(axis=0) # type: ignore
+    norm = float(np.sqrt(centroid @ centroid)) # type: ignore
+    if not norm > 0:
+        return np.zeros(size, dtype=np.float32) # type: ignore
+    return (vectors @ centroid) / np.float32(norm) # type: ignore
+
+
+def _select_representatives(
+    vectors: np.ndarray | None, # type: ignore
+    relevance: np.ndarray, # type: ignore
+    count: int = KEY_INSIGHT_COUNT,
+    diversity: float = INSIGHT_DIVERSITY,
+) -> List[int]:
+    """
+    Up to `count` members by maximal marginal relevance, as indices into the cluster.
 
-    # ---- representative sentence ----
-    most_common_text, _ = Counter(normalized_texts).most_common(1)[0]
+    The member closest to the centroid comes first. Each later pick
+    maximizes `(1 - diversity) * relevance - diversity * redundancy`, where
+    redundancy is its highest similarity to a member already picked.
+    Near-duplicates of a pick only come after every other member, since the
+    first pick sits at the centroid and redundancy alone barely separates
+    them. Each pick costs one matrix-vector product, so selection is linear
+    in cluster size.
+    """
+    if vectors is None or len(relevance) <= count:
+        # every member is picked either way; most central first
+        return [int(i) for i in np.argsort(-relevance, kind="stable")[:count]] # type: ignore
 
-    title = most_common_text.capitalize()
+    selected = [int(np.argmax(relevance))] # type: ignore
+    weighted_relevance = (1 - diversity) * relevance # type: ignore
+    redundancy = vectors @ vectors[selected[0]] # type: ignore
+    while len(selected) < count:
+        scores = weighted_relevance - diversity * redundancy - 3.0 * (redundancy >= NEAR_DUPLICATE_SIMILARITY) # type: ignore
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores))) # type: ignore
+        if len(selected) < count:
+            np.maximum(redundancy, vectors @ vectors[selected[-1]], out=redundancy) # type: ignore
+    return selected
+
+
+def _cluster_title(representative_text: str) -> str:
+    title = representative_text.capitalize()
     if len(title) > 60:
         title = title[:57] + "..."
+    return title
+
+
+def _cluster_sentiment(first_texts: List[str]) -> str:
+    return aggregate_sentiment(score_sentiment(first_texts))
+
+
+def _sentences_sentiment(cluster: SentenceCluster, first_texts: List[str]) -> str:
+    # Scores precomputed by preprocess_sentences, when the sentences came from there
+    scores = [embedded.sentence.sentiment_score for embedded in cluster.sentences]
+    if None in scores:
+        return _cluster_sentiment(first_texts)
+    return aggregate_sentiment(np.array(scores, dtype=np.float32)) # type: ignore
+
+
+def _rows_sentiment(batch: SentenceBatch, rows: np.ndarray, first_texts: List[str]) -> str: # type: ignore
+    # Scores precomputed for the whole batch by the sentiment stage, when it ran
+    if batch.sentiment_scores is None:
+        return _cluster_sentiment(first_texts)
+    return aggregate_sentiment(batch.sentiment_scores[rows]) # type: ignore
 
-    # ---- sentiment ----
-    sentiments = [
-        classify_sentiment(embedded.sentence.original_texts[0])
-        for embedded in cluster.sentences
+
+def _comparison_points(
+    first_texts: List[str],
+    in_baseline: List[bool],
+    in_comparison: List[bool],
+    baseline_count: int,
+    comparison_count: int,
+) -> tuple[List[str], List[str]]:
+    shared_texts = list[str]()
+    baseline_only_texts = list[str]()
+    comparison_only_texts = list[str]()
+
+    for text, baseline, comparison in zip(first_texts, in_baseline, in_comparison):
+        if baseline and comparison:
+            shared_texts.append(text)
+        elif comparison:
+            comparison_only_texts.append(text)
+        else:
+            baseline_only_texts.append(text)
+
+    # ---- similarities: sentences raised in both sets ----
+    similarities = shared_texts[:3]
+    if not similarities:
+        similarities = baseline_only_texts[:1] + comparison_only_texts[:1]
+
+    # ---- differences: relative volume and sentences unique to one set ----
+    differences = [
+        f"**{baseline_count} baseline** vs **{comparison_count} comparison** sentences in this theme"
     ]
+    differences.extend([t for t in comparison_only_texts if t not in similarities][:1])
+    differences.extend([t for t in baseline_only_texts if t not in similarities][:1])
+
+    return similarities, differences
+
+
+def _cluster_vectors(cluster: SentenceCluster) -> np.ndarray: # type: ignore
+    return np.vstack([embedded.vector for embedded in cluster.sentences]).astype(np.float32, copy=False) # type: ignore
+
 
-    sentiment = Counter(sentiments).most_common(1)[0][0]
+def _by_relevance(values: List, relevance: np.ndarray) -> List: # type: ignore
+    # most central first; ties keep input order
+    return [values[i] for i in np.argsort(-relevance, kind="stable")] # type: ignore
 
-    # ---- key insights ----
-    insights = list[str]()
-    seen = set[str]()
+
+def summarize_cluster(cluster: SentenceCluster) -> ClusterSummary:
+    """
+    Title from the member closest to the cluster centroid, key insights
+    picked by maximal marginal relevance over the member embeddings.
+    """
+    # ---- sentence IDs ----
+    sentence_ids = set[str]()
 
     for embedded in cluster.sentences:
-        text = embedded.sentence.original_texts[0]
-        if text not in seen:
-            insights.append(text)
-            seen.add(text)
-        if len(insights) == 3:
-            break
+        sentence_ids.update(embedded.sentence.ids)
+
+    first_texts = [embedded.sentence.original_texts[0] for embedded in cluster.sentences]
+    vectors = _cluster_vectors(cluster)
+    representatives = _select_representatives(vectors, _centroid_relevance(vectors, len(first_texts)))
 
     return ClusterSummary(
-        title=title,
-        sentiment=sentiment,
+        title=_cluster_title(cluster.sentences[representatives[0]].sentence.normalized_text),
+        sentiment=_sentences_sentiment(cluster, first_texts),
         sentence_ids=sorted(sentence_ids),
-        key_insights=insights,
+        key_insights=[first_texts[i] for i in representatives],
+    )
+
+
+def summarize_comparative_cluster(cluster: SentenceCluster) -> ComparativeClusterSummary:
+    """
+    Summarize a cluster formed over baseline and comparison sentences together,
+    splitting the member ids back out per input set. Members are considered
+    in order of closeness to the cluster centroid.
+    """
+    baseline_ids = set[str]()
+    comparison_ids = set[str]()
+
+    for embedded in cluster.sentences:
+        baseline_ids.update(embedded.sentence.baseline_ids)
+        comparison_ids.update(embedded.sentence.comparison_ids)
+
+    first_texts = [embedded.sentence.original_texts[0] for embedded in cluster.sentences]
+    relevance = _centroid_relevance(_cluster_vectors(cluster), len(first_texts))
+    members = _by_relevance(cluster.sentences, relevance)
+
+    similarities, differences = _comparison_points(
+        _by_relevance(first_texts, relevance),
+        [bool(embedded.sentence.baseline_ids) for embedded in members],
+        [bool(embedded.sentence.comparison_ids) for embedded in members],
+        len(baseline_ids),
+        len(comparison_ids),
+    )
+
+    return ComparativeClusterSummary(
+        title=_cluster_title(members[0].sentence.normalized_text),
+        sentiment=_sentences_sentiment(cluster, first_texts),
+        baseline_sentence_ids=sorted(baseline_ids),
+        comparison_sentence_ids=sorted(comparison_ids),
+        key_similarities=similarities,
+        key_differences=differences,
+    )
+
+
+def _rows_vectors(batch: SentenceBatch, rows: np.ndarray) -> np.ndarray | None: # type: ignore
+    return None if batch.vectors is None else batch.vectors[rows] # type: ignore
+
+
+def _row_sources(batch: SentenceBatch, rows: List[int]) -> tuple[List[bool], List[bool]]:
+    # whether each row has any baseline input, and any comparison input
+    row_sources = [batch.entry_sources[batch.entry_offsets[i]:batch.entry_offsets[i + 1]] for i in rows] # type: ignore
+    return (
+        [bool((s == BASELINE_SOURCE).any()) for s in row_sources], # type: ignore
+        [bool((s == COMPARISON_SOURCE).any()) for s in row_sources], # type: ignore
+    )
+
+
+def summarize_rows(batch: SentenceBatch, rows: np.ndarray) -> ClusterSummary: # type: ignore
+    """
+    `summarize_cluster` for the rows of a SentenceBatch.
+    """
+    first_texts = [batch.first_texts[i] for i in rows] # type: ignore
+    vectors = _rows_vectors(batch, rows)
+    representatives = _select_representatives(vectors, _centroid_relevance(vectors, len(rows)))
+
+    return ClusterSummary(
+        title=_cluster_title(batch.normalized_texts[rows[representatives[0]]]),
+        sentiment=_rows_sentiment(batch, rows, first_texts),
+        sentence_ids=batch.ids_for(rows),
+        key_insights=[first_texts[i] for i in representatives],
+    )
+
+
+def summarize_comparative_rows(batch: SentenceBatch, rows: np.ndarray) -> ComparativeClusterSummary: # type: ignore
+    """
+    `summarize_comparative_cluster` for the rows of a SentenceBatch.
+    """
+    first_texts = [batch.first_texts[i] for i in rows] # type: ignore
+    baseline_ids = batch.ids_for(rows, BASELINE_SOURCE)
+    comparison_ids = batch.ids_for(rows, COMPARISON_SOURCE)
+
+    ranked = _by_relevance(list(rows), _centroid_relevance(_rows_vectors(batch, rows), len(rows)))
+    in_baseline, in_comparison = _row_sources(batch, ranked)
+    similarities, differences = _comparison_points(
+        [batch.first_texts[i] for i in ranked],
+        in_baseline,
+        in_comparison,
+        len(baseline_ids),
+        len(comparison_ids),
+    )
+
+    return ComparativeClusterSummary(
+        title=_cluster_title(batch.normalized_texts[ranked[0]]),
+        sentiment=_rows_sentiment(batch, rows, first_texts),
+        baseline_sentence_ids=baseline_ids,
+        comparison_sentence_ids=comparison_ids,
+        key_similarities=similarities,
+        key_differences=differences,
+    )
+
+
+def summary_request_rows(
+    batch: SentenceBatch,
+    rows: np.ndarray, # type: ignore
+    summary: ClusterSummary | ComparativeClusterSummary,
+    survey_title: str,
+    theme: str,
+) -> SummaryRequest:
+    """
+    What a summary provider is shown of a cluster: up to SUMMARY_PROMPT_SENTENCES
+    of its sentences picked by maximal marginal relevance, split by input set,
+    with the extractive summary's sentiment and id counts.
+    """
+    vectors = _rows_vectors(batch, rows)
+    picked = [int(rows[i]) for i in _select_representatives( # type: ignore
+        vectors, _centroid_relevance(vectors, len(rows)), SUMMARY_PROMPT_SENTENCES,
+    )]
+
+    if isinstance(summary, ComparativeClusterSummary):
+        in_baseline, in_comparison = _row_sources(batch, picked)
+        return SummaryRequest(
+            mode=AnalysisMode.COMPARATIVE,
+            survey_title=survey_title,
+            theme=theme,
+            sentiment=summary.sentiment,
+            baseline_texts=[batch.first_texts[i] for i, keep in zip(picked, in_baseline) if keep],
+            comparison_texts=[batch.first_texts[i] for i, keep in zip(picked, in_comparison) if keep],
+            baseline_count=len(summary.baseline_sentence_ids),
+            comparison_count=len(summary.comparison_sentence_ids),
+        )
+
+    return SummaryRequest(
+        mode=AnalysisMode.STANDALONE,
+        survey_title=survey_title,
+        theme=theme,
+        sentiment=summary.sentiment,
+        baseline_texts=[batch.first_texts[i] for i in picked],
+        comparison_texts=[],
+        baseline_count=len(summary.sentence_ids),
+        comparison_count=0,
     )
+
+
+def apply_generated_summary(
+    summary: ClusterSummary | ComparativeClusterSummary,
+    generated: GeneratedSummary | None,
+) -> ClusterSummary | ComparativeClusterSummary:
+    """
+    The summary with a provider's title and bullets, or unchanged without them.
+    """
+    if generated is None:
+        return summary
+    if isinstance(summary, ComparativeClusterSummary):
+        return replace(
+            summary,
+            title=generated.title,
+            key_similarities=generated.key_similarities,
+            key_differences=generated.key_differences,
+        )
+    return replace(summary, title=generated.title, key_insights=generated.key_insights)
+
+
+def with_recovered_rows(
+    summary: ClusterSummary | ComparativeClusterSummary,
+    batch: SentenceBatch,
+    rows: np.ndarray, # type: ignore
+) -> ClusterSummary | ComparativeClusterSummary:
+    """
+    The summary with the ids of the noise rows recovered into its cluster,
+    leaving out ids that are already members (an id is listed once per cluster).
+    """
+    if isinstance(summary, ComparativeClusterSummary):
+        baseline = set(summary.baseline_sentence_ids)
+        comparison = set(summary.comparison_sentence_ids)
+        return replace(
+            summary,
+            recovered_baseline_sentence_ids=[i for i in batch.ids_for(rows, BASELINE_SOURCE) if i not in baseline],
+            recovered_comparison_sentence_ids=[i for i in batch.ids_for(rows, COMPARISON_SOURCE) if i not in comparison],
+        )
+    members = set(summary.sentence_ids)
+    return replace(summary, recovered_sentence_ids=[i for i in batch.ids_for(rows) if i not in members])
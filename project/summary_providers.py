@@ -0,0 +1,444 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import urllib.request
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Protocol, Type
+
+from project.logging import setup_logger
+from project.models import AnalysisMode, GeneratedSummary, SummaryRequest, SummaryRunStats
+
+
+logger = setup_logger(__name__)
+
+# Provider that rewrites cluster titles and insights; empty keeps the extractive summaries
+SUMMARY_PROVIDER = os.getenv("SUMMARY_PROVIDER", "")
+
+# Calls in flight at once, per-call timeout and retries after the first attempt
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "16"))
+SUMMARY_TIMEOUT_MS = float(os.getenv("SUMMARY_TIMEOUT_MS", "4000"))
+SUMMARY_RETRIES = int(os.getenv("SUMMARY_RETRIES", "2"))
+
+# Budget for the whole stage, so a request stays inside the 10s target;
+# clusters without a generated summary by then keep their extractive one
+SUMMARY_DEADLINE_MS = float(os.getenv("SUMMARY_DEADLINE_MS", "6000"))
+
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "4096"))
+# Optional directory of cached summaries that outlives the process, e.g. under /tmp
+SUMMARY_CACHE_DIR = os.getenv("SUMMARY_CACHE_DIR", "")
+
+# http provider: an OpenAI-compatible chat completions endpoint
+SUMMARY_API_URL = os.getenv("SUMMARY_API_URL", "")
+SUMMARY_API_KEY = os.getenv("SUMMARY_API_KEY", "")
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "")
+
+# stub provider: simulated latency per call, to exercise the worker pool offline
+SUMMARY_STUB_LATENCY_MS = float(os.getenv("SUMMARY_STUB_LATENCY_MS", "0"))
+
+# Base delay before a retry, doubled per attempt
+_RETRY_BACKOFF_SECONDS = 0.1
+
+
+class SummaryProviderError(Exception):
+    """Raised when a provider's response cannot be used as a summary."""
+    pass
+
+
+class SummaryProvider(Protocol):
+    """
+    Anything that writes a title and markdown insights for one cluster.
+    `model_id` is part of the cache key.
+    """
+
+    model_id: str
+
+    async def summarize(self, request: SummaryRequest) -> GeneratedSummary:
+        ...
+
+
+# ---- stub provider ----
+
+_STOPWORDS = {
+    "the", "and", "for", "was", "were", "are", "but", "not", "you", "your", "with", "that", "this", "they",
+    "them", "their", "there", "have", "has", "had", "been", "from", "our", "out", "all", "any", "can",
+    "very", "just", "get", "got", "also", "about", "would", "could", "when", "what", "which", "who", "its",
+    "into", "than", "then", "too", "only", "even", "more", "some", "one", "much", "will", "did", "does",
+    "don't", "didn't", "i'm", "it's", "after", "before", "again", "because", "being", "over", "still",
+}
+_WORD_RE = re.compile(r"[a-z][a-z']+")
+
+
+def _keywords(texts: List[str], count: int) -> List[str]:
+    """
+    The `count` words found in the most texts, ties broken alphabetically.
+    """
+    counts = Counter(
+        word for text in texts for word in set(_WORD_RE.findall(text.lower()))
+        if word not in _STOPWORDS and len(word) > 2
+    )
+    return [word for word, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:count]]
+
+
+def _bold_first(text: str, keywords: List[str]) -> str:
+    for keyword in keywords:
+        match = re.search(rf"\b{re.escape(keyword)}\b", text, re.IGNORECASE)
+        if match:
+            return f"{text[:match.start()]}**{match.group()}**{text[match.end():]}"
+    return text
+
+
+class StubSummaryProvider:
+    """
+    Offline, deterministic stand-in for an LLM: titles from the words most
+    members share, insights from the representative sentences with that
+    keyword in bold. For tests, benchmarks and local runs.
+    """
+
+    model_id = "stub-keywords"
+
+    def __init__(self, latency_seconds: float | None = None) -> None:
+        self.latency_seconds = SUMMARY_STUB_LATENCY_MS / 1000 if latency_seconds is None else latency_seconds
+
+    async def summarize(self, request: SummaryRequest) -> GeneratedSummary:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        keywords = _keywords(request.baseline_texts + request.comparison_texts, 3)
+        title = " and ".join(keywords[:2]).capitalize() or request.theme.capitalize()
+
+        if request.mode != AnalysisMode.COMPARATIVE:
+            return GeneratedSummary(
+                title=title,
+                key_insights=[_bold_first(text, keywords) for text in request.baseline_texts[:3]],
+            )
+
+        baseline_keywords = _keywords(request.baseline_texts, 5)
+        comparison_keywords = _keywords(request.comparison_texts, 5)
+        shared = [w for w in baseline_keywords if w in comparison_keywords]
+        similarities = [f"Both sets mention **{word}**" for word in shared[:2]]
+        if not similarities:
+            similarities = [_bold_first(text, keywords) for text in (request.baseline_texts[:1] + request.comparison_texts[:1])]
+
+        differences = [f"**{request.baseline_count} baseline** vs **{request.comparison_count} comparison** sentences"]
+        differences.extend(f"Only the comparison set raises **{w}**" for w in comparison_keywords if w not in baseline_keywords)
+        return GeneratedSummary(title=title, key_similarities=similarities, key_differences=differences[:3])
+
+
+# ---- http provider ----
+
+_SYSTEM_PROMPT = (
+    "You summarize clusters of customer feedback sentences. Reply with a single JSON object only. "
+    "Use markdown bold (**like this**) for the most important phrase in each bullet."
+)
+
+
+def build_prompt(request: SummaryRequest) -> str:
+    lines = [
+        f"Survey: {request.survey_title}",
+        f"Theme: {request.theme}",
+        f"Cluster sentiment: {request.sentiment}",
+    ]
+    if request.mode == AnalysisMode.COMPARATIVE:
+        lines.append(f"Baseline sentences ({request.baseline_count} in total, most representative first):")
+        lines.extend(f"- {text}" for text in request.baseline_texts)
+        lines.append(f"Comparison sentences ({request.comparison_count} in total, most representative first):")
+        lines.extend(f"- {text}" for text in request.comparison_texts)
+        lines.append(
+            'Return {"title": a short name for the sub-theme, "keySimilarities": 2-3 bullets on what both sets say, '
+            '"keyDifferences": 2-3 bullets on how they differ}.'
+        )
+    else:
+        lines.append(f"Sentences ({request.baseline_count} in total, most representative first):")
+        lines.extend(f"- {text}" for text in request.baseline_texts)
+        lines.append('Return {"title": a short name for the sub-theme, "keyInsights": 2-3 specific insight bullets}.')
+    return "\n".join(lines)
+
+
+def _string_list(value: Any, field_name: str) -> List[str]:
+    if not isinstance(value, list) or not value or not all(isinstance(v, str) and v.strip() for v in value):
+        raise SummaryProviderError(f"'{field_name}' must be a non-empty list of strings")
+    return [v.strip() for v in value[:3]]
+
+
+def parse_summary(content: str, mode: AnalysisMode) -> GeneratedSummary:
+    """
+    Validate a provider's JSON reply into a GeneratedSummary.
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as exc:
+        raise SummaryProviderError(f"Summary is not valid JSON: {exc.msg}")
+    if not isinstance(data, dict):
+        raise SummaryProviderError("Summary must be a JSON object")
+
+    title = data.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise SummaryProviderError("'title' must be a non-empty string")
+
+    if mode == AnalysisMode.COMPARATIVE:
+        return GeneratedSummary(
+            title=title.strip(),
+            key_similarities=_string_list(data.get("keySimilarities"), "keySimilarities"),
+            key_differences=_string_list(data.get("keyDifferences"), "keyDifferences"),
+        )
+    return GeneratedSummary(title=title.strip(), key_insights=_string_list(data.get("keyInsights"), "keyInsights"))
+
+
+# Blocking http calls run here rather than on the event loop's default executor,
+# which asyncio.run joins on exit: a call abandoned at SUMMARY_DEADLINE_MS runs on
+# to its socket timeout without holding the handler. Twice the concurrency leaves
+# room for such calls alongside the next request's
+_http_executor = ThreadPoolExecutor(max_workers=2 * max(1, SUMMARY_CONCURRENCY), thread_name_prefix="summary-http")
+
+
+class HttpSummaryProvider:
+    """
+    Any OpenAI-compatible chat completions endpoint at SUMMARY_API_URL,
+    asked for a JSON object. The blocking request runs on a worker thread.
+    """
+
+    def __init__(self) -> None:
+        if not SUMMARY_API_URL:
+            raise ValueError("SUMMARY_API_URL must be set for the http summary provider")
+        self.model_id = f"http:{SUMMARY_MODEL}"
+
+    async def summarize(self, request: SummaryRequest) -> GeneratedSummary:
+        content = await asyncio.get_running_loop().run_in_executor(_http_executor, self._complete, build_prompt(request))
+        return parse_summary(content, request.mode)
+
+    def _complete(self, prompt: str) -> str:
+        payload = {
+            "model": SUMMARY_MODEL,
+            "messages": [{"role": "system", "content": _SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"},
+            "temperature": 0,
+        }
+        headers = {"Content-Type": "application/json"}
+        if SUMMARY_API_KEY:
+            headers["Authorization"] = f"Bearer {SUMMARY_API_KEY}"
+
+        http_request = urllib.request.Request(SUMMARY_API_URL, data=json.dumps(payload).encode("utf-8"), headers=headers)
+        # the socket timeout bounds the thread even after the awaiting call has timed out
+        with urllib.request.urlopen(http_request, timeout=SUMMARY_TIMEOUT_MS / 1000) as response:
+            reply = json.loads(response.read())
+        try:
+            return reply["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise SummaryProviderError("Unexpected chat completions response shape")
+
+
+PROVIDERS: Dict[str, Type[Any]] = {
+    "stub": StubSummaryProvider,
+    "http": HttpSummaryProvider,
+}
+
+
+def get_provider_class(name: str) -> Type[Any]:
+    try:
+        return PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unsupported summary provider: {name}. Expected one of {sorted(PROVIDERS)}")
+
+
+# ---- cache ----
+
+def summary_cache_key(model_id: str, request: SummaryRequest) -> str:
+    """
+    Content address for a generated summary: hash of the provider and everything it is shown.
+    """
+    return hashlib.sha256(json.dumps([model_id, asdict(request)], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    In-process LRU of generated summaries, bounded by entry count, optionally
+    backed by one JSON file per key in `directory`.
+    """
+
+    def __init__(self, max_entries: int, directory: str | None = None):
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        self._entries: OrderedDict[str, GeneratedSummary] = OrderedDict()
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+            except OSError as exc:
+                logger.warning(f"Could not create summary cache directory {self.directory}, caching in memory only: {exc}")
+                self.directory = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> GeneratedSummary | None:
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is not None:
+                self._entries.move_to_end(key)
+                return summary
+
+        if self.directory is None:
+            return None
+        try:
+            summary = GeneratedSummary(**json.loads((self.directory / f"{key}.json").read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+        self._remember(key, summary)
+        return summary
+
+    def put(self, key: str, summary: GeneratedSummary) -> None:
+        self._remember(key, summary)
+        if self.directory is not None:
+            # write-then-rename so concurrent readers never see a partial file
+            path = self.directory / f"{key}.json"
+            temporary = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                temporary.write_text(json.dumps(asdict(summary)))
+                temporary.replace(path)
+            except OSError as exc:
+                # the disk copy is only an optimization; the summary is still kept in memory
+                logger.warning(f"Could not write summary cache entry {path}: {exc}")
+                temporary.unlink(missing_ok=True)
+
+    def _remember(self, key: str, summary: GeneratedSummary) -> None:
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_provider: Any = None
+_cache: SummaryCache | None = None
+_state_lock = threading.Lock()
+
+
+def get_provider() -> Any:
+    """
+    The SUMMARY_PROVIDER instance, created on first call. None when unset.
+    """
+    global _provider
+    if _provider is None and SUMMARY_PROVIDER:
+        with _state_lock:
+            if _provider is None:
+                _provider = get_provider_class(SUMMARY_PROVIDER)()
+    return _provider
+
+
+def get_summary_cache() -> SummaryCache:
+    global _cache
+    if _cache is None:
+        with _state_lock:
+            if _cache is None:
+                _cache = SummaryCache(SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_DIR or None)
+    return _cache
+
+
+# ---- worker pool ----
+
+async def _summarize_with_retry(
+    provider: Any,
+    request: SummaryRequest,
+    semaphore: asyncio.Semaphore,
+    timeout_seconds: float,
+    retries: int,
+) -> GeneratedSummary:
+    async with semaphore:
+        for attempt in range(retries + 1):
+            try:
+                return await asyncio.wait_for(provider.summarize(request), timeout_seconds)
+            except Exception as exc:
+                if attempt == retries:
+                    raise
+                logger.warning(f"Summary attempt {attempt + 1} failed, retrying: {exc!r}")
+                await asyncio.sleep(_RETRY_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+    raise AssertionError("unreachable")
+
+
+async def generate_summaries(
+    requests: List[SummaryRequest],
+    provider: Any,
+    cache: SummaryCache | None = None,
+    concurrency: int = SUMMARY_CONCURRENCY,
+    timeout_ms: float = SUMMARY_TIMEOUT_MS,
+    retries: int = SUMMARY_RETRIES,
+    deadline_ms: float = SUMMARY_DEADLINE_MS,
+    stats: SummaryRunStats | None = None,
+) -> List[GeneratedSummary | None]:
+    """
+    One generated summary per request, in order, or None where none could
+    be had in time.
+
+    Cached summaries are returned without a call, and identical requests
+    share one call. The rest run on a pool of at most `concurrency` calls,
+    each bounded by `timeout_ms` and retried up to `retries` times with
+    backoff. Calls still running when `deadline_ms` passes are cancelled.
+    """
+    stats = stats if stats is not None else SummaryRunStats()
+    stats.clusters += len(requests)
+    keys = [summary_cache_key(provider.model_id, r) for r in requests]
+
+    found: Dict[str, GeneratedSummary] = {}
+    missing: Dict[str, SummaryRequest] = {}
+    for key, request in zip(keys, requests):
+        if key in found or key in missing:
+            continue
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            found[key] = cached
+        else:
+            missing[key] = request
+    stats.cache_hits += sum(1 for key in keys if key in found)
+
+    if missing:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        tasks = {
+            asyncio.ensure_future(_summarize_with_retry(provider, request, semaphore, timeout_ms / 1000, retries)): key
+            for key, request in missing.items()
+        }
+        done, pending = await asyncio.wait(tasks, timeout=deadline_ms / 1000)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+        stats.timed_out += len(pending)
+        for task in done:
+            if task.exception() is not None:
+                stats.failed += 1
+                logger.warning(f"Summary generation failed, keeping the extractive summary: {task.exception()!r}")
+                continue
+            found[tasks[task]] = task.result()
+            stats.generated += 1
+            if cache is not None:
+                cache.put(tasks[task], task.result())
+
+    return [found.get(key) for key in keys]
+
+
+def summarize_clusters(
+    requests: List[SummaryRequest], stats: SummaryRunStats | None = None,
+) -> List[GeneratedSummary | None]:
+    """
+    Synchronous entry point for the handler: generate_summaries with the
+    configured provider and cache, on a private event loop. Counts go to
+    `stats` when given.
+    """
+    provider = get_provider()
+    if provider is None or not requests:
+        return [None] * len(requests)
+
+    stats = stats if stats is not None else SummaryRunStats()
+    results = asyncio.run(generate_summaries(requests, provider, get_summary_cache(), stats=stats))
+    logger.info(
+        f"Generated summaries for {stats.generated} of {stats.clusters} clusters",
+        extra={"fields": asdict(stats)},
+    )
+    return results
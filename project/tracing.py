@@ -0,0 +1,116 @@
+import contextlib
+import cProfile
+import logging
+import os
+import resource
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from project.logging import setup_logger
+from project.models import StageTiming
+
+logger = setup_logger(__name__)
+
+# Record wall time, CPU time and peak RSS growth per pipeline stage, logged as structured fields
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+
+# Also return the stage timings in the response body as a `timings` block (implies tracing)
+TRACE_TIMINGS_IN_RESPONSE = os.getenv("TRACE_TIMINGS_IN_RESPONSE", "false").lower() == "true"
+
+# When set, each request runs under cProfile and its stats are written here as a .prof file
+# (pstats format; opens in snakeviz, or flameprof / gprof2dot for a flame graph)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+
+_NO_STAGE = contextlib.nullcontext()
+
+
+def _peak_rss_kb() -> int:
+    # kilobytes on Linux (Lambda); macOS reports bytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Trace:
+    """
+    Per-request stage timings. Stages are recorded even when they raise.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.stages: List[StageTiming] = []
+
+    @contextlib.contextmanager
+    def _measure(self, name: str) -> Iterator[None]:
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        peak = _peak_rss_kb()
+        try:
+            yield
+        finally:
+            self.stages.append(StageTiming(
+                stage=name,
+                wall_ms=round((time.perf_counter() - wall) * 1000, 3),
+                cpu_ms=round((time.process_time() - cpu) * 1000, 3),
+                peak_rss_delta_kb=_peak_rss_kb() - peak,
+            ))
+
+    def stage(self, name: str) -> contextlib.AbstractContextManager:
+        return self._measure(name)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {s.stage: {k: v for k, v in asdict(s).items() if k != "stage"} for s in self.stages}
+
+    def log(self, target: logging.Logger = logger) -> None:
+        for s in self.stages:
+            target.info(f"Stage {s.stage} took {s.wall_ms:.1f}ms", extra={"fields": asdict(s)})
+
+
+class _DisabledTrace(Trace):
+    """
+    Shared stand-in when tracing is off: every stage is the same no-op context.
+    """
+
+    enabled = False
+
+    def stage(self, name: str) -> contextlib.AbstractContextManager:
+        return _NO_STAGE
+
+    def log(self, target: logging.Logger = logger) -> None:
+        pass
+
+
+_DISABLED_TRACE = _DisabledTrace()
+
+
+def start_trace() -> Trace:
+    """
+    A fresh Trace for one request, or the shared no-op trace when tracing is off.
+    """
+    if TRACING_ENABLED or TRACE_TIMINGS_IN_RESPONSE:
+        return Trace()
+    return _DISABLED_TRACE
+
+
+@contextlib.contextmanager
+def profiled(label: str = "request") -> Iterator[Path | None]:
+    """
+    Run the block under cProfile when PROFILE_DIR is set, yielding the .prof path it will write.
+    """
+    if not PROFILE_DIR:
+        yield None
+        return
+
+    directory = Path(PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{label}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{time.perf_counter_ns()}.prof"
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield path
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(path))
+        logger.info(f"Wrote profile {path}", extra={"fields": {"profile_path": str(path)}})
@@ -1,5 +1,6 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence
 
+from project.blob_store import split_uri
 from project.constants import MAX_SENTENCE_LENGTH, MAX_SENTENCES
 from project.models import AnalysisMode
 
@@ -19,6 +20,38 @@ def validate_payload(payload: Dict[str, Any], mode: AnalysisMode) -> None:
         _validate_sentences(payload["comparison"], field_name="comparison")
 
 
+def validate_reference_payload(payload: Dict[str, Any], allowed_prefixes: Sequence[str]) -> None:
+    """
+    Checks for a payload that points at stored objects (`baselineUri`,
+    optional `comparisonUri` and `resultUri`) instead of inlining sentences.
+    Every URI must start with one of `allowed_prefixes`.
+    """
+    for field in ("surveyTitle", "theme", "baselineUri"):
+        if field not in payload:
+            raise BadRequestError(f"Missing required field: {field}")
+
+    for field in ("surveyTitle", "theme", "baselineUri", "comparisonUri", "resultUri"):
+        if field not in payload:
+            continue
+        if not isinstance(payload[field], str):
+            raise BadRequestError(f"{field} must be a string")
+        if not payload[field].strip():
+            raise BadRequestError(f"{field} cannot be empty")
+        if field.endswith("Uri"):
+            validate_object_uri(payload[field], field, allowed_prefixes)
+
+
+def validate_object_uri(uri: str, field: str, allowed_prefixes: Sequence[str]) -> None:
+    try:
+        _, key = split_uri(uri)
+    except ValueError as exc:
+        raise BadRequestError(str(exc))
+
+    # "." and ".." segments are plain key characters to S3 but not to every store
+    if not any(uri.startswith(prefix) for prefix in allowed_prefixes) or {".", ".."} & set(key.split("/")):
+        raise BadRequestError(f"{field} is outside the allowed locations: {uri}")
+
+
 def _validate_required_fields(payload: Dict[str, Any]) -> None:
     for field in ("surveyTitle", "theme", "baseline"):
         if field not in payload:
@@ -41,22 +74,26 @@ def _validate_sentences(sentences: List[Dict[str, Any]], field_name: str) -> Non
         )
 
     for i, item in enumerate(sentences):
-        if "id" not in item or "sentence" not in item:
-            raise BadRequestError(
-                f"{field_name}[{i}] must contain 'id' and 'sentence'"
-            )
-
-        if not isinstance(item["id"], str) or not item["id"].strip():
-            raise BadRequestError(
-                f"{field_name}[{i}].id must be a non-empty string"
-            )
-
-        if not isinstance(item["sentence"], str) or not item["sentence"].strip():
-            raise BadRequestError(
-                f"{field_name}[{i}].sentence must be a non-empty string"
-            )
-
-        if len(item["sentence"]) > MAX_SENTENCE_LENGTH:
-            raise BadRequestError(
-                f"{field_name}[{i}].sentence exceeds max length of {MAX_SENTENCE_LENGTH}"
-            )
+        validate_sentence_item(item, field_name, i)
+
+
+def validate_sentence_item(item: Dict[str, Any], field_name: str, index: int) -> None:
+    if "id" not in item or "sentence" not in item:
+        raise BadRequestError(
+            f"{field_name}[{index}] must contain 'id' and 'sentence'"
+        )
+
+    if not isinstance(item["id"], str) or not item["id"].strip():
+        raise BadRequestError(
+            f"{field_name}[{index}].id must be a non-empty string"
+        )
+
+    if not isinstance(item["sentence"], str) or not item["sentence"].strip():
+        raise BadRequestError(
+            f"{field_name}[{index}].sentence must be a non-empty string"
+        )
+
+    if len(item["sentence"]) > MAX_SENTENCE_LENGTH:
+        raise BadRequestError(
+            f"{field_name}[{index}].sentence exceeds max length of {MAX_SENTENCE_LENGTH}"
+        )
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Export all-MiniLM-L6-v2 to ONNX and quantize it to int8 for the onnx backend.
+
+Needs the full torch stack (requirements.txt) plus onnx and onnxruntime. Writes
+`model.onnx` and `tokenizer.json` into the output directory, which defaults to
+the path the onnx backend loads from (EMBEDDING_ONNX_MODEL_DIR).
+
+Usage: python3 scripts/export_onnx_model.py [--output DIR]
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def main() -> int:
+    from project.constants import EMBEDDING_MODEL_NAME
+    from project.embedding_backends import EMBEDDING_ONNX_MODEL_DIR
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=EMBEDDING_ONNX_MODEL_DIR)
+    args = parser.parse_args()
+
+    import torch # type: ignore
+    from onnxruntime.quantization import QuantType, quantize_dynamic # type: ignore
+    from sentence_transformers import SentenceTransformer # type: ignore
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    st_model = SentenceTransformer(EMBEDDING_MODEL_NAME) # type: ignore
+    transformer = st_model[0].auto_model # type: ignore
+    tokenizer = st_model.tokenizer # type: ignore
+    transformer.eval() # type: ignore
+
+    sample = tokenizer(["export sample"], return_tensors="pt") # type: ignore
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "tokens"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "tokens"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32_path = Path(tmp) / "model_fp32.onnx"
+        with torch.no_grad(): # type: ignore
+            torch.onnx.export( # type: ignore
+                transformer,
+                tuple(sample[name] for name in input_names), # type: ignore
+                str(fp32_path),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        quantize_dynamic(str(fp32_path), str(output / "model.onnx"), weight_type=QuantType.QInt8) # type: ignore
+
+    tokenizer.backend_tokenizer.save(str(output / "tokenizer.json")) # type: ignore
+    print(f"Wrote int8 model and tokenizer to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
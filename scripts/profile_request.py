@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Profile one request through lambda_handler and print the hottest functions.
+
+Writes a cProfile .prof file (pstats format) under --out. Open it with
+`python -m pstats`, snakeviz, or turn it into a flame graph with flameprof or
+gprof2dot. Stage timings are printed as well.
+
+Usage: python3 scripts/profile_request.py [data/input_example.json] [--out /tmp/profiles] [--top 25]
+"""
+import argparse
+import json
+import os
+import pstats
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payload", nargs="?", type=Path, default=ROOT / "data" / "input_example.json")
+    parser.add_argument("--out", type=Path, default=Path("/tmp/profiles"))
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    # Read at import time by project.tracing
+    os.environ["PROFILE_DIR"] = str(args.out)
+    os.environ["TRACE_TIMINGS_IN_RESPONSE"] = "true"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from project import app, embeddings, tracing
+
+    # Profile the request, not the one-off model load
+    embeddings.warm_up()
+
+    response = app.lambda_handler({"body": args.payload.read_text()}, None)
+    body = json.loads(response["body"])
+    for stage, timing in body.get("timings", {}).items():
+        print(f"{stage:<10} wall {timing['wall_ms']:>9.1f}ms  cpu {timing['cpu_ms']:>9.1f}ms  "
+              f"peak rss +{timing['peak_rss_delta_kb']}KB")
+
+    profile = max(Path(tracing.PROFILE_DIR).glob("request-*.prof"), key=lambda p: p.stat().st_mtime)
+    print(f"\nprofile: {profile}\n")
+    pstats.Stats(str(profile)).sort_stats("cumulative").print_stats(args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
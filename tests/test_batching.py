@@ -0,0 +1,53 @@
+import os
+import unittest
+from unittest import mock
+
+from project.batching import get_token_budget, padding_efficiency, plan_batches, token_budget_for_memory
+
+
+class TestPlanBatches(unittest.TestCase):
+    def test_every_index_appears_exactly_once(self):
+        lengths = [5, 40, 3, 40, 12, 7, 90, 2]
+        batches = plan_batches(lengths, token_budget=100)
+        flat = [i for b in batches for i in b]
+        self.assertCountEqual(flat, range(len(lengths)))
+
+    def test_batches_respect_budget(self):
+        lengths = [5, 40, 3, 40, 12, 7, 30, 2]
+        for batch in plan_batches(lengths, token_budget=64):
+            self.assertLessEqual(len(batch) * max(lengths[i] for i in batch), 64)
+
+    def test_sorted_longest_first_and_stable(self):
+        lengths = [3, 10, 3, 10]
+        batches = plan_batches(lengths, token_budget=1000)
+        self.assertEqual(batches, [[1, 3, 0, 2]])
+
+    def test_oversized_item_gets_its_own_batch(self):
+        batches = plan_batches([500, 4, 4], token_budget=100)
+        self.assertEqual(batches[0], [0])
+        self.assertEqual(batches[1], [1, 2])
+
+    def test_sorting_reduces_padding(self):
+        lengths = [2, 50, 2, 50, 2, 50]
+        naive = [[0, 1], [2, 3], [4, 5]]
+        planned = plan_batches(lengths, token_budget=100)
+        self.assertGreater(padding_efficiency(lengths, planned), padding_efficiency(lengths, naive))
+
+    def test_empty_input(self):
+        self.assertEqual(plan_batches([], token_budget=100), [])
+
+
+class TestTokenBudget(unittest.TestCase):
+    def test_budget_for_memory_tiers(self):
+        budgets = {0: 10, 1024: 20, 2048: 40}
+        self.assertEqual(token_budget_for_memory(512, budgets), 10)
+        self.assertEqual(token_budget_for_memory(1024, budgets), 20)
+        self.assertEqual(token_budget_for_memory(3000, budgets), 40)
+
+    def test_env_override_wins(self):
+        with mock.patch.dict(os.environ, {"ENCODE_TOKEN_BUDGET": "123", "AWS_LAMBDA_FUNCTION_MEMORY_SIZE": "4096"}):
+            self.assertEqual(get_token_budget(), 123)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,9 @@
 import unittest
 import numpy as np
 
-from project.clustering import cluster_sentences
-from project.models import EmbeddedSentence, ProcessedSentence
+from project.clustering import _blocked_dbscan_labels, _dbscan_labels, cluster_batch, cluster_sentences, group_labels
+from project.models import AnalysisMode, EmbeddedSentence, ProcessedSentence, Sentence
+from project.preprocessing import build_sentence_batch
 
 
 def make_es(name: str, vec: list[float]) -> EmbeddedSentence:
@@ -33,6 +34,80 @@ class TestClustering(unittest.TestCase):
         clusters = cluster_sentences([p], eps=0.1, min_samples=2)
         self.assertEqual(clusters, [])
 
+    def test_unknown_engine_raises(self):
+        with self.assertRaises(ValueError):
+            cluster_sentences([make_es("a", [1.0, 0.0, 0.0])], engine="kmeans")
+
+
+class TestClusterBatch(unittest.TestCase):
+    def test_group_labels_orders_by_first_row_and_drops_noise(self):
+        groups = group_labels(np.array([1, -1, 0, 1, 0, -1, 2]))
+        self.assertEqual([g.tolist() for g in groups], [[0, 3], [2, 4], [6]])
+
+    def test_group_labels_all_noise(self):
+        self.assertEqual(group_labels(np.array([-1, -1])), [])
+
+    def test_cluster_batch_sets_labels_and_returns_rows(self):
+        batch = build_sentence_batch([
+            Sentence(id=name, text=name, source=AnalysisMode.STANDALONE) for name in ("a", "b", "c")
+        ])
+        batch.vectors = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 0.0, 0.0]], dtype=np.float32)
+
+        clusters = cluster_batch(batch, eps=0.1, min_samples=2)
+
+        self.assertEqual([c.tolist() for c in clusters], [[0, 2]])
+        self.assertEqual(batch.labels.tolist(), [0, -1, 0])
+
+
+def make_blobs(n_clusters: int, per_cluster: int, noise: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    points = [c + rng.normal(scale=0.05, size=(per_cluster, dim)) for c in centers]
+    points.append(rng.normal(size=(noise, dim)))
+    vectors = np.vstack(points)
+    rng.shuffle(vectors)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+class TestBlockedEngine(unittest.TestCase):
+    def test_matches_sklearn_labels(self):
+        vectors = make_blobs(n_clusters=5, per_cluster=30, noise=40)
+
+        expected = _dbscan_labels(vectors, eps=0.1, min_samples=3)
+        # tiny memory budget forces many one-row blocks
+        actual = _blocked_dbscan_labels(vectors, eps=0.1, min_samples=3, memory_bytes=1)
+
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_matches_sklearn_labels_with_stored_neighbour_graph(self):
+        vectors = make_blobs(n_clusters=5, per_cluster=30, noise=40, seed=2)
+
+        expected = _dbscan_labels(vectors, eps=0.1, min_samples=3)
+        actual = _blocked_dbscan_labels(vectors, eps=0.1, min_samples=3)
+
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_block_size_does_not_change_result(self):
+        vectors = make_blobs(n_clusters=3, per_cluster=20, noise=20, seed=1)
+        small = _blocked_dbscan_labels(vectors, eps=0.2, min_samples=2, memory_bytes=64 * 1024)
+        large = _blocked_dbscan_labels(vectors, eps=0.2, min_samples=2)
+        np.testing.assert_array_equal(small, large)
+
+    def test_all_noise(self):
+        vectors = np.eye(4, dtype=np.float32)
+        labels = _blocked_dbscan_labels(vectors, eps=0.1, min_samples=2)
+        np.testing.assert_array_equal(labels, [-1, -1, -1, -1])
+
+    def test_cluster_sentences_same_output_for_both_engines(self):
+        a = make_es("a", [1.0, 0.0, 0.0])
+        b = make_es("b", [1.0, 0.0, 0.0])
+        c = make_es("c", [0.0, 1.0, 0.0])
+
+        dbscan = cluster_sentences([a, b, c], eps=0.1, min_samples=2, engine="dbscan")
+        blocked = cluster_sentences([a, b, c], eps=0.1, min_samples=2, engine="blocked")
+
+        self.assertEqual(dbscan, blocked)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,135 @@
+import json
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+import project.embeddings as emb
+from project import app, clustering, compression
+from project.clustering import cluster_labels
+from project.compression import compress_vectors, quantize, reduce_dimensions
+from project.embedding_backends import StubBackend
+from project.models import QuantizedVectors
+from project.similarity import similarity_blocks, top_k_neighbours
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+class StubModel:
+    def encode(self, texts, **kwargs):
+        return StubBackend().encode(texts)
+
+
+def unit_rows(n, dim, seed=0, rank=None):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, rank or dim))
+    if rank:
+        vectors = vectors @ rng.normal(size=(rank, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def topic_rows(topics=5, per_topic=20, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(topics, dim))
+    vectors = np.repeat(centres, per_topic, axis=0) + rng.normal(scale=0.05, size=(topics * per_topic, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+class TestQuantize(unittest.TestCase):
+    def test_round_trip_is_close_and_a_quarter_of_the_size(self):
+        vectors = unit_rows(50, 384)
+        quantized = quantize(vectors)
+
+        self.assertEqual(quantized.codes.dtype, np.int8)
+        self.assertEqual(quantized.shape, (50, 384))
+        self.assertLess(quantized.nbytes, vectors.nbytes / 3.9)
+        np.testing.assert_allclose(np.asarray(quantized), vectors, atol=0.01)
+
+    def test_indexing_keeps_the_int8_form(self):
+        quantized = quantize(unit_rows(10, 8))
+        subset = quantized[np.array([3, 1])]
+        self.assertIsInstance(subset, QuantizedVectors)
+        np.testing.assert_array_equal(subset.codes, quantized.codes[[3, 1]])
+
+    def test_similarities_on_codes_match_float32(self):
+        vectors = unit_rows(300, 128)
+        quantized = quantize(vectors)
+
+        for (block, approx), (_, exact) in zip(similarity_blocks(quantized, quantized), similarity_blocks(vectors, vectors)):
+            np.testing.assert_allclose(approx, exact, atol=0.01)
+        for block, approx in similarity_blocks(vectors[:20], quantized):
+            np.testing.assert_allclose(approx, vectors[:20] @ vectors.T, atol=0.01)
+
+        indices, _ = top_k_neighbours(quantized, quantized, k=1, exclude_self=True)
+        expected, _ = top_k_neighbours(vectors, vectors, k=1, exclude_self=True)
+        self.assertGreater((indices == expected).mean(), 0.95)
+
+
+class TestReduceDimensions(unittest.TestCase):
+    def test_pca_keeps_similarities_of_low_rank_vectors(self):
+        vectors = unit_rows(200, 64, rank=8)
+        reduced = reduce_dimensions(vectors, 8, "pca")
+
+        self.assertEqual(reduced.shape, (200, 8))
+        np.testing.assert_allclose(reduced @ reduced.T, vectors @ vectors.T, atol=1e-4)
+
+    def test_random_projection_is_seeded_and_normalized(self):
+        vectors = unit_rows(100, 64)
+        reduced = reduce_dimensions(vectors, 32, "random")
+
+        np.testing.assert_array_equal(reduced, reduce_dimensions(vectors, 32, "random"))
+        np.testing.assert_allclose(np.linalg.norm(reduced, axis=1), 1.0, atol=1e-5)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            compress_vectors(unit_rows(4, 8), method="svd-ish")
+
+
+class TestCompressVectors(unittest.TestCase):
+    def test_nothing_to_do_returns_the_input(self):
+        vectors = unit_rows(10, 16)
+        self.assertIs(compress_vectors(vectors, method="none", int8=False), vectors)
+        self.assertIs(compress_vectors(vectors, method="pca", dim=16, int8=False), vectors)
+
+    def test_reduce_then_quantize(self):
+        compact = compress_vectors(unit_rows(40, 64), method="pca", dim=16, int8=True)
+        self.assertIsInstance(compact, QuantizedVectors)
+        self.assertEqual(compact.shape, (40, 16))
+
+    def test_every_engine_clusters_the_compact_form(self):
+        vectors = topic_rows()
+        compact = compress_vectors(vectors, method="pca", dim=16, int8=True)
+
+        for engine in ("dbscan", "blocked", "hierarchy"):
+            with self.subTest(engine=engine):
+                np.testing.assert_array_equal(cluster_labels(compact, engine=engine), cluster_labels(vectors, engine=engine))
+
+
+class TestHandlerCompression(unittest.TestCase):
+    def setUp(self):
+        self.orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = StubModel(), None, False
+
+    def tearDown(self):
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = self.orig
+
+    def test_clusters_run_on_the_compact_vectors_and_the_rest_on_the_full_ones(self):
+        payload = json.loads((DATA / "input_example_2.json").read_text())
+        with mock.patch.object(compression, "VECTOR_REDUCTION", "random"), \
+                mock.patch.object(compression, "VECTOR_INT8", True), \
+                mock.patch.object(clustering, "cluster_labels", wraps=clustering.cluster_labels) as clustered, \
+                mock.patch.object(app, "recover_noise", wraps=app.recover_noise) as recovered:
+            body = json.loads(app.lambda_handler(payload, None)["body"])
+
+        self.assertTrue(body["clusters"])
+        compact = clustered.call_args.args[0]
+        self.assertIsInstance(compact, QuantizedVectors)
+        self.assertEqual(compact.shape[1], compression.VECTOR_REDUCTION_DIM)
+        batch = recovered.call_args.args[0]
+        self.assertIsNone(batch.compact_vectors)
+        self.assertEqual(batch.vectors.shape[1], 384)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import importlib.util
+import json
+import unittest
+from pathlib import Path
+import numpy as np
+
+from project.embedding_backends import (
+    EMBEDDING_ONNX_MODEL_DIR, STUB_DIM, OnnxBackend, StubBackend, TorchBackend, get_backend_class, mean_pool,
+)
+from project.preprocessing import normalize_text
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+HAS_PARITY_DEPS = all(
+    importlib.util.find_spec(name) is not None for name in ("sentence_transformers", "onnxruntime", "tokenizers")
+) and (Path(EMBEDDING_ONNX_MODEL_DIR) / "model.onnx").exists()
+
+
+class TestBackendSelection(unittest.TestCase):
+    def test_known_backends(self):
+        self.assertIs(get_backend_class("torch"), TorchBackend)
+        self.assertIs(get_backend_class("onnx"), OnnxBackend)
+        self.assertIs(get_backend_class("stub"), StubBackend)
+
+    def test_unknown_backend_raises(self):
+        with self.assertRaises(ValueError):
+            get_backend_class("tensorflow")
+
+    def test_backends_have_distinct_model_ids(self):
+        # cached vectors from one backend must never be served for the other
+        model_ids = {TorchBackend.model_id, OnnxBackend.model_id, StubBackend.model_id}
+        self.assertEqual(len(model_ids), 3)
+
+
+class TestStubBackend(unittest.TestCase):
+    def test_deterministic_normalized_vectors(self):
+        texts = ["Great snacks and drinks", "great snacks, and drinks!", "The app keeps crashing", ""]
+        vectors = StubBackend().encode(texts)
+
+        self.assertEqual(vectors.shape, (4, STUB_DIM))
+        self.assertEqual(vectors.dtype, np.float32)
+        np.testing.assert_allclose(np.linalg.norm(vectors[:3], axis=1), 1.0, atol=1e-6)
+        np.testing.assert_array_equal(vectors[3], 0.0)
+        np.testing.assert_array_equal(vectors, StubBackend().encode(texts))
+
+    def test_shared_words_mean_higher_similarity(self):
+        a, b, c = StubBackend().encode(["great snacks and drinks", "great snacks", "the app keeps crashing"])
+        self.assertAlmostEqual(float(a @ a), 1.0, places=5)
+        self.assertGreater(float(a @ b), float(a @ c))
+
+
+class TestMeanPool(unittest.TestCase):
+    def test_padding_tokens_are_ignored_and_rows_normalized(self):
+        tokens = np.array([
+            [[3.0, 0.0], [1.0, 0.0], [100.0, 100.0]],
+            [[0.0, 2.0], [0.0, 4.0], [0.0, 6.0]],
+        ], dtype=np.float32)
+        mask = np.array([[1, 1, 0], [1, 1, 1]])
+
+        pooled = mean_pool(tokens, mask)
+
+        np.testing.assert_allclose(pooled, [[1.0, 0.0], [0.0, 1.0]], atol=1e-6)
+        self.assertEqual(pooled.dtype, np.float32)
+
+
+@unittest.skipUnless(HAS_PARITY_DEPS, "needs torch, onnxruntime and an exported model (scripts/export_onnx_model.py)")
+class TestOnnxParity(unittest.TestCase):
+    def test_cosine_agreement_with_torch_backend(self):
+        with (DATA_DIR / "input_example.json").open("r") as fh:
+            texts = sorted({normalize_text(item["sentence"]) for item in json.load(fh)["baseline"]})
+
+        reference = TorchBackend().encode(texts)
+        quantized = OnnxBackend().encode(texts)
+
+        # both outputs are L2-normalized so the row-wise dot product is the cosine
+        cosines = np.sum(reference * quantized, axis=1)
+        self.assertGreater(float(cosines.min()), 0.95)
+        self.assertGreater(float(cosines.mean()), 0.99)
+
+
+if __name__ == "__main__":
+    unittest.main()
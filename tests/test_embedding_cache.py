@@ -0,0 +1,104 @@
+import tempfile
+import unittest
+import numpy as np
+
+from project.embedding_cache import DiskEmbeddingStore, EmbeddingCache, LRUEmbeddingCache, cache_key
+
+
+def vec(*values: float) -> np.ndarray:
+    return np.array(values, dtype=np.float32)
+
+
+class TestCacheKey(unittest.TestCase):
+    def test_key_depends_on_model_and_text(self):
+        self.assertEqual(cache_key("m", "hello"), cache_key("m", "hello"))
+        self.assertNotEqual(cache_key("m", "hello"), cache_key("m", "hello!"))
+        self.assertNotEqual(cache_key("m1", "hello"), cache_key("m2", "hello"))
+
+
+class TestLRUEmbeddingCache(unittest.TestCase):
+    def test_evicts_least_recently_used_over_budget(self):
+        # each vector is 3 * 4 = 12 bytes, budget fits two
+        lru = LRUEmbeddingCache(max_bytes=24)
+        lru.put("a", vec(1, 0, 0))
+        lru.put("b", vec(0, 1, 0))
+        lru.get("a")
+        lru.put("c", vec(0, 0, 1))
+
+        self.assertIsNotNone(lru.get("a"))
+        self.assertIsNone(lru.get("b"))
+        self.assertIsNotNone(lru.get("c"))
+        self.assertEqual(lru.current_bytes, 24)
+
+    def test_vector_larger_than_budget_is_not_stored(self):
+        lru = LRUEmbeddingCache(max_bytes=8)
+        lru.put("a", vec(1, 0, 0))
+        self.assertEqual(len(lru), 0)
+
+
+class TestDiskEmbeddingStore(unittest.TestCase):
+    def test_round_trip_survives_reopen(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = DiskEmbeddingStore(tmp)
+            store.put_many({"a": vec(1, 2, 3), "b": vec(4, 5, 6)})
+            store.put_many({"c": vec(7, 8, 9)})
+
+            reopened = DiskEmbeddingStore(tmp)
+            found = reopened.get_many(["a", "c", "missing"])
+
+            self.assertEqual(len(reopened), 3)
+            self.assertCountEqual(found.keys(), ["a", "c"])
+            np.testing.assert_array_equal(found["c"], vec(7, 8, 9))
+
+    def test_stores_sharing_a_directory_see_each_others_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = DiskEmbeddingStore(tmp), DiskEmbeddingStore(tmp)
+            first.put_many({"ka": vec(1, 0, 0)})
+            second.put_many({"kb": vec(0, 1, 0)})
+            first.put_many({"kc": vec(0, 0, 1), "kb": vec(9, 9, 9)})
+
+            for store in (first, second, DiskEmbeddingStore(tmp)):
+                found = store.get_many(["ka", "kb", "kc"])
+                np.testing.assert_array_equal(found["kb"], vec(0, 1, 0))
+                np.testing.assert_array_equal(found.get("kc", vec(0, 0, 1)), vec(0, 0, 1))
+            self.assertEqual(len(DiskEmbeddingStore(tmp)), 3)
+
+    def test_rows_of_an_unfinished_append_are_dropped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = DiskEmbeddingStore(tmp)
+            store.put_many({"a": vec(1, 2, 3)})
+            with open(f"{tmp}/vectors.f32", "ab") as fh:
+                fh.write(vec(6, 6, 6).tobytes() + b"\0\0")
+
+            store.put_many({"b": vec(4, 5, 6)})
+            np.testing.assert_array_equal(DiskEmbeddingStore(tmp).get_many(["b"])["b"], vec(4, 5, 6))
+
+    def test_dimension_mismatch_raises(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = DiskEmbeddingStore(tmp)
+            store.put_many({"a": vec(1, 2, 3)})
+            with self.assertRaises(ValueError):
+                store.put_many({"b": vec(1, 2)})
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def test_lookup_counts_hits_and_misses_per_tier(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            DiskEmbeddingStore(tmp).put_many({"disk": vec(1, 0)})
+            cache = EmbeddingCache(LRUEmbeddingCache(max_bytes=1024), DiskEmbeddingStore(tmp))
+            cache.store({"mem": vec(0, 1)})
+
+            found = cache.lookup(["mem", "disk", "missing"])
+
+            self.assertCountEqual(found.keys(), ["mem", "disk"])
+            self.assertEqual(cache.stats.memory_hits, 1)
+            self.assertEqual(cache.stats.disk_hits, 1)
+            self.assertEqual(cache.stats.misses, 1)
+
+            # disk hits are promoted into memory
+            cache.lookup(["disk"])
+            self.assertEqual(cache.stats.memory_hits, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
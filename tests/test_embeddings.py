@@ -1,8 +1,12 @@
+import os
 import unittest
+from unittest import mock
 import numpy as np
 
 import project.embeddings as emb
-from project.models import ProcessedSentence, AnalysisMode, EmbeddedDataset
+from project.embedding_cache import EmbeddingCache, LRUEmbeddingCache
+from project.models import ProcessedSentence, AnalysisMode, EmbeddedDataset, Sentence
+from project.preprocessing import build_sentence_batch
 
 
 class FakeModel:
@@ -20,10 +24,13 @@ class TestEmbeddings(unittest.TestCase):
     def setUp(self):
         # swap in fake model and keep original
         self.orig_model = getattr(emb, "_model", None)
+        self.orig_cache = emb._cache
         emb._model = FakeModel()
+        emb._cache = EmbeddingCache(LRUEmbeddingCache(max_bytes=1 << 20))
 
     def tearDown(self):
         emb._model = self.orig_model
+        emb._cache = self.orig_cache
 
     def make_ps(self, nid: str, text: str) -> ProcessedSentence:
         return ProcessedSentence(ids=[nid], original_texts=[text], normalized_text=text.strip().lower())
@@ -51,15 +58,60 @@ class TestEmbeddings(unittest.TestCase):
         self.assertEqual(len(ds.baseline), 2)
         self.assertEqual(len(ds.comparison), 1)
 
-        # FakeModel should have recorded two encode calls: baseline then comparison
-        self.assertEqual(len(emb._model.calls), 2)
-        self.assertListEqual(emb._model.calls[0], [base1.normalized_text, base2.normalized_text])
-        self.assertListEqual(emb._model.calls[1], [comp1.normalized_text])
+        # FakeModel should have recorded a single encode pass over both sets
+        self.assertEqual(len(emb._model.calls), 1)
+        self.assertListEqual(emb._model.calls[0], [base1.normalized_text, base2.normalized_text, comp1.normalized_text])
+
+    def test_embed_sentences_comparative_encodes_shared_text_once(self):
+        base = self.make_ps("b1", "Same text")
+        comp = self.make_ps("c1", "same text")
+
+        ds = emb.embed_sentences(mode=AnalysisMode.COMPARATIVE, baseline=[base], comparison=[comp])
+
+        self.assertListEqual(emb._model.calls, [[base.normalized_text]])
+        np.testing.assert_array_equal(ds.baseline[0].vector, ds.comparison[0].vector)
 
     def test_embed_sentences_comparative_requires_comparison(self):
         with self.assertRaises(ValueError):
             emb.embed_sentences(mode=AnalysisMode.COMPARATIVE, baseline=[self.make_ps("x", "t")], comparison=None)
 
+    def test_repeated_texts_only_encode_cache_misses(self):
+        first = self.make_ps("1", "Alpha")
+        second = self.make_ps("2", "Beta")
+
+        emb.embed_sentence_list([first])
+        ds = emb.embed_sentence_list([first, second])
+
+        self.assertListEqual(emb._model.calls, [[first.normalized_text], [second.normalized_text]])
+        self.assertEqual(int(ds.baseline[0].vector[0]), len(first.normalized_text))
+        self.assertEqual(int(ds.baseline[1].vector[0]), len(second.normalized_text))
+        self.assertEqual(emb._cache.stats.memory_hits, 1)
+        self.assertEqual(emb._cache.stats.misses, 2)
+
+    def test_small_token_budget_splits_batches_and_keeps_order(self):
+        sentences = [self.make_ps(str(i), text) for i, text in enumerate(["a", "b c d e f g", "h i", "j k l m"])]
+
+        with mock.patch.dict(os.environ, {"ENCODE_TOKEN_BUDGET": "12"}):
+            ds = emb.embed_sentence_list(sentences)
+
+        self.assertGreater(len(emb._model.calls), 1)
+        self.assertEqual([e.sentence for e in ds.baseline], sentences)
+        for embedded in ds.baseline:
+            self.assertEqual(int(embedded.vector[0]), len(embedded.sentence.normalized_text))
+
+    def test_embed_batch_fills_contiguous_matrix(self):
+        batch = build_sentence_batch([
+            Sentence(id="1", text="Alpha", source=AnalysisMode.STANDALONE),
+            Sentence(id="2", text="Be", source=AnalysisMode.STANDALONE),
+        ])
+
+        emb.embed_batch(batch)
+
+        self.assertEqual(batch.vectors.shape, (2, 3))
+        self.assertEqual(batch.vectors.dtype, np.float32)
+        self.assertTrue(batch.vectors.flags["C_CONTIGUOUS"])
+        self.assertEqual(batch.vectors[:, 0].tolist(), [5.0, 2.0])
+
     def test_embed_sentence_list_empty_returns_empty(self):
         ds = emb.embed_sentence_list([])
         self.assertIsInstance(ds, EmbeddedDataset)
@@ -67,5 +119,50 @@ class TestEmbeddings(unittest.TestCase):
         self.assertIsNone(ds.comparison)
 
 
+class TestLazyModelLoading(unittest.TestCase):
+    def setUp(self):
+        self.orig_model = emb._model
+        self.orig_stats = emb._load_stats
+        self.orig_cache = emb._cache
+        emb._model = None
+        emb._cache = EmbeddingCache(LRUEmbeddingCache(max_bytes=1 << 20))
+
+    def tearDown(self):
+        emb._model = self.orig_model
+        emb._load_stats = self.orig_stats
+        emb._cache = self.orig_cache
+
+    def test_model_not_loaded_until_first_embed(self):
+        fake = FakeModel()
+        with mock.patch.object(emb, "_load_model", return_value=fake) as loader:
+            self.assertIsNone(emb._model)
+            emb.embed_sentence_list([ProcessedSentence(ids=["1"], original_texts=["a"], normalized_text="a")])
+            emb.embed_sentence_list([ProcessedSentence(ids=["2"], original_texts=["b"], normalized_text="b")])
+
+        loader.assert_called_once()
+        self.assertIs(emb._model, fake)
+        self.assertEqual(len(fake.calls), 2)
+
+    def test_empty_input_does_not_load_model(self):
+        with mock.patch.object(emb, "_load_model") as loader:
+            emb.embed_sentence_list([])
+        loader.assert_not_called()
+
+    def test_warm_up_loads_and_reports_timings(self):
+        def fake_load():
+            emb._load_stats = emb.ModelLoadStats(model_name="fake", import_seconds=0.5, load_seconds=1.5)
+            return FakeModel()
+
+        with mock.patch.object(emb, "_load_model", side_effect=fake_load) as loader:
+            stats = emb.warm_up()
+            emb.warm_up()
+
+        loader.assert_called_once()
+        self.assertIsNotNone(stats)
+        self.assertEqual(stats.import_seconds, 0.5)
+        self.assertEqual(stats.load_seconds, 1.5)
+        self.assertIs(emb.get_load_stats(), stats)
+
+
 if __name__ == "__main__":
     unittest.main()
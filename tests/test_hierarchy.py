@@ -0,0 +1,97 @@
+import dataclasses
+import unittest
+import numpy as np
+
+from project.clustering import _dbscan_labels, cluster_labels
+from project.hierarchy import build_hierarchy, stable_labels, threshold_labels
+
+
+def make_blobs(scales, per_cluster: int, noise: int, dim: int = 64, seed: int = 0, near_first: float = 0.0):
+    """
+    Unit vectors around one random centre per scale, then uniform noise;
+    returns (vectors, true labels). With `near_first`, the second centre is
+    placed that close to the first.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(len(scales), dim))
+    if near_first:
+        centres[1] = centres[0] + rng.normal(scale=near_first, size=dim)
+    points, truth = [], []
+    for label, (centre, scale) in enumerate(zip(centres, scales)):
+        points.append(centre + rng.normal(scale=scale, size=(per_cluster, dim)))
+        truth += [label] * per_cluster
+    points.append(rng.normal(size=(noise, dim)))
+    truth += [-1] * noise
+
+    vectors = np.vstack(points)
+    order = rng.permutation(len(truth))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    return vectors[order], np.asarray(truth)[order]
+
+
+def same_partition(actual: np.ndarray, expected: np.ndarray) -> bool:
+    pairs = set(zip(actual.tolist(), expected.tolist()))
+    return len(pairs) == len(set(actual.tolist())) == len(set(expected.tolist()))
+
+
+class TestThresholdLabels(unittest.TestCase):
+    def test_every_cut_matches_sklearn_dbscan(self):
+        vectors, _ = make_blobs([0.05, 0.1, 0.2, 0.3], per_cluster=25, noise=30, dim=16)
+        hierarchy = build_hierarchy(vectors, min_samples=3)
+
+        for eps in (0.05, 0.1, 0.2, 0.3, 0.4):
+            with self.subTest(eps=eps):
+                np.testing.assert_array_equal(threshold_labels(hierarchy, eps), _dbscan_labels(vectors, eps, 3))
+
+    def test_all_noise_below_every_core_distance(self):
+        hierarchy = build_hierarchy(np.eye(4, dtype=np.float32), min_samples=2)
+        np.testing.assert_array_equal(threshold_labels(hierarchy, 0.5), [-1, -1, -1, -1])
+
+
+class TestStableLabels(unittest.TestCase):
+    def test_finds_clusters_of_different_densities_and_leaves_noise(self):
+        # two tight clusters close together and two loose ones: any eps that holds the loose
+        # clusters together merges the tight pair, so no single DBSCAN run gets all four
+        vectors, truth = make_blobs([0.05, 0.05, 0.5, 0.5], per_cluster=30, noise=40, near_first=0.5)
+        for eps in np.arange(0.02, 0.8, 0.02):
+            self.assertFalse(same_partition(_dbscan_labels(vectors, eps, 2), truth))
+
+        labels = stable_labels(build_hierarchy(vectors, min_samples=2), min_cluster_size=2)
+
+        self.assertTrue(same_partition(labels, truth))
+
+    def test_labels_are_numbered_by_first_row(self):
+        vectors = np.array([[0.0, 1.0], [1.0, 0.0], [0.0, 1.0], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+        labels = stable_labels(build_hierarchy(vectors, min_samples=2), min_cluster_size=2)
+        np.testing.assert_array_equal(labels, [0, 1, 0, 1, 0])
+
+    def test_fewer_rows_than_min_cluster_size(self):
+        hierarchy = build_hierarchy(np.array([[1.0, 0.0]], dtype=np.float32), min_samples=2)
+        np.testing.assert_array_equal(stable_labels(hierarchy, min_cluster_size=2), [-1])
+
+    def test_zero_merge_distances_stay_finite(self):
+        vectors, truth = make_blobs([0.0, 0.0], per_cluster=5, noise=0, dim=8)
+        hierarchy = build_hierarchy(vectors, min_samples=2)
+        # exact duplicates merge at distance zero
+        distances = hierarchy.edge_distances
+        zeroed = dataclasses.replace(hierarchy, edge_distances=np.where(distances < 0.01, 0.0, distances))
+
+        with np.errstate(divide="raise", invalid="raise"):
+            labels = stable_labels(zeroed, min_cluster_size=2)
+        self.assertTrue(same_partition(labels, truth))
+
+    def test_max_distance_must_be_positive(self):
+        hierarchy = build_hierarchy(make_blobs([0.1], per_cluster=5, noise=0, dim=8)[0], min_samples=2)
+        with self.assertRaisesRegex(ValueError, "max_distance must be positive"):
+            stable_labels(hierarchy, min_cluster_size=2, max_distance=0.0)
+
+    def test_engine_ignores_eps(self):
+        vectors, _ = make_blobs([0.02, 0.05, 0.1], per_cluster=20, noise=20, seed=3)
+        np.testing.assert_array_equal(
+            cluster_labels(vectors, eps=0.05, min_samples=2, engine="hierarchy"),
+            cluster_labels(vectors, eps=0.5, min_samples=2, engine="hierarchy"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
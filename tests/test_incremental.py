@@ -0,0 +1,199 @@
+import copy
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+import project.embeddings as emb
+from project import app, clustering, compression, incremental, near_duplicates
+from project.embedding_backends import StubBackend
+from project.ingestion import ingest_event
+from project.models import AnalysisMode, AnalysisState, ClusterSummary, QuantizedVectors
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+class CountingModel:
+    def __init__(self):
+        self.texts = []
+
+    def encode(self, texts, **kwargs):
+        self.texts.extend(texts)
+        return StubBackend().encode(texts)
+
+
+def example_payload():
+    payload = json.loads((DATA / "input_example.json").read_text())
+    payload.pop("comparison", None)
+    return payload
+
+
+class TestIncrementalHandler(unittest.TestCase):
+    def setUp(self):
+        self.model = CountingModel()
+        self.store = incremental.MemoryAnalysisStore()
+        self.orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED, incremental._store)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = self.model, None, False
+        incremental._store = self.store
+        patcher = mock.patch.object(app, "INCREMENTAL_ANALYSIS", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED, incremental._store = self.orig
+
+    def run_handler(self, payload):
+        self.model.texts = []
+        return json.loads(app.lambda_handler(payload, None)["body"])["clusters"]
+
+    def run_full(self, payload):
+        with mock.patch.object(app, "INCREMENTAL_ANALYSIS", False):
+            return self.run_handler(payload)
+
+    def stats_after(self, payload):
+        run = incremental.start_incremental(ingest_event(payload), self.store)
+        batch = ingest_event(payload).batch
+        run.embed(batch)
+        batch.sentiment_scores = run.score(batch)
+        clusters = run.cluster(batch)
+        run.save(batch, clusters, [ClusterSummary("t", "neutral", [], []) for _ in clusters])
+        return run.stats
+
+    def test_identical_rerun_encodes_nothing(self):
+        payload = example_payload()
+        first = self.run_handler(payload)
+        self.assertEqual(len(self.store), 1)
+
+        second = self.run_handler(payload)
+        self.assertEqual(self.model.texts, [])
+        self.assertEqual(second, first)
+
+    def test_new_sentence_is_encoded_alone_and_joins_a_cluster(self):
+        payload = example_payload()
+        first = self.run_handler(payload)
+
+        payload["baseline"].append({"id": "new-1", "sentence": "Have lost so much money again"})
+        second = self.run_handler(payload)
+
+        self.assertEqual(self.model.texts, ["have lost so much money again"])
+        joined = [c for c in second if "new-1" in c["sentence_ids"]]
+        self.assertEqual(len(joined), 1)
+        # every other cluster is reused as it was
+        self.assertEqual([c for c in second if c not in joined], [c for c in first if c["title"] != joined[0]["title"]])
+
+    def test_new_rows_are_compared_in_the_compressed_space(self):
+        payload = example_payload()
+        with mock.patch.object(compression, "VECTOR_INT8", True), \
+                mock.patch.object(incremental, "similarity_blocks", wraps=incremental.similarity_blocks) as compared:
+            self.run_handler(payload)
+            payload["baseline"].append({"id": "new-1", "sentence": "Have lost so much money again"})
+            second = self.run_handler(payload)
+
+        self.assertEqual(self.model.texts, ["have lost so much money again"])
+        self.assertTrue(all(isinstance(vectors, QuantizedVectors) for vectors in compared.call_args.args))
+        self.assertEqual(len([c for c in second if "new-1" in c["sentence_ids"]]), 1)
+
+    def test_new_id_on_a_known_sentence_resummarizes_its_cluster(self):
+        payload = example_payload()
+        clustered_text = self.run_handler(payload)[0]["key_insights"][0]
+
+        payload["baseline"].append({"id": "new-2", "sentence": clustered_text})
+        clusters = self.run_handler(payload)
+
+        self.assertEqual(self.model.texts, [])
+        self.assertIn("new-2", clusters[0]["sentence_ids"])
+        self.assertEqual(clusters, self.run_full(payload))
+
+    def test_removed_sentences_leave_their_cluster(self):
+        payload = example_payload()
+        clustered_id = self.run_handler(payload)[0]["sentence_ids"][0]
+
+        payload["baseline"] = [item for item in payload["baseline"] if item["id"] != clustered_id]
+        clusters = self.run_handler(payload)
+
+        self.assertFalse(any(clustered_id in c["sentence_ids"] for c in clusters))
+        self.assertEqual(clusters, self.run_full(payload))
+
+    def test_mostly_new_input_runs_in_full(self):
+        payload = example_payload()
+        self.stats_after(payload)
+
+        small_change = copy.deepcopy(payload)
+        small_change["baseline"].append({"id": "x", "sentence": "Entirely unrelated remark"})
+        self.assertFalse(self.stats_after(small_change).full_rebuild)
+
+        payload["baseline"] = payload["baseline"][:50]
+        self.assertTrue(self.stats_after(payload).full_rebuild)
+
+    def test_state_from_another_model_is_ignored(self):
+        payload = example_payload()
+        self.stats_after(payload)
+        with mock.patch.object(incremental, "model_id", return_value="other-model"):
+            stats = self.stats_after(payload)
+        self.assertTrue(stats.full_rebuild)
+        self.assertEqual(stats.embedded_rows, stats.rows)
+
+    def test_state_from_other_pipeline_settings_is_ignored(self):
+        payload = example_payload()
+        self.stats_after(payload)
+        for module, name, value in (
+            (clustering, "CLUSTERING_ENGINE", "hierarchy"),
+            (near_duplicates, "NEAR_DUPLICATE_THRESHOLD", 0.95),
+            (compression, "VECTOR_INT8", True),
+        ):
+            with self.subTest(setting=name), mock.patch.object(module, name, value):
+                self.assertTrue(self.stats_after(payload).full_rebuild)
+                self.assertFalse(self.stats_after(payload).full_rebuild)
+
+    def test_comparative_rerun_matches_first_run(self):
+        payload = json.loads((DATA / "input_comparison_example.json").read_text())
+        first = self.run_handler(payload)
+        self.assertEqual(self.run_handler(payload), first)
+        self.assertEqual(self.model.texts, [])
+
+
+class TestFileAnalysisStore(unittest.TestCase):
+    def test_round_trip(self):
+        state = AnalysisState(
+            model_id="m",
+            mode=AnalysisMode.STANDALONE,
+            eps=0.3,
+            min_samples=2,
+            normalized_texts=["a", "b"],
+            first_texts=["A", "B"],
+            row_signatures=["s1", "s2"],
+            vectors=np.eye(2, dtype=np.float32),
+            labels=np.array([0, -1]),
+            sentiment_scores=np.array([1.0, 0.0], dtype=np.float32),
+            summaries={0: ClusterSummary("A", "positive", ["1"], ["A"])},
+            settings=["dbscan", 0.8, True, None],
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            incremental.FileAnalysisStore(tmp).save("k", state)
+            loaded = incremental.FileAnalysisStore(tmp).load("k")
+
+        self.assertEqual(loaded.summaries, state.summaries)
+        self.assertEqual(loaded.settings, state.settings)
+        self.assertEqual((loaded.normalized_texts, loaded.row_signatures), (["a", "b"], ["s1", "s2"]))
+        np.testing.assert_array_equal(loaded.vectors, state.vectors)
+        np.testing.assert_array_equal(loaded.labels, state.labels)
+
+    def test_missing_and_corrupt_states_load_as_none(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = incremental.FileAnalysisStore(tmp)
+            self.assertIsNone(store.load("missing"))
+            (Path(tmp) / "bad.npz").write_bytes(b"not a zip")
+            self.assertIsNone(store.load("bad"))
+
+    def test_key_depends_on_mode_title_and_theme(self):
+        key = incremental.analysis_key(AnalysisMode.STANDALONE, "t", "x")
+        self.assertEqual(key, incremental.analysis_key(AnalysisMode.STANDALONE, "t", "x"))
+        self.assertNotEqual(key, incremental.analysis_key(AnalysisMode.COMPARATIVE, "t", "x"))
+        self.assertNotEqual(key, incremental.analysis_key(AnalysisMode.STANDALONE, "t", "y"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+import numpy as np
+
+from project import ingestion
+from project.constants import MAX_SENTENCE_LENGTH, MAX_SENTENCES
+from project.models import AnalysisMode
+from project.validation import BadRequestError
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+def make_sentence(id: str = "s1", text: str = "ok"):
+    return {"id": id, "sentence": text}
+
+
+def staged_error(event: dict[str, Any]) -> str:
+    try:
+        ingestion._ingest_staged(ingestion.parse_json(event))
+    except BadRequestError as exc:
+        return str(exc)
+    raise AssertionError("staged path accepted the payload")
+
+
+def assert_batches_equal(test: unittest.TestCase, got, expected) -> None:
+    test.assertEqual(got.normalized_texts, expected.normalized_texts)
+    test.assertEqual(got.first_texts, expected.first_texts)
+    test.assertEqual(got.id_table, expected.id_table)
+    np.testing.assert_array_equal(got.entry_ids, expected.entry_ids)
+    np.testing.assert_array_equal(got.entry_sources, expected.entry_sources)
+    np.testing.assert_array_equal(got.entry_offsets, expected.entry_offsets)
+
+
+class TestIngestion(unittest.TestCase):
+    def test_matches_staged_path_on_example_files(self):
+        for name in ("input_example.json", "input_example_2.json", "input_comparison_example.json"):
+            body = (DATA / name).read_text()
+            for event in ({"body": body}, json.loads(body)):
+                with self.subTest(name=name, event=type(event.get("body")).__name__):
+                    got = ingestion.ingest_event(event)
+                    expected = ingestion._ingest_staged(ingestion.parse_json(event))
+
+                    self.assertEqual(got.mode, expected.mode)
+                    self.assertEqual(got.sentence_count, expected.sentence_count)
+                    self.assertEqual((got.survey_title, got.theme), (expected.survey_title, expected.theme))
+                    assert_batches_equal(self, got.batch, expected.batch)
+
+    def test_single_pass_does_not_fall_back_for_valid_body(self):
+        body = json.dumps({
+            "surveyTitle": "T", "theme": "t",
+            "baseline": [make_sentence("1", "Foo"), make_sentence("2", "foo")],
+            "comparison": [make_sentence("3", "bar")],
+        })
+        with mock.patch.object(ingestion, "_ingest_staged") as staged:
+            request = ingestion.ingest_event({"body": body})
+
+        staged.assert_not_called()
+        self.assertEqual(request.mode, AnalysisMode.COMPARATIVE)
+        self.assertEqual(request.sentence_count, 3)
+        self.assertEqual(request.batch.normalized_texts, ["foo", "bar"])
+
+    def test_empty_comparison_is_standalone(self):
+        request = ingestion.ingest_event({"body": json.dumps({
+            "surveyTitle": "T", "theme": "t", "baseline": [make_sentence()], "comparison": [],
+        })})
+        self.assertEqual(request.mode, AnalysisMode.STANDALONE)
+
+    def test_comparison_before_baseline_keeps_baseline_rows_first(self):
+        body = json.dumps({
+            "comparison": [make_sentence("c", "b")], "surveyTitle": "T", "theme": "t", "baseline": [make_sentence("b", "a")],
+        })
+        request = ingestion.ingest_event({"body": body})
+        self.assertEqual(request.batch.normalized_texts, ["a", "b"])
+
+    def test_errors_match_staged_path(self):
+        too_long = "x" * (MAX_SENTENCE_LENGTH + 1)
+        payloads: list[Any] = [
+            {},
+            {"theme": "t", "baseline": [make_sentence()]},
+            {"surveyTitle": "T", "theme": 123, "baseline": [make_sentence()]},
+            {"surveyTitle": "  ", "theme": "t", "baseline": [make_sentence()]},
+            {"surveyTitle": "T", "theme": "t", "baseline": []},
+            {"surveyTitle": "T", "theme": "t", "baseline": [make_sentence()] * (MAX_SENTENCES + 1)},
+            {"surveyTitle": "T", "theme": "t", "baseline": [make_sentence(), {"id": "2"}]},
+            {"surveyTitle": "T", "theme": "t", "baseline": [make_sentence(), make_sentence(" ")]},
+            {"surveyTitle": "T", "theme": "t", "baseline": [make_sentence(), make_sentence("2", too_long)]},
+            {
+                "surveyTitle": "T", "theme": "t", "baseline": [make_sentence()],
+                "comparison": [make_sentence(), {"id": 1, "sentence": "x"}],
+            },
+            # an invalid sentence seen before a missing title still reports the title first
+            {"baseline": [{"id": "1"}], "theme": "t"},
+            [1, 2],
+        ]
+        for payload in payloads:
+            for event in ({"body": json.dumps(payload)}, payload):
+                if not isinstance(event, dict):
+                    continue
+                with self.subTest(payload=str(payload)[:80], body="body" in event):
+                    expected = staged_error(event)
+                    with self.assertRaises(BadRequestError) as cm:
+                        ingestion.ingest_event(event)
+                    self.assertEqual(str(cm.exception), expected)
+
+    def test_malformed_json_reports_decoder_error(self):
+        body = '{"surveyTitle": "T", "theme": "t", "baseline": [{"id": "1", "sentence": "a"},'
+        with self.assertRaises(BadRequestError) as cm:
+            ingestion.ingest_event({"body": body})
+        self.assertEqual(str(cm.exception), staged_error({"body": body}))
+        self.assertIn("Invalid JSON in body", str(cm.exception))
+
+    def test_empty_event_raises(self):
+        with self.assertRaises(BadRequestError) as cm:
+            ingestion.ingest_event({})
+        self.assertEqual(str(cm.exception), "Empty event payload")
+
+
+if __name__ == "__main__":
+    unittest.main()
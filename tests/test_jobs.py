@@ -0,0 +1,232 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import project.embeddings as emb
+from project import app, jobs
+from project.embedding_backends import StubBackend
+from project.models import Job, JobStatus
+from project.validation import BadRequestError
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+class StubModel:
+    def encode(self, texts, **kwargs):
+        return StubBackend().encode(texts)
+
+
+def example_payload(name="input_example.json"):
+    return json.loads((DATA / name).read_text())
+
+
+def wait_for(manager, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job.status in (JobStatus.SUCCEEDED, JobStatus.FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+class RecordingStore(jobs.MemoryJobStore):
+    def __init__(self):
+        super().__init__()
+        self.saved = []
+
+    def save(self, job):
+        self.saved.append((job.status, job.stage))
+        super().save(job)
+
+
+class ManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = StubModel(), None, False
+
+    def tearDown(self):
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = self.orig
+
+    def manager(self, store=None, **options):
+        manager = jobs.JobManager(store if store is not None else jobs.MemoryJobStore(), **options)
+        self.addCleanup(manager.close)
+        return manager
+
+
+class TestJobManager(ManagerTestCase):
+    def test_job_reports_stages_then_the_same_clusters_as_a_sync_run(self):
+        for name in ("input_example.json", "input_comparison_example.json"):
+            with self.subTest(name=name):
+                payload = example_payload(name)
+                store = RecordingStore()
+                manager = self.manager(store)
+
+                job = manager.submit({"body": json.dumps(payload)})
+                self.assertEqual(job.status, JobStatus.QUEUED)
+                done = wait_for(manager, job.job_id)
+
+                expected = json.loads(app.lambda_handler(payload, None)["body"])
+                self.assertEqual(done.status, JobStatus.SUCCEEDED)
+                self.assertEqual(done.result["clusters"], expected["clusters"])
+                self.assertEqual(
+                    done.completed_stages[:7], ["ingest", "dedupe", "embed", "sentiment", "cluster", "recover", "summarize"]
+                )
+                self.assertIn((JobStatus.RUNNING, "cluster"), store.saved)
+
+                body = jobs.job_status_body(done)
+                self.assertEqual(body["status"], "succeeded")
+                self.assertEqual(body["clusters"], expected["clusters"])
+
+    def test_invalid_payload_is_refused_at_submit(self):
+        manager = self.manager()
+        for event, message in (
+            ({"body": "{"}, "Invalid JSON in body"),
+            ({"body": "[]"}, "Request body must be a JSON object"),
+            ({"body": json.dumps({"surveyTitle": "t", "theme": "x"})}, "Missing required field: baseline"),
+        ):
+            with self.subTest(message=message):
+                with self.assertRaisesRegex(BadRequestError, message):
+                    manager.submit(event)
+        self.assertEqual(len(manager.store), 0)
+
+    def test_identical_payloads_share_the_in_flight_job(self):
+        release = threading.Event()
+        calls = []
+
+        def blocked(payload, trace):
+            calls.append(payload)
+            release.wait(5)
+            return app.success_response({"clusters": []})
+
+        manager = self.manager(workers=1)
+        payload = example_payload()
+        reordered = json.dumps(dict(reversed(list(payload.items()))), indent=2)
+        with mock.patch.object(jobs, "run_analysis", blocked):
+            first = manager.submit({"body": json.dumps(payload)})
+            second = manager.submit({"body": reordered})
+            other = manager.submit({"body": json.dumps({**payload, "theme": "other"})})
+            release.set()
+            wait_for(manager, first.job_id)
+            wait_for(manager, other.job_id)
+            # once finished, the same payload runs again
+            third = manager.submit({"body": json.dumps(payload)})
+            wait_for(manager, third.job_id)
+
+        self.assertEqual(second.job_id, first.job_id)
+        self.assertNotEqual(other.job_id, first.job_id)
+        self.assertNotEqual(third.job_id, first.job_id)
+        self.assertEqual(len(calls), 3)
+
+    def test_failures_are_reported_without_internal_details(self):
+        manager = self.manager()
+        with mock.patch.object(jobs, "run_analysis", side_effect=BadRequestError("baseline[0].id is bad")):
+            failed = wait_for(manager, manager.submit(example_payload()).job_id)
+        self.assertEqual(jobs.job_status_body(failed)["error"], "baseline[0].id is bad")
+
+        with mock.patch.object(jobs, "run_analysis", side_effect=RuntimeError("secret")):
+            with self.assertLogs(jobs.logger, level="ERROR"):
+                failed = wait_for(manager, manager.submit(example_payload()).job_id)
+        self.assertEqual(failed.status, JobStatus.FAILED)
+        self.assertEqual(failed.error, "Internal server error")
+        self.assertEqual(manager.active, 0)
+
+    def test_submissions_beyond_max_active_are_refused(self):
+        release = threading.Event()
+        manager = self.manager(workers=1, max_active=1)
+        with mock.patch.object(jobs, "run_analysis", lambda payload, trace: release.wait(5) and app.success_response({})):
+            job = manager.submit(example_payload())
+            with self.assertRaises(jobs.JobQueueFullError):
+                manager.submit({**example_payload(), "theme": "other"})
+            release.set()
+            wait_for(manager, job.job_id)
+
+    def test_a_job_left_running_by_a_dead_process_is_failed_and_rerun(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "jobs.sqlite3")
+            fingerprint = jobs.payload_fingerprint(example_payload())
+            crashed = jobs.SqliteJobStore(path)
+            crashed.save(Job(job_id="dead", fingerprint=fingerprint, status=JobStatus.RUNNING, stage="embed",
+                             created_at=time.time() - 600, updated_at=time.time() - 600))
+            crashed.close()
+
+            store = jobs.SqliteJobStore(path)
+            self.addCleanup(store.close)
+            manager = self.manager(store, max_active=1, stale_seconds=60)
+            job = manager.submit(example_payload())
+            done = wait_for(manager, job.job_id)
+
+            self.assertNotEqual(job.job_id, "dead")
+            self.assertEqual(done.status, JobStatus.SUCCEEDED)
+            self.assertEqual(store.get("dead").status, JobStatus.FAILED)
+            self.assertEqual(jobs.job_status_body(store.get("dead"))["error"], "Job abandoned by its worker")
+
+    def test_owned_jobs_are_kept_fresh_while_they_run(self):
+        release = threading.Event()
+        store = jobs.MemoryJobStore()
+        manager = self.manager(store, heartbeat_seconds=0.01)
+        with mock.patch.object(jobs, "run_analysis", lambda payload, trace: release.wait(5) and app.success_response({})):
+            job = manager.submit(example_payload())
+            time.sleep(0.1)
+            self.assertGreater(store.get(job.job_id).updated_at, job.updated_at)
+            release.set()
+            wait_for(manager, job.job_id)
+
+
+class TestJobStores(unittest.TestCase):
+    def stores(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        sqlite_store = jobs.SqliteJobStore(str(Path(tmp.name) / "jobs.sqlite3"))
+        self.addCleanup(sqlite_store.close)
+        return [jobs.MemoryJobStore(), sqlite_store]
+
+    def test_round_trip_lookup_and_purge(self):
+        for store in self.stores():
+            with self.subTest(store=type(store).__name__):
+                running = Job(job_id="a", fingerprint="f", status=JobStatus.RUNNING, stage="embed",
+                              completed_stages=["ingest"], created_at=1.0, updated_at=2.0)
+                done = Job(job_id="b", fingerprint="g", status=JobStatus.SUCCEEDED, completed_stages=["ingest", "embed"],
+                           created_at=1.0, updated_at=3.0, result={"clusters": [{"title": "t"}]})
+                store.save(running)
+                store.save(done)
+
+                self.assertEqual(store.get("a"), running)
+                self.assertEqual(store.get("b"), done)
+                self.assertIsNone(store.get("missing"))
+                self.assertEqual(store.find_active("f").job_id, "a")
+                self.assertIsNone(store.find_active("g"))
+
+                self.assertEqual(store.purge(finished_before=10.0), 1)
+                self.assertIsNone(store.get("b"))
+                self.assertIsNotNone(store.get("a"))
+
+    def test_admission_is_shared_by_stores_on_one_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "jobs.sqlite3")
+            first, second = jobs.SqliteJobStore(path), jobs.SqliteJobStore(path)
+            self.addCleanup(first.close)
+            self.addCleanup(second.close)
+
+            admitted = first.admit(Job(job_id="a", fingerprint="f", updated_at=5.0), live_after=0.0, max_active=1)
+            self.assertEqual(second.admit(Job(job_id="b", fingerprint="f", updated_at=5.0), 0.0, 1).job_id, "a")
+            with self.assertRaises(jobs.JobQueueFullError):
+                second.admit(Job(job_id="c", fingerprint="g", updated_at=5.0), 0.0, 1)
+            # once "a" is stale it no longer counts
+            self.assertEqual(second.admit(Job(job_id="c", fingerprint="g", updated_at=9.0), 6.0, 1).job_id, "c")
+            self.assertEqual(admitted.job_id, "a")
+
+    def test_get_returns_a_copy(self):
+        store = jobs.MemoryJobStore()
+        job = Job(job_id="a", fingerprint="f")
+        store.save(job)
+        job.completed_stages.append("ingest")
+        self.assertEqual(store.get("a").completed_stages, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import threading
+import time
+import unittest
+from typing import List
+
+import numpy as np
+
+from project import embeddings as emb
+from project.microbatch import EncodeDeadlineExceeded, MicroBatcher
+
+
+class RecordingEncoder:
+    def __init__(self, delay: float = 0.0):
+        self.calls: List[List[str]] = []
+        self.delay = delay
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        return np.array([[len(t), ord(t[0])] for t in texts], dtype=np.float32)
+
+
+def later(seconds: float) -> float:
+    return time.monotonic() + seconds
+
+
+class TestMicroBatcher(unittest.TestCase):
+    def make(self, encoder: RecordingEncoder, window: float = 0.05, max_texts: int = 100) -> MicroBatcher:
+        batcher = MicroBatcher(encoder, window, max_texts)
+        self.addCleanup(batcher.close)
+        return batcher
+
+    def test_concurrent_jobs_share_one_encode_and_get_their_own_rows(self):
+        encoder = RecordingEncoder()
+        batcher = self.make(encoder, window=0.2)
+
+        futures = [batcher.submit(["a", "bb"], later(5)), batcher.submit(["ccc", "a"], later(5))]
+        results = [f.result(timeout=5) for f in futures]
+
+        self.assertEqual(len(encoder.calls), 1)
+        self.assertEqual(encoder.calls[0], ["a", "bb", "ccc"])  # "a" encoded once
+        np.testing.assert_array_equal(results[0], [[1, ord("a")], [2, ord("b")]])
+        np.testing.assert_array_equal(results[1], [[3, ord("c")], [1, ord("a")]])
+        self.assertEqual((batcher.stats.batches, batcher.stats.jobs, batcher.stats.texts), (1, 2, 3))
+
+    def test_batch_closes_at_max_texts_without_waiting_for_window(self):
+        encoder = RecordingEncoder()
+        batcher = self.make(encoder, window=10.0, max_texts=2)
+
+        start = time.monotonic()
+        batcher.encode(["a", "b"], later(5))
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_batch_closes_in_time_to_meet_the_earliest_deadline(self):
+        encoder = RecordingEncoder()
+        batcher = self.make(encoder, window=10.0)
+
+        start = time.monotonic()
+        np.testing.assert_array_equal(batcher.encode(["a"], later(0.1)), [[1, ord("a")]])
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_lead_before_a_deadline_follows_the_encode_time(self):
+        encoder = RecordingEncoder(delay=0.1)
+        batcher = MicroBatcher(encoder, 10.0, max_texts=2, margin_seconds=0.05)
+        self.addCleanup(batcher.close)
+
+        batcher.encode(["a", "b"], later(5))
+        # closing only the margin before the deadline would leave too little time for the 0.1s encode
+        np.testing.assert_array_equal(batcher.encode(["c"], later(0.3)), [[1, ord("c")]])
+        self.assertEqual(batcher.stats.expired, 0)
+
+    def test_expired_job_is_not_encoded(self):
+        encoder = RecordingEncoder(delay=0.3)
+        batcher = self.make(encoder, window=0.0)
+
+        # the first job keeps the batcher busy past the second job's deadline
+        first = batcher.submit(["slow"], later(5))
+        time.sleep(0.05)
+        with self.assertRaises(EncodeDeadlineExceeded):
+            batcher.encode(["late"], later(0.1))
+
+        first.result(timeout=5)
+        batcher.encode(["next"], later(5))
+        self.assertNotIn(["late"], encoder.calls)
+        self.assertEqual(batcher.stats.expired, 1)
+
+    def test_encode_error_reaches_every_caller(self):
+        def failing(texts: List[str]) -> np.ndarray:
+            raise RuntimeError("model down")
+
+        batcher = self.make(failing, window=0.1)  # type: ignore[arg-type]
+        futures = [batcher.submit(["a"], later(5)), batcher.submit(["b"], later(5))]
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "model down"):
+                future.result(timeout=5)
+
+    def test_submit_after_close_raises(self):
+        batcher = MicroBatcher(RecordingEncoder(), 0.01, 10)
+        batcher.close()
+        with self.assertRaises(RuntimeError):
+            batcher.submit(["a"], later(1))
+
+
+class TestEmbeddingsMicroBatching(unittest.TestCase):
+    def setUp(self):
+        self.encoder = RecordingEncoder()
+        self.original = (emb.EMBEDDING_MICROBATCH, emb._batcher, emb._cache, emb.EMBEDDING_CACHE_ENABLED)
+        emb.EMBEDDING_MICROBATCH = True
+        emb.EMBEDDING_CACHE_ENABLED = False
+        emb._cache = None
+        emb._batcher = MicroBatcher(self.encoder, 0.2, 100)
+
+    def tearDown(self):
+        emb._batcher.close() # type: ignore
+        emb.EMBEDDING_MICROBATCH, emb._batcher, emb._cache, emb.EMBEDDING_CACHE_ENABLED = self.original
+
+    def test_concurrent_requests_are_encoded_together(self):
+        results = {}
+
+        def request(name: str, texts: List[str]) -> None:
+            results[name] = emb._embed_texts(texts)
+
+        threads = [
+            threading.Thread(target=request, args=("x", ["alpha", "beta"])),
+            threading.Thread(target=request, args=("y", ["gamma"])),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(self.encoder.calls), 1)
+        self.assertEqual(results["x"].shape, (2, 2))
+        np.testing.assert_array_equal(results["y"], [[5, ord("g")]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import json
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+import project.embeddings as emb
+from project import app, near_duplicates
+from project.embedding_backends import StubBackend
+from project.models import BASELINE_SOURCE, COMPARISON_SOURCE
+from project.preprocessing import SentenceBatchBuilder
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+class StubModel:
+    def encode(self, texts, **kwargs):
+        return StubBackend().encode(texts)
+
+
+def build(items):
+    builder = SentenceBatchBuilder()
+    for item in items:
+        builder.add(*item)
+    return builder.build()
+
+
+class TestMinHash(unittest.TestCase):
+    def test_signatures_agree_in_proportion_to_jaccard(self):
+        keys = [
+            "the checkout page keeps timing out on my phone",
+            "the checkout page keeps timng out on my phone",
+            "delivery was quick and the driver was friendly",
+            "ok",
+        ]
+        signatures, hashed = near_duplicates.minhash_signatures(keys)
+
+        self.assertEqual(signatures.shape, (4, near_duplicates._PERMUTATIONS))
+        self.assertEqual(hashed.tolist(), [True, True, True, False])
+        self.assertGreater(np.mean(signatures[0] == signatures[1]), 0.6)
+        self.assertLess(np.mean(signatures[0] == signatures[2]), 0.2)
+
+    def test_signatures_do_not_depend_on_chunking(self):
+        keys = [f"sentence number {i} about topic {i % 7}" for i in range(50)]
+        whole, _ = near_duplicates.minhash_signatures(keys)
+        original = near_duplicates._CHUNK_ROWS
+        near_duplicates._CHUNK_ROWS = 7
+        try:
+            chunked, _ = near_duplicates.minhash_signatures(keys)
+        finally:
+            near_duplicates._CHUNK_ROWS = original
+        np.testing.assert_array_equal(whole, chunked)
+
+    def test_representatives_are_verified_and_earliest(self):
+        keys = [
+            "the checkout page keeps timing out on my phone",
+            "delivery was quick and the driver was friendly",
+            "the checkout page keeps timng out on my phone",
+            "the checkout page keeps timing out on my phone today",
+            "the checkout page never loads",
+            "delivery was quick and the driver was frendly",
+        ]
+        self.assertEqual(near_duplicates.near_duplicate_representatives(keys, 0.8).tolist(), [0, 1, 0, 0, 4, 1])
+        self.assertEqual(near_duplicates.near_duplicate_representatives(keys, 1.0).tolist(), list(range(6)))
+
+
+class TestCollapse(unittest.TestCase):
+    def test_ids_move_to_the_kept_row(self):
+        batch = build([
+            ("a", "The checkout page keeps timing out on my phone"),
+            ("b", "Delivery was quick and the driver was friendly"),
+            ("c", "The checkout page keeps timng out on my phone", COMPARISON_SOURCE),
+            ("a", "the checkout page keeps timing out on my phone!!"),
+            ("a", "The checkout page keeps timing out on my phne"),
+        ])
+        collapsed = near_duplicates.collapse_near_duplicates(batch)
+
+        self.assertEqual(len(collapsed), 2)
+        self.assertEqual(collapsed.first_texts, ["The checkout page keeps timing out on my phone", batch.first_texts[1]])
+        self.assertEqual(collapsed.ids_for(np.array([0])), ["a", "c"])
+        self.assertEqual(collapsed.ids_for(np.array([0]), BASELINE_SOURCE), ["a"])
+        self.assertEqual(collapsed.ids_for(np.array([0]), COMPARISON_SOURCE), ["c"])
+        self.assertEqual(collapsed.entry_offsets.tolist(), [0, 2, 3])
+
+    def test_nothing_to_fold_returns_the_same_batch(self):
+        batch = build([("a", "first sentence here"), ("b", "something else entirely")])
+        self.assertIs(near_duplicates.collapse_near_duplicates(batch), batch)
+
+    def test_handler_keeps_every_input_id(self):
+        orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = StubModel(), None, False
+        try:
+            payload = json.loads((DATA / "input_example.json").read_text())
+            payload["baseline"] += [
+                {"id": f"typo-{item['id']}", "sentence": item["sentence"].replace("e", "", 1)}
+                for item in payload["baseline"][:20]
+            ]
+            clusters = json.loads(app.lambda_handler(payload, None)["body"])["clusters"]
+        finally:
+            emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = orig
+
+        cluster_of = {i: n for n, c in enumerate(clusters) for i in c["sentence_ids"]}
+        self.assertTrue(set(cluster_of) <= {item["id"] for item in payload["baseline"]})
+        # a folded typo lands in the same cluster as the sentence it was folded into
+        together = [i for i in cluster_of if i.startswith("typo-") and cluster_of.get(i[len("typo-"):]) == cluster_of[i]]
+        self.assertTrue(together)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import json
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+import project.embeddings as emb
+from project import app
+from project.embedding_backends import StubBackend
+from project.models import BASELINE_SOURCE
+from project.noise_recovery import cluster_centroids, recover_noise, recovered_rows
+from project.preprocessing import SentenceBatchBuilder
+from project.summarization import summarize_rows, with_recovered_rows
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+class StubModel:
+    def encode(self, texts, **kwargs):
+        return StubBackend().encode(texts)
+
+
+def unit(*rows):
+    vectors = np.array(rows, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def labelled_batch(labels, vectors, ids=None):
+    builder = SentenceBatchBuilder()
+    for i in range(len(labels)):
+        builder.add(ids[i] if ids else f"s{i}", f"sentence {i}")
+    batch = builder.build()
+    batch.labels = np.array(labels, dtype=np.int64)
+    batch.vectors = vectors
+    return batch
+
+
+class TestRecoverNoise(unittest.TestCase):
+    def test_centroids_are_normalized_means_with_zero_rows_for_empty_labels(self):
+        vectors = unit([1, 0, 0], [0, 1, 0], [0, 0, 1])
+        centroids = cluster_centroids(vectors, np.array([2, 2, -1]))
+
+        np.testing.assert_allclose(centroids, [[0, 0, 0], [0, 0, 0], [2 ** -0.5, 2 ** -0.5, 0]], atol=1e-6)
+
+    def test_noise_joins_the_most_similar_centroid_above_the_floor(self):
+        vectors = unit([1, 0, 0], [1, 0.1, 0], [0, 1, 0], [0, 1, 0.1], [1, 0.3, 0], [0.2, 1, 0], [0, 0, 1])
+        batch = labelled_batch([1, 1, 0, 0, -1, -1, -1], vectors)
+
+        recovered = recover_noise(batch, threshold=0.9)
+
+        np.testing.assert_array_equal(recovered, [-1, -1, -1, -1, 1, 0, -1])
+        self.assertIs(batch.recovered_labels, recovered)
+        # members are untouched
+        np.testing.assert_array_equal(batch.labels, [1, 1, 0, 0, -1, -1, -1])
+
+    def test_nothing_to_recover_into(self):
+        batch = labelled_batch([-1, -1], unit([1, 0], [0, 1]))
+        np.testing.assert_array_equal(recover_noise(batch), [-1, -1])
+
+    def test_recovered_rows_follow_cluster_order(self):
+        vectors = unit([0, 1, 0], [1, 0, 0], [1, 0, 0], [0, 1, 0], [1, 0.1, 0], [0.1, 1, 0], [1, 0.2, 0])
+        batch = labelled_batch([1, 0, 0, 1, -1, -1, -1], vectors)
+        clusters = [np.array([0, 3]), np.array([1, 2])]
+
+        self.assertEqual([r.tolist() for r in recovered_rows(batch, clusters)], [[], []])
+        recover_noise(batch, threshold=0.9)
+        self.assertEqual([r.tolist() for r in recovered_rows(batch, clusters)], [[5], [4, 6]])
+
+    def test_recovered_ids_leave_out_members(self):
+        vectors = unit([1, 0], [1, 0.1], [1, 0.2], [1, 0.3])
+        batch = labelled_batch([0, 0, -1, -1], vectors, ids=["a", "b", "a", "c"])
+        rows = np.array([0, 1])
+
+        summary = with_recovered_rows(summarize_rows(batch, rows), batch, np.array([2, 3]))
+
+        self.assertEqual(summary.sentence_ids, ["a", "b"])
+        self.assertEqual(summary.recovered_sentence_ids, ["c"])
+        self.assertEqual(batch.ids_for(np.array([2, 3]), BASELINE_SOURCE), ["a", "c"])
+
+
+class TestHandlerRecovery(unittest.TestCase):
+    def setUp(self):
+        self.orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = StubModel(), None, False
+
+    def tearDown(self):
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = self.orig
+
+    def clusters(self, name):
+        payload = json.loads((DATA / name).read_text())
+        return json.loads(app.lambda_handler(payload, None)["body"])["clusters"]
+
+    def test_recovered_ids_are_reported_apart_from_members(self):
+        with_recovery = self.clusters("input_example_2.json")
+        with mock.patch.object(app, "NOISE_RECOVERY", False):
+            without = self.clusters("input_example_2.json")
+
+        self.assertTrue(any(c["recovered_sentence_ids"] for c in with_recovery))
+        for cluster in with_recovery:
+            self.assertFalse(set(cluster["recovered_sentence_ids"]) & set(cluster["sentence_ids"]))
+        self.assertEqual([c["sentence_ids"] for c in with_recovery], [c["sentence_ids"] for c in without])
+        self.assertTrue(all("recovered_sentence_ids" not in c for c in without))
+
+    def test_comparative_clusters_report_recovered_ids_per_set(self):
+        clusters = self.clusters("input_comparison_example.json")
+        self.assertTrue(all("recoveredBaselineSentences" in c and "recoveredComparisonSentences" in c for c in clusters))
+        self.assertTrue(any(c["recoveredBaselineSentences"] or c["recoveredComparisonSentences"] for c in clusters))
+
+        with mock.patch.object(app, "NOISE_RECOVERY", False):
+            clusters = self.clusters("input_comparison_example.json")
+        self.assertTrue(all("recoveredBaselineSentences" not in c and "recoveredComparisonSentences" not in c for c in clusters))
+
+
+if __name__ == "__main__":
+    unittest.main()
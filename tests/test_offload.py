@@ -0,0 +1,261 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+import project.embeddings as emb
+from project import app, blob_store, ingestion, offload
+from project.embedding_backends import StubBackend
+from project.models import AnalysisMode
+from project.preprocessing import SentenceBatchBuilder
+from project.validation import BadRequestError
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+class StubModel:
+    def encode(self, texts, **kwargs):
+        return StubBackend().encode(texts)
+
+
+def example_items(name="input_example.json", field="baseline"):
+    return json.loads((DATA / name).read_text())[field]
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.store = blob_store.LocalBlobStore(self.root)
+        patcher = mock.patch.object(offload, "OFFLOAD_ALLOWED_PREFIXES", ["s3://b/"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def put(self, uri, items, lines=False):
+        text = "".join(json.dumps(i) + "\n" for i in items) if lines else json.dumps(items, indent=1)
+        with self.store.open_write(uri) as fh:
+            fh.write(text.encode("utf-8"))
+
+
+class TestStreamingDecode(StoreTestCase):
+    def decode(self, uri):
+        with self.store.open_read(uri) as stream:
+            return list(offload.iter_sentence_items(stream, uri))
+
+    def test_array_and_lines_decode_across_small_reads(self):
+        items = example_items() + [{"id": "u", "sentence": "Ünïcödé ✓ spans reads"}]
+        self.put("s3://b/in.json", items)
+        self.put("s3://b/in.jsonl", items, lines=True)
+
+        with mock.patch.object(offload, "_READ_SIZE", 7):
+            self.assertEqual(self.decode("s3://b/in.json"), items)
+            self.assertEqual(self.decode("s3://b/in.jsonl"), items)
+
+    def test_empty_array(self):
+        self.put("s3://b/empty.json", [])
+        self.assertEqual(self.decode("s3://b/empty.json"), [])
+
+    def test_malformed_objects_raise_bad_request(self):
+        for uri, content in (
+            ("s3://b/a.json", '{"id": "1"}'),
+            ("s3://b/b.json", '[{"id": "1", "sentence": "x"} {"id": "2"}]'),
+            ("s3://b/c.json", '[{"id": "1", "sentence": "x"'),
+            ("s3://b/d.json", '[] trailing'),
+            ("s3://b/e.jsonl", '{"id": "1", "sentence": "x"}\nnot json\n'),
+        ):
+            with self.subTest(uri=uri):
+                with self.store.open_write(uri) as fh:
+                    fh.write(content.encode())
+                with self.assertRaises(BadRequestError):
+                    self.decode(uri)
+
+    def test_oversized_items_are_refused_without_reading_the_rest(self):
+        long_item = '{"id": "1", "sentence": "' + "x" * 200
+        for uri, content in (
+            ("s3://b/a.json", "[" + long_item + "  " * 5000),
+            ("s3://b/b.jsonl", long_item + " " * 10000 + "\n"),
+        ):
+            with self.subTest(uri=uri):
+                with self.store.open_write(uri) as fh:
+                    fh.write(content.encode())
+                with mock.patch.object(offload, "_READ_SIZE", 64), mock.patch.object(offload, "_MAX_ITEM_CHARS", 500):
+                    with self.store.open_read(uri) as stream:
+                        with self.assertRaisesRegex(BadRequestError, "500 characters"):
+                            list(offload.iter_sentence_items(stream, uri))
+                        self.assertTrue(stream.read(1))
+
+
+class TestIngestReference(StoreTestCase):
+    def test_matches_inline_batch(self):
+        items = example_items()
+        self.put("s3://b/in.jsonl", items, lines=True)
+
+        request = offload.ingest_reference(
+            {"surveyTitle": "t", "theme": "x", "baselineUri": "s3://b/in.jsonl"}, self.store,
+        )
+        builder = SentenceBatchBuilder()
+        for item in items:
+            builder.add(item["id"], item["sentence"])
+        expected = builder.build()
+
+        self.assertEqual(request.batch.normalized_texts, expected.normalized_texts)
+        np.testing.assert_array_equal(request.batch.entry_ids, expected.entry_ids)
+        self.assertEqual(request.sentence_count, len(items))
+        self.assertTrue(request.result_uri.startswith("s3://b/results/"))
+
+    def test_errors_name_the_field_and_index(self):
+        self.put("s3://b/bad.jsonl", [{"id": "1", "sentence": "fine"}, {"id": "2", "sentence": " "}], lines=True)
+        cases = [
+            ({"baselineUri": "s3://b/missing.json"}, "Object not found: s3://b/missing.json"),
+            ({"baselineUri": "not-a-uri"}, "Expected an object URI like s3://bucket/key, got 'not-a-uri'"),
+            ({"baselineUri": "s3://b/bad.jsonl"}, "baseline[1].sentence must be a non-empty string"),
+            ({"baselineUri": 3}, "baselineUri must be a string"),
+        ]
+        for fields, message in cases:
+            with self.subTest(message=message):
+                with self.assertRaises(BadRequestError) as ctx:
+                    offload.ingest_reference({"surveyTitle": "t", "theme": "x", **fields}, self.store)
+                self.assertEqual(str(ctx.exception), message)
+
+    def test_uris_outside_the_allowed_prefixes_are_refused(self):
+        self.put("s3://b/in.jsonl", example_items(), lines=True)
+        cases = [
+            ({"baselineUri": "s3://other/in.jsonl"}, "baselineUri"),
+            ({"baselineUri": "s3://b/in.jsonl", "comparisonUri": "s3://bb/in.jsonl"}, "comparisonUri"),
+            ({"baselineUri": "s3://b/in.jsonl", "resultUri": "s3://other/out.json"}, "resultUri"),
+            ({"baselineUri": "s3://b/in.jsonl", "resultUri": "s3://b/../other/out.json"}, "resultUri"),
+        ]
+        for fields, field in cases:
+            with self.subTest(fields=fields):
+                with self.assertRaisesRegex(BadRequestError, f"^{field} is outside the allowed locations"):
+                    offload.ingest_reference({"surveyTitle": "t", "theme": "x", **fields}, self.store)
+
+        # the default result location must be allowed too, and nothing is when no prefix is set
+        for prefixes in (["s3://b/in"], []):
+            with self.subTest(prefixes=prefixes), mock.patch.object(offload, "OFFLOAD_ALLOWED_PREFIXES", prefixes):
+                with self.assertRaises(BadRequestError):
+                    offload.ingest_reference({"surveyTitle": "t", "theme": "x", "baselineUri": "s3://b/in.jsonl"}, self.store)
+
+    def test_size_limit(self):
+        self.put("s3://b/in.jsonl", example_items()[:5], lines=True)
+        with mock.patch.object(offload, "OFFLOAD_MAX_SENTENCES", 4):
+            with self.assertRaisesRegex(BadRequestError, "baseline exceeds maximum allowed size of 4"):
+                offload.ingest_reference({"surveyTitle": "t", "theme": "x", "baselineUri": "s3://b/in.jsonl"}, self.store)
+
+    def test_inline_payloads_are_not_references(self):
+        self.assertFalse(offload.is_reference_payload({"baseline": [], "baselineUri": "s3://b/k"}))
+        self.assertTrue(offload.is_reference_payload({"baselineUri": "s3://b/k"}))
+
+
+class TestLocalBlobStore(StoreTestCase):
+    def test_failed_write_leaves_no_object(self):
+        with self.assertRaises(RuntimeError):
+            with self.store.open_write("s3://b/out.json") as fh:
+                fh.write(b"partial")
+                raise RuntimeError("boom")
+        with self.assertRaises(blob_store.BlobNotFoundError):
+            self.store.open_read("s3://b/out.json")
+        self.assertEqual(list(self.root.rglob("*.tmp")), [])
+
+    def test_keys_cannot_escape_the_root(self):
+        with self.assertRaises(ValueError):
+            self.store.path("s3://b/../../etc/passwd")
+
+
+class TestHandlerWithReferences(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED, blob_store._blob_store)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = StubModel(), None, False
+        blob_store._blob_store = self.store
+
+    def tearDown(self):
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED, blob_store._blob_store = self.orig
+
+    def inline_clusters(self, payload):
+        return json.loads(app.lambda_handler(payload, None)["body"])["clusters"]
+
+    def test_result_is_written_back_and_matches_inline(self):
+        payload = json.loads((DATA / "input_example.json").read_text())
+        payload.pop("comparison", None)
+        self.put("s3://b/survey.json", payload["baseline"])
+
+        with mock.patch.object(app, "OFFLOAD_CLUSTERING_ENGINE", "dbscan"), \
+                mock.patch.object(app, "OFFLOAD_CHUNK_SENTENCES", 16):
+            response = json.loads(app.lambda_handler({"body": json.dumps({
+                "surveyTitle": payload["surveyTitle"], "theme": payload["theme"],
+                "baselineUri": "s3://b/survey.json", "resultUri": "s3://b/out/result.json",
+            })}, None)["body"])
+
+        self.assertEqual(response["resultUri"], "s3://b/out/result.json")
+        self.assertEqual(response["sentenceCount"], len(payload["baseline"]))
+        with self.store.open_read("s3://b/out/result.json") as fh:
+            result = json.load(fh)
+        self.assertEqual(response["clusterCount"], len(result["clusters"]))
+        self.assertEqual(result["clusters"], self.inline_clusters(payload))
+
+    def test_incremental_analysis_leaves_references_on_their_own_path(self):
+        payload = json.loads((DATA / "input_example.json").read_text())
+        self.put("s3://b/survey.json", payload["baseline"])
+        event = {"surveyTitle": "t", "theme": "x", "baselineUri": "s3://b/survey.json"}
+
+        with mock.patch.object(app, "INCREMENTAL_ANALYSIS", True), \
+                mock.patch.object(app, "start_incremental") as started, \
+                mock.patch.object(app, "OFFLOAD_CLUSTERING_ENGINE", "dbscan"), \
+                mock.patch.object(app, "embed_batch_to_disk", wraps=app.embed_batch_to_disk) as to_disk, \
+                mock.patch.object(app, "cluster_batch", wraps=app.cluster_batch) as clustered:
+            app.lambda_handler(event, None)
+
+        started.assert_not_called()
+        to_disk.assert_called_once()
+        self.assertEqual(clustered.call_args.kwargs["engine"], "dbscan")
+
+    def test_comparative_references(self):
+        payload = json.loads((DATA / "input_comparison_example.json").read_text())
+        self.put("s3://b/base.jsonl", payload["baseline"], lines=True)
+        self.put("s3://b/comp.jsonl", payload["comparison"], lines=True)
+
+        request = ingestion.ingest_event({
+            "surveyTitle": "t", "theme": "x", "baselineUri": "s3://b/base.jsonl", "comparisonUri": "s3://b/comp.jsonl",
+        })
+        self.assertEqual(request.mode, AnalysisMode.COMPARATIVE)
+
+        response = json.loads(app.lambda_handler({
+            "surveyTitle": "t", "theme": "x", "baselineUri": "s3://b/base.jsonl", "comparisonUri": "s3://b/comp.jsonl",
+        }, None)["body"])
+        with self.store.open_read(response["resultUri"]) as fh:
+            clusters = json.load(fh)["clusters"]
+        self.assertTrue(all("baselineSentences" in c for c in clusters))
+
+
+class TestEmbedToDisk(unittest.TestCase):
+    def test_matches_in_memory_embedding(self):
+        orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = StubModel(), None, False
+        try:
+            builder = SentenceBatchBuilder()
+            for i, item in enumerate(example_items()):
+                builder.add(item["id"], item["sentence"])
+            on_disk = emb.embed_batch_to_disk(builder.build(), 10, tempfile.gettempdir())
+            in_memory = emb.embed_batch(builder.build())
+        finally:
+            emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = orig
+
+        self.assertIsInstance(on_disk.vectors, np.memmap)
+        np.testing.assert_array_equal(on_disk.vectors, in_memory.vectors)
+
+
+class TestWriteResult(StoreTestCase):
+    def test_streams_valid_json(self):
+        body = {"clusters": [{"title": f"t{i}", "ids": [str(j) for j in range(50)]} for i in range(200)]}
+        offload.write_result("s3://b/r.json", body, self.store)
+        with self.store.open_read("s3://b/r.json") as fh:
+            self.assertEqual(json.load(fh), body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 import unittest
 
-from project.preprocessing import normalize_text, preprocess_sentences
-from project.models import AnalysisMode, Sentence
+import numpy as np
+
+from project.preprocessing import build_sentence_batch, dedup_key, normalize_text, preprocess_sentences
+from project.models import AnalysisMode, BASELINE_SOURCE, COMPARISON_SOURCE, Sentence
 
 
 class TestPreprocessing(unittest.TestCase):
@@ -41,6 +43,84 @@ class TestPreprocessing(unittest.TestCase):
         self.assertEqual(ps.original_texts, ["  Mixed CASE "])
         self.assertEqual(ps.normalized_text, "mixed case")
 
+    def test_preprocess_dedups_across_sets_and_tracks_source_ids(self):
+        inp = [
+            Sentence(id="b1", text="Lost bag", source=AnalysisMode.STANDALONE),
+            Sentence(id="c1", text="lost  BAG", source=AnalysisMode.COMPARATIVE),
+            Sentence(id="c2", text="Late flight", source=AnalysisMode.COMPARATIVE),
+        ]
+        out = preprocess_sentences(inp)
+
+        self.assertEqual(len(out), 2)
+        self.assertEqual(out[0].ids, ["b1", "c1"])
+        self.assertEqual(out[0].baseline_ids, ["b1"])
+        self.assertEqual(out[0].comparison_ids, ["c1"])
+        self.assertEqual(out[1].baseline_ids, [])
+        self.assertEqual(out[1].comparison_ids, ["c2"])
+
+    def test_normalize_text_applies_nfkc(self):
+        self.assertEqual(normalize_text("ＦＵＬＬ ｗｉｄｔｈ ﬁne"), "full width fine")
+
+    def test_dedup_key_ignores_punctuation_emoji_and_apostrophes(self):
+        self.assertEqual(dedup_key(normalize_text("Great app!!! 👍🏽")), "great app")
+        self.assertEqual(dedup_key(normalize_text("Don’t like the check-in.")), "dont like the check in")
+        # text made only of symbols still has a key of its own
+        self.assertEqual(dedup_key("👍"), "👍")
+
+    def test_preprocess_groups_variants_by_dedup_key_keeping_the_first(self):
+        inp = [
+            Sentence(id="1", text="The app crashes!", source=AnalysisMode.STANDALONE),
+            Sentence(id="2", text="the app crashes 😡", source=AnalysisMode.STANDALONE),
+            Sentence(id="1", text="The app... crashes", source=AnalysisMode.STANDALONE),
+        ]
+        out = preprocess_sentences(inp)
+
+        self.assertEqual(len(out), 1)
+        self.assertEqual(out[0].normalized_text, "the app crashes!")
+        self.assertEqual(out[0].ids, ["1", "2"])
+        self.assertEqual(out[0].baseline_ids, ["1", "2"])
+        self.assertEqual(len(out[0].original_texts), 3)
+
+
+class TestSentenceBatch(unittest.TestCase):
+    def setUp(self):
+        self.inputs = [
+            Sentence(id="b1", text="  Foo BAR  ", source=AnalysisMode.STANDALONE),
+            Sentence(id="b2", text="foo    bar", source=AnalysisMode.STANDALONE),
+            Sentence(id="b1", text="foo bar", source=AnalysisMode.STANDALONE),
+            Sentence(id="b3", text="   ", source=AnalysisMode.STANDALONE),
+            Sentence(id="c1", text="Unique", source=AnalysisMode.COMPARATIVE),
+            Sentence(id="c2", text="FOO BAR", source=AnalysisMode.COMPARATIVE),
+        ]
+
+    def test_matches_preprocess_sentences(self):
+        processed = preprocess_sentences(self.inputs)
+        batch = build_sentence_batch(self.inputs)
+
+        self.assertEqual(len(batch), len(processed))
+        self.assertEqual(batch.normalized_texts, [p.normalized_text for p in processed])
+        self.assertEqual(batch.first_texts, [p.original_texts[0] for p in processed])
+        for row, p in enumerate(processed):
+            rows = np.array([row])
+            self.assertEqual(batch.ids_for(rows), sorted(p.ids))
+            self.assertEqual(batch.ids_for(rows, BASELINE_SOURCE), sorted(p.baseline_ids))
+            self.assertEqual(batch.ids_for(rows, COMPARISON_SOURCE), sorted(p.comparison_ids))
+
+    def test_ids_are_interned_once(self):
+        batch = build_sentence_batch(self.inputs)
+        self.assertEqual(batch.id_table, ["b1", "b2", "c1", "c2"])
+        self.assertEqual(batch.entry_offsets.tolist(), [0, 3, 4])
+
+    def test_ids_for_multiple_rows(self):
+        batch = build_sentence_batch(self.inputs)
+        self.assertEqual(batch.ids_for(np.array([0, 1])), ["b1", "b2", "c1", "c2"])
+        self.assertEqual(batch.ids_for(np.array([], dtype=np.int64)), [])
+
+    def test_empty_input(self):
+        batch = build_sentence_batch([])
+        self.assertEqual(len(batch), 0)
+        self.assertEqual(batch.entry_offsets.tolist(), [0])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,195 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import project.embeddings as emb
+from project import app, clustering, response_cache, summary_providers
+from project.embedding_backends import StubBackend
+from project.validation import BadRequestError
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        return StubBackend().encode(texts)
+
+
+def example_payload(name="input_example.json"):
+    return json.loads((DATA / name).read_text())
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_ignores_item_order_but_not_content(self):
+        payload = example_payload("input_comparison_example.json")
+        shuffled = {**payload, "baseline": payload["baseline"][::-1], "comparison": payload["comparison"][::-1]}
+        key = response_cache.response_fingerprint(payload)
+
+        self.assertEqual(response_cache.response_fingerprint(shuffled), key)
+        self.assertNotEqual(response_cache.response_fingerprint({**payload, "theme": "other"}), key)
+        self.assertNotEqual(response_cache.response_fingerprint({**payload, "comparison": payload["comparison"][1:]}), key)
+
+    def test_changes_with_pipeline_settings(self):
+        payload = example_payload()
+        key = response_cache.response_fingerprint(payload)
+        with mock.patch.object(clustering, "CLUSTERING_ENGINE", "blocked"):
+            self.assertNotEqual(response_cache.response_fingerprint(payload), key)
+        with mock.patch.object(summary_providers, "SUMMARY_DEADLINE_MS", 1):
+            self.assertNotEqual(response_cache.response_fingerprint(payload), key)
+        with mock.patch.object(response_cache, "RESPONSE_CACHE_VERSION", "next"):
+            self.assertNotEqual(response_cache.response_fingerprint(payload), key)
+
+    def test_uncacheable_payloads(self):
+        for payload in (
+            {"surveyTitle": "t", "theme": "x", "baselineUri": "s3://b/k.json"},
+            {"surveyTitle": "t", "theme": "x", "baseline": [{"sentence": "no id"}]},
+            {"surveyTitle": "t", "theme": "x", "baseline": "not a list of items"},
+            ["not", "an", "object"],
+        ):
+            with self.subTest(payload=payload):
+                self.assertIsNone(response_cache.response_fingerprint(payload))
+
+
+class TestMemoryResponseCache(unittest.TestCase):
+    def test_expires_after_ttl(self):
+        cache = response_cache.MemoryResponseCache(max_bytes=1000, ttl_seconds=10)
+        with mock.patch.object(response_cache.time, "monotonic", return_value=100.0):
+            cache.put("a", "body")
+        with mock.patch.object(response_cache.time, "monotonic", return_value=109.0):
+            self.assertEqual(cache.get("a"), "body")
+        with mock.patch.object(response_cache.time, "monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_evicts_least_recently_used_beyond_max_bytes(self):
+        cache = response_cache.MemoryResponseCache(max_bytes=10, ttl_seconds=60)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")
+        cache.put("c", "cccc")
+        cache.put("huge", "x" * 11)
+
+        self.assertEqual(cache.get("a"), "aaaa")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "cccc")
+        self.assertIsNone(cache.get("huge"))
+
+
+class TestFileResponseCache(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+
+    def test_shared_between_instances_and_expires_by_mtime(self):
+        response_cache.FileResponseCache(self.directory, 1000, 60).put("a", '{"clusters": []}')
+        other = response_cache.FileResponseCache(self.directory, 1000, 60)
+        self.assertEqual(other.get("a"), '{"clusters": []}')
+
+        old = time.time() - 120
+        os.utime(self.directory / "a.json", (old, old))
+        self.assertIsNone(other.get("a"))
+        self.assertFalse((self.directory / "a.json").exists())
+
+    def test_evicts_oldest_files_beyond_max_bytes(self):
+        cache = response_cache.FileResponseCache(self.directory, 10, 60)
+        for i, key in enumerate(("a", "b", "c")):
+            cache.put(key, key * 4)
+            os.utime(self.directory / f"{key}.json", (1000 + i, time.time() - 10 + i))
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), "bbbb")
+        self.assertEqual(cache.get("c"), "cccc")
+
+
+class TestCachedResponse(unittest.TestCase):
+    def setUp(self):
+        self.model = CountingModel()
+        self.orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED, response_cache._cache)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = self.model, None, False
+        response_cache._cache = response_cache.MemoryResponseCache()
+        patcher = mock.patch.object(response_cache, "RESPONSE_CACHE", "memory")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED, response_cache._cache = self.orig
+
+    def test_repeated_payload_is_served_from_the_cache(self):
+        payload = example_payload()
+        first = app.lambda_handler({"body": json.dumps(payload)}, None)
+        calls = self.model.calls
+
+        with self.assertLogs(response_cache.logger, level="INFO") as logs:
+            second = app.lambda_handler({"body": json.dumps({**payload, "baseline": payload["baseline"][::-1]})}, None)
+
+        self.assertEqual(second, first)
+        self.assertEqual(self.model.calls, calls)
+        self.assertIn("Response cache hit", logs.output[-1])
+
+    def test_concurrent_identical_requests_share_one_computation(self):
+        release = threading.Event()
+        computed = []
+
+        def compute(payload):
+            computed.append(payload)
+            release.wait(5)
+            return app.success_response({"clusters": []}), True
+
+        cache = response_cache.MemoryResponseCache()
+        event = {"body": json.dumps(example_payload())}
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(response_cache.cached_response(event, cache, compute)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        while not response_cache._in_flight:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(computed), 1)
+        self.assertEqual(results, [app.success_response({"clusters": []})] * 4)
+
+    def test_responses_with_missing_generated_summaries_are_not_cached(self):
+        def summarize_clusters(requests, stats):
+            stats.timed_out += len(requests)
+            return [None] * len(requests)
+
+        event = {"body": json.dumps(example_payload())}
+        with mock.patch.object(app, "SUMMARY_PROVIDER", "stub"), \
+                mock.patch.object(app, "summarize_clusters", side_effect=summarize_clusters):
+            first = app.lambda_handler(event, None)
+            calls = self.model.calls
+            second = app.lambda_handler(event, None)
+
+        self.assertEqual(second, first)
+        self.assertGreater(self.model.calls, calls)
+        self.assertEqual(len(response_cache._cache), 0)
+
+    def test_errors_are_not_cached(self):
+        cache = response_cache.MemoryResponseCache()
+        compute = mock.Mock(side_effect=BadRequestError("baseline[0].sentence must be a non-empty string"))
+        event = {"body": json.dumps(example_payload())}
+        for _ in range(2):
+            with self.assertRaises(BadRequestError):
+                response_cache.cached_response(event, cache, compute)
+        self.assertEqual(compute.call_count, 2)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from project.models import AnalysisMode, Sentence
+from project.preprocessing import build_sentence_batch, preprocess_sentences
+from project import sentiment
+from project.sentiment import aggregate_sentiment, label_scores, score_sentiment
+from project.summarization import classify_sentiment, summarize_rows
+
+
+class TestScoreSentiment(unittest.TestCase):
+    def labels(self, *texts):
+        return label_scores(score_sentiment(list(texts)))
+
+    def test_plain_polarity(self):
+        self.assertEqual(
+            self.labels("The crew was friendly", "Seats were dirty and cramped", "We boarded at gate 12"),
+            ["positive", "negative", "neutral"],
+        )
+
+    def test_negation_flips_within_window(self):
+        self.assertEqual(
+            self.labels("The food was not good", "No issues at all", "I never had a bad flight", "It wasn't terrible"),
+            ["negative", "positive", "positive", "positive"],
+        )
+
+    def test_negation_ends_at_clause_break_and_window(self):
+        self.assertEqual(self.labels("Not the cheapest, but great service"), ["positive"])
+        self.assertEqual(self.labels("No wifi on board and the staff were really very friendly"), ["positive"])
+
+    def test_negation_does_not_leak_across_texts(self):
+        scores = score_sentiment(["not", "good"])
+        self.assertEqual(scores.tolist(), [0.0, 1.0])
+
+    def test_strong_words_outweigh_weak_ones(self):
+        self.assertEqual(self.labels("Slow boarding but an amazing crew"), ["positive"])
+        self.assertGreater(score_sentiment(["excellent"])[0], score_sentiment(["good"])[0])
+
+    def test_empty_inputs(self):
+        self.assertEqual(score_sentiment([]).shape, (0,))
+        self.assertEqual(score_sentiment(["", "!!"]).tolist(), [0.0, 0.0])
+
+    def test_large_inputs_scored_in_slices_match_one_pass(self):
+        texts = ["not good at all", "great crew", "delays, but no issues", "fine"] * 5
+        with mock.patch.object(sentiment, "_TEXTS_PER_PASS", 3):
+            sliced = score_sentiment(texts)
+        np.testing.assert_array_equal(sliced, score_sentiment(texts))
+
+    def test_classify_sentiment_matches_batch_scoring(self):
+        texts = ["Great crew", "Lost my bag", "Gate 4"]
+        self.assertEqual([classify_sentiment(t) for t in texts], self.labels(*texts))
+
+
+class TestAggregateSentiment(unittest.TestCase):
+    def test_majority_label(self):
+        self.assertEqual(aggregate_sentiment(np.array([1.0, 2.0, -1.0, 0.0])), "positive")
+        self.assertEqual(aggregate_sentiment(np.array([0.0, 0.0, -3.0])), "neutral")
+
+    def test_tie_broken_by_summed_score(self):
+        self.assertEqual(aggregate_sentiment(np.array([1.0, -2.0])), "negative")
+        self.assertEqual(aggregate_sentiment(np.array([2.0, -1.0, 0.0])), "positive")
+
+    def test_empty_is_neutral(self):
+        self.assertEqual(aggregate_sentiment(np.zeros(0)), "neutral")
+
+
+class TestPrecomputedScores(unittest.TestCase):
+    def test_preprocess_scores_first_text_of_each_sentence(self):
+        processed = preprocess_sentences([
+            Sentence(id="a", text="Seats were not comfortable", source=AnalysisMode.STANDALONE),
+            Sentence(id="b", text="seats were  not comfortable", source=AnalysisMode.STANDALONE),
+            Sentence(id="c", text="Gate 4", source=AnalysisMode.STANDALONE),
+        ])
+        self.assertEqual([p.sentiment_score for p in processed], [-1.0, 0.0])
+
+    def test_summarize_rows_uses_batch_scores(self):
+        batch = build_sentence_batch([
+            Sentence(id="a", text="Great food", source=AnalysisMode.STANDALONE),
+            Sentence(id="b", text="Great drinks", source=AnalysisMode.STANDALONE),
+        ])
+        rows = np.arange(len(batch))
+        self.assertEqual(summarize_rows(batch, rows).sentiment, "positive")
+
+        batch.sentiment_scores = np.array([-1.0, -1.0], dtype=np.float32)
+        self.assertEqual(summarize_rows(batch, rows).sentiment, "negative")
+
+
+if __name__ == "__main__":
+    unittest.main()
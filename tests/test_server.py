@@ -0,0 +1,181 @@
+import asyncio
+import json
+import threading
+import unittest
+import unittest.mock
+from typing import Any, Dict, Tuple
+
+from project import jobs, server
+from project.app import success_response
+from project.validation import BadRequestError
+
+
+async def request(port: int, method: str, path: str, body: bytes = b"") -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    writer.write(head.encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, json.loads(payload)
+
+
+def echo_handler(event: Dict[str, Any]) -> Dict[str, Any]:
+    return success_response({"echo": json.loads(event["body"])})
+
+
+class TestHandleEvent(unittest.TestCase):
+    def test_bad_request_becomes_400(self):
+        original = server.lambda_handler
+        server.lambda_handler = lambda event, context: (_ for _ in ()).throw(BadRequestError("nope"))
+        try:
+            response = server.handle_event({"body": "{}"})
+        finally:
+            server.lambda_handler = original
+
+        self.assertEqual(response["statusCode"], 400)
+        self.assertEqual(json.loads(response["body"]), {"error": "nope"})
+
+    def test_unexpected_error_becomes_500_without_details(self):
+        original = server.lambda_handler
+        server.lambda_handler = lambda event, context: (_ for _ in ()).throw(RuntimeError("secret"))
+        try:
+            with self.assertLogs(server.logger, level="ERROR"):
+                response = server.handle_event({"body": "{}"})
+        finally:
+            server.lambda_handler = original
+
+        self.assertEqual(response["statusCode"], 500)
+        self.assertNotIn("secret", response["body"])
+
+
+class TestAnalysisServer(unittest.IsolatedAsyncioTestCase):
+    async def start(self, **options: Any) -> int:
+        self.server = server.AnalysisServer(warm=False, **options)
+        _, port = await self.server.start("127.0.0.1", 0)
+        self.addAsyncCleanup(self.server.close)
+        return port
+
+    async def test_post_runs_handler_and_returns_its_response(self):
+        port = await self.start(handler=echo_handler)
+        status, headers, body = await request(port, "POST", "/analyze", b'{"a": 1}')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "application/json")
+        self.assertEqual(body, {"echo": {"a": 1}})
+
+    async def test_error_responses(self):
+        port = await self.start(handler=echo_handler)
+
+        self.assertEqual((await request(port, "GET", "/missing"))[0], 404)
+        self.assertEqual((await request(port, "GET", "/analyze"))[0], 405)
+        status, _, body = await request(port, "POST", "/", b"\xff")
+        self.assertEqual(status, 400)
+        self.assertEqual(body, {"error": "Request body must be UTF-8"})
+
+    async def test_body_over_limit_is_rejected(self):
+        port = await self.start(handler=echo_handler, max_body_bytes=4)
+        status, _, _ = await request(port, "POST", "/", b'{"a": 1}')
+        self.assertEqual(status, 413)
+
+    async def test_unreadable_requests_get_an_error_and_a_closed_connection(self):
+        port = await self.start(handler=echo_handler, max_headers=3)
+        many = "".join(f"X-{i}: v\r\n" for i in range(4))
+        for head, expected in (
+            (f"GET /{'a' * 70000} HTTP/1.1\r\n\r\n", 400),
+            (f"POST / HTTP/1.1\r\nX-Long: {'a' * 70000}\r\n\r\n", 431),
+            (f"POST / HTTP/1.1\r\n{many}\r\n", 431),
+            ("POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n2\r\n{}\r\n0\r\n\r\n", 411),
+            ("POST / HTTP/1.1\r\nTransfer-Encoding: gzip\r\n\r\n", 501),
+            ("POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\nContent-Length: 2\r\n\r\n{}", 400),
+        ):
+            with self.subTest(status=expected):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(head.encode())
+                raw = await asyncio.wait_for(reader.read(), 5)
+                writer.close()
+                self.assertTrue(raw.startswith(f"HTTP/1.1 {expected} ".encode()), raw[:40])
+                self.assertIn(b"Connection: close", raw)
+
+    async def test_keep_alive_serves_several_requests_per_connection(self):
+        port = await self.start(handler=echo_handler)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+        for i in range(3):
+            body = json.dumps(i).encode()
+            writer.write(f"POST / HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            self.assertEqual(json.loads(await reader.readexactly(length)), {"echo": i})
+
+        writer.close()
+
+    async def test_sheds_load_beyond_max_pending(self):
+        release = threading.Event()
+
+        def blocking_handler(event: Dict[str, Any]) -> Dict[str, Any]:
+            release.wait(5)
+            return success_response({})
+
+        port = await self.start(handler=blocking_handler, workers=1, max_pending=2)
+        admitted = [asyncio.create_task(request(port, "POST", "/", b"{}")) for _ in range(2)]
+        while self.server.pending < 2:
+            await asyncio.sleep(0.01)
+
+        status, headers, body = await request(port, "POST", "/", b"{}")
+        self.assertEqual(status, 503)
+        self.assertEqual(headers["Retry-After"], "1")
+        self.assertIn("busy", body["error"])
+
+        # the loop stays responsive while both admitted requests are outstanding
+        self.assertEqual((await request(port, "GET", "/health"))[2], {"status": "ok", "pending": 2})
+
+        release.set()
+        self.assertEqual([r[0] for r in await asyncio.gather(*admitted)], [200, 200])
+
+    async def test_jobs_are_submitted_then_polled(self):
+        release = threading.Event()
+
+        def blocked(payload, trace):
+            with trace.stage("ingest"):
+                release.wait(5)
+            return success_response({"clusters": [{"title": payload["theme"]}]})
+
+        manager = jobs.JobManager(jobs.MemoryJobStore(), workers=1)
+        self.addCleanup(manager.close)
+        port = await self.start(jobs=manager)
+        payload = json.dumps({"surveyTitle": "t", "theme": "x", "baseline": [{"id": "1", "sentence": "Fine"}]}).encode()
+
+        with unittest.mock.patch.object(jobs, "run_analysis", blocked):
+            status, headers, body = await request(port, "POST", "/jobs", payload)
+            self.assertEqual(status, 202)
+            self.assertEqual(headers["Location"], f"/jobs/{body['jobId']}")
+
+            status, _, polled = await request(port, "GET", headers["Location"])
+            self.assertEqual(status, 200)
+            self.assertIn(polled["status"], ("queued", "running"))
+
+            release.set()
+            while polled["status"] != "succeeded":
+                await asyncio.sleep(0.01)
+                polled = (await request(port, "GET", headers["Location"]))[2]
+
+        self.assertEqual(polled["completedStages"], ["ingest"])
+        self.assertEqual(polled["clusters"], [{"title": "x"}])
+
+    async def test_job_errors(self):
+        port = await self.start(jobs=jobs.JobManager(jobs.MemoryJobStore(), workers=1))
+
+        self.assertEqual((await request(port, "GET", "/jobs/missing"))[0], 404)
+        self.assertEqual((await request(port, "GET", "/jobs"))[0], 405)
+        status, _, body = await request(port, "POST", "/jobs", b'{"theme": "x"}')
+        self.assertEqual(status, 400)
+        self.assertEqual(body, {"error": "Missing required field: surveyTitle"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+import project.embeddings as emb
+from project import app, sharding
+from project.clustering import cluster_batch
+from project.compression import compress_vectors
+from project.embedding_backends import StubBackend
+from project.preprocessing import SentenceBatchBuilder
+from project.sharding import cluster_shards, embed_shards, merge_shards, partition_rows
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+class StubModel:
+    def encode(self, texts, **kwargs):
+        return StubBackend().encode(texts)
+
+
+def text_batch(name="input_example_2.json"):
+    payload = json.loads((DATA / name).read_text())
+    builder = SentenceBatchBuilder()
+    for item in payload["baseline"]:
+        builder.add(item["id"], item["sentence"])
+    return builder.build()
+
+
+def vector_batch(vectors):
+    builder = SentenceBatchBuilder()
+    for i in range(len(vectors)):
+        builder.add(f"s{i}", f"sentence {i}")
+    batch = builder.build()
+    batch.vectors = np.asarray(vectors, dtype=np.float32)
+    return batch
+
+
+class ShardTestCase(unittest.TestCase):
+    def setUp(self):
+        self.orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = StubModel(), None, False
+        self.shared = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(sharding, "SHARD_SHARED_DIR", self.shared.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.executor = ThreadPoolExecutor(max_workers=3)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = self.orig
+        self.assertEqual(os.listdir(self.shared.name), [])
+        self.shared.cleanup()
+
+
+class TestEmbedShards(ShardTestCase):
+    def test_vectors_match_an_in_process_encode(self):
+        batch = embed_shards(text_batch(), shards=3, executor=self.executor)
+        np.testing.assert_array_equal(batch.vectors, StubBackend().encode(batch.normalized_texts))
+
+    def test_vectors_can_land_on_a_scratch_file(self):
+        with tempfile.TemporaryDirectory() as scratch:
+            batch = embed_shards(text_batch(), shards=3, executor=self.executor, directory=scratch)
+            self.assertIsInstance(batch.vectors, np.memmap)
+            self.assertFalse(batch.vectors.flags.writeable)
+            np.testing.assert_array_equal(batch.vectors, StubBackend().encode(batch.normalized_texts))
+
+    def test_shared_files_are_removed_when_a_shard_fails(self):
+        with mock.patch.object(sharding, "embed_texts", side_effect=RuntimeError("encoder down")):
+            with self.assertRaises(RuntimeError):
+                embed_shards(text_batch(), shards=3, executor=self.executor)
+
+
+class TestClusterShards(ShardTestCase):
+    def test_partition_keeps_similar_rows_together(self):
+        rng = np.random.default_rng(0)
+        centres = np.eye(4, 32)
+        vectors = np.repeat(centres, 10, axis=0) + rng.normal(scale=0.01, size=(40, 32))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        order = rng.permutation(40)
+
+        parts = partition_rows(vectors[order].astype(np.float32), 4)
+
+        self.assertEqual(sorted(np.concatenate(parts).tolist()), list(range(40)))
+        self.assertEqual([len({int(i) // 10 for i in order[rows]}) for rows in parts], [1, 1, 1, 1])
+
+    def test_clusters_merge_across_shards_by_centroid(self):
+        vectors = np.array([[1, 0, 0], [1, 0.1, 0], [1, 0.05, 0], [1, 0.1, 0.05], [0, 1, 0], [0, 1, 0.1], [0, 0, 1]])
+        batch = vector_batch(vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+        # the first two shards each hold half of one cluster; the second shard also holds another
+        parts = [np.array([0, 1]), np.array([2, 3, 4, 5]), np.array([6])]
+        local_labels = [np.array([0, 0]), np.array([0, 0, 1, 1]), np.array([-1])]
+
+        clusters = merge_shards(batch, parts, local_labels, threshold=0.9)
+
+        self.assertEqual([rows.tolist() for rows in clusters], [[0, 1, 2, 3], [4, 5]])
+        self.assertEqual(batch.labels[6], -1)
+
+    def test_clusters_of_one_shard_stay_apart(self):
+        batch = vector_batch([[1, 0], [1, 0], [0.9, 0.1], [0.9, 0.1]])
+        clusters = merge_shards(batch, [np.arange(4)], [np.array([0, 0, 1, 1])], threshold=0.5)
+        self.assertEqual([rows.tolist() for rows in clusters], [[0, 1], [2, 3]])
+
+    def test_one_shard_matches_cluster_batch(self):
+        batch = embed_shards(text_batch(), shards=2, executor=self.executor)
+        expected = [rows.tolist() for rows in cluster_batch(batch)]
+
+        clusters = cluster_shards(batch, shards=1, executor=self.executor)
+
+        self.assertEqual([rows.tolist() for rows in clusters], expected)
+
+    def test_workers_cluster_the_compact_vectors(self):
+        batch = embed_shards(text_batch(), shards=2, executor=self.executor)
+        batch.compact_vectors = compress_vectors(batch.vectors, method="random", dim=128, int8=True)
+        expected = [rows.tolist() for rows in cluster_batch(batch)]
+
+        with mock.patch.object(sharding, "cluster_labels", wraps=sharding.cluster_labels) as clustered:
+            clusters = cluster_shards(batch, shards=1, executor=self.executor)
+
+        self.assertEqual(clustered.call_args.args[0].codes.shape, (len(batch), 128))
+        self.assertEqual([rows.tolist() for rows in clusters], expected)
+
+
+class TestProcessPool(unittest.TestCase):
+    def test_worker_processes_embed_and_cluster_through_shared_files(self):
+        env = {"EMBEDDING_BACKEND": "stub", "EMBEDDING_CACHE_ENABLED": "false", "LOG_LEVEL": "WARNING"}
+        with tempfile.TemporaryDirectory() as shared, mock.patch.dict(os.environ, env), \
+                mock.patch.object(sharding, "SHARD_SHARED_DIR", shared):
+            executor = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+            try:
+                batch = embed_shards(text_batch(), shards=2, executor=executor)
+                clusters = cluster_shards(batch, shards=2, executor=executor)
+            finally:
+                executor.shutdown()
+            self.assertEqual(os.listdir(shared), [])
+
+        np.testing.assert_array_equal(batch.vectors, StubBackend().encode(batch.normalized_texts))
+        self.assertTrue(clusters)
+        self.assertEqual(sum(rows.size for rows in clusters), int((batch.labels >= 0).sum()))
+
+
+class TestHandlerSharding(ShardTestCase):
+    def test_handler_runs_sharded_above_the_row_floor(self):
+        payload = json.loads((DATA / "input_example_2.json").read_text())
+        with mock.patch.object(sharding, "SHARD_WORKERS", 3), mock.patch.object(sharding, "SHARD_MIN_ROWS", 1), \
+                mock.patch.object(sharding, "_executor", self.executor), \
+                mock.patch.object(app, "embed_shards", wraps=embed_shards) as sharded:
+            body = json.loads(app.lambda_handler(payload, None)["body"])
+
+        sharded.assert_called_once()
+        self.assertTrue(body["clusters"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+
+from project.similarity import row_blocks, similarity_blocks, threshold_neighbours, top_k_neighbours
+
+
+def random_unit_vectors(n: int, dim: int = 8, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+class TestRowBlocks(unittest.TestCase):
+    def test_blocks_cover_rows_within_budget(self):
+        blocks = row_blocks(n_rows=10, n_cols=4, memory_bytes=40, bytes_per_cell=4)
+        self.assertEqual([(b.start, b.stop) for b in blocks], [(0, 2), (2, 4), (4, 6), (6, 8), (8, 10)])
+
+    def test_at_least_one_row_per_block(self):
+        blocks = row_blocks(n_rows=3, n_cols=1000, memory_bytes=1)
+        self.assertEqual(len(blocks), 3)
+
+    def test_similarity_blocks_match_full_product(self):
+        vectors = random_unit_vectors(23)
+        full = vectors @ vectors.T
+        for block, sims in similarity_blocks(vectors, vectors, memory_bytes=200):
+            np.testing.assert_allclose(sims, full[block], atol=1e-6)
+
+
+class TestTopK(unittest.TestCase):
+    def test_matches_brute_force(self):
+        vectors = random_unit_vectors(50)
+        indices, scores = top_k_neighbours(vectors, vectors, k=5, memory_bytes=500)
+
+        full = vectors @ vectors.T
+        expected = np.argsort(-full, axis=1, kind="stable")[:, :5]
+        np.testing.assert_allclose(scores, np.take_along_axis(full, expected, axis=1), atol=1e-6)
+        np.testing.assert_array_equal(indices[:, 0], np.arange(50))
+
+    def test_exclude_self(self):
+        vectors = random_unit_vectors(20)
+        indices, scores = top_k_neighbours(vectors, vectors, k=3, exclude_self=True, memory_bytes=100)
+        self.assertFalse(np.any(indices == np.arange(20)[:, None]))
+        self.assertTrue(np.all(np.diff(scores, axis=1) <= 0))
+
+    def test_k_larger_than_corpus(self):
+        vectors = random_unit_vectors(4)
+        indices, _ = top_k_neighbours(vectors[:1], vectors, k=10)
+        self.assertEqual(indices.shape, (1, 4))
+
+
+class TestThresholdNeighbours(unittest.TestCase):
+    def test_matches_brute_force(self):
+        vectors = random_unit_vectors(40, dim=3)
+        graph = threshold_neighbours(vectors, vectors, threshold=0.8, memory_bytes=64)
+
+        full = vectors @ vectors.T
+        expected_rows, expected_cols = np.nonzero(full >= 0.8)
+        rows, cols = graph.nonzero()
+        self.assertEqual(set(zip(rows, cols)), set(zip(expected_rows, expected_cols)))
+        np.testing.assert_allclose(graph[rows, cols].A1, full[rows, cols], atol=1e-6)
+
+    def test_empty_queries(self):
+        vectors = random_unit_vectors(5)
+        graph = threshold_neighbours(vectors[:0], vectors, threshold=0.5)
+        self.assertEqual(graph.shape, (0, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
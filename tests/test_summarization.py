@@ -0,0 +1,120 @@
+import unittest
+import numpy as np
+
+from project.models import AnalysisMode, EmbeddedSentence, ProcessedSentence, Sentence, SentenceCluster
+from project.preprocessing import build_sentence_batch, preprocess_sentences
+from project.summarization import summarize_cluster, summarize_comparative_cluster, summarize_comparative_rows, summarize_rows
+
+
+def make_es(text: str, baseline_ids: list[str], comparison_ids: list[str], vector=(1.0, 0.0)) -> EmbeddedSentence:
+    ps = ProcessedSentence(
+        ids=baseline_ids + [i for i in comparison_ids if i not in baseline_ids],
+        original_texts=[text],
+        normalized_text=text.lower(),
+        baseline_ids=baseline_ids,
+        comparison_ids=comparison_ids,
+    )
+    v = np.array(vector, dtype=np.float32)
+    return EmbeddedSentence(sentence=ps, vector=v / np.linalg.norm(v))
+
+
+class TestSummarizeCluster(unittest.TestCase):
+    def test_ids_are_unique_and_sorted(self):
+        cluster = SentenceCluster(sentences=[make_es("Good food", ["b", "a"], []), make_es("Great food", ["a"], [])])
+        summary = summarize_cluster(cluster)
+        self.assertEqual(summary.sentence_ids, ["a", "b"])
+        self.assertEqual(summary.sentiment, "positive")
+        self.assertEqual(summary.key_insights, ["Good food", "Great food"])
+
+
+class TestRepresentatives(unittest.TestCase):
+    def members(self):
+        # two near-duplicates at the centre, one member on each side of them
+        return [
+            make_es("Seats were cramped", ["1"], [], (0.8, 0.6, 0.0)),
+            make_es("Legroom was poor", ["2"], [], (1.0, 0.0, 0.0)),
+            make_es("Legroom was very poor", ["3"], [], (1.0, 0.01, 0.0)),
+            make_es("No recline at all", ["4"], [], (0.8, -0.6, 0.0)),
+        ]
+
+    def test_title_is_member_closest_to_centroid(self):
+        summary = summarize_cluster(SentenceCluster(sentences=self.members()))
+        self.assertIn(summary.title, {"Legroom was poor", "Legroom was very poor"})
+        self.assertEqual(summary.key_insights[0], summary.title)
+
+    def test_insights_skip_near_duplicates(self):
+        summary = summarize_cluster(SentenceCluster(sentences=self.members()))
+        self.assertEqual(len(summary.key_insights), 3)
+        self.assertEqual(len({"Legroom was poor", "Legroom was very poor"} & set(summary.key_insights)), 1)
+
+    def test_independent_of_input_order(self):
+        forward = summarize_cluster(SentenceCluster(sentences=self.members()))
+        backward = summarize_cluster(SentenceCluster(sentences=self.members()[::-1]))
+        self.assertEqual(forward.title, backward.title)
+        self.assertEqual(forward.key_insights, backward.key_insights)
+
+
+class TestSummarizeComparativeCluster(unittest.TestCase):
+    def test_ids_split_per_input_set(self):
+        cluster = SentenceCluster(sentences=[
+            make_es("Bag was lost", ["b1"], ["c1"]),
+            make_es("Bag arrived late", ["b2"], []),
+            make_es("Bag was damaged", [], ["c2"]),
+        ])
+
+        summary = summarize_comparative_cluster(cluster)
+
+        self.assertEqual(summary.baseline_sentence_ids, ["b1", "b2"])
+        self.assertEqual(summary.comparison_sentence_ids, ["c1", "c2"])
+        self.assertEqual(summary.key_similarities, ["Bag was lost"])
+        self.assertIn("Bag was damaged", summary.key_differences)
+        self.assertIn("Bag arrived late", summary.key_differences)
+
+    def test_similarities_fall_back_when_no_shared_sentences(self):
+        cluster = SentenceCluster(sentences=[make_es("Seats ok", ["b1"], []), make_es("Seats fine", [], ["c1"])])
+        summary = summarize_comparative_cluster(cluster)
+        self.assertEqual(summary.key_similarities, ["Seats ok", "Seats fine"])
+
+
+class TestSummarizeRows(unittest.TestCase):
+    def setUp(self):
+        self.inputs = [
+            Sentence(id="b1", text="Bag was lost", source=AnalysisMode.STANDALONE),
+            Sentence(id="c1", text="bag was lost", source=AnalysisMode.COMPARATIVE),
+            Sentence(id="b2", text="Great service", source=AnalysisMode.STANDALONE),
+            Sentence(id="c2", text="Bag was damaged", source=AnalysisMode.COMPARATIVE),
+        ]
+
+    def as_cluster(self, rows: list[int]) -> SentenceCluster:
+        processed = preprocess_sentences(self.inputs)
+        return SentenceCluster(sentences=[EmbeddedSentence(sentence=processed[i], vector=np.zeros(2)) for i in rows])
+
+    def test_matches_object_based_summary(self):
+        batch = build_sentence_batch(self.inputs)
+        rows = np.array([0, 2])
+        self.assertEqual(summarize_rows(batch, rows), summarize_cluster(self.as_cluster([0, 2])))
+
+    def test_matches_object_based_summary_with_vectors(self):
+        vectors = np.array([[1.0, 0.2], [0.8, 0.6], [0.1, 1.0]], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        batch = build_sentence_batch(self.inputs)
+        batch.vectors = vectors
+        processed = preprocess_sentences(self.inputs)
+        cluster = SentenceCluster(sentences=[EmbeddedSentence(sentence=p, vector=v) for p, v in zip(processed, vectors)])
+
+        rows = np.arange(3)
+        self.assertEqual(summarize_rows(batch, rows), summarize_cluster(cluster))
+        self.assertEqual(summarize_comparative_rows(batch, rows), summarize_comparative_cluster(cluster))
+        self.assertEqual(summarize_rows(batch, rows).title, "Great service")
+
+    def test_comparative_matches_object_based_summary(self):
+        batch = build_sentence_batch(self.inputs)
+        rows = np.array([0, 1, 2])
+        self.assertEqual(
+            summarize_comparative_rows(batch, rows),
+            summarize_comparative_cluster(self.as_cluster([0, 1, 2])),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
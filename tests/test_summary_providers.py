@@ -0,0 +1,248 @@
+import asyncio
+import functools
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import project.embeddings as emb
+from project import app, summary_providers as sp
+from project.models import AnalysisMode, GeneratedSummary, SummaryRequest, SummaryRunStats
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+def make_request(texts, mode=AnalysisMode.STANDALONE, comparison_texts=()) -> SummaryRequest:
+    return SummaryRequest(
+        mode=mode,
+        survey_title="Airline feedback",
+        theme="seats",
+        sentiment="negative",
+        baseline_texts=list(texts),
+        comparison_texts=list(comparison_texts),
+        baseline_count=len(texts),
+        comparison_count=len(comparison_texts),
+    )
+
+
+class ScriptedProvider:
+    """Fails, hangs or answers per call, and records concurrency."""
+
+    model_id = "scripted"
+
+    def __init__(self, failures=0, hang_first=0, delay=0.0):
+        self.failures = failures
+        self.hang_first = hang_first
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def summarize(self, request):
+        self.calls += 1
+        call = self.calls
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if call <= self.hang_first:
+                await asyncio.sleep(60)
+            await asyncio.sleep(self.delay)
+            if call <= self.failures:
+                raise ConnectionError("transient")
+            return GeneratedSummary(title=request.baseline_texts[0], key_insights=["**x**"])
+        finally:
+            self.in_flight -= 1
+
+
+def run(requests, provider, **kwargs):
+    kwargs.setdefault("timeout_ms", 1000)
+    kwargs.setdefault("deadline_ms", 5000)
+    return asyncio.run(sp.generate_summaries(requests, provider, **kwargs))
+
+
+class TestStubProvider(unittest.TestCase):
+    def test_deterministic_with_bold_keywords(self):
+        request = make_request(["Seats were cramped", "Cramped seats and no legroom", "Legroom was poor"])
+        first = asyncio.run(sp.StubSummaryProvider(0).summarize(request))
+        second = asyncio.run(sp.StubSummaryProvider(0).summarize(request))
+
+        self.assertEqual(first, second)
+        self.assertEqual(first.title, "Cramped and legroom")
+        self.assertEqual(first.key_insights[0], "Seats were **cramped**")
+
+    def test_comparative_similarities_and_differences(self):
+        request = make_request(
+            ["Legroom was poor"], AnalysisMode.COMPARATIVE, ["Legroom is still poor", "Seats are dirty"],
+        )
+        summary = asyncio.run(sp.StubSummaryProvider(0).summarize(request))
+        self.assertIn("Both sets mention **legroom**", summary.key_similarities)
+        self.assertEqual(summary.key_differences[0], "**1 baseline** vs **2 comparison** sentences")
+
+
+class TestParseSummary(unittest.TestCase):
+    def test_valid_reply(self):
+        summary = sp.parse_summary(
+            json.dumps({"title": " Legroom ", "keyInsights": ["a **b**", "c", "d", "e"]}), AnalysisMode.STANDALONE,
+        )
+        self.assertEqual(summary.title, "Legroom")
+        self.assertEqual(summary.key_insights, ["a **b**", "c", "d"])
+
+    def test_invalid_replies_raise(self):
+        for content in ("not json", "[]", '{"title": ""}', '{"title": "t", "keyInsights": []}'):
+            with self.assertRaises(sp.SummaryProviderError):
+                sp.parse_summary(content, AnalysisMode.STANDALONE)
+        with self.assertRaises(sp.SummaryProviderError):
+            sp.parse_summary('{"title": "t", "keyInsights": ["a"]}', AnalysisMode.COMPARATIVE)
+
+    def test_prompt_lists_both_sets(self):
+        prompt = sp.build_prompt(make_request(["b1"], AnalysisMode.COMPARATIVE, ["c1"]))
+        self.assertIn("- b1", prompt)
+        self.assertIn("- c1", prompt)
+        self.assertIn("keyDifferences", prompt)
+
+
+class TestGenerateSummaries(unittest.TestCase):
+    def test_bounded_concurrency_and_order(self):
+        provider = ScriptedProvider(delay=0.01)
+        requests = [make_request([f"text {i}"]) for i in range(10)]
+
+        results = run(requests, provider, concurrency=3)
+
+        self.assertEqual([r.title for r in results], [f"text {i}" for i in range(10)])
+        self.assertEqual(provider.max_in_flight, 3)
+
+    def test_retries_transient_failures(self):
+        provider = ScriptedProvider(failures=2)
+        with mock.patch.object(sp, "_RETRY_BACKOFF_SECONDS", 0):
+            results = run([make_request(["a"])], provider, retries=2)
+        self.assertEqual(results[0].title, "a")
+        self.assertEqual(provider.calls, 3)
+
+    def test_gives_up_after_retries(self):
+        provider = ScriptedProvider(failures=10)
+        stats = SummaryRunStats()
+        with mock.patch.object(sp, "_RETRY_BACKOFF_SECONDS", 0):
+            results = run([make_request(["a"])], provider, retries=1, stats=stats)
+        self.assertEqual(results, [None])
+        self.assertEqual((provider.calls, stats.failed), (2, 1))
+
+    def test_per_call_timeout_is_retried(self):
+        provider = ScriptedProvider(hang_first=1)
+        with mock.patch.object(sp, "_RETRY_BACKOFF_SECONDS", 0):
+            results = run([make_request(["a"])], provider, timeout_ms=50, retries=1)
+        self.assertEqual(results[0].title, "a")
+
+    def test_deadline_leaves_pending_clusters_empty(self):
+        provider = ScriptedProvider(hang_first=1)
+        stats = SummaryRunStats()
+        results = run(
+            [make_request(["slow"]), make_request(["fast"])], provider,
+            timeout_ms=10_000, retries=0, deadline_ms=100, stats=stats,
+        )
+        self.assertIsNone(results[0])
+        self.assertEqual(results[1].title, "fast")
+        self.assertEqual(stats.timed_out, 1)
+
+    def test_deadline_holds_for_blocking_http_calls(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with mock.patch.object(sp, "SUMMARY_API_URL", "http://summaries.invalid"), \
+                mock.patch.object(sp, "SUMMARY_PROVIDER", "http"), \
+                mock.patch.object(sp, "_provider", None), \
+                mock.patch.object(sp, "_cache", sp.SummaryCache(16)), \
+                mock.patch.object(sp, "generate_summaries", functools.partial(sp.generate_summaries, deadline_ms=100)), \
+                mock.patch.object(sp.HttpSummaryProvider, "_complete", side_effect=lambda prompt: release.wait(10)):
+            start = time.perf_counter()
+            results = sp.summarize_clusters([make_request(["slow"])])
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(results, [None])
+        self.assertLess(elapsed, 2)
+
+    def test_cache_and_duplicates_skip_calls(self):
+        provider = ScriptedProvider()
+        cache = sp.SummaryCache(16)
+        requests = [make_request(["a"]), make_request(["a"]), make_request(["b"])]
+
+        run(requests, provider, cache=cache)
+        self.assertEqual(provider.calls, 2)
+
+        stats = SummaryRunStats()
+        results = run(requests, provider, cache=cache, stats=stats)
+        self.assertEqual(provider.calls, 2)
+        self.assertEqual(stats.cache_hits, 3)
+        self.assertEqual([r.title for r in results], ["a", "a", "b"])
+
+
+class TestSummaryCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = sp.SummaryCache(2)
+        for key in "abc":
+            cache.put(key, GeneratedSummary(title=key))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c").title, "c")
+
+    def test_directory_survives_a_new_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sp.SummaryCache(4, tmp).put("k", GeneratedSummary(title="t", key_insights=["**i**"]))
+            self.assertEqual(sp.SummaryCache(4, tmp).get("k"), GeneratedSummary(title="t", key_insights=["**i**"]))
+
+    def test_disk_write_failures_keep_the_summary_in_memory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = sp.SummaryCache(4, tmp)
+            summary = GeneratedSummary(title="t", key_insights=["**i**"])
+            with mock.patch.object(Path, "write_text", side_effect=OSError("No space left on device")), \
+                    self.assertLogs(sp.logger, level="WARNING"):
+                cache.put("k", summary)
+            self.assertEqual(cache.get("k"), summary)
+            self.assertEqual(list(Path(tmp).iterdir()), [])
+
+            with mock.patch.object(Path, "mkdir", side_effect=OSError("Read-only file system")), \
+                    self.assertLogs(sp.logger, level="WARNING"):
+                cache = sp.SummaryCache(4, str(Path(tmp) / "sub"))
+            cache.put("k", summary)
+            self.assertEqual(cache.get("k"), summary)
+
+    def test_key_covers_contents_and_provider(self):
+        request = make_request(["a"])
+        self.assertEqual(sp.summary_cache_key("p", request), sp.summary_cache_key("p", make_request(["a"])))
+        self.assertNotEqual(sp.summary_cache_key("p", request), sp.summary_cache_key("p", make_request(["b"])))
+        self.assertNotEqual(sp.summary_cache_key("p", request), sp.summary_cache_key("q", request))
+
+
+class StubBackendModel:
+    def encode(self, texts, **kwargs):
+        from project.embedding_backends import StubBackend
+        return StubBackend().encode(texts)
+
+
+class TestHandlerWithProvider(unittest.TestCase):
+    def setUp(self):
+        self.orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED, sp._provider, sp._cache)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = StubBackendModel(), None, False
+        sp._provider, sp._cache = sp.StubSummaryProvider(0), sp.SummaryCache(64)
+
+    def tearDown(self):
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED, sp._provider, sp._cache = self.orig
+
+    def test_generated_bullets_replace_extractive_ones(self):
+        event = {"body": (DATA / "input_example.json").read_text()}
+        with mock.patch.object(app, "SUMMARY_PROVIDER", "stub"):
+            body = json.loads(app.lambda_handler(event, None)["body"])
+
+        self.assertTrue(body["clusters"])
+        self.assertTrue(all(any("**" in i for i in c["key_insights"]) for c in body["clusters"]))
+        self.assertGreater(len(sp._cache), 0)
+
+    def test_comparative_generated_fields(self):
+        event = {"body": (DATA / "input_comparison_example.json").read_text()}
+        with mock.patch.object(app, "SUMMARY_PROVIDER", "stub"):
+            body = json.loads(app.lambda_handler(event, None)["body"])
+        self.assertTrue(all(c["keyDifferences"][0].startswith("**") for c in body["clusters"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import io
+import json
+import logging
+import pstats
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+import project.embeddings as emb
+from project import app, tracing
+from project.logging import JsonFormatter
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+class FakeModel:
+    def encode(self, texts, **kwargs):
+        return np.array([[len(t), 1.0, 0.0] for t in texts], dtype=np.float32)
+
+
+def capture_logger(name: str) -> tuple[logging.Logger, io.StringIO]:
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    target = logging.getLogger(name)
+    target.handlers = [handler]
+    target.propagate = False
+    target.setLevel(logging.INFO)
+    return target, stream
+
+
+class TestJsonFormatter(unittest.TestCase):
+    def test_structured_fields_and_escaping(self):
+        target, stream = capture_logger("test.tracing.formatter")
+        target.info('said "hi"', extra={"fields": {"stage": "embed", "wall_ms": 1.5}})
+
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry["message"], 'said "hi"')
+        self.assertEqual((entry["level"], entry["logger"]), ("INFO", "test.tracing.formatter"))
+        self.assertEqual((entry["stage"], entry["wall_ms"]), ("embed", 1.5))
+        self.assertIn("timestamp", entry)
+
+
+class TestTrace(unittest.TestCase):
+    def test_records_stages_including_failures(self):
+        trace = tracing.Trace()
+        with trace.stage("a"):
+            sum(range(1000))
+        with self.assertRaises(ValueError):
+            with trace.stage("b"):
+                raise ValueError("boom")
+
+        self.assertEqual([s.stage for s in trace.stages], ["a", "b"])
+        self.assertGreaterEqual(trace.stages[0].wall_ms, 0)
+        self.assertEqual(set(trace.as_dict()["a"]), {"wall_ms", "cpu_ms", "peak_rss_delta_kb"})
+
+    def test_log_emits_one_structured_line_per_stage(self):
+        target, stream = capture_logger("test.tracing.log")
+        trace = tracing.Trace()
+        with trace.stage("embed"):
+            pass
+        trace.log(target)
+
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry["stage"], "embed")
+        self.assertIn("cpu_ms", entry)
+
+    def test_disabled_trace_is_shared_and_records_nothing(self):
+        with mock.patch.object(tracing, "TRACING_ENABLED", False), \
+                mock.patch.object(tracing, "TRACE_TIMINGS_IN_RESPONSE", False):
+            first, second = tracing.start_trace(), tracing.start_trace()
+            with first.stage("x"):
+                pass
+
+        self.assertIs(first, second)
+        self.assertFalse(first.enabled)
+        self.assertEqual(first.as_dict(), {})
+
+    def test_profiled_writes_a_loadable_profile(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(tracing, "PROFILE_DIR", tmp):
+            with tracing.profiled("unit") as path:
+                sorted(range(1000), reverse=True)
+
+            self.assertTrue(path.name.startswith("unit-"))
+            self.assertGreater(pstats.Stats(str(path)).total_calls, 0)
+
+    def test_profiled_is_a_no_op_without_profile_dir(self):
+        with mock.patch.object(tracing, "PROFILE_DIR", ""):
+            with tracing.profiled() as path:
+                pass
+        self.assertIsNone(path)
+
+
+class TestHandlerTimings(unittest.TestCase):
+    def setUp(self):
+        self.orig = (emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED)
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = FakeModel(), None, False
+
+    def tearDown(self):
+        emb._model, emb._cache, emb.EMBEDDING_CACHE_ENABLED = self.orig
+
+    def event(self):
+        return {"body": (DATA / "input_example.json").read_text()}
+
+    def test_timings_block_when_enabled(self):
+        with mock.patch.object(app, "TRACE_TIMINGS_IN_RESPONSE", True), \
+                mock.patch.object(tracing, "TRACE_TIMINGS_IN_RESPONSE", True):
+            body = json.loads(app.lambda_handler(self.event(), None)["body"])
+
+        self.assertEqual(list(body["timings"]), ["ingest", "dedupe", "embed", "sentiment", "cluster", "recover", "summarize"])
+        self.assertIn("clusters", body)
+
+    def test_no_timings_block_by_default(self):
+        with mock.patch.object(app, "TRACE_TIMINGS_IN_RESPONSE", False):
+            body = json.loads(app.lambda_handler(self.event(), None)["body"])
+        self.assertNotIn("timings", body)
+
+
+if __name__ == "__main__":
+    unittest.main()